@@ -24,11 +24,14 @@ CREATE TABLE IF NOT EXISTS job_descriptions (
     work_competencies TEXT DEFAULT NULL,
     enhanced_title VARCHAR(255) DEFAULT NULL,
     enhanced_description TEXT DEFAULT NULL,
+    basic_minhash BLOB DEFAULT NULL,
+    enhanced_minhash BLOB DEFAULT NULL,
     created_by_user_id VARCHAR(255) NOT NULL,
     created_at DATETIME DEFAULT NULL,
     enhanced_at DATETIME DEFAULT NULL,
     INDEX ix_job_descriptions_req_id (req_id),
-    INDEX ix_job_descriptions_created_by_user_id (created_by_user_id)
+    INDEX ix_job_descriptions_created_by_user_id (created_by_user_id),
+    INDEX ix_job_descriptions_enhanced_at (enhanced_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Create interviews table
@@ -71,11 +74,15 @@ CREATE TABLE IF NOT EXISTS question_cache (
     skill_level VARCHAR(50) DEFAULT NULL,
     question_text TEXT NOT NULL,
     criteria JSON NOT NULL,
+    embedding BLOB DEFAULT NULL,
+    token_cost INT DEFAULT NULL,
     created_at DATETIME DEFAULT NULL,
     last_used_at DATETIME DEFAULT NULL,
     usage_count INT DEFAULT 1,
     INDEX ix_question_cache_cache_key (cache_key),
-    INDEX ix_question_cache_request_hash (request_hash)
+    INDEX ix_question_cache_request_hash (request_hash),
+    INDEX ix_question_cache_last_used_at (last_used_at),
+    INDEX ix_question_cache_usage_count (usage_count)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Create generation_logs table
@@ -87,12 +94,44 @@ CREATE TABLE IF NOT EXISTS generation_logs (
     status VARCHAR(50) NOT NULL,
     error_message TEXT DEFAULT NULL,
     tokens_used INT DEFAULT NULL,
+    repair_count INT DEFAULT 0,
+    tokens_saved INT DEFAULT 0,
+    cache_read_tokens INT DEFAULT 0,
+    cache_write_tokens INT DEFAULT 0,
+    model VARCHAR(100) DEFAULT NULL,
+    output_tokens INT DEFAULT NULL,
     started_at DATETIME DEFAULT NULL,
     completed_at DATETIME DEFAULT NULL,
     INDEX ix_generation_logs_req_id (req_id),
     INDEX ix_generation_logs_user_id (user_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Create generation_jobs table
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id VARCHAR(36) NOT NULL PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    req_id VARCHAR(255) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'queued',
+    payload JSON NOT NULL,
+    result JSON DEFAULT NULL,
+    error_message TEXT DEFAULT NULL,
+    created_at DATETIME DEFAULT NULL,
+    started_at DATETIME DEFAULT NULL,
+    completed_at DATETIME DEFAULT NULL,
+    INDEX ix_generation_jobs_req_id (req_id),
+    INDEX ix_generation_jobs_user_id (user_id),
+    INDEX ix_generation_jobs_status (status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create cache_leases table
+CREATE TABLE IF NOT EXISTS cache_leases (
+    lease_key VARCHAR(64) NOT NULL PRIMARY KEY,
+    token VARCHAR(32) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX ix_cache_leases_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Verify tables were created
 SHOW TABLES;
 
@@ -100,4 +139,4 @@ SHOW TABLES;
 SELECT TABLE_NAME, TABLE_COLLATION 
 FROM information_schema.TABLES 
 WHERE TABLE_SCHEMA = DATABASE() 
-AND TABLE_NAME IN ('job_descriptions', 'interviews', 'interview_questions', 'question_cache', 'generation_logs');
+AND TABLE_NAME IN ('job_descriptions', 'interviews', 'interview_questions', 'question_cache', 'generation_logs', 'generation_jobs', 'cache_leases');
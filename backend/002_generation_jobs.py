@@ -0,0 +1,55 @@
+"""
+Alembic migration for the background generation jobs table.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+def upgrade():
+    """Create the generation_jobs table used by the async workflow API."""
+    
+    bind = op.get_bind()
+    is_mysql = bind.dialect.name == 'mysql'
+    
+    json_type = mysql.JSON if is_mysql else sa.JSON
+    
+    mysql_table_args = {
+        'mysql_charset': 'utf8mb4',
+        'mysql_collate': 'utf8mb4_unicode_ci',
+        'mysql_engine': 'InnoDB'
+    } if is_mysql else {}
+    
+    op.create_table(
+        'generation_jobs',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('job_type', sa.String(50), nullable=False),
+        sa.Column('req_id', sa.String(255), nullable=False),
+        sa.Column('user_id', sa.String(255), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('payload', json_type, nullable=False),
+        sa.Column('result', json_type, nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        **mysql_table_args
+    )
+    op.create_index('ix_generation_jobs_req_id', 'generation_jobs', ['req_id'])
+    op.create_index('ix_generation_jobs_user_id', 'generation_jobs', ['user_id'])
+    op.create_index('ix_generation_jobs_status', 'generation_jobs', ['status'])
+
+
+def downgrade():
+    """Drop the generation_jobs table."""
+    
+    op.drop_index('ix_generation_jobs_status', 'generation_jobs')
+    op.drop_index('ix_generation_jobs_user_id', 'generation_jobs')
+    op.drop_index('ix_generation_jobs_req_id', 'generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,24 @@
+"""
+Alembic migration adding question repair tracking to generation_logs.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add repair_count and tokens_saved columns to generation_logs."""
+    
+    op.add_column('generation_logs', sa.Column('repair_count', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('generation_logs', sa.Column('tokens_saved', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade():
+    """Drop the repair tracking columns."""
+    
+    op.drop_column('generation_logs', 'tokens_saved')
+    op.drop_column('generation_logs', 'repair_count')
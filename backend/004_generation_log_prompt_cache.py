@@ -0,0 +1,24 @@
+"""
+Alembic migration adding prompt cache usage to generation_logs.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add cache_read_tokens and cache_write_tokens columns to generation_logs."""
+    
+    op.add_column('generation_logs', sa.Column('cache_read_tokens', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('generation_logs', sa.Column('cache_write_tokens', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade():
+    """Drop the prompt cache columns."""
+    
+    op.drop_column('generation_logs', 'cache_write_tokens')
+    op.drop_column('generation_logs', 'cache_read_tokens')
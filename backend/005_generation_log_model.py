@@ -0,0 +1,22 @@
+"""
+Alembic migration recording the Claude model used for each generation.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add the model column to generation_logs."""
+    
+    op.add_column('generation_logs', sa.Column('model', sa.String(100), nullable=True))
+
+
+def downgrade():
+    """Drop the model column."""
+    
+    op.drop_column('generation_logs', 'model')
@@ -0,0 +1,22 @@
+"""
+Alembic migration recording the output size of each generation, for the token budgeter.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add the output_tokens column to generation_logs."""
+    
+    op.add_column('generation_logs', sa.Column('output_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    """Drop the output_tokens column."""
+    
+    op.drop_column('generation_logs', 'output_tokens')
@@ -0,0 +1,22 @@
+"""
+Alembic migration adding the similarity vector to question_cache, for semantic question reuse.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add the embedding column to question_cache."""
+    
+    op.add_column('question_cache', sa.Column('embedding', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    """Drop the embedding column."""
+    
+    op.drop_column('question_cache', 'embedding')
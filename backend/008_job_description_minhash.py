@@ -0,0 +1,29 @@
+"""
+Alembic migration adding MinHash signatures to job_descriptions, for near-duplicate JD detection.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+
+Existing rows get no signatures here; backfill them afterwards with:
+    python -m backend.jd_deduplication
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add the signature columns and index enhanced_at (the near-duplicate index refreshes by it)."""
+    
+    op.add_column('job_descriptions', sa.Column('basic_minhash', sa.LargeBinary(), nullable=True))
+    op.add_column('job_descriptions', sa.Column('enhanced_minhash', sa.LargeBinary(), nullable=True))
+    op.create_index('ix_job_descriptions_enhanced_at', 'job_descriptions', ['enhanced_at'])
+
+
+def downgrade():
+    """Drop the signature columns and the enhanced_at index."""
+    
+    op.drop_index('ix_job_descriptions_enhanced_at', table_name='job_descriptions')
+    op.drop_column('job_descriptions', 'enhanced_minhash')
+    op.drop_column('job_descriptions', 'basic_minhash')
@@ -0,0 +1,26 @@
+"""
+Alembic migration adding the generation cost of cached questions and indexing the eviction orders.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Add token_cost and index last_used_at and usage_count (the sweeper orders by them)."""
+    
+    op.add_column('question_cache', sa.Column('token_cost', sa.Integer(), nullable=True))
+    op.create_index('ix_question_cache_last_used_at', 'question_cache', ['last_used_at'])
+    op.create_index('ix_question_cache_usage_count', 'question_cache', ['usage_count'])
+
+
+def downgrade():
+    """Drop the eviction indexes and token_cost."""
+    
+    op.drop_index('ix_question_cache_usage_count', table_name='question_cache')
+    op.drop_index('ix_question_cache_last_used_at', table_name='question_cache')
+    op.drop_column('question_cache', 'token_cost')
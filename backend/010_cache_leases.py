@@ -0,0 +1,40 @@
+"""
+Alembic migration for the cache_leases table, which protects the question cache from stampedes.
+Compatible with Aurora MySQL 5.7+ and 8.0+.
+
+To run this migration:
+    alembic upgrade head
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    """Create the cache_leases table."""
+    
+    bind = op.get_bind()
+    is_mysql = bind.dialect.name == 'mysql'
+    
+    mysql_table_args = {
+        'mysql_charset': 'utf8mb4',
+        'mysql_collate': 'utf8mb4_unicode_ci',
+        'mysql_engine': 'InnoDB'
+    } if is_mysql else {}
+    
+    op.create_table(
+        'cache_leases',
+        sa.Column('lease_key', sa.String(64), nullable=False),
+        sa.Column('token', sa.String(32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('lease_key'),
+        **mysql_table_args
+    )
+    op.create_index('ix_cache_leases_expires_at', 'cache_leases', ['expires_at'])
+
+
+def downgrade():
+    """Drop the cache_leases table."""
+    
+    op.drop_index('ix_cache_leases_expires_at', 'cache_leases')
+    op.drop_table('cache_leases')
@@ -0,0 +1,429 @@
+"""
+Batch Service - Bulk JD enhancement and interview generation through the Claude Message Batches API.
+Used to onboard whole requisition backlogs at half the price of individual requests.
+"""
+
+import logging
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from .models import db, JobDescription, GenerationLog
+from .jd_enhancement_service import JDEnhancementService
+from .interview_generation_service import InterviewGenerationService
+from .prompts import JD_ENHANCEMENT_INSTRUCTIONS, JD_ENHANCEMENT_SYSTEM_PROMPT
+from .token_budget import load_token_history
+from .input_normalizer import normalize_input
+
+logger = logging.getLogger(__name__)
+
+# Optional JD fields passed through to the enhancement prompt and the JobDescription row
+JD_OPTIONAL_FIELDS = (
+    'basic_department',
+    'basic_level',
+    'work_output',
+    'work_role',
+    'work_knowledge',
+    'work_competencies'
+)
+
+
+class BatchService:
+    """
+    Bulk counterpart of JDEnhancementService.enhance_jd and
+    InterviewGenerationService.generate_interview.
+    
+    Each stage builds the same prompts as the interactive services, submits
+    them as one Message Batch, and writes all results in a single
+    transaction. Items succeed or fail individually: an errored or invalid
+    response only fails its own JD. As in the interactive services, no
+    database transaction is open while the batch runs.
+    """
+    
+    def __init__(
+        self,
+        jd_enhancement_service: JDEnhancementService,
+        interview_generation_service: InterviewGenerationService,
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None
+    ):
+        """
+        Initialize Batch Service.
+        
+        Args:
+            jd_enhancement_service: Service whose prompts and JD writes are reused
+            interview_generation_service: Service whose prompts, repair and interview writes are reused
+            poll_interval: Seconds between batch status checks (defaults to Config.BATCH_POLL_INTERVAL)
+            timeout: Seconds to wait for each batch (defaults to Config.BATCH_TIMEOUT)
+        """
+        self.jd_enhancement_service = jd_enhancement_service
+        self.interview_generation_service = interview_generation_service
+        self.claude_client = jd_enhancement_service.claude_client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+    
+    def run_bulk_workflow(
+        self,
+        jds: List[Dict[str, Any]],
+        user_id: str,
+        generate_interviews: bool = True,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Enhance a list of JDs, then generate an interview for each enhanced JD.
+        
+        Args:
+            jds: JD dictionaries with 'req_id', 'basic_title', 'basic_description',
+                 the optional enhance_jd fields and an optional 'interview_name'
+            user_id: ID of user running the workflow
+            generate_interviews: Also run the interview stage (default True)
+            use_cache: Whether cached Claude responses may be reused (default True)
+        
+        Returns:
+            Dictionary with:
+            {
+                'success': True,
+                'jd_enhancements': [...],   # one enhance_jds item per JD
+                'interviews': [...],        # one generate_interviews item per enhanced JD
+                'succeeded': int,           # JDs that completed every stage
+                'failed': int,
+                'total_tokens_used': int
+            }
+        """
+        jd_results = self.enhance_jds(jds, user_id, use_cache=use_cache)
+        
+        interview_results = []
+        if generate_interviews:
+            items = [
+                {
+                    'req_id': jd_result['req_id'],
+                    'job_description_id': jd_result['job_description_id'],
+                    'interview_name': jd.get('interview_name')
+                }
+                for jd, jd_result in zip(jds, jd_results) if jd_result['success']
+            ]
+            if items:
+                interview_results = self.generate_interviews(items, user_id, use_cache=use_cache)
+        
+        final_results = interview_results if generate_interviews else jd_results
+        succeeded = sum(1 for result in final_results if result['success'])
+        
+        return {
+            'success': True,
+            'jd_enhancements': jd_results,
+            'interviews': interview_results,
+            'succeeded': succeeded,
+            'failed': len(jds) - succeeded,
+            'total_tokens_used': sum(
+                result.get('tokens_used', 0) for result in jd_results + interview_results
+            )
+        }
+    
+    def enhance_jds(
+        self,
+        jds: List[Dict[str, Any]],
+        user_id: str,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Enhance many JDs with one Message Batch.
+        
+        Args:
+            jds: JD dictionaries with 'req_id', 'basic_title', 'basic_description'
+                 and the optional enhance_jd fields
+            user_id: ID of user requesting enhancement
+            use_cache: Whether cached Claude responses may be reused (default True)
+        
+        Returns:
+            One dictionary per JD, in order:
+            {'success': True, 'req_id': str, 'job_description_id': int, 'tokens_used': int}
+            or {'success': False, 'req_id': str, 'error': str}
+        
+        Raises:
+            ValueError: If a req_id appears more than once
+            Exception: If the batch itself fails (every log entry is marked failed)
+        """
+        req_ids = [jd['req_id'] for jd in jds]
+        duplicates = sorted({req_id for req_id in req_ids if req_ids.count(req_id) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate req_id in bulk request: {', '.join(duplicates)}")
+        
+        load_token_history(self.claude_client, 'jd_enhancement')
+        log_entry_ids = self._start_logs('jd_enhancement', req_ids, user_id)
+        
+        # Phase 2: one batch for every JD, with no open transaction. Descriptions are
+        # normalized, and very long ones condensed first (individual calls); a JD whose condensation
+        # fails or whose prompt is over the input limit fails on its own
+        requests = {}
+        errors = {}
+        condensation_tokens = {}
+        for index, jd in enumerate(jds):
+            try:
+                normalized = normalize_input(jd['basic_description'], label=f"Job description {jd['req_id']}")['text']
+                condensation = self.jd_enhancement_service._condense_description(normalized, use_cache)
+                condensation_tokens[index] = condensation['tokens_used']
+                user_prompt = self.jd_enhancement_service._build_user_prompt(
+                    basic_title=jd['basic_title'],
+                    basic_description=condensation['text'],
+                    **{field: jd.get(field) for field in JD_OPTIONAL_FIELDS}
+                )
+            except Exception as e:
+                logger.warning(f"Bulk JD enhancement failed for req_id {jd['req_id']}: {str(e)}")
+                errors[index] = str(e)
+                continue
+            requests[f"jd-{index}"] = {
+                'system_prompt': JD_ENHANCEMENT_SYSTEM_PROMPT,
+                'static_prompt': JD_ENHANCEMENT_INSTRUCTIONS,
+                'user_prompt': user_prompt,
+                'temperature': 0.3,
+                'operation': 'jd_enhancement'
+            }
+        responses = self._run_batch(requests, log_entry_ids, use_cache) if requests else {}
+        
+        # Phase 3: write every JD and log entry in one transaction
+        existing = {
+            jd.req_id: jd
+            for jd in JobDescription.query.filter(JobDescription.req_id.in_(req_ids))
+        }
+        log_entries = self._load_logs(log_entry_ids)
+        
+        results = []
+        rows = {}
+        for index, fields in enumerate(jds):
+            log_entry = log_entries[log_entry_ids[index]]
+            
+            if index in errors:
+                self._finish_log(log_entry, error=errors[index])
+                results.append({'success': False, 'req_id': fields['req_id'], 'error': errors[index]})
+                continue
+            
+            response = responses[f"jd-{index}"]
+            if not response.get('success'):
+                error = f"Claude API call failed: {response.get('error', 'Unknown error')}"
+                self._finish_log(log_entry, error=error)
+                results.append({'success': False, 'req_id': fields['req_id'], 'error': error})
+                continue
+            
+            rows[index] = self.jd_enhancement_service._apply_enhancement(
+                jd=existing.get(fields['req_id']),
+                req_id=fields['req_id'],
+                basic_title=fields['basic_title'],
+                basic_description=fields['basic_description'],
+                user_id=user_id,
+                enhanced_description=response.get('text', '').strip(),
+                **{field: fields.get(field) for field in JD_OPTIONAL_FIELDS}
+            )
+            tokens_used = response['usage']['total_tokens'] + condensation_tokens[index]
+            self._finish_log(
+                log_entry,
+                tokens_used=tokens_used,
+                cache_read_tokens=response['usage'].get('cache_read_input_tokens', 0),
+                cache_write_tokens=response['usage'].get('cache_creation_input_tokens', 0),
+                model=response.get('model'),
+                output_tokens=response['usage'].get('output_tokens') or None
+            )
+            results.append({
+                'success': True,
+                'req_id': fields['req_id'],
+                'tokens_used': tokens_used
+            })
+        
+        db.session.flush()
+        for index, result in enumerate(results):
+            if result['success']:
+                result['job_description_id'] = rows[index].id
+        db.session.commit()
+        
+        logger.info(f"Bulk JD enhancement finished: {len(rows)}/{len(jds)} succeeded")
+        return results
+    
+    def generate_interviews(
+        self,
+        items: List[Dict[str, Any]],
+        user_id: str,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate interviews for many JDs with one Message Batch.
+        
+        Invalid questions are repaired with individual calls (see
+        InterviewGenerationService._repair_questions), as in single mode.
+        
+        Args:
+            items: Dictionaries with 'req_id', 'job_description_id' and optional 'interview_name'
+            user_id: ID of user requesting interview generation
+            use_cache: Whether cached Claude responses may be reused (default True)
+        
+        Returns:
+            One dictionary per item, in order:
+            {'success': True, 'req_id': str, 'interview_id': int, 'tokens_used': int, 'repaired_questions': int}
+            or {'success': False, 'req_id': str, 'error': str}
+        
+        Raises:
+            Exception: If the batch itself fails (every log entry is marked failed)
+        """
+        load_token_history(self.claude_client, 'interview_generation')
+        log_entry_ids = self._start_logs('interview_generation', [item['req_id'] for item in items], user_id)
+        
+        # Phase 1: read every JD in one query, then end the transaction
+        jds = {
+            jd.id: jd
+            for jd in JobDescription.query.filter(
+                JobDescription.id.in_([item['job_description_id'] for item in items])
+            )
+        }
+        inputs = {}
+        errors = {}
+        for index, item in enumerate(items):
+            if item['job_description_id'] not in jds:
+                errors[index] = f"Job description with id {item['job_description_id']} not found"
+                continue
+            try:
+                inputs[index] = self.interview_generation_service._generation_inputs(
+                    jds[item['job_description_id']], item.get('interview_name')
+                )
+            except ValueError as e:
+                errors[index] = str(e)
+        db.session.commit()
+        
+        # Phase 2: one batch for every interview, then parse and repair with no open transaction
+        requests = {
+            f"interview-{index}": self.interview_generation_service._generation_request(item_inputs['jd_content'])
+            for index, item_inputs in inputs.items()
+        }
+        responses = self._run_batch(requests, log_entry_ids, use_cache) if requests else {}
+        
+        generations = {}
+        for index, item in enumerate(items):
+            if index in errors:
+                continue
+            try:
+                generations[index] = self.interview_generation_service._finish_generation(
+                    inputs[index]['jd_content'], responses[f"interview-{index}"]
+                )
+            except Exception as e:
+                logger.warning(f"Bulk interview generation failed for req_id {item['req_id']}: {str(e)}")
+                errors[index] = str(e)
+        
+        # Phase 3: write every interview and log entry in one transaction
+        log_entries = self._load_logs(log_entry_ids)
+        interviews = {}
+        for index, item in enumerate(items):
+            log_entry = log_entries[log_entry_ids[index]]
+            
+            if index in errors:
+                self._finish_log(log_entry, error=errors[index])
+                continue
+            
+            generation = generations[index]
+            interviews[index] = self.interview_generation_service._build_interview(
+                req_id=item['req_id'],
+                job_description_id=item['job_description_id'],
+                user_id=user_id,
+                interview_name=inputs[index]['interview_name'],
+                questions_data=generation['questions']
+            )
+            self._finish_log(
+                log_entry,
+                tokens_used=generation['tokens_used'],
+                repair_count=generation['repair_count'],
+                tokens_saved=generation['tokens_saved'],
+                cache_read_tokens=generation.get('cache_read_tokens', 0),
+                cache_write_tokens=generation.get('cache_write_tokens', 0),
+                model=generation.get('model'),
+                output_tokens=generation.get('output_tokens')
+            )
+        
+        db.session.flush()
+        results = []
+        for index, item in enumerate(items):
+            if index in errors:
+                results.append({'success': False, 'req_id': item['req_id'], 'error': errors[index]})
+                continue
+            results.append({
+                'success': True,
+                'req_id': item['req_id'],
+                'interview_id': interviews[index].id,
+                'tokens_used': generations[index]['tokens_used'],
+                'repaired_questions': generations[index]['repair_count']
+            })
+        db.session.commit()
+        
+        logger.info(f"Bulk interview generation finished: {len(interviews)}/{len(items)} succeeded")
+        return results
+    
+    def _run_batch(
+        self,
+        requests: Dict[str, Dict[str, Any]],
+        log_entry_ids: List[int],
+        use_cache: bool
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run a batch; if it fails as a whole, mark every log entry failed and re-raise."""
+        try:
+            return self.claude_client.call_claude_batch(
+                requests,
+                use_cache=use_cache,
+                poll_interval=self.poll_interval,
+                timeout=self.timeout
+            )
+        except Exception as e:
+            logger.error(f"Claude batch failed: {str(e)}")
+            db.session.rollback()
+            for log_entry in self._load_logs(log_entry_ids).values():
+                self._finish_log(log_entry, error=str(e))
+            db.session.commit()
+            raise
+    
+    def _start_logs(self, operation_type: str, req_ids: List[str], user_id: str) -> List[int]:
+        """
+        Create one in-progress GenerationLog entry per item in a single transaction.
+        
+        Returns:
+            Log entry IDs, in item order
+        """
+        now = datetime.utcnow()
+        log_entries = [
+            GenerationLog(
+                operation_type=operation_type,
+                req_id=req_id,
+                user_id=user_id,
+                status='in_progress',
+                started_at=now
+            )
+            for req_id in req_ids
+        ]
+        db.session.add_all(log_entries)
+        db.session.flush()
+        log_entry_ids = [log_entry.id for log_entry in log_entries]
+        db.session.commit()
+        
+        return log_entry_ids
+    
+    def _load_logs(self, log_entry_ids: List[int]) -> Dict[int, GenerationLog]:
+        """Load log entries with one query, keyed by ID."""
+        return {
+            log_entry.id: log_entry
+            for log_entry in GenerationLog.query.filter(GenerationLog.id.in_(log_entry_ids))
+        }
+    
+    def _finish_log(
+        self,
+        log_entry: GenerationLog,
+        tokens_used: int = 0,
+        repair_count: int = 0,
+        tokens_saved: int = 0,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0,
+        model: Optional[str] = None,
+        output_tokens: Optional[int] = None,
+        error: Optional[str] = None
+    ):
+        """Mark a log entry succeeded or failed (no commit)."""
+        log_entry.status = 'failed' if error else 'success'
+        log_entry.error_message = error
+        log_entry.tokens_used = tokens_used
+        log_entry.repair_count = repair_count
+        log_entry.tokens_saved = tokens_saved
+        log_entry.cache_read_tokens = cache_read_tokens
+        log_entry.cache_write_tokens = cache_write_tokens
+        log_entry.model = model
+        log_entry.output_tokens = output_tokens
+        log_entry.completed_at = datetime.utcnow()
@@ -0,0 +1,156 @@
+"""
+Cache Leases - Short-lived claims, in the cache_leases table, on cache entries being generated.
+Lets concurrent misses on any host wait for one generation instead of each calling Claude.
+"""
+
+import hashlib
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, Set
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from .config import Config
+from .models import db, CacheLease
+
+logger = logging.getLogger(__name__)
+
+
+class CacheLeases:
+    """
+    Leases stored as rows of cache_leases, keyed by a hash of what is generated.
+    
+    The primary key makes acquiring atomic on every backend: of several
+    concurrent inserts of one key, one commits and the others fail. A lease
+    lapses after `ttl` seconds, so a holder that crashed cannot block its key
+    for long. Each call runs its own short transactions and ends them, so it
+    must not be used inside a caller's transaction.
+    """
+    
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        wait_timeout: Optional[float] = None,
+        poll_interval: Optional[float] = None
+    ):
+        """
+        Initialize Cache Leases.
+        
+        Args:
+            ttl: Lease lifetime in seconds (defaults to Config.CACHE_LEASE_TTL)
+            wait_timeout: Seconds callers wait for another holder (defaults to Config.CACHE_LEASE_WAIT_TIMEOUT)
+            poll_interval: Seconds between checks while waiting (defaults to Config.CACHE_LEASE_POLL_INTERVAL)
+        """
+        self.ttl = ttl if ttl is not None else Config.CACHE_LEASE_TTL
+        self.wait_timeout = wait_timeout if wait_timeout is not None else Config.CACHE_LEASE_WAIT_TIMEOUT
+        self.poll_interval = poll_interval if poll_interval is not None else Config.CACHE_LEASE_POLL_INTERVAL
+        
+        self._lock = threading.Lock()
+        self._counters = {'acquired': 0, 'contended': 0, 'released': 0, 'timeouts': 0}
+    
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """SHA-256 hex digest of the parts (fits the lease_key column)."""
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+    
+    def acquire(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Take the leases on the keys that no one else holds.
+        
+        Lapsed leases are deleted first; then each key is inserted in its own
+        short transaction.
+        
+        Args:
+            keys: Lease keys (see make_key)
+        
+        Returns:
+            Leases taken, as {key: token}
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return {}
+        now = datetime.utcnow()
+        
+        CacheLease.query.filter(
+            CacheLease.lease_key.in_(keys), CacheLease.expires_at <= now
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        
+        leases = {}
+        for key in keys:
+            token = uuid.uuid4().hex
+            db.session.add(CacheLease(lease_key=key, token=token, expires_at=now + timedelta(seconds=self.ttl)))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                continue
+            leases[key] = token
+        
+        with self._lock:
+            self._counters['acquired'] += len(leases)
+            self._counters['contended'] += len(keys) - len(leases)
+        return leases
+    
+    def held(self, keys: Iterable[str]) -> Set[str]:
+        """
+        Report which keys are leased (by anyone) and not lapsed.
+        
+        Args:
+            keys: Lease keys (see make_key)
+        
+        Returns:
+            Set of the keys currently leased
+        """
+        keys = list(set(keys))
+        if not keys:
+            return set()
+        rows = CacheLease.query.filter(
+            CacheLease.lease_key.in_(keys), CacheLease.expires_at > datetime.utcnow()
+        ).with_entities(CacheLease.lease_key).all()
+        db.session.commit()
+        return {key for (key,) in rows}
+    
+    def release(self, leases: Optional[Dict[str, str]]):
+        """
+        Release leases taken with acquire; a lease taken over after it lapsed is left alone.
+        
+        A failure is logged only: the leases then lapse after ttl seconds.
+        
+        Args:
+            leases: {key: token} as returned by acquire
+        """
+        if not leases:
+            return
+        try:
+            released = CacheLease.query.filter(or_(*[
+                and_(CacheLease.lease_key == key, CacheLease.token == token)
+                for key, token in leases.items()
+            ])).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Releasing cache leases failed: {str(e)}")
+            return
+        
+        with self._lock:
+            self._counters['released'] += released
+    
+    def record_timeout(self):
+        """Count a caller that stopped waiting for another holder."""
+        with self._lock:
+            self._counters['timeouts'] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report lease counters for this process.
+        
+        Returns:
+            Dictionary with 'acquired', 'contended' (keys held by another
+            request when asked for), 'released' and 'timeouts'
+        """
+        with self._lock:
+            return dict(self._counters)
@@ -5,14 +5,33 @@ Handles error handling, retries, and response parsing.
 
 import logging
 import json
-from typing import Dict, Any, Optional, List
+import os
+import re
+from typing import Dict, Any, Optional, List, Iterator, Callable, Tuple
 from datetime import datetime
 import time
+import threading
+from contextlib import contextmanager
+import httpx
 from anthropic import Anthropic, APIError, RateLimitError, APIConnectionError
+from anthropic.types import Message
+# The SDK's lenient response parser; Message(**data) rejects content types this SDK version predates
+from anthropic._models import construct_type
 from .config import Config
+from .response_cache import ResponseCache
+from .rate_limiter import RateLimiter, estimate_tokens
+from .retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError
+from .retry_policy import circuit_breaker as shared_circuit_breaker
+from .hedging import HedgingPolicy, HedgeAttempt, hedged_events
+from .model_router import ModelRouter
+from .token_budget import TokenBudgeter
+from .interview_schema import parse_interview_tool_input
 
 logger = logging.getLogger(__name__)
 
+# Outline lines look like "1. Subject Area - What the question should test"
+OUTLINE_LINE_PATTERN = re.compile(r'^\d+[.)]\s+(.+)$')
+
 
 class ClaudeClientService:
     """
@@ -20,104 +39,1162 @@ class ClaudeClientService:
     Handles authentication, request/response formatting, and error handling.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        response_cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        http_client=None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+        model_router: Optional[ModelRouter] = None,
+        token_budgeter: Optional[TokenBudgeter] = None
+    ):
         """
         Initialize Claude client.
         
         Args:
             api_key: Claude API key. If not provided, uses CLAUDE_API_KEY from config.
+            response_cache: Cache for identical requests. If not provided, one is
+                            created when Config.RESPONSE_CACHE_ENABLED is set.
+            rate_limiter: Budgets shared with the other workers. If not provided,
+                          one is created when Config.RATE_LIMIT_ENABLED is set.
+            retry_policy: Backoff and retryable-error rules (defaults from config)
+            circuit_breaker: Breaker to consult before each call (defaults to the
+                             process-wide breaker)
+            http_client: httpx.Client for the SDK to use (e.g. with a mock
+                         transport in tests)
+            hedging_policy: Latency tracking and budget for hedge=True calls. If not
+                            provided, one is created when Config.HEDGE_ENABLED is set.
+            model_router: Per-operation model routing with fallbacks. If not
+                          provided, one is created when Config.MODEL_ROUTING_ENABLED
+                          is set; without one every call uses Config.CLAUDE_MODEL.
+            token_budgeter: Learned per-operation max_tokens. If not provided, one is
+                            created when Config.TOKEN_BUDGET_ENABLED is set; without
+                            one calls default to Config.CLAUDE_MAX_TOKENS.
         """
         self.api_key = api_key or Config.CLAUDE_API_KEY
-        self.client = Anthropic(api_key=self.api_key)
+        # Retries are handled by retry_policy, not by the SDK
+        self.client = Anthropic(
+            api_key=self.api_key, base_url=Config.CLAUDE_BASE_URL, http_client=http_client, max_retries=0
+        )
         self.model = Config.CLAUDE_MODEL
         self.max_tokens = Config.CLAUDE_MAX_TOKENS
-        self.max_retries = 3
-        self.retry_delay = 2
+        self.max_continuations = Config.CLAUDE_MAX_CONTINUATIONS
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or shared_circuit_breaker
+        if hedging_policy is None and Config.HEDGE_ENABLED:
+            hedging_policy = HedgingPolicy()
+        self.hedging_policy = hedging_policy
+        if model_router is None and Config.MODEL_ROUTING_ENABLED:
+            model_router = ModelRouter()
+        self.model_router = model_router
+        if token_budgeter is None and Config.TOKEN_BUDGET_ENABLED:
+            token_budgeter = TokenBudgeter()
+        self.token_budgeter = token_budgeter
+        if response_cache is None and Config.RESPONSE_CACHE_ENABLED:
+            response_cache = ResponseCache()
+        self.response_cache = response_cache
+        self.cache_leases = Config.CACHE_LEASE_ENABLED
+        self.lease_wait_timeout = Config.CACHE_LEASE_WAIT_TIMEOUT
+        if rate_limiter is None and Config.RATE_LIMIT_ENABLED:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
     
     def call_claude(
         self,
         system_prompt: str,
         user_prompt: str,
         max_tokens: Optional[int] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        use_cache: bool = True,
+        store_cache: bool = True,
+        hedge: bool = False,
+        static_prompt: Optional[str] = None,
+        cached_context: Optional[str] = None,
+        operation: Optional[str] = None,
+        tool: Optional[Dict[str, Any]] = None,
+        stop_sequences: Optional[List[str]] = None,
+        prefill: Optional[str] = None,
+        max_continuations: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Make a call to Claude API with retry logic.
         
+        Identical requests (model, prompts, temperature, max_tokens) are served
+        from the response cache when one is configured. A learned max_tokens
+        budget is not part of the cache key: a complete response does not
+        depend on it. A cached result has
+        'cached': True and zero usage, since no tokens were spent on it.
+        Concurrent misses of the same request make a single API call, and a
+        recently expired response is served while it is refreshed (see
+        _get_or_lease).
+        
+        static_prompt and cached_context are sent with prompt caching (see
+        _build_request), so repeated prefixes are billed at the cache-read rate.
+        
+        A text response cut off at max_tokens is continued: its text is sent
+        back as the start of Claude's reply (prefill) and the continuation is
+        appended, up to max_continuations times. 'usage' then sums all
+        segments and 'continuations' counts the extra calls. Tool calls
+        cannot be continued this way.
+        
         Args:
             system_prompt: System instruction for Claude
-            user_prompt: User query/prompt
-            max_tokens: Maximum tokens in response (defaults to config value)
+            user_prompt: User query/prompt (the part that changes per request)
+            max_tokens: Maximum tokens in response (defaults to the operation's
+                        learned budget, see TokenBudgeter, or the config value)
             temperature: Temperature for response variability (0-1)
+            use_cache: Whether a cached response may be returned (default True)
+            store_cache: Whether to cache the new response (default True)
+            hedge: Send a backup request if this one is slower than usual
+                   (for interactive callers; see HedgingPolicy)
+            static_prompt: Instructions identical for every request of an
+                           operation, sent after the system prompt
+            cached_context: Input reused across several requests (e.g. a job
+                            description), sent before user_prompt
+            operation: Model routing key (e.g. 'jd_enhancement'). The model is
+                       chosen per attempt, so a retry can go to a fallback model.
+            tool: Tool definition (name, description, input_schema) Claude must
+                  call to return structured output, e.g. INTERVIEW_TOOL
+            stop_sequences: Strings that end the response as soon as Claude
+                            writes one (the sequence itself is not returned)
+            prefill: Start of Claude's reply; Claude carries on from it and the
+                     returned text does not repeat it
+            max_continuations: Calls made to continue a truncated response
+                               (defaults to Config.CLAUDE_MAX_CONTINUATIONS; 0 disables)
         
         Returns:
-            Dictionary with response text and metadata
+            Dictionary with response text and metadata ('model' is the model that
+            answered). With a tool, 'tool_input' holds the tool call's input and
+            'text' its JSON.
         
         Raises:
             Exception: If API call fails after max retries
         """
+        call_args = {name: value for name, value in locals().items() if name != 'self'}
+        # A truncated tool call cannot be continued, so tool calls keep the full default
+        budgeted = max_tokens is None and not tool and self.token_budgeter is not None
         max_tokens = max_tokens or self.max_tokens
+        prompts = {
+            'system_prompt': system_prompt,
+            'user_prompt': user_prompt,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'static_prompt': static_prompt,
+            'cached_context': cached_context,
+            'tool': tool,
+            'stop_sequences': stop_sequences,
+            'prefill': prefill
+        }
+        model = self._route(operation)
+        
+        cache_key = self._cache_key(model=model, **prompts)
+        if cache_key and use_cache:
+            cached, lease = self._get_or_lease(
+                cache_key,
+                lambda: self.call_claude(**dict(call_args, use_cache=False, hedge=False)),
+                lease=store_cache
+            )
+            if cached:
+                logger.info("Claude API call served from response cache")
+                return cached
+            if lease is not None:
+                try:
+                    return self.call_claude(**dict(call_args, use_cache=False))
+                finally:
+                    self.response_cache.release_lease(cache_key, lease)
+        
+        request = self._build_request(model=model, **prompts)
+        if budgeted:
+            request['max_tokens'] = max_tokens = self.token_budgeter.max_tokens(operation)
         
-        for attempt in range(self.max_retries):
+        previous_delay = None
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
             try:
-                logger.info(f"Claude API call attempt {attempt + 1}/{self.max_retries}")
+                logger.info(f"Claude API call attempt {attempt}/{self.retry_policy.max_attempts} ({model})")
                 
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    system=system_prompt,
-                    messages=[
-                        {"role": "user", "content": user_prompt}
-                    ]
-                )
+                started_at = time.monotonic()
+                if hedge and self.hedging_policy is not None:
+                    # This SDK version cannot stream tool calls, so those attempts are non-streaming
+                    open_attempt = self._create_attempt if tool else self._stream_attempt
+                    events = hedged_events(
+                        lambda hedge_attempt: open_attempt(request, hedge_attempt),
+                        self.hedging_policy,
+                        metric='response',
+                        key=(model, max_tokens)
+                    )
+                    result = [event for event in events if event['type'] == 'done'][0]['result']
+                else:
+                    with self._circuit_slot(model), self._rate_limit_slot(request) as slot:
+                        response = self.client.messages.create(**self._sdk_request(request))
+                        
+                        result = self._build_result(response)
+                        slot['usage'] = result['usage']
+                    
+                    if self.hedging_policy is not None:
+                        self.hedging_policy.record_latency('response', (model, max_tokens), time.monotonic() - started_at)
+                self._record_route(operation, model, time.monotonic() - started_at)
                 
-                # Extract text from response
-                response_text = response.content[0].text
+                logger.info(f"Claude API call successful. Tokens used: {result['usage']['total_tokens']} "
+                            f"(cache read {result['usage']['cache_read_input_tokens']}, "
+                            f"cache write {result['usage']['cache_creation_input_tokens']})")
+                break
+            
+            except APIError as e:
+                self._record_route(operation, model, None, e)
+                previous_delay = self._backoff(attempt, previous_delay, e)
+                model, request, cache_key = self._reroute(operation, model, request, cache_key, prompts)
+            
+            except CircuitOpenError as e:
+                logger.warning(str(e))
+                raise
+            
+            except Exception as e:
+                logger.error(f"Unexpected error in Claude API call: {str(e)}")
+                raise
+        else:
+            raise Exception("Claude API call failed after max retries")
+        
+        max_continuations = self.max_continuations if max_continuations is None else max_continuations
+        if result['stop_reason'] == 'max_tokens' and not tool and max_continuations > 0:
+            result = self._continue_truncated(result, prompts, operation, max_continuations, hedge)
+        if budgeted:
+            self.token_budgeter.record(operation, result['usage']['output_tokens'])
+        
+        if cache_key and store_cache:
+            self._store_cached_response(cache_key, result)
+        return result
+    
+    def stream_claude(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        use_cache: bool = True,
+        store_cache: bool = True,
+        hedge: bool = False,
+        static_prompt: Optional[str] = None,
+        cached_context: Optional[str] = None,
+        operation: Optional[str] = None,
+        stop_sequences: Optional[List[str]] = None,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        prefill: Optional[str] = None,
+        max_continuations: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a Claude response using the Messages streaming API.
+        
+        Rate limit and connection errors are retried only until the first text
+        arrives; after that the error is raised to the caller. A cached
+        response is replayed as a single text chunk; concurrent misses and
+        stale entries are handled as in call_claude.
+        
+        stop_when lets the caller end a response it has seen enough of: it
+        is called after each text delta has been yielded, and once it returns
+        True the HTTP stream is closed, so Claude stops generating (and
+        billing) output. The done result then holds only the text yielded so
+        far, with stop_reason 'stop_requested'; its output_tokens is an
+        estimate, since the API only reports output usage at the end.
+        
+        A response cut off at max_tokens is continued as in call_claude; the
+        continuation's text is streamed on as part of the same response.
+        
+        Args:
+            system_prompt: System instruction for Claude
+            user_prompt: User query/prompt
+            max_tokens: Maximum tokens in response (defaults as for call_claude)
+            temperature: Temperature for response variability (0-1)
+            use_cache: Whether a cached response may be replayed (default True)
+            store_cache: Whether to cache the completed response (default True)
+            hedge: Send a backup request if the first token is slower than usual
+            static_prompt: Cached instructions (as for call_claude)
+            cached_context: Cached shared input (as for call_claude)
+            operation: Model routing key (as for call_claude)
+            stop_sequences: Strings that end the response (as for call_claude)
+            stop_when: Called with each text delta; True ends the stream there
+            prefill: Start of Claude's reply (as for call_claude)
+            max_continuations: Calls made to continue a truncated response (as for call_claude)
+        
+        Yields:
+            {'type': 'text', 'text': str} for each text delta, then
+            {'type': 'done', 'result': {...}} with the same structure call_claude returns
+        """
+        call_args = {name: value for name, value in locals().items() if name != 'self'}
+        budgeted = max_tokens is None and self.token_budgeter is not None
+        max_tokens = max_tokens or self.max_tokens
+        prompts = {
+            'system_prompt': system_prompt,
+            'user_prompt': user_prompt,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'static_prompt': static_prompt,
+            'cached_context': cached_context,
+            'stop_sequences': stop_sequences,
+            'prefill': prefill
+        }
+        model = self._route(operation)
+        
+        cache_key = self._cache_key(model=model, **prompts)
+        if cache_key and use_cache:
+            # A stale entry is refreshed in full: stop_when only applies to this stream
+            refresh_args = {name: value for name, value in call_args.items() if name != 'stop_when'}
+            cached, lease = self._get_or_lease(
+                cache_key,
+                lambda: self.call_claude(**dict(refresh_args, use_cache=False, hedge=False)),
+                lease=store_cache
+            )
+            if cached:
+                logger.info("Claude API stream served from response cache")
+                yield {'type': 'text', 'text': cached['text']}
+                yield {'type': 'done', 'result': cached}
+                return
+            if lease is not None:
+                try:
+                    yield from self.stream_claude(**dict(call_args, use_cache=False))
+                finally:
+                    self.response_cache.release_lease(cache_key, lease)
+                return
+        
+        request = self._build_request(model=model, **prompts)
+        if budgeted:
+            request['max_tokens'] = max_tokens = self.token_budgeter.max_tokens(operation)
+        
+        previous_delay = None
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            started = False
+            stop = threading.Event()
+            try:
+                logger.info(f"Claude API stream attempt {attempt}/{self.retry_policy.max_attempts} ({model})")
                 
-                result = {
-                    'success': True,
-                    'text': response_text,
-                    'usage': {
-                        'input_tokens': response.usage.input_tokens,
-                        'output_tokens': response.usage.output_tokens,
-                        'total_tokens': response.usage.input_tokens + response.usage.output_tokens
-                    },
-                    'model': response.model,
-                    'stop_reason': response.stop_reason
-                }
+                hedged = hedge and self.hedging_policy is not None
+                if hedged:
+                    events = hedged_events(
+                        lambda hedge_attempt: self._stream_attempt(request, hedge_attempt, stop),
+                        self.hedging_policy,
+                        metric='first_token',
+                        key=(model, max_tokens)
+                    )
+                else:
+                    events = self._stream_attempt(request, stop=stop)
                 
-                logger.info(f"Claude API call successful. Tokens used: {result['usage']['total_tokens']}")
-                return result
+                started_at = time.monotonic()
+                result = None
+                delivered = []
+                for event in events:
+                    if event['type'] == 'done':
+                        result = event['result']
+                        continue
+                    # A hedged attempt runs ahead of us; drop what it sent after the stop
+                    if stop.is_set():
+                        continue
+                    if not started and not hedged and self.hedging_policy is not None:
+                        self.hedging_policy.record_latency(
+                            'first_token', (model, max_tokens), time.monotonic() - started_at
+                        )
+                    started = True
+                    yield event
+                    delivered.append(event['text'])
+                    if stop_when is not None and stop_when(event['text']):
+                        logger.info("Claude API stream stopped early by the caller")
+                        stop.set()
+                self._record_route(operation, model, time.monotonic() - started_at)
+                if stop.is_set():
+                    result['text'] = ''.join(delivered)
                 
-            except RateLimitError as e:
-                logger.warning(f"Rate limit hit on attempt {attempt + 1}. Retrying...")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))
-                else:
-                    logger.error("Max retries exceeded due to rate limiting")
-                    raise Exception(f"Claude API rate limit exceeded: {str(e)}")
-            
-            except APIConnectionError as e:
-                logger.warning(f"Connection error on attempt {attempt + 1}. Retrying...")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                else:
-                    logger.error("Max retries exceeded due to connection errors")
-                    raise Exception(f"Claude API connection failed: {str(e)}")
+                logger.info(f"Claude API stream successful. Tokens used: {result['usage']['total_tokens']}")
+                break
             
             except APIError as e:
-                logger.error(f"Claude API error: {str(e)}")
-                if attempt == self.max_retries - 1:
-                    raise Exception(f"Claude API error: {str(e)}")
-                time.sleep(self.retry_delay)
+                self._record_route(operation, model, None, e)
+                if started:
+                    logger.error(f"Claude API stream failed: {str(e)}")
+                    raise Exception(f"Claude API stream failed: {str(e)}")
+                previous_delay = self._backoff(attempt, previous_delay, e)
+                model, request, cache_key = self._reroute(operation, model, request, cache_key, prompts)
             
-            except Exception as e:
-                logger.error(f"Unexpected error in Claude API call: {str(e)}")
+            except CircuitOpenError as e:
+                logger.warning(str(e))
                 raise
+        else:
+            raise Exception("Claude API stream failed after max retries")
+        
+        max_continuations = self.max_continuations if max_continuations is None else max_continuations
+        if result['stop_reason'] == 'max_tokens' and max_continuations > 0:
+            result = yield from self._stream_continuation(
+                result, prompts, operation, max_continuations, hedge, stop_when
+            )
+        if budgeted:
+            self.token_budgeter.record(operation, result['usage']['output_tokens'])
+        
+        if cache_key and store_cache:
+            self._store_cached_response(cache_key, result)
+        yield {'type': 'done', 'result': result}
+    
+    def call_claude_batch(
+        self,
+        requests: Dict[str, Dict[str, Any]],
+        use_cache: bool = True,
+        store_cache: bool = True,
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run many independent requests through the Message Batches API.
+        
+        Batched requests cost half as much as individual calls and do not
+        count against the per-minute rate limits, but can take minutes to
+        hours, so this is for bulk work only. Requests with a cached response
+        are answered from the cache and not submitted. Blocks, polling the
+        batch, until it has ended. Text responses cut off at max_tokens are
+        continued with regular calls (see call_claude).
+        
+        Args:
+            requests: Dictionary of {custom_id: params}, where params has
+                      'system_prompt', 'user_prompt' and optionally 'max_tokens',
+                      'temperature', 'static_prompt', 'cached_context',
+                      'operation', 'tool', 'stop_sequences' and 'prefill' (as
+                      for call_claude). A custom_id is 1-64 letters, digits,
+                      '-' or '_'.
+            use_cache: Whether cached responses may be returned (default True)
+            store_cache: Whether to cache the new responses (default True)
+            poll_interval: Seconds between status checks (defaults to Config.BATCH_POLL_INTERVAL)
+            timeout: Seconds to wait for the batch (defaults to Config.BATCH_TIMEOUT)
+        
+        Returns:
+            Dictionary of {custom_id: result}. Succeeded requests have the
+            structure call_claude returns; errored, canceled or expired ones
+            are {'success': False, 'error': str}.
+        
+        Raises:
+            TimeoutError: If the batch has not ended within timeout (it is canceled)
+            Exception: If the batch cannot be submitted, or cannot be polled
+                       (it is canceled)
+        """
+        poll_interval = poll_interval if poll_interval is not None else Config.BATCH_POLL_INTERVAL
+        timeout = timeout if timeout is not None else Config.BATCH_TIMEOUT
+        
+        results = {}
+        cache_keys = {}
+        submitted = {}
+        budgeted = set()
+        batch_requests = []
+        for custom_id, params in requests.items():
+            prompts = {
+                'system_prompt': params['system_prompt'],
+                'user_prompt': params['user_prompt'],
+                'max_tokens': params.get('max_tokens') or self.max_tokens,
+                'temperature': params.get('temperature', 0.7),
+                'static_prompt': params.get('static_prompt'),
+                'cached_context': params.get('cached_context'),
+                'tool': params.get('tool'),
+                'stop_sequences': params.get('stop_sequences'),
+                'prefill': params.get('prefill')
+            }
+            model = self._route(params.get('operation'))
+            
+            cache_key = self._cache_key(model=model, **prompts)
+            if cache_key and use_cache:
+                cached = self._get_cached_response(cache_key)
+                if cached:
+                    results[custom_id] = cached
+                    continue
+            
+            request = self._build_request(model=model, **prompts)
+            if not params.get('max_tokens') and not params.get('tool') and self.token_budgeter is not None:
+                request['max_tokens'] = self.token_budgeter.max_tokens(params.get('operation'))
+                budgeted.add(custom_id)
+            
+            cache_keys[custom_id] = cache_key
+            submitted[custom_id] = prompts
+            batch_requests.append({'custom_id': custom_id, 'params': request})
+        
+        if not batch_requests:
+            logger.info(f"All {len(results)} batch requests served from response cache")
+            return results
+        
+        batch = self._batch_api('post', '/v1/messages/batches', body={'requests': batch_requests})
+        logger.info(f"Submitted Claude batch {batch['id']} with {len(batch_requests)} requests "
+                    f"({len(results)} served from response cache)")
+        
+        # A batch left behind keeps running and billing, so any failure while waiting cancels it
+        batch_id = batch['id']
+        deadline = time.monotonic() + timeout
+        try:
+            while batch['processing_status'] != 'ended':
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Claude batch {batch_id} did not finish within {timeout:.0f}s and was canceled")
+                time.sleep(poll_interval)
+                batch = self._batch_api('get', f"/v1/messages/batches/{batch_id}")
+        except BaseException:
+            self._cancel_batch(batch_id)
+            raise
+        
+        logger.info(f"Claude batch {batch['id']} ended: {batch.get('request_counts')}")
+        
+        # Results are JSON Lines, one per request, in no particular order
+        response = self._batch_api('get', batch['results_url'], cast_to=httpx.Response)
+        for line in response.iter_lines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            outcome = entry['result']
+            
+            if outcome['type'] == 'succeeded':
+                result = self._build_result(construct_type(type_=Message, value=outcome['message']))
+                prompts = submitted[entry['custom_id']]
+                operation = requests[entry['custom_id']].get('operation')
+                if result['stop_reason'] == 'max_tokens' and not prompts['tool'] and self.max_continuations > 0:
+                    result = self._continue_truncated(result, prompts, operation, self.max_continuations)
+                if entry['custom_id'] in budgeted:
+                    self.token_budgeter.record(operation, result['usage']['output_tokens'])
+                cache_key = cache_keys.get(entry['custom_id'])
+                if cache_key and store_cache:
+                    self._store_cached_response(cache_key, result)
+            elif outcome['type'] == 'errored':
+                error = outcome.get('error', {}).get('error', {})
+                result = {
+                    'success': False,
+                    'error': f"Claude API error: {error.get('type', 'error')}: {error.get('message', 'unknown')}"
+                }
+            else:
+                result = {'success': False, 'error': f"Claude batch request {outcome['type']}"}
+            
+            results[entry['custom_id']] = result
+        
+        for custom_id in cache_keys:
+            results.setdefault(custom_id, {'success': False, 'error': "Claude batch returned no result"})
+        
+        return results
+    
+    def _cancel_batch(self, batch_id: str):
+        """Cancel a batch, best effort: a failure is logged, not raised."""
+        try:
+            self._batch_api('post', f"/v1/messages/batches/{batch_id}/cancel")
+            logger.warning(f"Canceled Claude batch {batch_id}")
+        except Exception as e:
+            logger.error(f"Could not cancel Claude batch {batch_id}: {str(e)}")
+    
+    def _batch_api(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, cast_to=object):
+        """
+        Call a Message Batches endpoint with the retry policy and circuit breaker.
+        
+        The SDK version in use has no batches resource, so the endpoints are
+        called through the client's generic request methods.
+        
+        Args:
+            method: 'get' or 'post'
+            path: Endpoint path, or the absolute results URL
+            body: JSON body for POST requests
+            cast_to: object for JSON endpoints (returns the decoded body),
+                     httpx.Response for the results file
+        """
+        previous_delay = None
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            try:
+                with self._circuit_slot():
+                    if method == 'post':
+                        return self.client.post(path, body=body, cast_to=cast_to)
+                    return self.client.get(path, cast_to=cast_to)
+            
+            except APIError as e:
+                previous_delay = self._backoff(attempt, previous_delay, e)
         
         raise Exception("Claude API call failed after max retries")
     
+    def _build_request(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        temperature: float,
+        static_prompt: Optional[str] = None,
+        cached_context: Optional[str] = None,
+        model: Optional[str] = None,
+        tool: Optional[Dict[str, Any]] = None,
+        stop_sequences: Optional[List[str]] = None,
+        prefill: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Messages API request body (keyword arguments for messages.stream,
+        and for messages.create after _sdk_request).
+        
+        The prompt is laid out as system prompt + static_prompt (system
+        blocks), then cached_context + user_prompt (user content blocks).
+        A cache breakpoint follows static_prompt and cached_context, so the
+        API reuses the processed prefix of a recent identical request. The
+        API does not cache prefixes shorter than the model's minimum (about
+        1024 tokens), so a breakpoint is only set where the estimated prefix
+        (tool, system prompt and the blocks up to it) reaches
+        Config.PROMPT_CACHE_MIN_TOKENS.
+        
+        With a tool, Claude is made to call it (tool_choice), so the answer
+        is always structured. A prefill is sent as the start of the
+        assistant's turn, which Claude continues.
+        """
+        def cache_control(*prefix: str) -> Dict[str, Any]:
+            if not Config.PROMPT_CACHE_ENABLED:
+                return {}
+            prefix_tokens = sum(estimate_tokens(part) for part in prefix if part)
+            if prefix_tokens < Config.PROMPT_CACHE_MIN_TOKENS:
+                return {}
+            return {'cache_control': {'type': 'ephemeral'}}
+        
+        tool_text = json.dumps(tool) if tool else ''
+        
+        system = system_prompt
+        if static_prompt:
+            system = [
+                {'type': 'text', 'text': system_prompt},
+                {'type': 'text', 'text': static_prompt, **cache_control(tool_text, system_prompt, static_prompt)}
+            ]
+        
+        content = user_prompt
+        if cached_context:
+            prefix = (tool_text, system_prompt, static_prompt, cached_context)
+            content = [
+                {'type': 'text', 'text': cached_context, **cache_control(*prefix)},
+                {'type': 'text', 'text': user_prompt}
+            ]
+        
+        request = {
+            'model': model or self.model,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'system': system,
+            'messages': [
+                {"role": "user", "content": content}
+            ]
+        }
+        if tool:
+            request['tools'] = [tool]
+            request['tool_choice'] = {'type': 'tool', 'name': tool['name']}
+        if stop_sequences:
+            request['stop_sequences'] = list(stop_sequences)
+        if prefill:
+            request['messages'].append({"role": "assistant", "content": prefill})
+        return request
+    
+    @staticmethod
+    def _sdk_request(request: Dict[str, Any]) -> Dict[str, Any]:
+        """messages.create keyword arguments; this SDK version has no tools parameters, so they go in extra_body."""
+        if 'tools' not in request:
+            return request
+        sdk_request = {key: value for key, value in request.items() if key not in ('tools', 'tool_choice')}
+        sdk_request['extra_body'] = {'tools': request['tools'], 'tool_choice': request['tool_choice']}
+        return sdk_request
+    
+    def _stream_attempt(
+        self,
+        request: Dict[str, Any],
+        hedge_attempt: Optional[HedgeAttempt] = None,
+        stop: Optional[threading.Event] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Send one streaming request and yield its events (without caching or retries).
+        
+        When run as part of a hedged request, the attempt stops as soon as it
+        is cancelled, and cancelling closes its HTTP response. Once `stop` is
+        set the response is closed too, and the done event is built from the
+        part received so far (see stream_claude's stop_when).
+        
+        Yields:
+            {'type': 'text', 'text': str} events, then {'type': 'done', 'result': {...}}
+        """
+        with self._circuit_slot(request['model']), self._rate_limit_slot(request) as slot:
+            if hedge_attempt is not None and hedge_attempt.cancelled.is_set():
+                return
+            
+            with self.client.messages.stream(**request) as stream:
+                if hedge_attempt is not None:
+                    hedge_attempt.on_cancel(stream.close)
+                stopped = False
+                for text in stream.text_stream:
+                    if hedge_attempt is not None and hedge_attempt.cancelled.is_set():
+                        return
+                    yield {'type': 'text', 'text': text}
+                    if stop is not None and stop.is_set():
+                        stream.close()
+                        stopped = True
+                        break
+                response = stream.current_message_snapshot if stopped else stream.get_final_message()
+            
+            result = self._build_result(response)
+            if stopped:
+                # message_start reports the input usage; output usage only comes at the end
+                result['stop_reason'] = 'stop_requested'
+                output_tokens = max(result['usage']['output_tokens'], estimate_tokens(result['text']))
+                result['usage']['total_tokens'] += output_tokens - result['usage']['output_tokens']
+                result['usage']['output_tokens'] = output_tokens
+            slot['usage'] = result['usage']
+        
+        yield {'type': 'done', 'result': result}
+    
+    def _create_attempt(
+        self,
+        request: Dict[str, Any],
+        hedge_attempt: Optional[HedgeAttempt] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Send one non-streaming request as an attempt (for hedged tool calls).
+        
+        The response is read lazily so that cancelling the attempt closes
+        the HTTP response, as for _stream_attempt.
+        
+        Yields:
+            {'type': 'done', 'result': {...}}
+        """
+        with self._circuit_slot(request['model']), self._rate_limit_slot(request) as slot:
+            if hedge_attempt is not None and hedge_attempt.cancelled.is_set():
+                return
+            
+            with self.client.messages.with_streaming_response.create(**self._sdk_request(request)) as response:
+                if hedge_attempt is not None:
+                    hedge_attempt.on_cancel(response.close)
+                message = response.parse()
+            
+            if hedge_attempt is not None and hedge_attempt.cancelled.is_set():
+                return
+            result = self._build_result(message)
+            slot['usage'] = result['usage']
+        
+        yield {'type': 'done', 'result': result}
+    
+    def _build_result(self, response) -> Dict[str, Any]:
+        """Convert an SDK Message into the result dictionary returned by call_claude."""
+        # Extract text from response; a tool call's input is returned as-is and as JSON text.
+        # A continuation may end at once with no content at all
+        tool_input = next(
+            (block.input for block in response.content if getattr(block, 'type', 'text') == 'tool_use'),
+            None
+        )
+        response_text = json.dumps(tool_input) if tool_input is not None else ''.join(
+            block.text for block in response.content if getattr(block, 'type', 'text') == 'text'
+        )
+        
+        # Prompt caching usage; input_tokens only counts the uncached part of the prompt
+        cache_creation = getattr(response.usage, 'cache_creation_input_tokens', None) or 0
+        cache_read = getattr(response.usage, 'cache_read_input_tokens', None) or 0
+        
+        return {
+            'success': True,
+            'text': response_text,
+            'tool_input': tool_input,
+            'usage': {
+                'input_tokens': response.usage.input_tokens,
+                'output_tokens': response.usage.output_tokens,
+                'cache_creation_input_tokens': cache_creation,
+                'cache_read_input_tokens': cache_read,
+                'total_tokens': response.usage.input_tokens + cache_creation + cache_read + response.usage.output_tokens
+            },
+            'model': response.model,
+            'stop_reason': response.stop_reason,
+            'cached': False
+        }
+    
+    def _route(self, operation: Optional[str]) -> str:
+        """Model for the next attempt of an operation, skipping models whose circuit is open."""
+        if self.model_router is None:
+            return self.model
+        return self.model_router.choose(
+            operation, is_available=lambda model: not self.circuit_breaker.is_open(model)
+        )
+    
+    def _record_route(
+        self,
+        operation: Optional[str],
+        model: str,
+        seconds: Optional[float],
+        error: Optional[APIError] = None
+    ):
+        """
+        Report a call's outcome to the model router.
+        
+        Only retryable errors (overload, rate limits, 5xx, timeouts) count
+        against a model; a rejected request says nothing about its health.
+        """
+        if self.model_router is None:
+            return
+        if error is not None and not self.retry_policy.is_retryable(error):
+            return
+        self.model_router.record(operation, model, seconds)
+    
+    def _reroute(
+        self,
+        operation: Optional[str],
+        model: str,
+        request: Dict[str, Any],
+        cache_key: Optional[str],
+        prompts: Dict[str, Any]
+    ):
+        """
+        Pick the model for a retry.
+        
+        Returns:
+            Tuple of (model, request, cache_key), updated if the router now
+            prefers a fallback model
+        """
+        next_model = self._route(operation)
+        if next_model == model:
+            return model, request, cache_key
+        
+        logger.warning(f"Retrying {operation} on fallback model {next_model} instead of {model}")
+        return next_model, dict(request, model=next_model), self._cache_key(model=next_model, **prompts)
+    
+    def _continue_truncated(
+        self,
+        result: Dict[str, Any],
+        prompts: Dict[str, Any],
+        operation: Optional[str],
+        max_continuations: int,
+        hedge: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Continue a response that stopped at max_tokens, merging the segments.
+        
+        A continuation that fails leaves the response truncated (the caller's
+        validation decides what to do with it) rather than losing it.
+        
+        Returns:
+            The merged result (see _merge_continuation)
+        """
+        for segment in range(1, max_continuations + 1):
+            logger.info(f"Claude response hit max_tokens; continuing ({segment}/{max_continuations})")
+            try:
+                continuation = self.call_claude(
+                    **dict(prompts, prefill=self._continuation_prefill(prompts, result)),
+                    use_cache=False,
+                    store_cache=False,
+                    hedge=hedge,
+                    operation=operation,
+                    max_continuations=0
+                )
+            except Exception as e:
+                logger.warning(f"Continuing truncated response failed: {str(e)}")
+                break
+            result = self._merge_continuation(result, continuation)
+            if result['stop_reason'] != 'max_tokens':
+                break
+        return result
+    
+    def _stream_continuation(
+        self,
+        result: Dict[str, Any],
+        prompts: Dict[str, Any],
+        operation: Optional[str],
+        max_continuations: int,
+        hedge: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming counterpart of _continue_truncated: yields the continuation's
+        text events and returns the merged result.
+        
+        Once continuation text has been yielded a failure is raised, as for
+        any stream that fails after its first text.
+        """
+        for segment in range(1, max_continuations + 1):
+            logger.info(f"Claude stream hit max_tokens; continuing ({segment}/{max_continuations})")
+            # The prefill loses its trailing whitespace, which Claude then usually writes
+            # again; skip what the caller has already been sent
+            pending = result['text'][len(result['text'].rstrip()):]
+            delivered = []
+            continuation = None
+            try:
+                for event in self.stream_claude(
+                    **dict(prompts, prefill=self._continuation_prefill(prompts, result)),
+                    use_cache=False,
+                    store_cache=False,
+                    hedge=hedge,
+                    operation=operation,
+                    stop_when=stop_when,
+                    max_continuations=0
+                ):
+                    if event['type'] == 'done':
+                        continuation = event['result']
+                        continue
+                    text = event['text']
+                    if pending:
+                        matched = len(os.path.commonprefix([pending, text]))
+                        text = text[matched:]
+                        pending = pending[matched:] if not text else ''
+                        if not text:
+                            continue
+                    delivered.append(text)
+                    yield {'type': 'text', 'text': text}
+            except Exception as e:
+                if delivered:
+                    raise
+                logger.warning(f"Continuing truncated stream failed: {str(e)}")
+                break
+            result = self._merge_continuation(result, continuation, ''.join(delivered))
+            if result['stop_reason'] != 'max_tokens':
+                break
+        return result
+    
+    @staticmethod
+    def _continuation_prefill(prompts: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """Everything Claude has written so far, as a prefill (the API rejects trailing whitespace there)."""
+        return ((prompts.get('prefill') or '') + result['text']).rstrip()
+    
+    @staticmethod
+    def _merge_continuation(
+        result: Dict[str, Any],
+        continuation: Dict[str, Any],
+        text: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Append a continuation segment to a truncated result.
+        
+        Args:
+            result: The result so far
+            continuation: Result of the continuation call
+            text: Continuation text to append, when already trimmed (streaming
+                  passes what was actually sent to the caller)
+        
+        Returns:
+            Result with the joined text, usage summed over the segments and the
+            continuation's stop_reason
+        """
+        if text is None:
+            # Claude usually starts by rewriting the whitespace the prefill lost
+            trailing = result['text'][len(result['text'].rstrip()):]
+            text = continuation['text'][len(os.path.commonprefix([trailing, continuation['text']])):]
+        
+        return dict(
+            result,
+            text=result['text'] + text,
+            usage={field: count + continuation['usage'].get(field, 0) for field, count in result['usage'].items()},
+            stop_reason=continuation['stop_reason'],
+            continuations=result.get('continuations', 0) + 1
+        )
+    
+    def _backoff(self, attempt: int, previous_delay: Optional[float], error: APIError) -> float:
+        """
+        Sleep before retrying a failed attempt, or raise if it should not be retried.
+        
+        Args:
+            attempt: Number of the attempt that failed (1-based)
+            previous_delay: Delay slept before that attempt, if any
+            error: The SDK error
+        
+        Returns:
+            The delay that was slept
+        
+        Raises:
+            Exception: If the error is not retryable or attempts are exhausted
+        """
+        delay = self.retry_policy.next_delay(attempt, previous_delay, error)
+        
+        if delay is None:
+            logger.error(f"Claude API call failed on attempt {attempt}, not retrying: {str(error)}")
+            if isinstance(error, RateLimitError):
+                raise Exception(f"Claude API rate limit exceeded: {str(error)}")
+            if isinstance(error, APIConnectionError):
+                raise Exception(f"Claude API connection failed: {str(error)}")
+            raise Exception(f"Claude API error: {str(error)}")
+        
+        logger.warning(f"{type(error).__name__} on attempt {attempt}. Retrying in {delay:.1f}s...")
+        self.retry_policy.sleep(delay)
+        return delay
+    
+    @contextmanager
+    def _circuit_slot(self, model: Optional[str] = None):
+        """
+        Consult the circuit breaker around one API request.
+        
+        Connection errors and 5xx responses count as upstream failures; any
+        other API response (including 4xx) shows the upstream is reachable.
+        
+        Args:
+            model: Model the request is for (defaults to Config.CLAUDE_MODEL)
+        
+        Raises:
+            CircuitOpenError: If the circuit for this model is open
+        """
+        model = model or self.model
+        self.circuit_breaker.before_request(model)
+        try:
+            yield
+        except APIError as e:
+            if self.retry_policy.is_upstream_failure(e):
+                self.circuit_breaker.record_failure(model)
+            else:
+                self.circuit_breaker.record_success(model)
+            raise
+        except BaseException:
+            self.circuit_breaker.release(model)
+            raise
+        self.circuit_breaker.record_success(model)
+    
+    @contextmanager
+    def _rate_limit_slot(self, request: Dict[str, Any]):
+        """
+        Wait for rate limiter budget around one API request.
+        
+        The caller stores the response usage in slot['usage'] so the
+        reservation can be settled against real token counts. A rate limit
+        error drains the shared budget so the other workers back off too.
+        """
+        slot = {}
+        if self.rate_limiter is None:
+            yield slot
+            return
+        
+        reservation = self.rate_limiter.acquire(
+            input_tokens=sum(estimate_tokens(text) for text in self._prompt_texts(request)),
+            output_tokens=request['max_tokens']
+        )
+        try:
+            yield slot
+        except RateLimitError:
+            self.rate_limiter.settle(reservation)
+            self.rate_limiter.drain()
+            raise
+        except BaseException:
+            self.rate_limiter.settle(reservation)
+            raise
+        self.rate_limiter.settle(reservation, slot.get('usage'))
+    
+    @staticmethod
+    def _prompt_texts(request: Dict[str, Any]) -> List[str]:
+        """All prompt text of a request, whether sent as strings or content blocks."""
+        parts = [request['system']] + [message['content'] for message in request['messages']]
+        texts = [json.dumps(request['tools'])] if request.get('tools') else []
+        for part in parts:
+            if isinstance(part, str):
+                texts.append(part)
+            else:
+                texts.extend(block['text'] for block in part)
+        return texts
+    
+    def discard_cached_response(self, result: Dict[str, Any]):
+        """
+        Drop a response from the cache, e.g. after it failed validation, so
+        the next identical request goes back to Claude.
+        
+        Args:
+            result: Dictionary returned by call_claude or stream_claude
+        """
+        cache_key = result.get('cache_key') if result else None
+        if cache_key and self.response_cache is not None:
+            self.response_cache.delete(cache_key)
+    
+    def _cache_key(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        static_prompt: Optional[str] = None,
+        cached_context: Optional[str] = None,
+        model: Optional[str] = None,
+        tool: Optional[Dict[str, Any]] = None,
+        stop_sequences: Optional[List[str]] = None,
+        prefill: Optional[str] = None
+    ) -> Optional[str]:
+        """Response cache key for a request, or None when caching is disabled."""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(
+            model or self.model,
+            "\n\n".join(part for part in (system_prompt, static_prompt) if part),
+            "\n\n".join(part for part in (cached_context, user_prompt) if part),
+            temperature,
+            max_tokens,
+            tool=tool,
+            stop_sequences=stop_sequences,
+            prefill=prefill
+        )
+    
+    def _get_or_lease(
+        self,
+        cache_key: str,
+        refresh: Callable[[], Dict[str, Any]],
+        lease: bool = True
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Look up a cached response, coordinating concurrent misses of the same request.
+        
+        On a miss the first caller takes the key's lease and calls Claude;
+        the others wait for its response (up to Config.CACHE_LEASE_WAIT_TIMEOUT,
+        then they call Claude themselves). A response that expired less than
+        Config.RESPONSE_CACHE_STALE_TTL ago is returned at once instead, marked
+        'stale', while the lease holder refreshes it in a background thread.
+        
+        Args:
+            cache_key: Response cache key of the request
+            refresh: Makes the request uncached and stores its response
+            lease: Whether to take a lease (False when the response will not be stored)
+        
+        Returns:
+            Tuple of (cached result, None), or (None, lease token) for the caller
+            that must call Claude and then release the lease; the token is None
+            when leases are off or waiting timed out
+        """
+        cached = self._get_cached_response(cache_key)
+        if cached or not (lease and self.cache_leases):
+            return cached, None
+        
+        token = self.response_cache.acquire_lease(cache_key)
+        stale = self.response_cache.get_stale(cache_key)
+        if stale is not None:
+            if token is not None:
+                threading.Thread(
+                    target=self._refresh_stale_response, args=(cache_key, token, refresh), daemon=True
+                ).start()
+            return dict(self._cached_result(stale, cache_key), stale=True), None
+        if token is not None:
+            return None, token
+        
+        logger.info("Waiting for a concurrent identical Claude request")
+        value, token = self.response_cache.wait(cache_key, self.lease_wait_timeout)
+        if value is not None:
+            return self._cached_result(value, cache_key), None
+        return None, token
+    
+    def _refresh_stale_response(self, cache_key: str, token: str, refresh: Callable[[], Dict[str, Any]]):
+        """Replace a stale response in the background, then release its lease."""
+        try:
+            refresh()
+            logger.info("Refreshed a stale cached Claude response")
+        except Exception as e:
+            logger.warning(f"Refreshing a stale cached Claude response failed: {str(e)}")
+        finally:
+            self.response_cache.release_lease(cache_key, token)
+    
+    def _get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result marked as cached, with zero usage."""
+        cached = self.response_cache.get(cache_key)
+        if not cached:
+            return None
+        return self._cached_result(cached, cache_key)
+    
+    @staticmethod
+    def _cached_result(cached: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+        """A stored response as returned to callers: marked as cached, with zero usage."""
+        return dict(
+            cached,
+            usage={
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'cache_creation_input_tokens': 0,
+                'cache_read_input_tokens': 0,
+                'total_tokens': 0
+            },
+            cached=True,
+            cache_key=cache_key
+        )
+    
+    def _store_cached_response(self, cache_key: str, result: Dict[str, Any]):
+        """Cache a complete response; truncated responses are not reused."""
+        result['cache_key'] = cache_key
+        if result['stop_reason'] == 'max_tokens':
+            return
+        self.response_cache.set(cache_key, {k: v for k, v in result.items() if k != 'cache_key'})
+    
     def parse_interview_response(self, response_text: str) -> List[Dict[str, Any]]:
         """
         Parse Claude's interview generation response into structured format.
@@ -143,58 +1220,65 @@ class ClaudeClientService:
                 ]
             }
         """
-        questions = []
-        current_question = None
-        lines = response_text.split('\n')
+        # One set of line rules: the whole text goes through the streaming parser
+        parser = InterviewStreamParser()
+        questions = parser.feed(response_text) + parser.close()
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Detect question header: [Question N]:
-            if line.startswith('[Question ') and ']: ' in line:
-                # Save previous question if exists
-                if current_question is not None:
-                    questions.append(current_question)
-                
-                # Parse question number and text
-                parts = line.split(']: ', 1)
-                question_num_part = parts[0]  # e.g., "[Question 1"
-                question_num = int(question_num_part.split()[-1])
-                question_text = parts[1] if len(parts) > 1 else ''
-                
-                current_question = {
-                    'question_number': question_num,
-                    'question_text': question_text,
-                    'criteria': []
-                }
-            
-            # Detect Expected Answer section
-            elif line.startswith('Expected Answer: ') and current_question:
-                current_question['expected_answer'] = line.replace('Expected Answer: ', '')
-            
-            # Detect criteria (lines that have a colon followed by description)
-            elif ': ' in line and current_question and not line.startswith('['):
-                parts = line.split(': ', 1)
-                criterion_name = parts[0].strip()
-                description = parts[1].strip() if len(parts) > 1 else ''
-                
-                # Validate it looks like a criterion (not metadata)
-                if criterion_name and not criterion_name.startswith('---'):
-                    current_question['criteria'].append({
-                        'criterion': criterion_name,
-                        'description': description
-                    })
-            
-            i += 1
+        logger.info(f"Parsed {len(questions)} questions from Claude response")
+        return questions
+    
+    def parse_interview_tool_input(self, tool_input: Any) -> List[Dict[str, Any]]:
+        """
+        Parse a structured interview (record_interview tool input).
         
-        # Don't forget the last question
-        if current_question is not None:
-            questions.append(current_question)
+        Validation uses the precompiled InterviewOutput schema, so there is
+        no line-based parsing for stray colons to confuse.
         
-        logger.info(f"Parsed {len(questions)} questions from Claude response")
+        Args:
+            tool_input: 'tool_input' of a call_claude result made with INTERVIEW_TOOL
+        
+        Returns:
+            List of question dictionaries (same structure as parse_interview_response)
+        
+        Raises:
+            ValueError: If the input does not match the schema
+        """
+        questions = parse_interview_tool_input(tool_input)
+        logger.info(f"Parsed {len(questions)} questions from structured Claude response")
         return questions
     
+    def parse_outline_response(self, response_text: str) -> List[Dict[str, str]]:
+        """
+        Parse Claude's interview outline response (INTERVIEW_OUTLINE_PROMPT).
+        
+        Expects numbered lines of the form "N. Subject Area - Focus sentence".
+        
+        Args:
+            response_text: Raw response from Claude
+        
+        Returns:
+            List of outline items in order:
+            {
+                'subject_area': str,
+                'focus': str
+            }
+        """
+        outline = []
+        
+        for raw_line in response_text.split('\n'):
+            match = OUTLINE_LINE_PATTERN.match(raw_line.strip())
+            if not match:
+                continue
+            
+            subject_area, _, focus = match.group(1).partition(' - ')
+            outline.append({
+                'subject_area': subject_area.strip().strip('*[]'),
+                'focus': focus.strip().strip('[]')
+            })
+        
+        logger.info(f"Parsed {len(outline)} outline items from Claude response")
+        return outline
+    
     def validate_interview_structure(self, questions: List[Dict[str, Any]]) -> bool:
         """
         Validate that interview has correct structure.
@@ -213,23 +1297,234 @@ class ClaudeClientService:
             if question_num != i + 1:
                 raise ValueError(f"Question numbering is incorrect. Expected {i+1}, got {question_num}")
             
-            criteria_count = len(q.get('criteria', []))
-            if criteria_count < 8 or criteria_count > 10:
-                raise ValueError(
-                    f"Question {i+1} has {criteria_count} criteria. "
-                    f"Expected 8-10 criteria."
-                )
+            self.validate_question(q)
+        
+        return True
+    
+    def validate_question(self, q: Dict[str, Any]) -> bool:
+        """
+        Validate a single question's text and criteria.
+        
+        Args:
+            q: Parsed question
+        
+        Returns:
+            True if valid, raises ValueError otherwise
+        """
+        question_num = q.get('question_number')
+        
+        criteria_count = len(q.get('criteria', []))
+        if criteria_count < 8 or criteria_count > 10:
+            raise ValueError(
+                f"Question {question_num} has {criteria_count} criteria. "
+                f"Expected 8-10 criteria."
+            )
+        
+        if not q.get('question_text'):
+            raise ValueError(f"Question {question_num} is missing question text")
+        
+        for j, criterion in enumerate(q.get('criteria', [])):
+            if not criterion.get('criterion'):
+                raise ValueError(f"Question {question_num}, Criterion {j+1} is missing name")
+            if not criterion.get('description'):
+                raise ValueError(f"Question {question_num}, Criterion {j+1} is missing description")
+        
+        return True
+    
+    def find_question_errors(self, questions: List[Dict[str, Any]]) -> Dict[int, str]:
+        """
+        Check each of the 5 question slots independently.
+        
+        Unlike validate_interview_structure, which stops at the first problem,
+        this reports every missing or invalid question so that only those
+        need to be regenerated. Duplicate and out-of-range numbers are ignored.
+        
+        Args:
+            questions: List of parsed questions
+        
+        Returns:
+            Dictionary of {question_number: error message}; empty if all 5 are valid
+        """
+        by_number = {}
+        for q in questions:
+            by_number.setdefault(q.get('question_number'), q)
+        
+        errors = {}
+        for question_num in range(1, 6):
+            q = by_number.get(question_num)
+            if q is None:
+                errors[question_num] = f"Question {question_num} is missing"
+                continue
             
-            if not q.get('question_text'):
-                raise ValueError(f"Question {i+1} is missing question text")
+            try:
+                self.validate_question(q)
+            except ValueError as e:
+                errors[question_num] = str(e)
+        
+        return errors
+
+
+class InterviewStreamParser:
+    """
+    Line parser of Claude's interview text (INTERVIEW_GENERATION_PROMPT format).
+    
+    Feed response text chunks as they arrive; each completed question is
+    returned as soon as the next [Question N] header (or close()) ends it.
+    ClaudeClientService.parse_interview_response feeds a whole response at
+    once, so any chunking yields the same questions as a complete response.
+    
+    State is limited to the current unfinished line and the question being built.
+    
+    Given question_count and max_criteria, the parser also watches the
+    stream's shape so the caller can stop it early:
+    - complete: the last question is finished (it has max_criteria
+      criteria, or a line that is not part of the question, such as an
+      extra [Question N] header, followed its criteria), so anything
+      further is trailing output
+    - error: the stream has gone wrong (a question number was skipped or
+      repeated, or a question has more than max_criteria criteria). The
+      faulty question is dropped and further input is ignored; questions
+      completed before the fault are kept.
+    """
+    
+    def __init__(self, question_count: Optional[int] = None, max_criteria: Optional[int] = None):
+        """
+        Args:
+            question_count: Number of questions expected (enables `complete`
+                            and the numbering check)
+            max_criteria: Most criteria a question may have (enables `complete`
+                          and the overflow check)
+        """
+        self.question_count = question_count
+        self.max_criteria = max_criteria
+        self.error = None
+        self._partial_line = ''
+        self._current_question = None
+        self._trailing = False
+        self._ignore_rest = False
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk of response text.
+        
+        Args:
+            chunk: Next piece of the response
+        
+        Returns:
+            Questions completed by this chunk (usually empty or one)
+        """
+        if self.error or self._ignore_rest:
+            return []
+        if '\n' not in chunk:
+            self._partial_line += chunk
+            return []
+        
+        lines = (self._partial_line + chunk).split('\n')
+        self._partial_line = lines.pop()
+        
+        completed = []
+        for line in lines:
+            question = self._consume_line(line)
+            if question is not None:
+                completed.append(question)
+            if self.error or self._ignore_rest:
+                break
+        return completed
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Signal end of stream.
+        
+        Returns:
+            Questions completed by the final line and end of stream
+        """
+        completed = []
+        question = None
+        if not (self.error or self._ignore_rest):
+            question = self._consume_line(self._partial_line)
+        if question is not None:
+            completed.append(question)
+        self._partial_line = ''
+        
+        # Don't forget the last question
+        if self._current_question is not None:
+            completed.append(self._current_question)
+            self._current_question = None
+        return completed
+    
+    @property
+    def current_question(self) -> Optional[Dict[str, Any]]:
+        """The question currently being built (not yet complete)."""
+        return self._current_question
+    
+    @property
+    def complete(self) -> bool:
+        """Whether the last expected question has been fully received."""
+        current = self._current_question
+        if self.error or current is None or self.question_count is None:
+            return False
+        if current['question_number'] != self.question_count:
+            return False
+        return self._trailing or (
+            self.max_criteria is not None and len(current['criteria']) >= self.max_criteria
+        )
+    
+    def _consume_line(self, raw_line: str) -> Optional[Dict[str, Any]]:
+        """Apply one line; return the previous question if this line closed it."""
+        line = raw_line.strip()
+        current = self._current_question
+        
+        # Detect question header: [Question N]:
+        if line.startswith('[Question ') and ']: ' in line:
+            parts = line.split(']: ', 1)
+            question_num = int(parts[0].split()[-1])
+            if self.question_count is not None:
+                expected = current['question_number'] + 1 if current else 1
+                if current and expected > self.question_count:
+                    # An extra question after the last one is trailing output, not a fault
+                    self._trailing = True
+                    self._ignore_rest = True
+                    return None
+                if question_num != expected:
+                    self._fail(f"Expected [Question {expected}] but the stream continued with [Question {question_num}]")
+                    return current
+            self._current_question = {
+                'question_number': question_num,
+                'question_text': parts[1] if len(parts) > 1 else '',
+                'criteria': []
+            }
+            self._trailing = False
+            return current
+        
+        # Detect Expected Answer section
+        if line.startswith('Expected Answer: ') and current:
+            current['expected_answer'] = line.replace('Expected Answer: ', '')
+        
+        # Detect criteria (lines that have a colon followed by description)
+        elif ': ' in line and current and not line.startswith('['):
+            parts = line.split(': ', 1)
+            criterion_name = parts[0].strip()
+            description = parts[1].strip() if len(parts) > 1 else ''
             
-            for j, criterion in enumerate(q.get('criteria', [])):
-                if not criterion.get('criterion'):
-                    raise ValueError(f"Question {i+1}, Criterion {j+1} is missing name")
-                if not criterion.get('description'):
-                    raise ValueError(f"Question {i+1}, Criterion {j+1} is missing description")
+            # Validate it looks like a criterion (not metadata)
+            if criterion_name and not criterion_name.startswith('---'):
+                current['criteria'].append({
+                    'criterion': criterion_name,
+                    'description': description
+                })
+                if self.max_criteria is not None and len(current['criteria']) > self.max_criteria:
+                    self._fail(f"Question {current['question_number']} has more than {self.max_criteria} criteria")
         
-        return True
+        # Any other line after the criteria ends the question's block
+        elif line and current and current['criteria']:
+            self._trailing = True
+        
+        return None
+    
+    def _fail(self, error: str):
+        """Record a malformed stream and drop the question being built."""
+        self.error = error
+        self._current_question = None
 
 
 class MockClaudeClient:
@@ -248,10 +1543,40 @@ class MockClaudeClient:
             'stop_reason': 'end_turn'
         }
     
+    def stream_claude(self, system_prompt: str, user_prompt: str, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Stream the mock response in small chunks"""
+        result = self.call_claude(system_prompt, user_prompt, **kwargs)
+        text = result['text']
+        for i in range(0, len(text), 16):
+            yield {'type': 'text', 'text': text[i:i + 16]}
+        yield {'type': 'done', 'result': result}
+    
+    def call_claude_batch(self, requests: Dict[str, Dict[str, Any]], **kwargs) -> Dict[str, Dict[str, Any]]:
+        """Return a mock response for every request"""
+        return {
+            custom_id: self.call_claude(params['system_prompt'], params['user_prompt'])
+            for custom_id, params in requests.items()
+        }
+    
     def parse_interview_response(self, response_text: str) -> List[Dict[str, Any]]:
         """Return empty list for mock"""
         return []
     
+    def parse_interview_tool_input(self, tool_input: Any) -> List[Dict[str, Any]]:
+        """Return empty list for mock"""
+        return []
+    
+    def parse_outline_response(self, response_text: str) -> List[Dict[str, str]]:
+        """Return empty list for mock"""
+        return []
+    
+    def find_question_errors(self, questions: List[Dict[str, Any]]) -> Dict[int, str]:
+        """No errors for mock"""
+        return {}
+    
     def validate_interview_structure(self, questions: List[Dict[str, Any]]) -> bool:
         """Always valid for mock"""
         return True
+    
+    def discard_cached_response(self, result: Dict[str, Any]):
+        """Nothing is cached by the mock"""
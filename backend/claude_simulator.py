@@ -0,0 +1,584 @@
+"""
+Claude Simulator - A stand-in for the Anthropic Messages API for load tests and benchmarks.
+Answers with valid, randomized JD rewrites and interviews, with realistic latency, token rates,
+streaming and injected 429/5xx errors, either in-process (SimulatedClaudeClient) or over HTTP.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+import httpx
+from .config import Config
+from .claude_client import ClaudeClientService
+from .prompts import (
+    INTERVIEW_END_MARKER,
+    JD_CONDENSATION_SYSTEM_PROMPT,
+    JD_ENHANCEMENT_SYSTEM_PROMPT
+)
+from .rate_limiter import estimate_tokens, CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Prompt caching: prefixes shorter than this are not cached, and entries live this long (seconds)
+MIN_CACHEABLE_TOKENS = 1024
+PROMPT_CACHE_TTL = 300
+
+SUBJECT_AREAS = [
+    'Distributed System Design', 'Data Pipeline Reliability', 'API Design and Versioning',
+    'Database Performance Tuning', 'Observability and Incident Response', 'Caching Strategy',
+    'Security and Access Control', 'Cloud Cost Optimization', 'Event-Driven Architecture',
+    'Testing Strategy', 'Capacity Planning', 'Schema Migration', 'Stakeholder Communication',
+    'Technical Leadership', 'Batch and Stream Processing', 'Deployment Automation'
+]
+SCENARIOS = [
+    "Your team's {topic} work is behind schedule and a key customer launch depends on it. How do you get it back on track?",
+    "A production incident traces back to {topic}. Walk through how you would diagnose and fix it.",
+    "You are asked to design the {topic} approach for a new product line. What decisions do you make first?",
+    "Traffic is expected to triple next quarter. How would you prepare the {topic} side of the system?",
+    "A junior engineer proposes a shortcut in {topic}. How do you evaluate it and what do you tell them?"
+]
+CRITERIA = [
+    'Problem Framing', 'Trade-off Analysis', 'Failure Modes', 'Measurement', 'Incremental Delivery',
+    'Scalability', 'Data Integrity', 'Security Awareness', 'Operational Readiness', 'Communication',
+    'Prioritization', 'Testing Approach', 'Cost Awareness', 'Rollback Plan', 'Documentation',
+    'Ownership', 'Tooling Choice', 'Performance Budget'
+]
+EXPLANATIONS = [
+    "A strong answer names the constraints up front and explains how they shape the design.",
+    "Mastery shows in weighing at least two alternatives and stating when each would win.",
+    "The candidate anticipates what breaks first under load and how it would be detected.",
+    "They define concrete metrics and thresholds rather than relying on intuition.",
+    "They propose shipping in small, reversible steps with a clear checkpoint after each.",
+    "A strong answer ties the technical choice back to the business outcome it protects.",
+    "They describe how they would verify the change before, during and after rollout.",
+    "The candidate explains who needs to know about the decision and how they would tell them."
+]
+SENTENCES = [
+    "This role owns the {topic} roadmap and delivers measurable improvements every quarter.",
+    "You will design, build and operate services that handle {topic} for thousands of customers.",
+    "Success in the first six months means a stable {topic} platform with clear service level objectives.",
+    "You will partner with product and data teams to turn ambiguous requirements into shipped systems.",
+    "Typical problems include reducing latency, removing single points of failure and simplifying {topic}.",
+    "The position requires hands-on depth in {topic} and the judgment to know when good enough is enough.",
+    "You will review designs, mentor engineers and raise the bar for operational excellence.",
+    "Key decisions include choosing storage engines, defining interfaces and planning migrations."
+]
+
+
+class SimulatedAPIError(Exception):
+    """An error response the simulator decided to return (status, error type, message)."""
+    
+    def __init__(self, status: int, error_type: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+        self.retry_after = retry_after
+    
+    def body(self) -> bytes:
+        return json.dumps({'type': 'error', 'error': {'type': self.error_type, 'message': str(self)}}).encode()
+    
+    def headers(self) -> Dict[str, str]:
+        headers = {'content-type': 'application/json'}
+        if self.retry_after is not None:
+            headers['retry-after'] = str(self.retry_after)
+        return headers
+
+
+class ClaudeSimulator:
+    """
+    Answers Messages API requests (POST /v1/messages, streaming or not).
+    
+    The answer is chosen from the request's prompts: JD enhancement and
+    condensation get prose, interview prompts get a valid interview in the
+    requested form (formatted text with the end marker, a record_interview
+    tool call, an outline, or one question). Content is randomized but
+    seeded by the request, so an identical request (and a continuation
+    with the partial answer as prefill) gets the same answer.
+    
+    max_tokens, stop_sequences, prefills and prompt-cache breakpoints are
+    honored, and usage is reported with the same estimate the rate limiter
+    uses. Time to first token is lognormal (`ttft_median`, `ttft_sigma`),
+    followed by `tokens_per_second`; `time_scale` multiplies every delay
+    (0 disables sleeping). Errors are injected at the given rates, or
+    scripted with fail_next.
+    """
+    
+    def __init__(
+        self,
+        seed: int = 0,
+        ttft_median: float = 0.8,
+        ttft_sigma: float = 0.5,
+        tokens_per_second: float = 60.0,
+        chunk_tokens: int = 6,
+        rate_limit_rate: float = 0.0,
+        overload_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        retry_after: float = 1.0,
+        time_scale: float = 1.0,
+        sleep=time.sleep
+    ):
+        """
+        Initialize Claude Simulator.
+        
+        Args:
+            seed: Seed for the generated content and the injected errors
+            ttft_median: Median seconds to the first token
+            ttft_sigma: Spread of the lognormal time to first token
+            tokens_per_second: Output rate after the first token
+            chunk_tokens: Tokens per streamed text delta
+            rate_limit_rate: Fraction of requests answered with 429 rate_limit_error
+            overload_rate: Fraction of requests answered with 529 overloaded_error
+            server_error_rate: Fraction of requests answered with 500 api_error
+            retry_after: Retry-After seconds sent with 429 responses
+            time_scale: Multiplier for every delay (0 answers instantly)
+            sleep: Sleep function (injectable for tests)
+        """
+        self.seed = seed
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.rate_limit_rate = rate_limit_rate
+        self.overload_rate = overload_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.time_scale = time_scale
+        self.sleep = sleep
+        
+        self._lock = threading.Lock()
+        self._fault_rng = random.Random(seed)
+        self._scripted_faults = deque()
+        self._prompt_cache = {}  # prefix hash -> expires_at
+        self._counters = {'requests': 0, 'streamed': 0, 'errors': 0, 'input_tokens': 0, 'output_tokens': 0}
+    
+    def fail_next(self, *statuses: int):
+        """Answer the next requests with these HTTP statuses (429, 500 or 529), in order."""
+        with self._lock:
+            self._scripted_faults.extend(statuses)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Report request, error and token counters."""
+        with self._lock:
+            return dict(self._counters)
+    
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, str], Iterator[bytes]]:
+        """
+        Answer one HTTP request.
+        
+        Args:
+            method: HTTP method
+            path: Request path (query string ignored)
+            body: Request body
+        
+        Returns:
+            (status, headers, body chunks). Delays happen while the chunks are read.
+        """
+        try:
+            if method != 'POST' or path.split('?')[0].rstrip('/') != '/v1/messages':
+                raise SimulatedAPIError(404, 'not_found_error', f"The simulator does not serve {method} {path}")
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError:
+                raise SimulatedAPIError(400, 'invalid_request_error', 'Request body is not valid JSON')
+            for field in ('model', 'max_tokens', 'messages'):
+                if field not in request:
+                    raise SimulatedAPIError(400, 'invalid_request_error', f"{field}: Field required")
+            if request.get('stream') and request.get('tools'):
+                raise SimulatedAPIError(400, 'invalid_request_error', 'The simulator does not stream tool use')
+            self._inject_fault()
+        except SimulatedAPIError as e:
+            with self._lock:
+                self._counters['errors'] += 1
+            return e.status, e.headers(), iter([e.body()])
+        
+        message = self._respond(request)
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['streamed'] += 1 if request.get('stream') else 0
+            self._counters['input_tokens'] += message['usage']['input_tokens']
+            self._counters['output_tokens'] += message['usage']['output_tokens']
+        
+        if request.get('stream'):
+            return 200, {'content-type': 'text/event-stream'}, self._stream_events(message)
+        return 200, {'content-type': 'application/json'}, self._delayed_body(message)
+    
+    # --- Faults and timing ---
+    
+    def _inject_fault(self):
+        """Raise the next scripted fault, or a random one at the configured rates."""
+        with self._lock:
+            if self._scripted_faults:
+                status = self._scripted_faults.popleft()
+            else:
+                roll = self._fault_rng.random()
+                status = None
+                for rate, candidate in (
+                    (self.rate_limit_rate, 429), (self.overload_rate, 529), (self.server_error_rate, 500)
+                ):
+                    if roll < rate:
+                        status = candidate
+                        break
+                    roll -= rate
+        if status == 429:
+            raise SimulatedAPIError(429, 'rate_limit_error', 'Simulated rate limit', retry_after=self.retry_after)
+        if status == 529:
+            raise SimulatedAPIError(529, 'overloaded_error', 'Simulated overload')
+        if status is not None:
+            raise SimulatedAPIError(status, 'api_error', 'Simulated server error')
+    
+    def _wait(self, seconds: float):
+        if seconds > 0 and self.time_scale > 0:
+            self.sleep(seconds * self.time_scale)
+    
+    def _time_to_first_token(self, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(self.ttft_median), self.ttft_sigma) if self.ttft_median > 0 else 0.0
+    
+    def _delayed_body(self, message: Dict[str, Any]) -> Iterator[bytes]:
+        """Non-streaming body, sent once the whole answer would have been generated."""
+        timing = message.pop('_timing')
+        self._wait(timing['ttft'] + message['usage']['output_tokens'] / self.tokens_per_second)
+        yield json.dumps(message).encode()
+    
+    def _stream_events(self, message: Dict[str, Any]) -> Iterator[bytes]:
+        """Server-Sent Events for a text answer, one delta per chunk_tokens of output."""
+        timing = message.pop('_timing')
+        text = message['content'][0]['text']
+        start = dict(message, content=[], stop_reason=None, stop_sequence=None,
+                     usage=dict(message['usage'], output_tokens=1))
+        
+        yield self._event('message_start', {'type': 'message_start', 'message': start})
+        yield self._event('content_block_start', {
+            'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}
+        })
+        self._wait(timing['ttft'])
+        chunk_chars = self.chunk_tokens * CHARS_PER_TOKEN
+        for i in range(0, len(text), chunk_chars):
+            chunk = text[i:i + chunk_chars]
+            yield self._event('content_block_delta', {
+                'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': chunk}
+            })
+            self._wait(estimate_tokens(chunk) / self.tokens_per_second)
+        yield self._event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        yield self._event('message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': message['stop_reason'], 'stop_sequence': message['stop_sequence']},
+            'usage': {'output_tokens': message['usage']['output_tokens']}
+        })
+        yield self._event('message_stop', {'type': 'message_stop'})
+    
+    @staticmethod
+    def _event(name: str, data: Dict[str, Any]) -> bytes:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+    
+    # --- Answers ---
+    
+    def _respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the Message for a request (with a private '_timing' entry for the delays)."""
+        messages = list(request['messages'])
+        prefill = ''
+        if messages and messages[-1].get('role') == 'assistant':
+            prefill = self._text_of(messages.pop()['content'])
+        
+        system = self._text_of(request.get('system', ''))
+        prompt = '\n'.join(self._text_of(message['content']) for message in messages)
+        rng = random.Random(self._request_seed(request, messages))
+        usage = self._input_usage(request)
+        model = request['model']
+        message_id = f"msg_sim_{uuid.uuid4().hex[:24]}"
+        timing = {'ttft': self._time_to_first_token(rng)}
+        
+        tool = next(iter(request.get('tools') or []), None)
+        if tool is not None:
+            tool_input = self._tool_input(tool, prompt, rng)
+            output_tokens = estimate_tokens(json.dumps(tool_input))
+            return {
+                'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+                'content': [{'type': 'tool_use', 'id': f"toolu_sim_{uuid.uuid4().hex[:20]}",
+                             'name': tool['name'], 'input': tool_input}],
+                'stop_reason': 'tool_use', 'stop_sequence': None,
+                'usage': dict(usage, output_tokens=output_tokens), '_timing': timing
+            }
+        
+        text = self._answer_text(system, prompt, rng)
+        if prefill and text.startswith(prefill):
+            text = text[len(prefill):]
+        
+        stop_reason, stop_sequence = 'end_turn', None
+        matches = [(text.find(sequence), sequence) for sequence in request.get('stop_sequences') or [] if sequence in text]
+        if matches:
+            position, stop_sequence = min(matches)
+            text, stop_reason = text[:position], 'stop_sequence'
+        max_chars = request['max_tokens'] * CHARS_PER_TOKEN
+        if len(text) > max_chars:
+            text, stop_reason, stop_sequence = text[:max_chars], 'max_tokens', None
+        
+        return {
+            'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': stop_reason, 'stop_sequence': stop_sequence,
+            'usage': dict(usage, output_tokens=estimate_tokens(text)), '_timing': timing
+        }
+    
+    def _answer_text(self, system: str, prompt: str, rng: random.Random) -> str:
+        """Text answer for the kind of prompt."""
+        topics = self._topics(prompt, rng)
+        if system == JD_CONDENSATION_SYSTEM_PROMPT:
+            # About a fifth of the chunk, cut at a word boundary
+            chunk = re.split(r'PART \d+ OF \d+:\n', prompt)[-1]
+            return chunk[:len(chunk) // 5].rsplit(' ', 1)[0].strip()
+        if system == JD_ENHANCEMENT_SYSTEM_PROMPT:
+            return self._prose(topics, rng, paragraphs=rng.randint(4, 6))
+        if 'Generate the 5 subject areas now' in prompt:
+            return '\n'.join(
+                f"{number}. {topic} - Tests how the candidate approaches {topic.lower()} in this role."
+                for number, topic in enumerate(topics[:Config.INTERVIEW_QUESTION_COUNT], 1)
+            )
+        question = re.search(r'starting with \[Question (\d+)\]', prompt)
+        subject = re.search(r'^Subject Area: (.+)$', prompt, re.MULTILINE)
+        if question and 'Write the question now' in prompt:
+            return self._question(int(question.group(1)), subject.group(1) if subject else topics[0], rng)
+        if '[Question 1]' in prompt:
+            text = '\n\n'.join(
+                self._question(number, topic, rng)
+                for number, topic in enumerate(topics[:Config.INTERVIEW_QUESTION_COUNT], 1)
+            )
+            return f"{text}\n\n{INTERVIEW_END_MARKER}" if INTERVIEW_END_MARKER in prompt else text
+        return self._prose(topics, rng, paragraphs=1)
+    
+    def _tool_input(self, tool: Dict[str, Any], prompt: str, rng: random.Random) -> Dict[str, Any]:
+        """Input for a forced tool call; record_interview gets a full interview."""
+        if tool.get('name') != 'record_interview':
+            return {}
+        topics = self._topics(prompt, rng)
+        return {'questions': [
+            {
+                'question_text': self._scenario(topic, rng),
+                'expected_answer': topic,
+                'criteria': [
+                    {'criterion': criterion, 'description': rng.choice(EXPLANATIONS)}
+                    for criterion in self._criteria(rng)
+                ]
+            }
+            for topic in topics[:Config.INTERVIEW_QUESTION_COUNT]
+        ]}
+    
+    def _question(self, number: int, topic: str, rng: random.Random) -> str:
+        criteria = '\n'.join(f"{criterion}: {rng.choice(EXPLANATIONS)}" for criterion in self._criteria(rng))
+        return f"[Question {number}]: {self._scenario(topic, rng)}\n\nExpected Answer: {topic}\n\n{criteria}"
+    
+    @staticmethod
+    def _scenario(topic: str, rng: random.Random) -> str:
+        return rng.choice(SCENARIOS).format(topic=topic.lower())
+    
+    @staticmethod
+    def _criteria(rng: random.Random) -> List[str]:
+        return rng.sample(CRITERIA, rng.randint(Config.QUESTION_CRITERIA_MIN, Config.QUESTION_CRITERIA_MAX))
+    
+    @staticmethod
+    def _prose(topics: List[str], rng: random.Random, paragraphs: int) -> str:
+        return '\n\n'.join(
+            ' '.join(rng.choice(SENTENCES).format(topic=rng.choice(topics).lower()) for _ in range(rng.randint(3, 5)))
+            for _ in range(paragraphs)
+        )
+    
+    @staticmethod
+    def _topics(prompt: str, rng: random.Random) -> List[str]:
+        """Subject areas, preferring ones whose words appear in the prompt."""
+        words = set(re.findall(r'[a-z]{4,}', prompt.lower()))
+        ranked = sorted(SUBJECT_AREAS, key=lambda area: (-len(words & set(area.lower().split())), rng.random()))
+        return ranked
+    
+    # --- Request helpers ---
+    
+    def _request_seed(self, request: Dict[str, Any], messages: List[Dict[str, Any]]) -> int:
+        """Seed for the answer: the prompts without any prefill (and without the model, so fallbacks agree)."""
+        digest = hashlib.sha256(json.dumps(
+            [self.seed, request.get('system'), messages, request.get('tools')], sort_keys=True
+        ).encode())
+        return int.from_bytes(digest.digest()[:8], 'big')
+    
+    def _input_usage(self, request: Dict[str, Any]) -> Dict[str, int]:
+        """Input usage, with the prefix up to the last cache breakpoint read from or written to the prompt cache."""
+        blocks = []
+        system = request.get('system', '')
+        blocks += system if isinstance(system, list) else [{'type': 'text', 'text': system}]
+        for message in request['messages']:
+            content = message['content']
+            blocks += content if isinstance(content, list) else [{'type': 'text', 'text': content}]
+        
+        total = estimate_tokens(json.dumps(request.get('tools') or '') + ''.join(b.get('text', '') for b in blocks))
+        breakpoint = max((i for i, block in enumerate(blocks) if block.get('cache_control')), default=None)
+        usage = {'input_tokens': total, 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        if breakpoint is None:
+            return usage
+        
+        prefix = ''.join(block.get('text', '') for block in blocks[:breakpoint + 1])
+        prefix_tokens = estimate_tokens(prefix)
+        if prefix_tokens < MIN_CACHEABLE_TOKENS:
+            return usage
+        
+        key = hashlib.sha256(f"{request['model']}\0{prefix}".encode()).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._prompt_cache.get(key, 0) > now
+            self._prompt_cache[key] = now + PROMPT_CACHE_TTL
+        usage['input_tokens'] = max(0, total - prefix_tokens)
+        usage['cache_read_input_tokens' if hit else 'cache_creation_input_tokens'] = prefix_tokens
+        return usage
+    
+    @staticmethod
+    def _text_of(content: Any) -> str:
+        if isinstance(content, list):
+            return '\n'.join(block.get('text', '') for block in content)
+        return content or ''
+
+
+class SimulatorTransport(httpx.BaseTransport):
+    """httpx transport that sends every request to a ClaudeSimulator instead of the network."""
+    
+    def __init__(self, simulator: ClaudeSimulator):
+        self.simulator = simulator
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        status, headers, body = self.simulator.handle(request.method, request.url.raw_path.decode(), request.read())
+        return httpx.Response(status, headers=headers, stream=_IteratorStream(body), request=request)
+
+
+class _IteratorStream(httpx.SyncByteStream):
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+    
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self.chunks
+    
+    def close(self):
+        close = getattr(self.chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class SimulatedClaudeClient(ClaudeClientService):
+    """
+    ClaudeClientService whose API calls go to an in-process ClaudeSimulator.
+    
+    Everything above the HTTP layer is the real client (retries, routing,
+    caching, streaming, continuation, parsing and validation), so services
+    can be load-tested and benchmarked without API access.
+    """
+    
+    def __init__(self, simulator: Optional[ClaudeSimulator] = None, **kwargs):
+        """
+        Initialize Simulated Claude Client.
+        
+        Args:
+            simulator: Simulator to answer the calls (defaults to ClaudeSimulator())
+            **kwargs: Other ClaudeClientService arguments (not api_key or http_client)
+        """
+        self.simulator = simulator or ClaudeSimulator()
+        super().__init__(
+            api_key='simulated',
+            http_client=httpx.Client(transport=SimulatorTransport(self.simulator)),
+            **kwargs
+        )
+
+
+class ClaudeSimulatorServer(ThreadingHTTPServer):
+    """
+    Local HTTP stand-in for the Messages API, serving a ClaudeSimulator.
+    
+    Point the application at it with CLAUDE_BASE_URL=http://host:port.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, simulator: ClaudeSimulator, host: str = '127.0.0.1', port: int = 0):
+        self.simulator = simulator
+        super().__init__((host, port), _SimulatorRequestHandler)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _SimulatorRequestHandler(BaseHTTPRequestHandler):
+    """Streams the simulator's answer; the connection is closed after each response."""
+    
+    def do_GET(self):
+        self._answer(b'')
+    
+    def do_POST(self):
+        self._answer(self.rfile.read(int(self.headers.get('content-length') or 0)))
+    
+    def _answer(self, body: bytes):
+        status, headers, chunks = self.server.simulator.handle(self.command, self.path, body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('connection', 'close')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early (hedging, early stop)
+            chunks.close()
+    
+    def log_message(self, format, *args):
+        logger.debug(f"Simulator {self.address_string()} {format % args}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the HTTP stand-in: python -m backend.claude_simulator --port 8089"""
+    parser = argparse.ArgumentParser(description='Local stand-in for the Anthropic Messages API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ttft-median', type=float, default=0.8, help='Median seconds to the first token')
+    parser.add_argument('--ttft-sigma', type=float, default=0.5, help='Spread of the lognormal time to first token')
+    parser.add_argument('--tokens-per-second', type=float, default=60.0)
+    parser.add_argument('--chunk-tokens', type=int, default=6, help='Tokens per streamed text delta')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--overload-rate', type=float, default=0.0, help='Fraction of requests answered with 529')
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds on 429')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='Multiplier for every delay')
+    args = parser.parse_args(argv)
+    
+    simulator = ClaudeSimulator(
+        seed=args.seed,
+        ttft_median=args.ttft_median,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        chunk_tokens=args.chunk_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        overload_rate=args.overload_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after=args.retry_after,
+        time_scale=args.time_scale
+    )
+    server = ClaudeSimulatorServer(simulator, args.host, args.port)
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Claude simulator listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Claude simulator stopped: {simulator.stats()}")
+
+
+if __name__ == '__main__':
+    main()
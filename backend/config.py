@@ -1,8 +1,19 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _model_route(operation: str, default_models: str, default_max_latency: float) -> dict:
+    """Routing table entry from MODEL_ROUTE_<OPERATION> (comma-separated models) and its latency limit."""
+    models = os.getenv(f'MODEL_ROUTE_{operation}', default_models)
+    return {
+        'models': [model.strip() for model in models.split(',') if model.strip()],
+        'max_latency': float(os.getenv(f'MODEL_ROUTE_{operation}_MAX_LATENCY', str(default_max_latency)))
+    }
+
+
 class Config:
     """Base configuration"""
     
@@ -25,17 +36,139 @@ class Config:
     
     # Claude API
     CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
+    # Messages API endpoint; set to a local simulator (see claude_simulator.py) for load tests
+    CLAUDE_BASE_URL = os.getenv('CLAUDE_BASE_URL') or None
     CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-opus-4-1')
     CLAUDE_MAX_TOKENS = int(os.getenv('CLAUDE_MAX_TOKENS', '4000'))
+    # Extra calls made to continue a text response cut off at max_tokens (0 disables)
+    CLAUDE_MAX_CONTINUATIONS = int(os.getenv('CLAUDE_MAX_CONTINUATIONS', '2'))
+    # Retries: decorrelated jitter between the base and max delay (seconds), honoring Retry-After
+    CLAUDE_RETRY_MAX_ATTEMPTS = int(os.getenv('CLAUDE_RETRY_MAX_ATTEMPTS', '3'))
+    CLAUDE_RETRY_BASE_DELAY = float(os.getenv('CLAUDE_RETRY_BASE_DELAY', '1'))
+    CLAUDE_RETRY_MAX_DELAY = float(os.getenv('CLAUDE_RETRY_MAX_DELAY', '20'))
+    # Hedging for interactive requests: send a backup request when the first is slower than
+    # HEDGE_PERCENTILE of recent latencies, for at most HEDGE_BUDGET_RATIO extra requests
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'True') == 'True'
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+    HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', '0.05'))
+    HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))  # Latencies observed before hedging starts
+    HEDGE_WINDOW_SIZE = int(os.getenv('HEDGE_WINDOW_SIZE', '200'))
+    # Consecutive upstream failures (5xx, connection errors) before failing fast, and for how long
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.getenv('CIRCUIT_BREAKER_RESET_TIMEOUT', '30'))
+    # Model routing: primary model first, then fallbacks used while the primary's recent
+    # error rate or mean latency (seconds) is over its limit. Enhancement and the short
+    # outline/repair calls do not need the largest model
+    MODEL_ROUTING_ENABLED = os.getenv('MODEL_ROUTING_ENABLED', 'True') == 'True'
+    MODEL_ROUTES = {
+        'jd_enhancement': _model_route('JD_ENHANCEMENT', f'claude-sonnet-4-5,{CLAUDE_MODEL}', 60),
+        'interview_generation': _model_route('INTERVIEW_GENERATION', f'{CLAUDE_MODEL},claude-sonnet-4-5', 180),
+        'interview_outline': _model_route('INTERVIEW_OUTLINE', f'claude-sonnet-4-5,{CLAUDE_MODEL}', 30),
+        'question_repair': _model_route('QUESTION_REPAIR', f'claude-sonnet-4-5,{CLAUDE_MODEL}', 60),
+        'jd_condensation': _model_route('JD_CONDENSATION', 'claude-haiku-4-5,claude-sonnet-4-5', 30)
+    }
+    MODEL_ROUTER_MAX_ERROR_RATE = float(os.getenv('MODEL_ROUTER_MAX_ERROR_RATE', '0.25'))
+    MODEL_ROUTER_MIN_SAMPLES = int(os.getenv('MODEL_ROUTER_MIN_SAMPLES', '10'))  # Calls observed before judging a model
+    MODEL_ROUTER_WINDOW_SIZE = int(os.getenv('MODEL_ROUTER_WINDOW_SIZE', '50'))
+    MODEL_ROUTER_COOLDOWN = float(os.getenv('MODEL_ROUTER_COOLDOWN', '300'))  # Seconds before retrying an unhealthy model
+    # Token budget: calls that do not set max_tokens get the TOKEN_BUDGET_PERCENTILE of their
+    # operation's recent output sizes times TOKEN_BUDGET_HEADROOM (CLAUDE_MAX_TOKENS until
+    # TOKEN_BUDGET_MIN_SAMPLES sizes are known, and at most CLAUDE_MAX_TOKENS)
+    TOKEN_BUDGET_ENABLED = os.getenv('TOKEN_BUDGET_ENABLED', 'True') == 'True'
+    TOKEN_BUDGET_PERCENTILE = float(os.getenv('TOKEN_BUDGET_PERCENTILE', '99'))
+    TOKEN_BUDGET_HEADROOM = float(os.getenv('TOKEN_BUDGET_HEADROOM', '1.25'))
+    TOKEN_BUDGET_MIN_SAMPLES = int(os.getenv('TOKEN_BUDGET_MIN_SAMPLES', '20'))
+    TOKEN_BUDGET_WINDOW_SIZE = int(os.getenv('TOKEN_BUDGET_WINDOW_SIZE', '200'))
+    TOKEN_BUDGET_MIN_MAX_TOKENS = int(os.getenv('TOKEN_BUDGET_MIN_MAX_TOKENS', '512'))
+    # Prompt inputs (job descriptions) over this many estimated tokens are compressed or rejected (0 disables)
+    MAX_INPUT_TOKENS = int(os.getenv('MAX_INPUT_TOKENS', '20000'))
+    # Job descriptions are normalized before they go into a prompt: HTML/markdown residue,
+    # paragraphs where most sentences or list items contain a boilerplate phrase (semicolon-
+    # separated) and repeated paragraphs are removed and whitespace collapsed
+    INPUT_NORMALIZATION_ENABLED = os.getenv('INPUT_NORMALIZATION_ENABLED', 'True') == 'True'
+    INPUT_BOILERPLATE_PHRASES = [
+        phrase.strip() for phrase in os.getenv(
+            'INPUT_BOILERPLATE_PHRASES',
+            'equal opportunity employer;equal employment opportunity;without regard to race;'
+            'all qualified applicants will receive consideration;affirmative action;reasonable accommodation;'
+            'protected veteran;e-verify;pay transparency;background check;drug-free workplace;'
+            'medical, dental;dental and vision;dental, vision;401(k);paid time off;parental leave;'
+            'employee assistance program;wellness program;tuition reimbursement;commuter benefits;'
+            'employee stock purchase plan;follow us on;apply now;click apply'
+        ).split(';') if phrase.strip()
+    ]
+    # Basic descriptions over JD_CONDENSE_THRESHOLD_TOKENS are split into chunks of at most
+    # JD_CONDENSE_CHUNK_TOKENS, condensed concurrently (route 'jd_condensation') and merged
+    JD_CONDENSE_ENABLED = os.getenv('JD_CONDENSE_ENABLED', 'True') == 'True'
+    JD_CONDENSE_THRESHOLD_TOKENS = int(os.getenv('JD_CONDENSE_THRESHOLD_TOKENS', '6000'))
+    JD_CONDENSE_CHUNK_TOKENS = int(os.getenv('JD_CONDENSE_CHUNK_TOKENS', '2000'))
+    JD_CONDENSE_MAX_TOKENS = int(os.getenv('JD_CONDENSE_MAX_TOKENS', '600'))  # Output per chunk
+    JD_CONDENSE_MAX_WORKERS = int(os.getenv('JD_CONDENSE_MAX_WORKERS', '8'))
+    JD_CONDENSE_MAX_ROUNDS = int(os.getenv('JD_CONDENSE_MAX_ROUNDS', '3'))
+    # MinHash signatures of each JD's text, LSH-indexed so a near-duplicate JD's enhancement
+    # or interview can be cloned (clone_near_duplicate). Signature parameters are stored with
+    # the data: changing NUM_PERM or SHINGLE_SIZE makes existing signatures unusable
+    JD_DEDUP_ENABLED = os.getenv('JD_DEDUP_ENABLED', 'True') == 'True'
+    JD_DEDUP_THRESHOLD = float(os.getenv('JD_DEDUP_THRESHOLD', '0.85'))  # Estimated Jaccard similarity
+    JD_DEDUP_NUM_PERM = int(os.getenv('JD_DEDUP_NUM_PERM', '128'))
+    JD_DEDUP_BANDS = int(os.getenv('JD_DEDUP_BANDS', '16'))
+    JD_DEDUP_SHINGLE_SIZE = int(os.getenv('JD_DEDUP_SHINGLE_SIZE', '4'))  # Words per shingle
     
     # Interview Generation
     INTERVIEW_QUESTION_COUNT = 5
     QUESTION_CRITERIA_MIN = 8
     QUESTION_CRITERIA_MAX = 10
+    # 'single': one completion for all questions
+    # 'parallel': a short outline call, then one concurrent call per question
+    INTERVIEW_GENERATION_MODE = os.getenv('INTERVIEW_GENERATION_MODE', 'single')
+    # Single-completion output: 'tool' (structured, via the record_interview tool) or 'text'.
+    # Streamed and parallel generation always use text
+    INTERVIEW_OUTPUT_MODE = os.getenv('INTERVIEW_OUTPUT_MODE', 'tool')
+    # Text-format interviews end at a stop sequence after question 5; streamed ones are also
+    # cut off client-side once question 5 is complete or the stream turns out malformed
+    INTERVIEW_EARLY_STOP_ENABLED = os.getenv('INTERVIEW_EARLY_STOP_ENABLED', 'true').lower() == 'true'
+    INTERVIEW_OUTLINE_MAX_TOKENS = int(os.getenv('INTERVIEW_OUTLINE_MAX_TOKENS', '400'))
+    INTERVIEW_QUESTION_MAX_TOKENS = int(os.getenv('INTERVIEW_QUESTION_MAX_TOKENS', '1200'))
+    # Rounds of re-requesting only the invalid questions before failing (0 disables repair)
+    INTERVIEW_REPAIR_MAX_ROUNDS = int(os.getenv('INTERVIEW_REPAIR_MAX_ROUNDS', '2'))
     
     # Caching
     ENABLE_QUESTION_CACHE = os.getenv('ENABLE_QUESTION_CACHE', 'True') == 'True'
     CACHE_SIMILARITY_THRESHOLD = float(os.getenv('CACHE_SIMILARITY_THRESHOLD', '0.85'))
+    # Question cache eviction: 'lru' (least recently used), 'lfu' (least used) or 'cost'
+    # (fewest tokens saved: uses x tokens it cost to generate). Entries idle longer than
+    # MAX_AGE_DAYS go first; 0 disables either limit
+    QUESTION_CACHE_EVICTION_POLICY = os.getenv('QUESTION_CACHE_EVICTION_POLICY', 'cost')
+    QUESTION_CACHE_MAX_ENTRIES = int(os.getenv('QUESTION_CACHE_MAX_ENTRIES', '20000'))
+    QUESTION_CACHE_MAX_AGE_DAYS = int(os.getenv('QUESTION_CACHE_MAX_AGE_DAYS', '180'))
+    # Rows deleted or updated per transaction, so a sweep or usage flush never holds long locks on MySQL
+    QUESTION_CACHE_SWEEP_BATCH_SIZE = int(os.getenv('QUESTION_CACHE_SWEEP_BATCH_SIZE', '500'))
+    QUESTION_CACHE_SWEEP_INTERVAL = int(os.getenv('QUESTION_CACHE_SWEEP_INTERVAL', '3600'))  # Seconds; 0 disables
+    # Cache hits are counted in memory and written every interval; at most this many
+    # seconds of usage_count / last_used_at updates are lost if a worker crashes
+    QUESTION_CACHE_USAGE_FLUSH_INTERVAL = int(os.getenv('QUESTION_CACHE_USAGE_FLUSH_INTERVAL', '30'))  # Seconds
+    # Memoization of identical Claude requests (model, prompts, temperature, max_tokens)
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '86400'))  # Seconds
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))  # In-process LRU
+    # SQLite file shared by all workers on the host; empty disables the shared tier
+    RESPONSE_CACHE_DB_PATH = os.getenv(
+        'RESPONSE_CACHE_DB_PATH',
+        os.path.join(tempfile.gettempdir(), 'jdenhancer_response_cache.db')
+    )
+    RESPONSE_CACHE_DISK_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_DISK_MAX_ENTRIES', '5000'))
+    # Expired responses are kept this much longer and served while one request refreshes them; 0 disables
+    RESPONSE_CACHE_STALE_TTL = int(os.getenv('RESPONSE_CACHE_STALE_TTL', '3600'))  # Seconds
+    # Stampede protection: the first miss of a response or question cache entry takes a lease and
+    # generates it; concurrent misses wait for it (up to the wait timeout) instead of calling Claude
+    CACHE_LEASE_ENABLED = os.getenv('CACHE_LEASE_ENABLED', 'True') == 'True'
+    CACHE_LEASE_TTL = int(os.getenv('CACHE_LEASE_TTL', '300'))  # Seconds before a crashed holder's lease lapses
+    CACHE_LEASE_WAIT_TIMEOUT = float(os.getenv('CACHE_LEASE_WAIT_TIMEOUT', '120'))  # Seconds
+    CACHE_LEASE_POLL_INTERVAL = float(os.getenv('CACHE_LEASE_POLL_INTERVAL', '0.25'))  # Seconds
+    # Anthropic prompt caching of the static instructions and reused job descriptions
+    PROMPT_CACHE_ENABLED = os.getenv('PROMPT_CACHE_ENABLED', 'True') == 'True'
+    # Breakpoints are only set on prefixes of at least this many estimated tokens (the API's minimum)
+    PROMPT_CACHE_MIN_TOKENS = int(os.getenv('PROMPT_CACHE_MIN_TOKENS', '1024'))
     
     # Security
     ADMIN_ONLY_FEATURE = True  # Only admins can create interviews
@@ -43,6 +176,26 @@ class Config:
     # Processing
     ASYNC_PROCESSING = os.getenv('ASYNC_PROCESSING', 'True') == 'True'
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '300'))  # 5 minutes
+    
+    # Claude rate limits shared by all workers on the host (0 disables a budget)
+    # Match these to your Anthropic organization's tier
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+    RATE_LIMIT_REQUESTS_PER_MINUTE = int(os.getenv('RATE_LIMIT_REQUESTS_PER_MINUTE', '50'))
+    RATE_LIMIT_INPUT_TOKENS_PER_MINUTE = int(os.getenv('RATE_LIMIT_INPUT_TOKENS_PER_MINUTE', '40000'))
+    RATE_LIMIT_OUTPUT_TOKENS_PER_MINUTE = int(os.getenv('RATE_LIMIT_OUTPUT_TOKENS_PER_MINUTE', '16000'))
+    RATE_LIMIT_DB_PATH = os.getenv(
+        'RATE_LIMIT_DB_PATH',
+        os.path.join(tempfile.gettempdir(), 'jdenhancer_rate_limit.db')
+    )
+    
+    # Background jobs (async workflow mode)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))  # Worker threads per process
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '16'))  # Jobs waiting beyond the busy workers
+    JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '1800'))  # Seconds queued or running before a job is abandoned
+    
+    # Bulk workflow (Message Batches API): status polling and how long to wait per batch
+    BATCH_POLL_INTERVAL = float(os.getenv('BATCH_POLL_INTERVAL', '30'))  # Seconds
+    BATCH_TIMEOUT = int(os.getenv('BATCH_TIMEOUT', '86400'))  # Seconds; batches expire after 24 hours
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -59,6 +212,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     CLAUDE_API_KEY = 'test-key'
+    QUESTION_CACHE_SWEEP_INTERVAL = 0  # Tests sweep explicitly
+    QUESTION_CACHE_USAGE_FLUSH_INTERVAL = 0  # and flush usage explicitly
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -0,0 +1,274 @@
+"""
+Hedged Requests - Send a backup copy of a slow Claude request and keep whichever answers first.
+Latency thresholds are learned from the requests this process has observed.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Iterator, Tuple
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeAttempt:
+    """
+    One copy of a hedged request, running in its own thread.
+    
+    The attempt checks `cancelled` between stream events and registers
+    callbacks with on_cancel() (e.g. closing its HTTP response) so a losing
+    attempt that is still waiting on the network is aborted too.
+    """
+    
+    def __init__(self, index: int):
+        self.index = index
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+    
+    def on_cancel(self, callback: Callable[[], None]):
+        """Run callback when the attempt is cancelled (immediately if it already was)."""
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run(callback)
+    
+    def cancel(self):
+        """Cancel the attempt and run its callbacks."""
+        with self._lock:
+            if self.cancelled.is_set():
+                return
+            self.cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        
+        for callback in callbacks:
+            self._run(callback)
+    
+    @staticmethod
+    def _run(callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            logger.debug(f"Hedge cancel callback failed: {str(e)}")
+
+
+class HedgingPolicy:
+    """
+    Decides when to send a backup request and keeps hedging within budget.
+    
+    Latencies are kept in a sliding window per (metric, key), where metric is
+    'response' (time to the complete response) or 'first_token' (time to
+    the first streamed text) and key separates request shapes with very
+    different latencies (the client uses (model, max_tokens)). A backup is sent once
+    the primary has taken longer than the configured percentile of its
+    window, provided the window has enough samples and hedges so far stay
+    under `budget_ratio` of all requests.
+    """
+    
+    def __init__(
+        self,
+        percentile: Optional[float] = None,
+        budget_ratio: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window_size: Optional[int] = None
+    ):
+        """
+        Initialize Hedging Policy.
+        
+        Args:
+            percentile: Latency percentile after which to hedge (defaults to Config.HEDGE_PERCENTILE)
+            budget_ratio: Maximum backup requests per request (defaults to Config.HEDGE_BUDGET_RATIO)
+            min_samples: Observations needed before hedging (defaults to Config.HEDGE_MIN_SAMPLES)
+            window_size: Latencies remembered per window (defaults to Config.HEDGE_WINDOW_SIZE)
+        """
+        self.percentile = percentile if percentile is not None else Config.HEDGE_PERCENTILE
+        self.budget_ratio = budget_ratio if budget_ratio is not None else Config.HEDGE_BUDGET_RATIO
+        self.min_samples = min_samples if min_samples is not None else Config.HEDGE_MIN_SAMPLES
+        self.window_size = window_size or Config.HEDGE_WINDOW_SIZE
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[str, Any], deque] = {}
+        self._counters = {
+            'requests': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'skipped_over_budget': 0
+        }
+    
+    def record_latency(self, metric: str, key: Any, seconds: float):
+        """Add an observed latency to a window."""
+        with self._lock:
+            window = self._windows.setdefault((metric, key), deque(maxlen=self.window_size))
+            window.append(seconds)
+    
+    def hedge_delay(self, metric: str, key: Any) -> Optional[float]:
+        """
+        Seconds to wait for the primary before sending a backup.
+        
+        Returns:
+            The window's percentile latency, or None while the window has
+            fewer than min_samples observations
+        """
+        with self._lock:
+            window = self._windows.get((metric, key))
+            if not window or len(window) < self.min_samples:
+                return None
+            ordered = sorted(window)
+        
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+    
+    def record_request(self):
+        """Count a request that could have been hedged."""
+        with self._lock:
+            self._counters['requests'] += 1
+    
+    def try_acquire_hedge(self) -> bool:
+        """
+        Claim budget for one backup request.
+        
+        Returns:
+            True if a backup may be sent
+        """
+        with self._lock:
+            if self._counters['hedged'] + 1 > self._counters['requests'] * self.budget_ratio:
+                self._counters['skipped_over_budget'] += 1
+                return False
+            self._counters['hedged'] += 1
+            return True
+    
+    def record_hedge_win(self):
+        """Count a backup request that answered before the primary."""
+        with self._lock:
+            self._counters['hedge_wins'] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hedging counters for this process.
+        
+        Returns:
+            Dictionary of counters plus 'hedge_ratio' (backups per request)
+            and 'win_rate' (share of backups that answered first)
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        
+        stats['hedge_ratio'] = round(stats['hedged'] / stats['requests'], 4) if stats['requests'] else 0.0
+        stats['win_rate'] = round(stats['hedge_wins'] / stats['hedged'], 4) if stats['hedged'] else 0.0
+        return stats
+
+
+def hedged_events(
+    open_attempt: Callable[[HedgeAttempt], Iterator[Dict[str, Any]]],
+    policy: HedgingPolicy,
+    metric: str,
+    key: Any,
+    clock=time.monotonic
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run a request with an optional backup and yield the winner's events.
+    
+    open_attempt(attempt) must return an iterator of client events
+    ({'type': 'text', ...} and finally {'type': 'done', ...}) and stop early
+    once attempt.cancelled is set. It is consumed in a worker thread.
+    
+    With metric 'first_token' the first attempt to produce any event wins
+    (streaming); with 'response' the first to produce 'done' wins. The loser
+    is cancelled as soon as there is a winner. If the primary fails before a
+    backup was sent, its error is raised at once so the caller's retry policy
+    applies; once a backup is running, an error is only raised if both fail.
+    
+    Args:
+        open_attempt: Starts one copy of the request
+        policy: Hedging policy providing the delay and budget
+        metric: 'response' or 'first_token'
+        key: Latency window key (e.g. max_tokens)
+        clock: Time source
+    
+    Yields:
+        The winning attempt's events, in order
+    """
+    events = queue.Queue()
+    attempts = []
+    started_at = {}
+    
+    def run(attempt: HedgeAttempt):
+        try:
+            for event in open_attempt(attempt):
+                events.put((attempt.index, 'event', event))
+                if attempt.cancelled.is_set():
+                    break
+            events.put((attempt.index, 'end', None))
+        except BaseException as e:
+            events.put((attempt.index, 'error', e))
+    
+    def start():
+        attempt = HedgeAttempt(len(attempts))
+        attempts.append(attempt)
+        started_at[attempt.index] = clock()
+        threading.Thread(target=run, args=(attempt,), name=f"claude-hedge-{attempt.index}", daemon=True).start()
+    
+    policy.record_request()
+    delay = policy.hedge_delay(metric, key)
+    start()
+    
+    winner = None
+    buffered = {}
+    failures = {}
+    
+    try:
+        while winner is None:
+            timeout = None
+            if len(attempts) == 1 and delay is not None:
+                timeout = max(0.0, started_at[0] + delay - clock())
+            
+            try:
+                index, kind, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                delay = None
+                if policy.try_acquire_hedge():
+                    logger.info(f"Claude request slower than p{policy.percentile:g}; sending a hedge request")
+                    start()
+                continue
+            
+            if kind == 'event':
+                buffered.setdefault(index, []).append(payload)
+                if metric == 'first_token' or payload.get('type') == 'done':
+                    winner = index
+                continue
+            
+            if kind == 'end':
+                payload = Exception("Claude API stream ended without a result")
+            failures[index] = payload
+            if len(failures) == len(attempts):
+                raise failures[0] if 0 in failures else payload
+        
+        for attempt in attempts:
+            if attempt.index != winner:
+                attempt.cancel()
+        
+        policy.record_latency(metric, key, clock() - started_at[winner])
+        if winner > 0:
+            policy.record_hedge_win()
+            logger.info("Hedge request answered first")
+        
+        for event in buffered[winner]:
+            yield event
+        
+        while buffered[winner][-1].get('type') != 'done':
+            index, kind, payload = events.get()
+            if index != winner:
+                continue
+            if kind == 'event':
+                buffered[winner].append(payload)
+                yield payload
+            elif kind == 'error':
+                raise payload
+            else:
+                raise Exception("Claude API stream ended without a result")
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
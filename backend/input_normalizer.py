@@ -0,0 +1,173 @@
+"""
+Input Normalizer - Deterministic clean-up of job descriptions before they are sent to Claude.
+Strips ATS export residue (HTML, markdown), EEO and benefits boilerplate, repeated paragraphs and extra whitespace.
+"""
+
+import html
+import logging
+import re
+from typing import Optional, Dict, Any, Iterable
+from .config import Config
+from .rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tags that end a paragraph or a line when HTML is flattened to text
+_PARAGRAPH_TAG = re.compile(r'<\s*/\s*(?:p|div|h[1-6]|ul|ol|table)\s*>', re.IGNORECASE)
+_LINE_TAG = re.compile(r'<\s*br\b[^>]*>|<\s*/\s*(?:li|tr)\s*>', re.IGNORECASE)
+_LIST_ITEM_TAG = re.compile(r'<\s*li\b[^>]*>', re.IGNORECASE)
+_SCRIPT_OR_STYLE = re.compile(r'<\s*(script|style)\b.*?<\s*/\s*\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'</?[A-Za-z][A-Za-z0-9]*(\s[^<>]*)?/?>')
+# Elements whose tags mark a paste as HTML; a bare '<' or 'vector<int>' does not
+_HTML_HINT = re.compile(
+    r'<\s*/?\s*(?:p|div|span|br|hr|li|ul|ol|b|i|u|em|strong|a|h[1-6]|table|tr|td|th|script|style)\b[^<>]*>',
+    re.IGNORECASE
+)
+_MARKDOWN_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+_MARKDOWN_EMPHASIS = re.compile(r'(\*\*|~~)(.+?)\1')
+# __text__ only where the underscores are not part of a word, so __init__ or snake__case stay as they are
+_MARKDOWN_UNDERSCORE_EMPHASIS = re.compile(r'(?<!\w)__(?=[^\s_])(.+?)(?<=[^\s_])__(?!\w)')
+_MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+', re.MULTILINE)
+_MARKDOWN_RULE = re.compile(r'^\s*([-*_=])(\s*\1){2,}\s*$', re.MULTILINE)
+_BULLET = re.compile('^[*+\u2022\u25cf\u25aa\u2013]\\s+', re.MULTILINE)
+_INVISIBLE = re.compile('[\u200b\u200c\u200d\u2060\ufeff]')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])')
+
+
+class InputNormalizer:
+    """
+    Deterministic, idempotent normalization of prompt inputs.
+    
+    Steps, in order: HTML is flattened to text (entities decoded, block
+    tags turned into line breaks) when the text contains HTML tags, markdown markup is reduced to its text,
+    whitespace is collapsed, paragraphs where most sentences and list
+    items contain a boilerplate phrase are dropped, and repeated
+    paragraphs are kept only once.
+    
+    Boilerplate phrases are matched case-insensitively with a single
+    compiled pattern (the phrase index), built once per normalizer.
+    """
+    
+    def __init__(self, boilerplate_phrases: Optional[Iterable[str]] = None):
+        """
+        Initialize Input Normalizer.
+        
+        Args:
+            boilerplate_phrases: Phrases that mark a sentence or list item as boilerplate
+                                 (defaults to Config.INPUT_BOILERPLATE_PHRASES)
+        """
+        phrases = boilerplate_phrases if boilerplate_phrases is not None else Config.INPUT_BOILERPLATE_PHRASES
+        phrases = sorted({phrase.strip().lower() for phrase in phrases if phrase.strip()}, key=len, reverse=True)
+        self.boilerplate_pattern = (
+            re.compile('|'.join(r'\s+'.join(map(re.escape, phrase.split())) for phrase in phrases), re.IGNORECASE)
+            if phrases else None
+        )
+    
+    def normalize(self, text: str) -> Dict[str, Any]:
+        """
+        Normalize text and report what it saved.
+        
+        Args:
+            text: Prompt input, e.g. a job description
+        
+        Returns:
+            Dictionary with:
+            {
+                'text': str,           # normalized text
+                'chars_saved': int,
+                'tokens_saved': int    # estimated (see estimate_tokens)
+            }
+        """
+        if not text:
+            return {'text': text, 'chars_saved': 0, 'tokens_saved': 0}
+        
+        normalized = self._strip_markup(text)
+        paragraphs = self._paragraphs(normalized)
+        paragraphs = [self._remove_boilerplate(paragraph) for paragraph in paragraphs]
+        normalized = '\n\n'.join(self._deduplicate(paragraph for paragraph in paragraphs if paragraph))
+        
+        return {
+            'text': normalized,
+            'chars_saved': len(text) - len(normalized),
+            'tokens_saved': max(0, estimate_tokens(text) - estimate_tokens(normalized))
+        }
+    
+    @staticmethod
+    def _strip_markup(text: str) -> str:
+        """Flatten HTML and markdown to plain text."""
+        if _HTML_HINT.search(text):
+            text = _SCRIPT_OR_STYLE.sub('', text)
+            text = _LIST_ITEM_TAG.sub('\n- ', text)
+            text = _PARAGRAPH_TAG.sub('\n\n', text)
+            text = _LINE_TAG.sub('\n', text)
+            text = _TAG.sub('', text)
+        text = html.unescape(text).replace('\xa0', ' ')
+        text = _INVISIBLE.sub('', text)
+        
+        text = _MARKDOWN_LINK.sub(r'\1', text)
+        text = _MARKDOWN_EMPHASIS.sub(r'\2', text)
+        text = _MARKDOWN_UNDERSCORE_EMPHASIS.sub(
+            lambda match: match.group(0) if re.fullmatch(r'\w+', match.group(0)) else match.group(1), text
+        )
+        text = _MARKDOWN_HEADING.sub('', text)
+        text = _MARKDOWN_RULE.sub('', text)
+        return _BULLET.sub('- ', text)
+    
+    @staticmethod
+    def _paragraphs(text: str):
+        """Split text into paragraphs with whitespace collapsed inside each line."""
+        lines = [re.sub(r'[ \t\f\v]+', ' ', line).strip() for line in text.replace('\r\n', '\n').split('\n')]
+        return [paragraph.strip('\n') for paragraph in re.split(r'\n{2,}', '\n'.join(lines)) if paragraph.strip()]
+    
+    def _remove_boilerplate(self, paragraph: str) -> str:
+        """
+        Drop a paragraph that is mostly boilerplate.
+        
+        The paragraph goes when more than half of its sentences and list
+        items contain a boilerplate phrase (an EEO statement, a benefits
+        list). A paragraph where the phrases are the minority, such as a
+        list of duties that mentions 401(k) plans, is kept whole.
+        """
+        if self.boilerplate_pattern is None or not self.boilerplate_pattern.search(paragraph):
+            return paragraph
+        
+        units = [sentence for line in paragraph.split('\n') for sentence in _SENTENCE_END.split(line) if sentence]
+        matches = sum(1 for unit in units if self.boilerplate_pattern.search(unit))
+        return '' if matches * 2 > len(units) else paragraph
+    
+    @staticmethod
+    def _deduplicate(paragraphs: Iterable[str]):
+        """Keep the first occurrence of each paragraph (compared case- and whitespace-insensitively)."""
+        seen = set()
+        for paragraph in paragraphs:
+            key = ' '.join(paragraph.lower().split())
+            if key not in seen:
+                seen.add(key)
+                yield paragraph
+
+
+_default_normalizer = None
+
+
+def normalize_input(text: str, label: str = 'Input') -> Dict[str, Any]:
+    """
+    Normalize a prompt input with the default normalizer (see InputNormalizer).
+    
+    Args:
+        text: Prompt input, e.g. a job description
+        label: Name of the input for the log message
+    
+    Returns:
+        InputNormalizer.normalize result dictionary ('text', 'chars_saved', 'tokens_saved');
+        the text unchanged if Config.INPUT_NORMALIZATION_ENABLED is off
+    """
+    global _default_normalizer
+    if not Config.INPUT_NORMALIZATION_ENABLED:
+        return {'text': text, 'chars_saved': 0, 'tokens_saved': 0}
+    if _default_normalizer is None:
+        _default_normalizer = InputNormalizer()
+    
+    result = _default_normalizer.normalize(text)
+    if result['chars_saved']:
+        logger.info(f"{label} normalized: {result['chars_saved']} characters, ~{result['tokens_saved']} tokens saved")
+    return result
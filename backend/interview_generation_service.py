@@ -5,32 +5,69 @@ Uses the Interview Creation Framework to produce structured Q&A with 8-10 evalua
 
 import logging
 import hashlib
-from typing import Optional, Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Iterator
 from datetime import datetime
 from .models import db, JobDescription, Interview, InterviewQuestion, QuestionCache, GenerationLog
-from .claude_client import ClaudeClientService
-from .prompts import INTERVIEW_GENERATION_PROMPT, INTERVIEW_GENERATION_SYSTEM_PROMPT
+from .claude_client import ClaudeClientService, InterviewStreamParser
+from .interview_schema import INTERVIEW_TOOL
+from .token_budget import fit_input, load_token_history
+from .input_normalizer import normalize_input
+from .question_similarity import QuestionIndex, embed_question, skill_level_key, topic_key
+from .question_cache_usage import QuestionUsageBuffer
+from .cache_leases import CacheLeases
+from .jd_deduplication import FIELDS, NearDuplicateIndex, default_hasher, signature_from_bytes
+from .prompts import (
+    INTERVIEW_GENERATION_CONTEXT,
+    INTERVIEW_GENERATION_INSTRUCTIONS,
+    INTERVIEW_GENERATION_PROMPT,
+    INTERVIEW_GENERATION_SYSTEM_PROMPT,
+    INTERVIEW_GENERATION_TOOL_PROMPT,
+    INTERVIEW_STOP_SEQUENCES,
+    INTERVIEW_OUTLINE_PROMPT,
+    INTERVIEW_QUESTION_PROMPT,
+    INTERVIEW_QUESTION_REPAIR_INSTRUCTIONS
+)
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
+# Accepted values of generation_mode (and Config.INTERVIEW_GENERATION_MODE)
+GENERATION_MODES = ('single', 'parallel')
+
 
 class InterviewGenerationService:
     """
     Service for generating interview questions from enhanced job descriptions.
-    Implements caching for similar questions to optimize API usage.
+    Questions similar to ones generated before (see QuestionIndex) are reused
+    from the question cache instead of being generated again.
     """
     
-    def __init__(self, claude_client: Optional[ClaudeClientService] = None):
+    def __init__(
+        self,
+        claude_client: Optional[ClaudeClientService] = None,
+        duplicate_index: Optional[NearDuplicateIndex] = None
+    ):
         """
         Initialize Interview Generation Service.
         
         Args:
             claude_client: Claude client service. If not provided, creates a new one.
+            duplicate_index: Near-duplicate JD index, shared with the enhancement service.
+                             If not provided, creates a new one.
         """
         self.claude_client = claude_client or ClaudeClientService()
         self.enable_cache = Config.ENABLE_QUESTION_CACHE
         self.similarity_threshold = Config.CACHE_SIMILARITY_THRESHOLD
+        self.question_index = QuestionIndex()
+        self.usage_buffer = QuestionUsageBuffer()
+        self.question_leases = CacheLeases() if Config.CACHE_LEASE_ENABLED else None
+        self.duplicate_index = duplicate_index if duplicate_index is not None else NearDuplicateIndex()
+        self.generation_mode = Config.INTERVIEW_GENERATION_MODE
+        self.output_mode = Config.INTERVIEW_OUTPUT_MODE
+        self.early_stop = Config.INTERVIEW_EARLY_STOP_ENABLED
+        self.repair_max_rounds = Config.INTERVIEW_REPAIR_MAX_ROUNDS
     
     def generate_interview(
         self,
@@ -38,7 +75,10 @@ class InterviewGenerationService:
         job_description_id: int,
         user_id: str,
         interview_name: Optional[str] = None,
-        use_cache: bool = True
+        use_cache: bool = True,
+        generation_mode: Optional[str] = None,
+        hedge: bool = False,
+        clone_near_duplicate: bool = False
     ) -> Dict[str, Any]:
         """
         Generate a complete 5-question interview from an enhanced JD.
@@ -48,7 +88,16 @@ class InterviewGenerationService:
             job_description_id: ID of the JobDescription to use
             user_id: ID of user requesting interview generation
             interview_name: Custom name for the interview (optional)
-            use_cache: Whether to use cached questions (default True)
+            use_cache: Whether to use cached questions and cached Claude responses (default True)
+            generation_mode: 'single' (one completion) or 'parallel' (outline, then one
+                             concurrent call per question). Defaults to
+                             Config.INTERVIEW_GENERATION_MODE. While the question cache
+                             has questions for the role's skill level, the outline is
+                             always used so similar questions can be reused.
+            hedge: Hedge slow Claude calls (for interactive requests)
+            clone_near_duplicate: Copy the latest interview of another JD whose description is
+                                  a near-duplicate (Jaccard >= Config.JD_DEDUP_THRESHOLD)
+                                  instead of generating one
         
         Returns:
             Dictionary with:
@@ -59,133 +108,946 @@ class InterviewGenerationService:
                 'interview': {...},  # Full interview with questions
                 'tokens_used': int,
                 'cached_questions': int,
+                'cloned_from': {...} or None,  # 'job_description_id', 'req_id', 'interview_id', 'similarity'
                 'error': str (if failed)
             }
         """
         
-        # Start generation log
-        log_entry = GenerationLog(
-            operation_type='interview_generation',
-            req_id=req_id,
-            user_id=user_id,
-            status='in_progress',
-            started_at=datetime.utcnow()
-        )
-        db.session.add(log_entry)
-        db.session.commit()
+        log_entry_id = self._start_log(req_id, user_id)
+        generation = None
         
         try:
             logger.info(f"Starting interview generation for req_id: {req_id}")
             
-            # Get the job description
-            jd = JobDescription.query.filter_by(id=job_description_id).first()
-            if not jd:
-                raise ValueError(f"Job description with id {job_description_id} not found")
-            
-            # Use enhanced description if available, otherwise basic
-            jd_content = jd.enhanced_description or jd.basic_description
+            # Phase 1: read everything we need from the database, then end the
+            # transaction so no pooled connection is held during the Claude call
+            inputs = self._load_generation_inputs(job_description_id, interview_name)
+            load_token_history(self.claude_client, 'interview_generation')
+            if self.enable_cache:
+                self.question_index.refresh()
+            if clone_near_duplicate and Config.JD_DEDUP_ENABLED:
+                self.duplicate_index.refresh()
+                generation = self._clone_interview(job_description_id)
+            db.session.commit()
             
-            if not interview_name:
-                interview_name = f"{jd.basic_title} - Interview"
+            # Phase 2: call Claude with no open transaction (reusing similar cached questions),
+            # unless a near-duplicate JD's interview is being cloned
+            if generation is None:
+                generation = self._generate_questions(
+                    inputs['jd_content'],
+                    generation_mode or self.generation_mode,
+                    use_cache=use_cache,
+                    hedge=hedge,
+                    skill_level=inputs['skill_level']
+                )
+            total_tokens_used = generation['tokens_used']
+            cached_questions_count = len(generation['cache_hits'])
             
-            # Create interview record
-            interview = Interview(
-                job_description_id=job_description_id,
+            # Phase 3: write the interview, its questions and the log in one short transaction
+            result = self._persist_interview(
                 req_id=req_id,
-                interview_name=interview_name,
-                created_by_user_id=user_id
+                job_description_id=job_description_id,
+                user_id=user_id,
+                interview_name=inputs['interview_name'],
+                questions_data=generation['questions'],
+                log_entry_id=log_entry_id,
+                tokens_used=total_tokens_used,
+                repair_count=generation['repair_count'],
+                tokens_saved=generation['tokens_saved'],
+                cache_read_tokens=generation.get('cache_read_tokens', 0),
+                cache_write_tokens=generation.get('cache_write_tokens', 0),
+                model=generation.get('model'),
+                output_tokens=generation.get('output_tokens')
             )
-            db.session.add(interview)
-            db.session.flush()  # Get the ID
-            
-            total_tokens_used = 0
-            cached_questions_count = 0
-            
-            # Call Claude to generate interview
-            logger.info("Calling Claude API for interview generation...")
-            user_prompt = INTERVIEW_GENERATION_PROMPT.format(jd_content=jd_content)
+            result['cached_questions'] = cached_questions_count
+            result['input_tokens_saved'] = inputs['input_tokens_saved']
+            result['cloned_from'] = generation.get('cloned_from')
+            if not result['cloned_from']:
+                self._cache_questions(
+                    generation['questions'],
+                    inputs['skill_level'],
+                    generation['cache_hits'],
+                    generation.get('subject_areas'),
+                    generation['tokens_used']
+                )
             
-            response = self.claude_client.call_claude(
-                system_prompt=INTERVIEW_GENERATION_SYSTEM_PROMPT,
-                user_prompt=user_prompt,
-                temperature=0.4  # Moderate temperature for creativity with consistency
-            )
+            logger.info(f"Interview generation completed for req_id {req_id}. "
+                       f"Total tokens: {total_tokens_used}, Cached: {cached_questions_count}")
             
-            if not response.get('success'):
-                raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+            return result
+        
+        except Exception as e:
+            logger.error(f"Interview generation failed: {str(e)}")
+            self._record_failure(log_entry_id, e)
             
-            total_tokens_used += response['usage']['total_tokens']
+            return {
+                'success': False,
+                'req_id': req_id,
+                'error': str(e)
+            }
+        
+        finally:
+            # Requests waiting on these outline items now find the cached questions (or generate them)
+            if generation is not None and self.question_leases is not None:
+                self.question_leases.release(generation.get('leases'))
+    
+    def stream_interview(
+        self,
+        req_id: str,
+        job_description_id: int,
+        user_id: str,
+        interview_name: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of generate_interview (always a single completion).
+        
+        Takes the same arguments as generate_interview except generation_mode.
+        
+        Yields (event, data) tuples:
+            ('stage', {'stage': 'interview_generation', 'status': 'started'})
+            ('stage', {'stage': 'interview_generation', 'status': 'restarted'})
+                                            # only if the stream was malformed before
+                                            # its first complete question
+            ('question', {...})             # each question once its block is complete;
+                                            # repaired questions are re-sent with the same number
+            ('interview_complete', {...})   # same dictionary generate_interview returns
+            ('error', {...})                # instead of interview_complete on failure
+        
+        Streamed questions are provisional until interview_complete: the
+        interview is only saved once all five questions pass validation.
+        A malformed stream is stopped early; the questions completed before
+        the fault are kept and the rest are repaired.
+        """
+        log_entry_id = self._start_log(req_id, user_id)
+        completed = False
+        
+        try:
+            logger.info(f"Starting streamed interview generation for req_id: {req_id}")
+            yield 'stage', {'stage': 'interview_generation', 'status': 'started'}
             
-            # Parse the response into structured questions
-            logger.info("Parsing Claude response...")
-            questions_data = self.claude_client.parse_interview_response(response['text'])
+            inputs = self._load_generation_inputs(job_description_id, interview_name)
+            load_token_history(self.claude_client, 'interview_generation')
+            if self.enable_cache:
+                self.question_index.refresh()
+            db.session.commit()
             
-            # Validate structure
-            self.claude_client.validate_interview_structure(questions_data)
+            questions_data = []
+            usage = {'total_tokens': 0, 'cache_read_input_tokens': 0, 'cache_creation_input_tokens': 0}
+            for stream_attempt in (1, 2):
+                response, stream_error = yield from self._stream_questions(
+                    inputs['jd_content'], questions_data, use_cache=use_cache and stream_attempt == 1, hedge=hedge
+                )
+                for field in usage:
+                    usage[field] += response['usage'].get(field, 0)
+                if not stream_error:
+                    break
+                
+                # The aborted response must not be replayed; questions completed before
+                # the fault are kept and repaired below, so only restart with none
+                self.claude_client.discard_cached_response(response)
+                if questions_data or stream_attempt == 2:
+                    break
+                yield 'stage', {'stage': 'interview_generation', 'status': 'restarted'}
             
-            logger.info(f"Successfully parsed {len(questions_data)} questions")
+            logger.info(f"Parsed {len(questions_data)} questions from Claude stream")
             
-            # Create InterviewQuestion records
-            for q_data in questions_data:
-                # Convert criteria to standardized format
-                criteria = [
-                    {
-                        'criterion': c['criterion'],
-                        'description': c['description'],
-                        'is_checked': False
-                    }
-                    for c in q_data.get('criteria', [])
-                ]
-                
-                question = InterviewQuestion(
-                    interview_id=interview.id,
-                    question_number=q_data['question_number'],
-                    question_text=q_data['question_text'],
-                    question_type='technical',
-                    criteria=criteria
+            repair = {'questions': questions_data, 'tokens_used': 0, 'repair_count': 0, 'tokens_saved': 0}
+            if self.claude_client.find_question_errors(questions_data):
+                yield 'stage', {'stage': 'repairing', 'status': 'started'}
+                repair = self._repair_questions(
+                    inputs['jd_content'],
+                    questions_data,
+                    usage['total_tokens'],
+                    hedge=hedge
                 )
-                db.session.add(question)
+                # Re-send repaired questions; clients replace by question_number
+                for q_data in repair['questions']:
+                    if q_data not in questions_data:
+                        yield 'question', q_data
+                questions_data = repair['questions']
             
-            db.session.commit()
+            try:
+                self.claude_client.validate_interview_structure(questions_data)
+            except Exception:
+                self.claude_client.discard_cached_response(response)
+                raise
             
-            # Update log
-            log_entry.status = 'success'
-            log_entry.tokens_used = total_tokens_used
-            log_entry.completed_at = datetime.utcnow()
-            db.session.commit()
+            yield 'stage', {'stage': 'saving', 'status': 'started'}
             
-            logger.info(f"Interview generation completed for req_id {req_id}. "
-                       f"Total tokens: {total_tokens_used}, Cached: {cached_questions_count}")
+            result = self._persist_interview(
+                req_id=req_id,
+                job_description_id=job_description_id,
+                user_id=user_id,
+                interview_name=inputs['interview_name'],
+                questions_data=questions_data,
+                log_entry_id=log_entry_id,
+                tokens_used=usage['total_tokens'] + repair['tokens_used'],
+                repair_count=repair['repair_count'],
+                tokens_saved=repair['tokens_saved'],
+                cache_read_tokens=usage['cache_read_input_tokens'],
+                cache_write_tokens=usage['cache_creation_input_tokens'],
+                model=response.get('model'),
+                output_tokens=response['usage'].get('output_tokens') or None
+            )
+            result['cached_questions'] = 0
+            result['input_tokens_saved'] = inputs['input_tokens_saved']
+            self._cache_questions(
+                questions_data,
+                inputs['skill_level'],
+                tokens_used=usage['total_tokens'] + repair['tokens_used']
+            )
             
-            # Return complete interview
-            return {
-                'success': True,
-                'interview_id': interview.id,
-                'req_id': req_id,
-                'interview_name': interview.interview_name,
-                'interview': interview.to_dict(),
-                'tokens_used': total_tokens_used,
-                'cached_questions': cached_questions_count,
-                'created_at': interview.created_at.isoformat()
-            }
+            completed = True
+            yield 'interview_complete', result
+        
+        except GeneratorExit:
+            # The SSE client went away; nothing more can be sent, but the log must not stay in_progress
+            if not completed:
+                logger.warning("Streamed interview generation abandoned: client disconnected")
+                self._record_failure(log_entry_id, Exception("Client disconnected"))
+            raise
         
         except Exception as e:
-            logger.error(f"Interview generation failed: {str(e)}")
+            logger.error(f"Streamed interview generation failed: {str(e)}")
+            self._record_failure(log_entry_id, e)
             
-            # Update log with error
-            log_entry.status = 'failed'
-            log_entry.error_message = str(e)
-            log_entry.completed_at = datetime.utcnow()
-            db.session.commit()
-            
-            db.session.rollback()
-            
-            return {
+            yield 'error', {
                 'success': False,
                 'req_id': req_id,
                 'error': str(e)
             }
     
+    def _stream_questions(
+        self,
+        jd_content: str,
+        questions_data: List[Dict[str, Any]],
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream one interview completion, yielding ('question', q_data) as each question completes.
+        
+        With early stop enabled the stream is closed as soon as question 5 is
+        complete, or as soon as it is malformed (skipped question numbers or
+        too many criteria) rather than letting Claude run on to max_tokens.
+        
+        Args:
+            jd_content: Job description text
+            questions_data: List the completed questions are appended to
+            use_cache: Whether a cached Claude response may be replayed
+            hedge: Hedge a slow first token
+        
+        Returns:
+            Tuple of (stream_claude result, error): error describes why a
+            malformed stream was stopped, or is None
+        """
+        if self.early_stop:
+            parser = InterviewStreamParser(
+                question_count=Config.INTERVIEW_QUESTION_COUNT, max_criteria=Config.QUESTION_CRITERIA_MAX
+            )
+            
+            def stop_when(text: str) -> bool:
+                return parser.complete or parser.error is not None
+        else:
+            parser = InterviewStreamParser()
+            stop_when = None
+        
+        response = None
+        for chunk in self.claude_client.stream_claude(
+            **self._generation_request(jd_content, output_mode='text'),
+            use_cache=use_cache,
+            hedge=hedge,
+            stop_when=stop_when
+        ):
+            if chunk['type'] == 'done':
+                response = chunk['result']
+                continue
+            
+            # A question block is complete once the next header has started
+            for q_data in parser.feed(chunk['text']):
+                questions_data.append(q_data)
+                yield 'question', q_data
+        
+        if not response or not response.get('success'):
+            raise Exception("Claude API stream ended without a result")
+        
+        for q_data in parser.close():
+            questions_data.append(q_data)
+            yield 'question', q_data
+        
+        if parser.error:
+            logger.warning(f"Stopped malformed interview stream: {parser.error}")
+        elif response.get('stop_reason') == 'stop_requested':
+            logger.info("Stopped interview stream after the last question")
+        
+        return response, parser.error
+    
+    def _start_log(self, req_id: str, user_id: str) -> int:
+        """
+        Create the in-progress GenerationLog entry.
+        
+        Returns:
+            ID of the log entry
+        """
+        log_entry = GenerationLog(
+            operation_type='interview_generation',
+            req_id=req_id,
+            user_id=user_id,
+            status='in_progress',
+            started_at=datetime.utcnow()
+        )
+        db.session.add(log_entry)
+        db.session.flush()
+        log_entry_id = log_entry.id
+        db.session.commit()
+        
+        return log_entry_id
+    
+    def _record_failure(self, log_entry_id: int, error: Exception):
+        """Discard partial writes and mark the log entry failed."""
+        db.session.rollback()
+        
+        log_entry = db.session.get(GenerationLog, log_entry_id)
+        log_entry.status = 'failed'
+        log_entry.error_message = str(error)
+        log_entry.completed_at = datetime.utcnow()
+        db.session.commit()
+    
+    def _load_generation_inputs(
+        self,
+        job_description_id: int,
+        interview_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Read the job description fields needed for generation.
+        
+        Values are copied out of the ORM object so the caller can end the
+        transaction before the (slow) Claude call.
+        
+        Args:
+            job_description_id: ID of the JobDescription to use
+            interview_name: Custom name for the interview (optional)
+        
+        Returns:
+            Dictionary with 'jd_content', 'interview_name', 'skill_level' and 'input_tokens_saved'
+        """
+        jd = JobDescription.query.filter_by(id=job_description_id).first()
+        if not jd:
+            raise ValueError(f"Job description with id {job_description_id} not found")
+        
+        return self._generation_inputs(jd, interview_name)
+    
+    @staticmethod
+    def _generation_inputs(jd: JobDescription, interview_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Copy the generation inputs out of a loaded JobDescription.
+        
+        The description is normalized (see normalize_input) before the
+        input limit is checked.
+        
+        Returns:
+            Dictionary with 'jd_content', 'interview_name', 'skill_level' and 'input_tokens_saved'
+        
+        Raises:
+            InputTooLargeError: If the job description is over Config.MAX_INPUT_TOKENS
+        """
+        # Use enhanced description if available, otherwise basic
+        normalization = normalize_input(jd.enhanced_description or jd.basic_description, label='Job description')
+        return {
+            'jd_content': fit_input(normalization['text'], label='Job description'),
+            'interview_name': interview_name or f"{jd.basic_title} - Interview",
+            'skill_level': jd.basic_level,
+            'input_tokens_saved': normalization['tokens_saved']
+        }
+    
+    def _clone_interview(self, job_description_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Copy the questions of the latest interview of a near-duplicate JD.
+        
+        The JD's basic and enhanced descriptions are each compared with the
+        same field of the indexed JDs; the most similar JD with an interview
+        is the source. Runs in the caller's read transaction (phase 1).
+        
+        Args:
+            job_description_id: ID of the JD the interview is for
+        
+        Returns:
+            Generation dictionary like _generate_questions' (no tokens used) with
+            'cloned_from', or None if no near-duplicate JD has an interview
+        """
+        jd = db.session.get(JobDescription, job_description_id)
+        hasher = default_hasher()
+        similarities = {}
+        for field, blob, text in zip(
+            FIELDS,
+            (jd.basic_minhash, jd.enhanced_minhash),
+            (jd.basic_description, jd.enhanced_description)
+        ):
+            signature = signature_from_bytes(blob) if blob else hasher.signature(text)
+            for jd_id, similarity in self.duplicate_index.query(signature, field=field, exclude=job_description_id):
+                similarities[jd_id] = max(similarity, similarities.get(jd_id, 0.0))
+        if not similarities:
+            return None
+        
+        latest = {}
+        for interview in (
+            Interview.query
+            .filter(Interview.job_description_id.in_(list(similarities)))
+            .order_by(Interview.id)
+        ):
+            latest[interview.job_description_id] = interview
+        if not latest:
+            return None
+        
+        source_jd_id = max(latest, key=lambda jd_id: similarities[jd_id])
+        source = latest[source_jd_id]
+        logger.info(
+            f"Cloning interview {source.id} of req_id {source.req_id} "
+            f"(similarity {similarities[source_jd_id]:.2f})"
+        )
+        
+        return {
+            'questions': [
+                {
+                    'question_number': question.question_number,
+                    'question_text': question.question_text,
+                    'criteria': [
+                        {'criterion': c['criterion'], 'description': c['description']}
+                        for c in question.criteria
+                    ]
+                }
+                for question in sorted(source.questions, key=lambda question: question.question_number)
+            ],
+            'tokens_used': 0,
+            'repair_count': 0,
+            'tokens_saved': 0,
+            'cache_hits': {},
+            'model': None,
+            'cloned_from': {
+                'job_description_id': source_jd_id,
+                'req_id': source.req_id,
+                'interview_id': source.id,
+                'similarity': similarities[source_jd_id]
+            }
+        }
+    
+    def _generate_questions(
+        self,
+        jd_content: str,
+        generation_mode: str = 'single',
+        use_cache: bool = True,
+        hedge: bool = False,
+        skill_level: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Call Claude and return parsed, validated questions.
+        
+        Invalid or missing questions are regenerated individually (see
+        _repair_questions) before the interview is validated as a whole.
+        When the question cache holds questions of the skill level, the
+        interview is planned with an outline (whatever the mode) so that
+        items similar to a cached question reuse it, and only the other
+        items are sent to Claude. Must be called without an open database
+        transaction.
+        
+        Args:
+            jd_content: Job description text to generate questions from
+            generation_mode: 'single' or 'parallel'
+            use_cache: Whether cached questions and cached Claude responses may be reused
+            hedge: Hedge slow Claude calls
+            skill_level: Skill level of the role, for question cache lookups
+        
+        Returns:
+            Dictionary with 'questions', 'tokens_used', 'repair_count', 'tokens_saved',
+            'cache_hits' (cache entry id by question number) and, with an outline,
+            'leases' (question cache leases the caller releases once the questions are cached)
+        """
+        reuse_questions = use_cache and self.enable_cache and self.question_index.has_level(skill_level)
+        outline_tokens = 0
+        
+        if generation_mode == 'parallel' or reuse_questions:
+            outline, outline_response = self._request_outline(jd_content, use_cache=use_cache, hedge=hedge)
+            if len(outline) == Config.INTERVIEW_QUESTION_COUNT:
+                cached_questions, leases = self._claim_outline_items(outline, skill_level) if reuse_questions else ({}, {})
+                try:
+                    generation = self._generate_questions_parallel(
+                        jd_content,
+                        outline,
+                        outline_response,
+                        cached_questions,
+                        use_cache=use_cache,
+                        hedge=hedge
+                    )
+                except Exception:
+                    if leases:
+                        self.question_leases.release(leases)
+                    raise
+                generation['leases'] = leases
+                return generation
+            if generation_mode == 'parallel':
+                raise ValueError(
+                    f"Expected {Config.INTERVIEW_QUESTION_COUNT} outline items, got {len(outline)}"
+                )
+            # The outline was only wanted for cache lookups; generate the interview in one completion
+            logger.warning(f"Unusable interview outline ({len(outline)} items), skipping the question cache")
+            outline_tokens = outline_response['usage']['total_tokens']
+        
+        logger.info("Calling Claude API for interview generation...")
+        response = self.claude_client.call_claude(
+            **self._generation_request(jd_content),
+            use_cache=use_cache,
+            hedge=hedge
+        )
+        
+        generation = self._finish_generation(jd_content, response, hedge=hedge)
+        generation['tokens_used'] += outline_tokens
+        generation['cache_hits'] = {}
+        return generation
+    
+    def _generation_request(self, jd_content: str, output_mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        call_claude arguments for a single-completion interview.
+        
+        The JD is its own cached block: regenerations, retries and hedged
+        backups for the same JD only pay full price for the short final
+        prompt. In 'tool' output mode Claude returns the interview through
+        INTERVIEW_TOOL instead of formatted text; in 'text' mode the
+        completion ends at a stop sequence after question 5.
+        
+        Args:
+            jd_content: Job description text
+            output_mode: 'tool' or 'text' (defaults to Config.INTERVIEW_OUTPUT_MODE)
+        
+        Returns:
+            Keyword arguments for call_claude (also used as batch request params)
+        """
+        request = {
+            'system_prompt': INTERVIEW_GENERATION_SYSTEM_PROMPT,
+            'static_prompt': INTERVIEW_GENERATION_INSTRUCTIONS,
+            'cached_context': INTERVIEW_GENERATION_CONTEXT.format(jd_content=jd_content),
+            'user_prompt': INTERVIEW_GENERATION_PROMPT,
+            'temperature': 0.4,  # Moderate temperature for creativity with consistency
+            'operation': 'interview_generation'
+        }
+        if (output_mode or self.output_mode) == 'tool':
+            request['user_prompt'] = INTERVIEW_GENERATION_TOOL_PROMPT
+            request['tool'] = INTERVIEW_TOOL
+        elif self.early_stop:
+            request['stop_sequences'] = INTERVIEW_STOP_SEQUENCES
+        return request
+    
+    def _finish_generation(
+        self,
+        jd_content: str,
+        response: Dict[str, Any],
+        hedge: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Turn a single-completion interview response into validated questions.
+        
+        Parses the response, repairs invalid questions and validates the
+        result. A response that cannot be turned into an interview is
+        dropped from the response cache.
+        
+        Args:
+            jd_content: Job description text the response was generated from
+            response: Result of call_claude (or one call_claude_batch entry)
+            hedge: Hedge slow repair calls
+        
+        Returns:
+            Dictionary with 'questions', 'tokens_used', 'repair_count', 'tokens_saved',
+            'cache_read_tokens', 'cache_write_tokens', 'model' and 'output_tokens'
+        """
+        if not response.get('success'):
+            raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+        
+        try:
+            # Parse the response into structured questions
+            logger.info("Parsing Claude response...")
+            if response.get('tool_input') is not None:
+                questions_data = self.claude_client.parse_interview_tool_input(response['tool_input'])
+            else:
+                questions_data = self.claude_client.parse_interview_response(response['text'])
+            
+            generation = self._repair_questions(
+                jd_content, questions_data, response['usage']['total_tokens'], hedge=hedge
+            )
+            
+            # Validate structure
+            self.claude_client.validate_interview_structure(generation['questions'])
+        except Exception:
+            # Never serve a response that could not be turned into an interview again
+            self.claude_client.discard_cached_response(response)
+            raise
+        
+        logger.info(f"Successfully parsed {len(generation['questions'])} questions")
+        
+        generation['tokens_used'] += response['usage']['total_tokens']
+        generation['cache_read_tokens'] = response['usage'].get('cache_read_input_tokens', 0)
+        generation['cache_write_tokens'] = response['usage'].get('cache_creation_input_tokens', 0)
+        generation['model'] = response.get('model')
+        # Output size of the completion for the token budget (none for a cached response)
+        generation['output_tokens'] = response['usage'].get('output_tokens') or None
+        return generation
+    
+    def _request_outline(
+        self,
+        jd_content: str,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Ask Claude for the interview outline: one subject area and focus per question.
+        
+        An outline without Config.INTERVIEW_QUESTION_COUNT items is dropped
+        from the response cache and returned as is; callers check its length.
+        
+        Returns:
+            Tuple of (outline, response)
+        """
+        logger.info("Calling Claude API for interview outline...")
+        response = self.claude_client.call_claude(
+            system_prompt=INTERVIEW_GENERATION_SYSTEM_PROMPT,
+            user_prompt=INTERVIEW_OUTLINE_PROMPT.format(jd_content=jd_content),
+            max_tokens=Config.INTERVIEW_OUTLINE_MAX_TOKENS,
+            temperature=0.4,
+            use_cache=use_cache,
+            hedge=hedge,
+            operation='interview_outline'
+        )
+        
+        if not response.get('success'):
+            raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+        
+        outline = self.claude_client.parse_outline_response(response['text'])
+        if len(outline) != Config.INTERVIEW_QUESTION_COUNT:
+            self.claude_client.discard_cached_response(response)
+        return outline, response
+    
+    def _generate_questions_parallel(
+        self,
+        jd_content: str,
+        outline: List[Dict[str, str]],
+        outline_response: Dict[str, Any],
+        cached_questions: Optional[Dict[int, Tuple[int, Dict[str, Any]]]] = None,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Expand an outline with one concurrent call per outline item.
+        
+        Wall-clock time approaches the outline call plus the slowest single
+        question, instead of one long completion for all five. Items answered
+        from the question cache are not sent to Claude at all.
+        
+        Args:
+            jd_content: Job description text to generate questions from
+            outline: Outline items (see _request_outline)
+            outline_response: Result of the outline call
+            cached_questions: Reused questions keyed by question number, as
+                              (cache entry id, question_data) (see _get_cached_questions)
+            use_cache: Whether cached Claude responses may be reused
+            hedge: Hedge slow Claude calls
+        
+        Returns:
+            Dictionary with 'questions', 'tokens_used', 'repair_count', 'tokens_saved',
+            'model', 'cache_hits' (cache entry id by question number) and
+            'subject_areas' (outline subject area by question number)
+        """
+        cached_questions = cached_questions or {}
+        total_tokens_used = outline_response['usage']['total_tokens']
+        to_expand = [n for n in range(1, len(outline) + 1) if n not in cached_questions]
+        
+        results = []
+        if to_expand:
+            logger.info(f"Expanding {len(to_expand)} outline items concurrently...")
+            with ThreadPoolExecutor(max_workers=len(to_expand)) as executor:
+                futures = [
+                    executor.submit(
+                        self._expand_outline_item, jd_content, outline, question_number,
+                        use_cache=use_cache, hedge=hedge
+                    )
+                    for question_number in to_expand
+                ]
+                results = [future.result() for future in futures]
+        
+        expanded = {n: q_data for n, (q_data, _, _) in zip(to_expand, results)}
+        questions_data = [
+            cached_questions[n][1] if n in cached_questions else expanded[n]
+            for n in range(1, len(outline) + 1)
+        ]
+        total_tokens_used += sum(tokens for _, tokens, _ in results)
+        
+        generation = self._repair_questions(jd_content, questions_data, total_tokens_used, hedge=hedge)
+        
+        # Validate the merged interview
+        self.claude_client.validate_interview_structure(generation['questions'])
+        
+        logger.info(
+            f"Successfully generated {len(generation['questions'])} questions in parallel "
+            f"({len(cached_questions)} from the question cache)"
+        )
+        
+        generation['tokens_used'] += total_tokens_used
+        generation['model'] = ', '.join(sorted(
+            {model for _, _, model in results} or {outline_response.get('model')}
+        ))
+        generation['cache_hits'] = {n: entry_id for n, (entry_id, _) in cached_questions.items()}
+        generation['subject_areas'] = {n: item['subject_area'] for n, item in enumerate(outline, 1)}
+        return generation
+    
+    def _repair_questions(
+        self,
+        jd_content: str,
+        questions_data: List[Dict[str, Any]],
+        generation_tokens: int,
+        hedge: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Re-request only the missing or invalid questions, keeping the valid ones.
+        
+        Runs at most Config.INTERVIEW_REPAIR_MAX_ROUNDS rounds. If no question is
+        valid there is nothing to keep, so the questions are returned unchanged
+        and the caller's validation fails as before.
+        
+        Args:
+            jd_content: Job description text
+            questions_data: Parsed questions from the initial generation
+            generation_tokens: Tokens the initial generation cost (what a full
+                               retry would cost again)
+            hedge: Hedge slow Claude calls
+        
+        Returns:
+            Dictionary with:
+            {
+                'questions': [...],      # repaired questions (or the originals)
+                'tokens_used': int,      # tokens spent on repair calls
+                'repair_count': int,     # questions re-requested
+                'tokens_saved': int      # estimate vs. regenerating everything
+            }
+        """
+        generation = {'questions': questions_data, 'tokens_used': 0, 'repair_count': 0, 'tokens_saved': 0}
+        
+        errors = self.claude_client.find_question_errors(questions_data)
+        if not errors or len(errors) == Config.INTERVIEW_QUESTION_COUNT:
+            return generation
+        
+        slots = {}
+        for q_data in questions_data:
+            slots.setdefault(q_data.get('question_number'), q_data)
+        
+        for round_number in range(1, self.repair_max_rounds + 1):
+            logger.warning(f"Repair round {round_number}: re-requesting questions {sorted(errors)}")
+            
+            # Keep each broken question's subject area so the repair stays on topic
+            outline = []
+            for question_number in range(1, Config.INTERVIEW_QUESTION_COUNT + 1):
+                q_data = slots.get(question_number) or {}
+                subject_area = q_data.get('expected_answer') or 'A core area of the role not covered by the other questions'
+                outline.append({
+                    'subject_area': subject_area,
+                    'focus': q_data.get('question_text') or subject_area
+                })
+            
+            with ThreadPoolExecutor(max_workers=len(errors)) as executor:
+                futures = {
+                    question_number: executor.submit(
+                        self._expand_outline_item, jd_content, outline, question_number, error,
+                        hedge=hedge
+                    )
+                    for question_number, error in errors.items()
+                }
+                for question_number, future in futures.items():
+                    generation['repair_count'] += 1
+                    try:
+                        q_data, tokens, _ = future.result()
+                    except Exception as e:
+                        logger.warning(f"Repair of question {question_number} failed: {str(e)}")
+                        continue
+                    slots[question_number] = q_data
+                    generation['tokens_used'] += tokens
+            
+            generation['questions'] = [
+                slots[n] for n in range(1, Config.INTERVIEW_QUESTION_COUNT + 1) if n in slots
+            ]
+            errors = self.claude_client.find_question_errors(generation['questions'])
+            if not errors:
+                break
+        
+        generation['tokens_saved'] = max(0, generation_tokens - generation['tokens_used'])
+        logger.info(f"Repaired {generation['repair_count']} questions using {generation['tokens_used']} tokens "
+                    f"(~{generation['tokens_saved']} tokens saved vs. full regeneration)")
+        
+        return generation
+    
+    def _expand_outline_item(
+        self,
+        jd_content: str,
+        outline: List[Dict[str, str]],
+        question_number: int,
+        repair_error: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Tuple[Dict[str, Any], int, str]:
+        """
+        Generate a single question for one outline item.
+        
+        Repairs always go to Claude: a repeated repair prompt must not be
+        answered with the response that just failed validation, and are
+        routed as 'question_repair' rather than 'interview_generation'.
+        
+        Args:
+            jd_content: Job description text
+            outline: Full interview outline (other items are passed to avoid overlap)
+            question_number: 1-based number of the outline item to expand
+            repair_error: Validation error of a previous attempt, when repairing
+            use_cache: Whether a cached Claude response may be reused
+            hedge: Hedge a slow Claude call
+        
+        Returns:
+            Tuple of (question_data, tokens_used, model)
+        """
+        item = outline[question_number - 1]
+        other_subject_areas = "\n".join(
+            f"- {other['subject_area']}"
+            for n, other in enumerate(outline, 1) if n != question_number
+        )
+        
+        response = self.claude_client.call_claude(
+            system_prompt=INTERVIEW_GENERATION_SYSTEM_PROMPT,
+            user_prompt=INTERVIEW_QUESTION_PROMPT.format(
+                jd_content=jd_content,
+                subject_area=item['subject_area'],
+                focus=item['focus'] or item['subject_area'],
+                other_subject_areas=other_subject_areas,
+                question_number=question_number,
+                repair_instructions=(
+                    INTERVIEW_QUESTION_REPAIR_INSTRUCTIONS.format(error=repair_error) if repair_error else ''
+                )
+            ),
+            max_tokens=Config.INTERVIEW_QUESTION_MAX_TOKENS,
+            temperature=0.4,
+            use_cache=use_cache and not repair_error,
+            store_cache=not repair_error,
+            hedge=hedge,
+            operation='question_repair' if repair_error else 'interview_generation'
+        )
+        
+        if not response.get('success'):
+            raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+        
+        parsed = self.claude_client.parse_interview_response(response['text'])
+        if not parsed:
+            self.claude_client.discard_cached_response(response)
+            raise ValueError(f"Question {question_number} could not be parsed from Claude response")
+        
+        # The model only sees its own question, so pin the number and subject area
+        q_data = parsed[0]
+        q_data['question_number'] = question_number
+        q_data.setdefault('expected_answer', item['subject_area'])
+        
+        return q_data, response['usage']['total_tokens'], response.get('model')
+    
+    def _persist_interview(
+        self,
+        req_id: str,
+        job_description_id: int,
+        user_id: str,
+        interview_name: str,
+        questions_data: List[Dict[str, Any]],
+        log_entry_id: int,
+        tokens_used: int,
+        repair_count: int = 0,
+        tokens_saved: int = 0,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0,
+        model: Optional[str] = None,
+        output_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Write the interview, its questions and the log update in one transaction.
+        
+        Returns:
+            Success result dictionary for generate_interview
+        """
+        interview = self._build_interview(req_id, job_description_id, user_id, interview_name, questions_data)
+        
+        # Update log
+        log_entry = db.session.get(GenerationLog, log_entry_id)
+        log_entry.status = 'success'
+        log_entry.tokens_used = tokens_used
+        log_entry.repair_count = repair_count
+        log_entry.tokens_saved = tokens_saved
+        log_entry.cache_read_tokens = cache_read_tokens
+        log_entry.cache_write_tokens = cache_write_tokens
+        log_entry.model = model
+        log_entry.output_tokens = output_tokens
+        log_entry.completed_at = datetime.utcnow()
+        
+        # Flush to get IDs and defaults, build the result, then commit
+        db.session.flush()
+        result = {
+            'success': True,
+            'interview_id': interview.id,
+            'req_id': req_id,
+            'interview_name': interview.interview_name,
+            'interview': interview.to_dict(),
+            'tokens_used': tokens_used,
+            'repaired_questions': repair_count,
+            'cache_read_tokens': cache_read_tokens,
+            'cache_write_tokens': cache_write_tokens,
+            'model': model,
+            'created_at': interview.created_at.isoformat()
+        }
+        db.session.commit()
+        
+        return result
+    
+    def _build_interview(
+        self,
+        req_id: str,
+        job_description_id: int,
+        user_id: str,
+        interview_name: str,
+        questions_data: List[Dict[str, Any]]
+    ) -> Interview:
+        """
+        Add an interview and its questions to the session (no flush or commit).
+        
+        Returns:
+            The new Interview
+        """
+        interview = Interview(
+            job_description_id=job_description_id,
+            req_id=req_id,
+            interview_name=interview_name,
+            created_by_user_id=user_id
+        )
+        db.session.add(interview)
+        
+        # Create InterviewQuestion records
+        for q_data in questions_data:
+            # Convert criteria to standardized format
+            criteria = [
+                {
+                    'criterion': c['criterion'],
+                    'description': c['description'],
+                    'is_checked': False
+                }
+                for c in q_data.get('criteria', [])
+            ]
+            
+            interview.questions.append(InterviewQuestion(
+                question_number=q_data['question_number'],
+                question_text=q_data['question_text'],
+                question_type='technical',
+                criteria=criteria
+            ))
+        
+        return interview
+    
     def get_interview(self, interview_id: int) -> Optional[Dict[str, Any]]:
         """
         Retrieve a generated interview by ID.
@@ -220,79 +1082,205 @@ class InterviewGenerationService:
         
         return [interview.to_dict() for interview in interviews]
     
-    def _cache_question(
+    def _claim_outline_items(
         self,
-        topic: str,
-        skill_level: str,
-        question_text: str,
-        criteria: List[Dict[str, str]]
-    ) -> str:
+        outline: List[Dict[str, str]],
+        skill_level: Optional[str]
+    ) -> Tuple[Dict[int, Tuple[int, Dict[str, Any]]], Dict[str, str]]:
         """
-        Cache a generated question for future reuse.
+        Look up cached questions for an outline and lease the items that missed.
+        
+        The lease key of an item is its skill level and normalized subject
+        area, so concurrent interviews for the same role generate each missing
+        question once: the request that leases an item generates it, and the
+        others wait (polling the question cache, up to
+        Config.CACHE_LEASE_WAIT_TIMEOUT) and reuse the question it caches. An
+        item whose holder finishes without caching a similar question is
+        leased and generated by the waiter. Waiting only uses short read
+        transactions, and happens before any Claude call of this request.
         
         Args:
-            topic: Technical topic (e.g., 'CI/CD', 'React')
-            skill_level: Skill level (e.g., 'Intermediate', 'Advanced')
-            question_text: The question text
-            criteria: List of criteria dictionaries
+            outline: Outline items (see _request_outline)
+            skill_level: Skill level of the role
         
         Returns:
-            Cache key
+            Tuple of (reused questions keyed by question number, as in
+            _get_cached_questions; leases held, as {lease key: token})
         """
-        if not self.enable_cache:
-            return None
+        cached_questions = self._get_cached_questions(outline, skill_level)
+        if self.question_leases is None:
+            return cached_questions, {}
         
-        # Create a hash key from topic and skill level
-        cache_key_str = f"{topic}:{skill_level}"
-        cache_key = hashlib.md5(cache_key_str.encode()).hexdigest()
-        
-        # Check if this already exists
-        existing = QuestionCache.query.filter_by(cache_key=cache_key).first()
-        
-        if existing:
-            existing.increment_usage()
-            return existing.cache_key
-        
-        # Create new cache entry
-        cache_entry = QuestionCache(
-            cache_key=cache_key,
-            request_hash=hashlib.md5(question_text.encode()).hexdigest(),
-            topic=topic,
-            skill_level=skill_level,
-            question_text=question_text,
-            criteria=criteria
-        )
-        db.session.add(cache_entry)
-        db.session.commit()
+        keys = {
+            n: CacheLeases.make_key(skill_level_key(skill_level), topic_key(item['subject_area']))
+            for n, item in enumerate(outline, 1) if n not in cached_questions
+        }
+        leases = self.question_leases.acquire(set(keys.values()))
+        waiting = {n: key for n, key in keys.items() if key not in leases}
+        if not waiting:
+            return cached_questions, leases
         
-        logger.info(f"Cached question for {topic} ({skill_level})")
+        logger.info(f"Waiting for {len(waiting)} outline items being generated by other requests")
+        deadline = time.monotonic() + self.question_leases.wait_timeout
+        indexed = len(self.question_index)
+        while waiting:
+            if time.monotonic() >= deadline:
+                logger.warning(f"Gave up waiting for outline items {sorted(waiting)}; generating them here")
+                self.question_leases.record_timeout()
+                break
+            time.sleep(self.question_leases.poll_interval)
+            
+            # Leases are released after their questions are cached, so check them before the cache
+            held = self.question_leases.held(waiting.values())
+            self.question_index.refresh()
+            db.session.commit()
+            if len(self.question_index) != indexed:
+                indexed = len(self.question_index)
+                used = {entry_id for entry_id, _ in cached_questions.values()}
+                for n, (entry_id, q_data) in self._get_cached_questions(outline, skill_level).items():
+                    if n in waiting and entry_id not in used:
+                        cached_questions[n] = (entry_id, q_data)
+                        used.add(entry_id)
+                        del waiting[n]
+            
+            # A holder that finished without caching a similar question: generate the item here
+            released = set(waiting.values()) - held
+            if released:
+                leases.update(self.question_leases.acquire(released))
+                waiting = {n: key for n, key in waiting.items() if key not in leases}
         
-        return cache_key
+        return cached_questions, leases
     
-    def _get_cached_question(self, topic: str, skill_level: str) -> Optional[Dict[str, Any]]:
+    def _get_cached_questions(
+        self,
+        outline: List[Dict[str, str]],
+        skill_level: Optional[str]
+    ) -> Dict[int, Tuple[int, Dict[str, Any]]]:
         """
-        Retrieve a cached question if available.
+        Look up a cached question for each outline item.
+        
+        Each item is vectorized like a stored question (subject area as topic
+        and expected answer, the focus standing in for the question text) and
+        matched by cosine similarity against the cached questions of the skill
+        level; matches at or above Config.CACHE_SIMILARITY_THRESHOLD are reused.
+        Reads the matched rows in a short transaction, ended before returning.
         
         Args:
-            topic: Technical topic
-            skill_level: Skill level
+            outline: Outline items (see _request_outline)
+            skill_level: Skill level of the role
         
         Returns:
-            Cached question dictionary or None
+            Reused questions keyed by question number, as (cache entry id, question_data)
         """
-        if not self.enable_cache:
-            return None
+        vectors = [
+            embed_question(item['subject_area'], item['subject_area'], item['focus'])
+            for item in outline
+        ]
+        matches = self.question_index.search(vectors, skill_level, self.similarity_threshold)
+        matched = {n: entry_id for n, (entry_id, _) in enumerate(matches, 1) if entry_id is not None}
+        if not matched:
+            return {}
+        
+        rows = {
+            row.id: row
+            for row in QuestionCache.query.filter(QuestionCache.id.in_(list(matched.values()))).all()
+        }
+        cached_questions = {
+            n: (entry_id, {
+                'question_number': n,
+                'question_text': rows[entry_id].question_text,
+                'expected_answer': rows[entry_id].topic,
+                'criteria': rows[entry_id].criteria
+            })
+            for n, entry_id in matched.items() if entry_id in rows
+        }
+        db.session.commit()
         
-        cache_key_str = f"{topic}:{skill_level}"
-        cache_key = hashlib.md5(cache_key_str.encode()).hexdigest()
+        # Entries deleted since they were indexed are simply generated
+        self.question_index.remove(entry_id for entry_id in matched.values() if entry_id not in rows)
+        logger.info(
+            f"Question cache: {len(cached_questions)}/{len(outline)} outline items matched "
+            f"(similarities {', '.join(f'{score:.2f}' for entry_id, score in matches if entry_id in rows)})"
+        )
+        return cached_questions
+    
+    def _cache_questions(
+        self,
+        questions_data: List[Dict[str, Any]],
+        skill_level: Optional[str],
+        cache_hits: Optional[Dict[int, int]] = None,
+        subject_areas: Optional[Dict[int, str]] = None,
+        tokens_used: Optional[int] = None
+    ):
+        """
+        Store newly generated questions in the question cache and count the reused ones.
         
-        cached = QuestionCache.query.filter_by(cache_key=cache_key).first()
+        Runs in its own short transaction after the interview is saved; a
+        failure here is logged and does not fail the generation. A question
+        similar to one already cached (or stored by another worker) is skipped.
+        Reuse is counted in the usage buffer, which writes it in batches.
         
-        if cached:
-            cached.increment_usage()
-            return {
-                'question_text': cached.question_text,
-                'criteria': cached.criteria
-            }
+        Args:
+            questions_data: Questions of the saved interview
+            skill_level: Skill level of the role
+            cache_hits: Cache entry id by question number, for questions reused from the cache
+            subject_areas: Outline subject area by question number, stored as the
+                           topic (the expected answer is used without an outline)
+            tokens_used: Tokens spent generating the interview; each new entry's
+                         token_cost (what a hit saves, for the 'cost' eviction policy) is its share
+        """
+        if not self.enable_cache:
+            return
+        cache_hits = cache_hits or {}
+        subject_areas = subject_areas or {}
+        self.usage_buffer.record(cache_hits.values())
+        
+        try:
+            new_questions = [q_data for q_data in questions_data if q_data['question_number'] not in cache_hits]
+            token_cost = tokens_used // len(new_questions) if tokens_used and new_questions else None
+            topics = [
+                (subject_areas.get(q_data['question_number']) or q_data.get('expected_answer') or '').strip()[:255]
+                for q_data in new_questions
+            ]
+            vectors = [
+                embed_question(topic, topic, q_data['question_text'])
+                for topic, q_data in zip(topics, new_questions)
+            ]
+            matches = self.question_index.search(vectors, skill_level, self.similarity_threshold)
+            
+            entries = []
+            for q_data, topic, vector, (existing_id, _) in zip(new_questions, topics, vectors, matches):
+                if existing_id is not None or not topic:
+                    continue
+                cache_key = hashlib.md5(
+                    f"{topic}:{skill_level}:{q_data['question_text']}".encode()
+                ).hexdigest()
+                if QuestionCache.query.filter_by(cache_key=cache_key).first():
+                    continue
+                entry = QuestionCache(
+                    cache_key=cache_key,
+                    request_hash=hashlib.md5(q_data['question_text'].encode()).hexdigest(),
+                    topic=topic,
+                    skill_level=skill_level,
+                    question_text=q_data['question_text'],
+                    criteria=[
+                        {'criterion': c['criterion'], 'description': c['description']}
+                        for c in q_data.get('criteria', [])
+                    ],
+                    embedding=vector.tobytes(),
+                    token_cost=token_cost
+                )
+                db.session.add(entry)
+                entries.append(entry)
+            
+            db.session.flush()
+            indexed = [(entry.id, entry.skill_level, entry.embedding) for entry in entries]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Question cache update failed: {str(e)}")
+            return
         
-        return None
+        self.question_index.add(indexed)
+        if indexed:
+            logger.info(f"Cached {len(indexed)} questions ({skill_level or 'any level'})")
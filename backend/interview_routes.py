@@ -3,14 +3,20 @@ Flask API routes for JD Enhancement and Interview Generation.
 These endpoints expose the services to the frontend application.
 """
 
+import json
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from datetime import datetime
 from functools import wraps
 from .models import db, JobDescription, Interview
 from .jd_enhancement_service import JDEnhancementService
-from .interview_generation_service import InterviewGenerationService
+from .interview_generation_service import GENERATION_MODES, InterviewGenerationService
 from .claude_client import ClaudeClientService
+from .job_service import JobService, JobQueueFullError
+from .batch_service import BatchService
+from .jd_deduplication import NearDuplicateIndex
+from .question_cache_sweeper import QuestionCacheSweeper
+from .config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +25,23 @@ interview_bp = Blueprint('interview', __name__, url_prefix='/api/interview')
 
 # Initialize services
 claude_client = ClaudeClientService()
-jd_enhancement_service = JDEnhancementService(claude_client)
-interview_generation_service = InterviewGenerationService(claude_client)
+jd_duplicate_index = NearDuplicateIndex()
+jd_enhancement_service = JDEnhancementService(claude_client, jd_duplicate_index)
+interview_generation_service = InterviewGenerationService(claude_client, jd_duplicate_index)
+batch_service = BatchService(jd_enhancement_service, interview_generation_service)
+job_service = JobService()
+question_cache_sweeper = QuestionCacheSweeper(
+    interview_generation_service.question_index,
+    interview_generation_service.usage_buffer
+)
+
+
+@interview_bp.before_app_request
+def start_question_cache_sweeper():
+    """Start this worker's question cache sweeper and usage flusher on its first request."""
+    app = current_app._get_current_object()
+    question_cache_sweeper.ensure_started(app)
+    interview_generation_service.usage_buffer.ensure_started(app)
 
 
 def require_admin(f):
@@ -60,6 +81,35 @@ def require_auth(f):
     return decorated_function
 
 
+def invalid_generation_mode(data):
+    """Return an error message if the request names an unknown generation_mode, else None."""
+    generation_mode = data.get('generation_mode')
+    if generation_mode is not None and generation_mode not in GENERATION_MODES:
+        return f"Invalid generation_mode: {generation_mode!r} (expected one of {', '.join(GENERATION_MODES)})"
+    return None
+
+
+def sse_response(events):
+    """
+    Wrap an iterator of (event, data) tuples as a Server-Sent Events response.
+    
+    Each tuple becomes one SSE message with a JSON data payload. Buffering is
+    disabled so proxies forward events as soon as they are written.
+    """
+    def generate():
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 # ============================================================================
 # JD ENHANCEMENT ENDPOINTS
 # ============================================================================
@@ -94,7 +144,10 @@ def enhance_jd():
             work_output=data.get('work_output'),
             work_role=data.get('work_role'),
             work_knowledge=data.get('work_knowledge'),
-            work_competencies=data.get('work_competencies')
+            work_competencies=data.get('work_competencies'),
+            use_cache=data.get('use_cache', True),
+            hedge=True,
+            clone_near_duplicate=data.get('clone_near_duplicate', False)
         )
         
         if result['success']:
@@ -141,6 +194,10 @@ def generate_interview():
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
+        error = invalid_generation_mode(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
         # Get user ID from request
         user_id = request.headers.get('X-User-ID', 'system')
         
@@ -150,7 +207,10 @@ def generate_interview():
             job_description_id=data['job_description_id'],
             user_id=user_id,
             interview_name=data.get('interview_name'),
-            use_cache=data.get('use_cache', True)
+            use_cache=data.get('use_cache', True),
+            generation_mode=data.get('generation_mode'),
+            hedge=True,
+            clone_near_duplicate=data.get('clone_near_duplicate', False)
         )
         
         if result['success']:
@@ -163,6 +223,43 @@ def generate_interview():
         return jsonify({'error': str(e)}), 500
 
 
+@interview_bp.route('/generate/stream', methods=['POST'])
+@require_admin
+def generate_interview_stream():
+    """
+    Streaming variant of /generate.
+    
+    Responds with Server-Sent Events: 'stage', one 'question' per completed
+    question, then 'interview_complete' (or 'error').
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        
+        # Validate required fields
+        required_fields = ['req_id', 'job_description_id']
+        for field in required_fields:
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        # Get user ID from request
+        user_id = request.headers.get('X-User-ID', 'system')
+        
+        return sse_response(interview_generation_service.stream_interview(
+            req_id=data['req_id'],
+            job_description_id=data['job_description_id'],
+            user_id=user_id,
+            interview_name=data.get('interview_name'),
+            use_cache=data.get('use_cache', True),
+            hedge=True
+        ))
+    
+    except Exception as e:
+        logger.error(f"Error in generate_interview_stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 @interview_bp.route('/<int:interview_id>', methods=['GET'])
 @require_auth
 def get_interview(interview_id):
@@ -230,7 +327,10 @@ def workflow_jd_enhancement_only():
             work_output=data.get('work_output'),
             work_role=data.get('work_role'),
             work_knowledge=data.get('work_knowledge'),
-            work_competencies=data.get('work_competencies')
+            work_competencies=data.get('work_competencies'),
+            use_cache=data.get('use_cache', True),
+            hedge=True,
+            clone_near_duplicate=data.get('clone_near_duplicate', False)
         )
         
         if result['success']:
@@ -243,10 +343,89 @@ def workflow_jd_enhancement_only():
         return jsonify({'error': str(e)}), 500
 
 
+def run_full_workflow(data, user_id, hedge=False):
+    """
+    Run JD enhancement followed by interview generation.
+    
+    Shared by the synchronous endpoint and the background 'workflow_full' job.
+    
+    Args:
+        data: Validated request body
+        user_id: ID of user running the workflow
+        hedge: Hedge slow Claude calls (the synchronous endpoint has a caller waiting)
+    
+    Returns:
+        Result dictionary with a 'success' key
+    """
+    # Step 1: Enhance JD with WORK inputs
+    jd_result = jd_enhancement_service.enhance_jd(
+        req_id=data['req_id'],
+        basic_title=data['basic_title'],
+        basic_description=data['basic_description'],
+        user_id=user_id,
+        basic_department=data.get('basic_department'),
+        basic_level=data.get('basic_level'),
+        work_output=data.get('work_output'),
+        work_role=data.get('work_role'),
+        work_knowledge=data.get('work_knowledge'),
+        work_competencies=data.get('work_competencies'),
+        use_cache=data.get('use_cache', True),
+        hedge=hedge,
+        clone_near_duplicate=data.get('clone_near_duplicate', False)
+    )
+    
+    if not jd_result['success']:
+        return jd_result
+    
+    total_tokens = jd_result.get('tokens_used', 0)
+    
+    # Step 2: Generate Interview
+    interview_result = interview_generation_service.generate_interview(
+        req_id=data['req_id'],
+        job_description_id=jd_result['job_description_id'],
+        user_id=user_id,
+        interview_name=data.get('interview_name'),
+        use_cache=data.get('use_cache', True),
+        generation_mode=data.get('generation_mode'),
+        hedge=hedge,
+        clone_near_duplicate=data.get('clone_near_duplicate', False)
+    )
+    
+    if not interview_result['success']:
+        # JD was enhanced, but interview generation failed
+        return {
+            'success': False,
+            'error': interview_result.get('error'),
+            'job_description_id': jd_result['job_description_id'],
+            'message': 'JD was enhanced successfully, but interview generation failed'
+        }
+    
+    total_tokens += interview_result.get('tokens_used', 0)
+    
+    # Return complete workflow result
+    return {
+        'success': True,
+        'job_description_id': jd_result['job_description_id'],
+        'interview_id': interview_result['interview_id'],
+        'req_id': data['req_id'],
+        'interview': interview_result['interview'],
+        'total_tokens_used': total_tokens,
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+
+job_service.register('workflow_full', run_full_workflow)
+
+
 @interview_bp.route('/workflow/full', methods=['POST'])
 @require_admin
 def workflow_full_jd_and_interview():
-    """WORKFLOW 2: Complete Workflow - JD Enhancement + Interview Generation."""
+    """
+    WORKFLOW 2: Complete Workflow - JD Enhancement + Interview Generation.
+    
+    Send "async": true to run it as a background job: the response is
+    202 with a job_id to poll at GET /api/interview/jobs/<job_id>.
+    """
     try:
         data = request.get_json()
         
@@ -256,62 +435,254 @@ def workflow_full_jd_and_interview():
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
+        error = invalid_generation_mode(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
         # Get user ID from request
         user_id = request.headers.get('X-User-ID', 'system')
         
+        if data.get('async') and Config.ASYNC_PROCESSING:
+            logger.info(f"Queueing complete workflow for req_id: {data['req_id']}")
+            
+            try:
+                job = job_service.submit('workflow_full', data['req_id'], user_id, data)
+            except JobQueueFullError as e:
+                return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '30'}
+            
+            return jsonify({
+                'success': True,
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'status_url': f"{interview_bp.url_prefix}/jobs/{job['job_id']}"
+            }), 202
+        
         logger.info(f"Starting complete workflow for req_id: {data['req_id']}")
         
-        # Step 1: Enhance JD with WORK inputs
-        jd_result = jd_enhancement_service.enhance_jd(
-            req_id=data['req_id'],
-            basic_title=data['basic_title'],
-            basic_description=data['basic_description'],
-            user_id=user_id,
-            basic_department=data.get('basic_department'),
-            basic_level=data.get('basic_level'),
-            work_output=data.get('work_output'),
-            work_role=data.get('work_role'),
-            work_knowledge=data.get('work_knowledge'),
-            work_competencies=data.get('work_competencies')
-        )
+        result = run_full_workflow(data, user_id, hedge=True)
         
-        if not jd_result['success']:
-            return jsonify(jd_result), 500
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+    
+    except Exception as e:
+        logger.error(f"Error in workflow_full_jd_and_interview: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def stream_full_workflow(data, user_id):
+    """
+    Streaming variant of run_full_workflow.
+    
+    Yields the JD enhancement events followed by the interview generation
+    events, then a final 'done' event with the combined result.
+    """
+    jd_result = None
+    for event, event_data in jd_enhancement_service.stream_enhance_jd(
+        req_id=data['req_id'],
+        basic_title=data['basic_title'],
+        basic_description=data['basic_description'],
+        user_id=user_id,
+        basic_department=data.get('basic_department'),
+        basic_level=data.get('basic_level'),
+        work_output=data.get('work_output'),
+        work_role=data.get('work_role'),
+        work_knowledge=data.get('work_knowledge'),
+        work_competencies=data.get('work_competencies'),
+        use_cache=data.get('use_cache', True),
+        hedge=True
+    ):
+        yield event, event_data
+        if event == 'jd_enhanced':
+            jd_result = event_data
+    
+    if not jd_result:
+        return
+    
+    interview_result = None
+    for event, event_data in interview_generation_service.stream_interview(
+        req_id=data['req_id'],
+        job_description_id=jd_result['job_description_id'],
+        user_id=user_id,
+        interview_name=data.get('interview_name'),
+        use_cache=data.get('use_cache', True),
+        hedge=True
+    ):
+        yield event, event_data
+        if event == 'interview_complete':
+            interview_result = event_data
+    
+    if not interview_result:
+        return
+    
+    yield 'done', {
+        'success': True,
+        'job_description_id': jd_result['job_description_id'],
+        'interview_id': interview_result['interview_id'],
+        'req_id': data['req_id'],
+        'total_tokens_used': jd_result.get('tokens_used', 0) + interview_result.get('tokens_used', 0),
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+
+@interview_bp.route('/workflow/full/stream', methods=['POST'])
+@require_admin
+def workflow_full_stream():
+    """
+    Streaming variant of /workflow/full.
+    
+    Responds with Server-Sent Events: stage changes, 'jd_delta' chunks of the
+    enhanced JD as they arrive, 'jd_enhanced', one 'question' per completed
+    question, 'interview_complete' and finally 'done' (or 'error').
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         
-        total_tokens = jd_result.get('tokens_used', 0)
+        # Validate required fields
+        required_fields = ['req_id', 'basic_title', 'basic_description']
+        for field in required_fields:
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Step 2: Generate Interview
-        interview_result = interview_generation_service.generate_interview(
-            req_id=data['req_id'],
-            job_description_id=jd_result['job_description_id'],
-            user_id=user_id,
-            interview_name=data.get('interview_name')
-        )
+        # Get user ID from request
+        user_id = request.headers.get('X-User-ID', 'system')
         
-        if not interview_result['success']:
-            # JD was enhanced, but interview generation failed
-            return jsonify({
-                'success': False,
-                'error': interview_result.get('error'),
-                'job_description_id': jd_result['job_description_id'],
-                'message': 'JD was enhanced successfully, but interview generation failed'
-            }), 500
+        logger.info(f"Starting streamed workflow for req_id: {data['req_id']}")
         
-        total_tokens += interview_result.get('tokens_used', 0)
+        return sse_response(stream_full_workflow(data, user_id))
+    
+    except Exception as e:
+        logger.error(f"Error in workflow_full_stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def run_bulk_workflow(data, user_id):
+    """
+    Run the 'workflow_bulk' job: batch JD enhancement, then batch interview generation.
+    
+    Args:
+        data: Validated request body
+        user_id: ID of user running the workflow
+    
+    Returns:
+        BatchService.run_bulk_workflow result dictionary
+    """
+    return batch_service.run_bulk_workflow(
+        data['jds'],
+        user_id,
+        generate_interviews=data.get('generate_interviews', True),
+        use_cache=data.get('use_cache', True)
+    )
+
+
+# Each stage may wait up to BATCH_TIMEOUT for its batch
+job_service.register('workflow_bulk', run_bulk_workflow, stale_after=2 * Config.BATCH_TIMEOUT + Config.JOB_STALE_AFTER)
+
+
+@interview_bp.route('/workflow/bulk', methods=['POST'])
+@require_admin
+def workflow_bulk():
+    """
+    Bulk workflow: enhance many JDs and generate their interviews through the
+    Message Batches API (half price, but batches can take hours).
+    
+    Always runs as a background job: the response is 202 with a job_id to
+    poll at GET /api/interview/jobs/<job_id>.
+    """
+    try:
+        data = request.get_json()
+        
+        jds = data.get('jds')
+        if not jds or not isinstance(jds, list):
+            return jsonify({'error': 'Missing required field: jds'}), 400
+        
+        # Validate required fields of every JD
+        required_fields = ['req_id', 'basic_title', 'basic_description']
+        for index, jd in enumerate(jds):
+            for field in required_fields:
+                if not jd.get(field):
+                    return jsonify({'error': f'Missing required field: jds[{index}].{field}'}), 400
+        
+        req_ids = [jd['req_id'] for jd in jds]
+        if len(set(req_ids)) != len(req_ids):
+            return jsonify({'error': 'Each req_id may only appear once'}), 400
+        
+        # Get user ID from request
+        user_id = request.headers.get('X-User-ID', 'system')
+        
+        logger.info(f"Queueing bulk workflow for {len(jds)} JDs")
+        
+        try:
+            job = job_service.submit('workflow_bulk', f"bulk ({len(req_ids)} JDs)", user_id, data)
+        except JobQueueFullError as e:
+            return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '30'}
         
-        # Return complete workflow result
         return jsonify({
             'success': True,
-            'job_description_id': jd_result['job_description_id'],
-            'interview_id': interview_result['interview_id'],
-            'req_id': data['req_id'],
-            'interview': interview_result['interview'],
-            'total_tokens_used': total_tokens,
-            'created_at': datetime.utcnow().isoformat()
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_url': f"{interview_bp.url_prefix}/jobs/{job['job_id']}"
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Error in workflow_bulk: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# BACKGROUND JOB ENDPOINTS
+# ============================================================================
+
+@interview_bp.route('/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    """Retrieve the status (and result, once finished) of a background job."""
+    try:
+        result = job_service.get_job(job_id)
+        
+        if result:
+            return jsonify({'success': True, 'job': result}), 200
+        else:
+            return jsonify({'error': 'Job not found'}), 404
+    
+    except Exception as e:
+        logger.error(f"Error in get_job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# STATS
+# ============================================================================
+
+@interview_bp.route('/stats', methods=['GET'])
+@require_admin
+def get_stats():
+    """Per-process Claude client and question cache statistics (counters reset when the worker restarts)."""
+    try:
+        response_cache = claude_client.response_cache
+        rate_limiter = claude_client.rate_limiter
+        hedging_policy = claude_client.hedging_policy
+        model_router = claude_client.model_router
+        token_budgeter = claude_client.token_budgeter
+        question_leases = interview_generation_service.question_leases
+        return jsonify({
+            'success': True,
+            'response_cache': response_cache.stats() if response_cache is not None else None,
+            'rate_limiter': rate_limiter.stats() if rate_limiter is not None else None,
+            'circuit_breaker': claude_client.circuit_breaker.stats(),
+            'hedging': hedging_policy.stats() if hedging_policy is not None else None,
+            'model_routing': model_router.stats() if model_router is not None else None,
+            'token_budget': token_budgeter.stats() if token_budgeter is not None else None,
+            'question_cache': question_cache_sweeper.stats(),
+            'question_cache_usage': interview_generation_service.usage_buffer.stats(),
+            'question_cache_leases': question_leases.stats() if question_leases is not None else None
         }), 200
     
     except Exception as e:
-        logger.error(f"Error in workflow_full_jd_and_interview: {str(e)}")
+        logger.error(f"Error in get_stats: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
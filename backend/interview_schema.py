@@ -0,0 +1,70 @@
+"""
+Interview Schema - Structured output format for interview generation.
+Claude returns the interview as the input of the record_interview tool; the tool's
+JSON schema and the validator are both built once, at import, from the models below.
+"""
+
+from typing import List, Dict, Any
+from pydantic import BaseModel, Field, ValidationError
+
+
+class InterviewCriterionOutput(BaseModel):
+    """One evaluation criterion as returned by Claude."""
+    
+    criterion: str = Field(description="Short name of what a strong answer covers")
+    description: str = Field(description="1-2 sentence explanation of what demonstrates mastery")
+
+
+class InterviewQuestionOutput(BaseModel):
+    """One interview question as returned by Claude."""
+    
+    question_text: str = Field(description="Concise scenario-based question (max 3 separate elements)")
+    expected_answer: str = Field(description="Subject area name")
+    criteria: List[InterviewCriterionOutput] = Field(description="8-10 evaluation criteria")
+
+
+class InterviewOutput(BaseModel):
+    """The complete interview as returned by Claude."""
+    
+    questions: List[InterviewQuestionOutput] = Field(description="Exactly 5 questions, in interview order")
+
+
+INTERVIEW_TOOL = {
+    'name': 'record_interview',
+    'description': "Record the generated interview. Call this exactly once with all 5 questions.",
+    'input_schema': InterviewOutput.model_json_schema()
+}
+
+
+def parse_interview_tool_input(tool_input: Any) -> List[Dict[str, Any]]:
+    """
+    Validate record_interview tool input and convert it to question dictionaries.
+    
+    Only the structure is checked here; question and criteria counts are
+    left to validate_question, so a single short question can still be
+    repaired instead of failing the whole interview.
+    
+    Args:
+        tool_input: The tool_use block's input
+    
+    Returns:
+        List of question dictionaries (same structure as parse_interview_response),
+        numbered in order
+    
+    Raises:
+        ValueError: If the input does not match the schema
+    """
+    try:
+        interview = InterviewOutput.model_validate(tool_input)
+    except ValidationError as e:
+        first = e.errors()[0]
+        location = '.'.join(str(part) for part in first['loc']) or 'input'
+        raise ValueError(
+            f"Interview tool output does not match the schema ({e.error_count()} errors): "
+            f"{location}: {first['msg']}"
+        )
+    
+    return [
+        {'question_number': number, **question.model_dump()}
+        for number, question in enumerate(interview.questions, 1)
+    ]
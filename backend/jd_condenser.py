@@ -0,0 +1,210 @@
+"""
+JD Condenser - Map-reduce condensation of very long job descriptions.
+Pasted career-page exports are split into sections, condensed concurrently with a fast model,
+and merged, so the enhancement prompt stays bounded however much text was pasted.
+"""
+
+import hashlib
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from .config import Config
+from .prompts import JD_CONDENSATION_PROMPT, JD_CONDENSATION_SYSTEM_PROMPT
+from .rate_limiter import estimate_tokens, CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+
+class JDCondenser:
+    """
+    Condenses job descriptions over a token threshold before enhancement.
+    
+    The text is split on blank lines into sections, which are packed into
+    chunks of at most `chunk_tokens` (a section longer than that is split
+    on lines, then on characters). Each chunk is condensed by its own
+    concurrent call (operation 'jd_condensation', routed to a fast model)
+    and the summaries are joined in order. If the merged summary is still
+    over the threshold, it is condensed again, up to `max_rounds` times.
+    
+    Summaries are cached in the client's response cache under the hash of
+    the chunk (and the condensation prompt), so a re-pasted description
+    only pays for the sections that changed, whichever model answered.
+    Concurrent pastes of the same description share each chunk's summary
+    through the cache's leases.
+    """
+    
+    def __init__(
+        self,
+        claude_client,
+        threshold_tokens: Optional[int] = None,
+        chunk_tokens: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_rounds: Optional[int] = None
+    ):
+        """
+        Initialize JD Condenser.
+        
+        Args:
+            claude_client: ClaudeClientService used for the chunk calls (and its response cache)
+            threshold_tokens: Text estimated at or under this many tokens is left alone
+                              (defaults to Config.JD_CONDENSE_THRESHOLD_TOKENS)
+            chunk_tokens: Maximum tokens per chunk (defaults to Config.JD_CONDENSE_CHUNK_TOKENS)
+            max_workers: Concurrent chunk calls (defaults to Config.JD_CONDENSE_MAX_WORKERS)
+            max_rounds: Condensation rounds before giving up on the threshold
+                        (defaults to Config.JD_CONDENSE_MAX_ROUNDS)
+        """
+        self.claude_client = claude_client
+        self.threshold_tokens = threshold_tokens or Config.JD_CONDENSE_THRESHOLD_TOKENS
+        self.chunk_tokens = chunk_tokens or Config.JD_CONDENSE_CHUNK_TOKENS
+        self.max_workers = max_workers or Config.JD_CONDENSE_MAX_WORKERS
+        self.max_rounds = max_rounds or Config.JD_CONDENSE_MAX_ROUNDS
+    
+    def needs_condensing(self, text: str) -> bool:
+        """Whether text is over the threshold and would be condensed."""
+        return bool(text) and estimate_tokens(text) > self.threshold_tokens
+    
+    def condense(self, text: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Condense text if it is over the threshold.
+        
+        Args:
+            text: Job description text
+            use_cache: Whether cached chunk summaries may be reused
+        
+        Returns:
+            Dictionary with:
+            {
+                'text': str,            # condensed text, or the input unchanged
+                'condensed': bool,
+                'chunks': int,          # chunks condensed, over all rounds
+                'cached_chunks': int,   # of which were served from the cache
+                'tokens_used': int
+            }
+        
+        Raises:
+            Exception: If a chunk call fails
+        """
+        result = {'text': text, 'condensed': False, 'chunks': 0, 'cached_chunks': 0, 'tokens_used': 0}
+        
+        for round_number in range(1, self.max_rounds + 1):
+            if not self.needs_condensing(result['text']):
+                break
+            chunks = self.split(result['text'])
+            logger.info(
+                f"Condensing job description (~{estimate_tokens(result['text'])} tokens) "
+                f"in {len(chunks)} chunks, round {round_number}"
+            )
+            
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                futures = [
+                    executor.submit(self._condense_chunk, chunk, index, len(chunks), use_cache)
+                    for index, chunk in enumerate(chunks, 1)
+                ]
+                summaries = [future.result() for future in futures]
+            
+            result['text'] = '\n\n'.join(summary['text'] for summary in summaries)
+            result['condensed'] = True
+            result['chunks'] += len(chunks)
+            result['cached_chunks'] += sum(1 for summary in summaries if summary['cached'])
+            result['tokens_used'] += sum(summary['tokens_used'] for summary in summaries)
+        
+        if result['condensed']:
+            logger.info(
+                f"Job description condensed to ~{estimate_tokens(result['text'])} tokens "
+                f"({result['cached_chunks']}/{result['chunks']} chunks cached)"
+            )
+        return result
+    
+    def split(self, text: str) -> List[str]:
+        """
+        Split text into chunks of at most chunk_tokens, keeping sections together where possible.
+        
+        Args:
+            text: Text to split
+        
+        Returns:
+            Non-empty chunks, in order
+        """
+        max_chars = self.chunk_tokens * CHARS_PER_TOKEN
+        
+        pieces = []
+        for section in re.split(r'\n\s*\n', text):
+            section = section.strip()
+            if not section:
+                continue
+            if len(section) <= max_chars:
+                pieces.append(section)
+                continue
+            # Oversized section: fall back to lines, then to fixed-size slices
+            for line in section.splitlines():
+                line = line.strip()
+                pieces.extend(line[i:i + max_chars] for i in range(0, len(line), max_chars))
+        
+        chunks = []
+        current = ''
+        for piece in pieces:
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        
+        return chunks
+    
+    def _condense_chunk(self, chunk: str, index: int, total: int, use_cache: bool) -> Dict[str, Any]:
+        """
+        Condense one chunk, through the chunk-hash cache.
+        
+        On a miss the chunk's lease is taken in the response cache, so
+        concurrent requests condensing the same chunk wait for one summary
+        (up to the client's lease wait timeout) instead of each calling Claude.
+        
+        Returns:
+            Dictionary with 'text', 'cached' and 'tokens_used'
+        """
+        response_cache = getattr(self.claude_client, 'response_cache', None)
+        key = self._chunk_key(chunk)
+        
+        lease = None
+        if use_cache and response_cache is not None:
+            cached = response_cache.get(key)
+            if cached is None and getattr(self.claude_client, 'cache_leases', False):
+                lease = response_cache.acquire_lease(key)
+                if lease is None:
+                    timeout = getattr(self.claude_client, 'lease_wait_timeout', Config.CACHE_LEASE_WAIT_TIMEOUT)
+                    cached, lease = response_cache.wait(key, timeout)
+            if cached is not None:
+                return {'text': cached['text'], 'cached': True, 'tokens_used': 0}
+        
+        try:
+            response = self.claude_client.call_claude(
+                system_prompt=JD_CONDENSATION_SYSTEM_PROMPT,
+                user_prompt=JD_CONDENSATION_PROMPT.format(part=index, parts=total, chunk=chunk),
+                max_tokens=Config.JD_CONDENSE_MAX_TOKENS,
+                temperature=0.0,
+                use_cache=False,
+                operation='jd_condensation'
+            )
+            
+            if not response.get('success'):
+                raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+            
+            text = response.get('text', '').strip()
+            if response_cache is not None and response.get('stop_reason') != 'max_tokens':
+                response_cache.set(key, {'text': text})
+        finally:
+            if lease is not None:
+                response_cache.release_lease(key, lease)
+        
+        return {'text': text, 'cached': False, 'tokens_used': response['usage']['total_tokens']}
+    
+    @staticmethod
+    def _chunk_key(chunk: str) -> str:
+        """Cache key of a chunk's summary: the hash of the chunk and the prompt that condensed it."""
+        digest = hashlib.sha256()
+        for part in ('jd_condensation', JD_CONDENSATION_SYSTEM_PROMPT, JD_CONDENSATION_PROMPT, chunk):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
@@ -0,0 +1,435 @@
+"""
+JD Deduplication - MinHash signatures and an LSH index over job description text.
+The ATS often opens one role under several req_ids with trivially different text; a near-duplicate's
+enhancement or interview can be cloned instead of running the whole pipeline again.
+Signatures of JDs written before they existed are backfilled from the command line:
+    python -m backend.jd_deduplication --batch-size 500
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple, Iterable
+
+import numpy as np
+
+from .config import Config, config
+from .models import db, JobDescription
+
+logger = logging.getLogger(__name__)
+
+# Indexed text of a JD
+BASIC = 'basic'
+ENHANCED = 'enhanced'
+FIELDS = (BASIC, ENHANCED)
+
+_TAG = re.compile(r'<[^>]+>')
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles.
+    
+    Text is lowercased and reduced to words (HTML tags dropped), shingled
+    into runs of `shingle_size` words and hashed with crc32. Each of the
+    `num_perm` hash functions is a multiply-shift hash of the shingle hash;
+    the signature is the minimum of each over the shingles, so the fraction
+    of equal positions in two signatures estimates their Jaccard similarity.
+    
+    The hash functions come from a fixed seed because signatures are stored
+    in job_descriptions and compared across processes.
+    """
+    
+    SEED = 7919
+    
+    def __init__(self, num_perm: Optional[int] = None, shingle_size: Optional[int] = None):
+        """
+        Initialize MinHasher.
+        
+        Args:
+            num_perm: Hash functions per signature (defaults to Config.JD_DEDUP_NUM_PERM)
+            shingle_size: Words per shingle (defaults to Config.JD_DEDUP_SHINGLE_SIZE)
+        """
+        self.num_perm = num_perm or Config.JD_DEDUP_NUM_PERM
+        self.shingle_size = shingle_size or Config.JD_DEDUP_SHINGLE_SIZE
+        rng = np.random.default_rng(self.SEED)
+        # Odd multipliers keep multiply-shift universal; uint64 arithmetic wraps by design
+        self._multipliers = rng.integers(1, 2 ** 63, self.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._increments = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+    
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        Hash the distinct word shingles of a text.
+        
+        Args:
+            text: Job description text
+        
+        Returns:
+            uint64 array of shingle hashes (a text shorter than one shingle is one shingle)
+        """
+        words = _WORD.findall(_TAG.sub(' ', text or '').lower())
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+        size = min(self.shingle_size, len(words))
+        hashes = {
+            zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+            for i in range(len(words) - size + 1)
+        }
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature of a text.
+        
+        Args:
+            text: Job description text
+        
+        Returns:
+            uint32 array of num_perm values, or None for text without words
+        """
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return None
+        hashed = (shingles[:, np.newaxis] * self._multipliers + self._increments) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+_default_hasher = None
+
+
+def default_hasher() -> MinHasher:
+    """The MinHasher with the configured parameters, shared by the process."""
+    global _default_hasher
+    if _default_hasher is None:
+        _default_hasher = MinHasher()
+    return _default_hasher
+
+
+def signature_from_bytes(blob: bytes) -> np.ndarray:
+    """Signature stored in a job_descriptions minhash column."""
+    return np.frombuffer(blob, dtype=np.uint32)
+
+
+def sign_job_description(jd: JobDescription):
+    """
+    Store the MinHash signatures of a JD's basic and enhanced description on the row (no commit).
+    
+    The basic signature is computed once; the enhanced one whenever the
+    enhanced description is written. Does nothing if Config.JD_DEDUP_ENABLED is off.
+    
+    Args:
+        jd: JobDescription being written
+    """
+    if not Config.JD_DEDUP_ENABLED:
+        return
+    hasher = default_hasher()
+    if jd.basic_minhash is None:
+        signature = hasher.signature(jd.basic_description)
+        jd.basic_minhash = signature.tobytes() if signature is not None else None
+    signature = hasher.signature(jd.enhanced_description)
+    jd.enhanced_minhash = signature.tobytes() if signature is not None else None
+
+
+def backfill_signatures(batch_size: int = 500) -> Dict[str, int]:
+    """
+    Sign the JDs that have no basic signature yet (rows written before signatures existed).
+    
+    Rows are read and signed in id order, `batch_size` per transaction, so
+    the backfill never holds long locks and can be stopped and rerun. A
+    backfilled JD keeps its enhanced_at, so workers already running index
+    it only after their next start. Needs an app context.
+    
+    Args:
+        batch_size: Rows signed per transaction
+    
+    Returns:
+        Dictionary with 'signed' (rows updated) and 'batches'
+    """
+    report = {'signed': 0, 'batches': 0}
+    if not Config.JD_DEDUP_ENABLED:
+        return report
+    
+    last_id = 0
+    while True:
+        rows = JobDescription.query.filter(
+            JobDescription.basic_minhash.is_(None),
+            JobDescription.id > last_id
+        ).order_by(JobDescription.id).limit(batch_size).all()
+        if not rows:
+            db.session.commit()
+            break
+        for jd in rows:
+            sign_job_description(jd)
+        last_id = rows[-1].id
+        db.session.commit()
+        
+        report['signed'] += len(rows)
+        report['batches'] += 1
+        logger.info(f"Signed {report['signed']} job descriptions (up to id {last_id})")
+    return report
+
+
+class NearDuplicateIndex:
+    """
+    In-process LSH index of JD signatures (one entry per JD and field).
+    
+    Signatures are cut into `bands` bands; each band is hashed to a 64-bit
+    key and kept in a sorted array, so finding the JDs that share a band
+    with a query is two binary searches per band. Candidates are verified
+    against their stored signatures (the low 16 bits of each value, which
+    halves the memory at a negligible collision rate) and only those at or
+    above the Jaccard threshold are returned. About 0.5 KB per indexed text.
+    
+    New entries go to a small pending table first and are merged into the
+    sorted arrays in batches of MERGE_SIZE, so adds stay cheap as well.
+    Replacing a JD's entry (re-enhancement) marks the old row dead.
+    """
+    
+    MERGE_SIZE = 1024
+    
+    def __init__(self, num_perm: Optional[int] = None, bands: Optional[int] = None):
+        """
+        Initialize Near-Duplicate Index.
+        
+        Args:
+            num_perm: Signature length (defaults to Config.JD_DEDUP_NUM_PERM)
+            bands: LSH bands; num_perm must be a multiple (defaults to Config.JD_DEDUP_BANDS)
+        """
+        self.num_perm = num_perm or Config.JD_DEDUP_NUM_PERM
+        self.bands = bands or Config.JD_DEDUP_BANDS
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.rows_per_band = self.num_perm // self.bands
+        self._band_mix = np.random.default_rng(MinHasher.SEED + 1).integers(
+            1, 2 ** 63, self.rows_per_band, dtype=np.uint64
+        ) * np.uint64(2) + np.uint64(1)
+        
+        self._lock = threading.Lock()
+        self._count = 0
+        self._jd_ids = np.empty(0, dtype=np.int64)
+        self._fields = np.empty(0, dtype=np.uint8)
+        self._alive = np.empty(0, dtype=bool)
+        self._signatures = np.empty((0, self.num_perm), dtype=np.uint16)
+        self._row_of: Dict[Tuple[int, int], int] = {}  # Live row of each (JD, field)
+        # Sorted band keys and their rows, for rows merged so far
+        self._band_keys = [np.empty(0, dtype=np.uint64) for _ in range(self.bands)]
+        self._band_rows = [np.empty(0, dtype=np.int64) for _ in range(self.bands)]
+        # Rows added since the last merge: band key -> rows per band, for lookups
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        self._pending_keys: List[np.ndarray] = []
+        self._pending_rows: List[np.ndarray] = []
+        self._watermark: Optional[datetime] = None
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._alive[:self._count].sum())
+    
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """64-bit key of each band of each signature (shape: signatures x bands)."""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        return (bands * self._band_mix).sum(axis=2, dtype=np.uint64)
+    
+    def add(self, entries: Iterable[Tuple[int, str, np.ndarray]]):
+        """
+        Index signatures, replacing any earlier entry of the same JD and field.
+        
+        Args:
+            entries: (job_description_id, field, signature) tuples; field is BASIC or ENHANCED
+        """
+        entries = [
+            (jd_id, FIELDS.index(field), signature)
+            for jd_id, field, signature in entries
+            if signature is not None and len(signature) == self.num_perm
+        ]
+        if not entries:
+            return
+        
+        signatures = np.stack([signature for _, _, signature in entries])
+        keys = self.band_keys(signatures)
+        low_bits = (signatures & 0xFFFF).astype(np.uint16)
+        
+        with self._lock:
+            self._reserve(self._count + len(entries))
+            added = []
+            for index, (jd_id, field, _) in enumerate(entries):
+                existing = self._row_of.get((jd_id, field))
+                if existing is not None:
+                    if np.array_equal(self._signatures[existing], low_bits[index]):
+                        continue
+                    self._alive[existing] = False
+                
+                row = self._count
+                self._count += 1
+                self._row_of[(jd_id, field)] = row
+                self._jd_ids[row], self._fields[row], self._alive[row] = jd_id, field, True
+                self._signatures[row] = low_bits[index]
+                added.append((index, row))
+            if not added:
+                return
+            
+            indexes, rows = (np.array(column, dtype=np.int64) for column in zip(*added))
+            if len(rows) >= self.MERGE_SIZE:
+                # Bulk load (e.g. the first refresh): straight into the sorted arrays
+                self._merge(keys[indexes], rows)
+                return
+            for row_keys, row in zip(keys[indexes].tolist(), rows.tolist()):
+                for band, key in enumerate(row_keys):
+                    self._pending[band].setdefault(key, []).append(row)
+            self._pending_keys.append(keys[indexes])
+            self._pending_rows.append(rows)
+            if sum(len(pending) for pending in self._pending_rows) >= self.MERGE_SIZE:
+                self._merge(np.concatenate(self._pending_keys), np.concatenate(self._pending_rows))
+                self._pending = [{} for _ in range(self.bands)]
+                self._pending_keys, self._pending_rows = [], []
+    
+    def add_job_description(self, jd_id: int, basic_minhash: Optional[bytes], enhanced_minhash: Optional[bytes]):
+        """Index a JD from its stored signature columns."""
+        self.add(
+            (jd_id, field, signature_from_bytes(blob))
+            for field, blob in ((BASIC, basic_minhash), (ENHANCED, enhanced_minhash)) if blob
+        )
+    
+    def remove(self, jd_id: int):
+        """Drop every entry of a JD."""
+        with self._lock:
+            for field in range(len(FIELDS)):
+                row = self._row_of.pop((jd_id, field), None)
+                if row is not None:
+                    self._alive[row] = False
+    
+    def query(
+        self,
+        signature: Optional[np.ndarray],
+        threshold: Optional[float] = None,
+        field: Optional[str] = None,
+        exclude: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the JDs whose indexed text is a near-duplicate of a signature.
+        
+        Args:
+            signature: Query signature (see MinHasher.signature)
+            threshold: Minimum estimated Jaccard similarity (defaults to Config.JD_DEDUP_THRESHOLD)
+            field: Only compare against this field (BASIC or ENHANCED); both if None
+            exclude: JD id to leave out (usually the query JD itself)
+        
+        Returns:
+            (job_description_id, similarity) tuples, most similar first, one per JD
+        """
+        if signature is None or len(signature) != self.num_perm:
+            return []
+        threshold = Config.JD_DEDUP_THRESHOLD if threshold is None else threshold
+        keys = self.band_keys(signature[np.newaxis])[0]
+        query_bits = (signature & 0xFFFF).astype(np.uint16)
+        
+        with self._lock:
+            candidates = []
+            for band, key in enumerate(keys):
+                band_keys = self._band_keys[band]
+                start = np.searchsorted(band_keys, key, side='left')
+                end = np.searchsorted(band_keys, key, side='right')
+                if end > start:
+                    candidates.append(self._band_rows[band][start:end])
+                pending = self._pending[band].get(int(key))
+                if pending:
+                    candidates.append(np.array(pending, dtype=np.int64))
+            if not candidates:
+                return []
+            
+            rows = np.unique(np.concatenate(candidates))
+            keep = self._alive[rows]
+            if field is not None:
+                keep &= self._fields[rows] == FIELDS.index(field)
+            if exclude is not None:
+                keep &= self._jd_ids[rows] != exclude
+            rows = rows[keep]
+            similarities = (self._signatures[rows] == query_bits).mean(axis=1)
+            jd_ids = self._jd_ids[rows]
+        
+        best: Dict[int, float] = {}
+        for jd_id, similarity in zip(jd_ids.tolist(), similarities.tolist()):
+            if similarity >= threshold and similarity > best.get(jd_id, -1.0):
+                best[jd_id] = similarity
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)
+    
+    def refresh(self):
+        """
+        Index the JDs enhanced since the last refresh, from their stored signatures.
+        
+        The first call loads every signed JD. Queries through the caller's
+        session, so call it during a short read transaction (phase 1).
+        """
+        query = JobDescription.query.filter(JobDescription.basic_minhash.isnot(None))
+        if self._watermark is not None:
+            # >=: timestamps may only have second precision; unchanged rows are skipped by add
+            query = query.filter(JobDescription.enhanced_at >= self._watermark)
+        rows = query.with_entities(
+            JobDescription.id,
+            JobDescription.basic_minhash,
+            JobDescription.enhanced_minhash,
+            JobDescription.enhanced_at
+        ).all()
+        
+        for jd_id, basic_minhash, enhanced_minhash, enhanced_at in rows:
+            self.add_job_description(jd_id, basic_minhash, enhanced_minhash)
+            if enhanced_at and (self._watermark is None or enhanced_at > self._watermark):
+                self._watermark = enhanced_at
+        if self._watermark is None:
+            self._watermark = datetime.min
+        if rows:
+            logger.info(f"Indexed signatures of {len(rows)} job descriptions")
+    
+    def _reserve(self, size: int):
+        """Grow the row arrays (doubling) to hold at least size rows."""
+        capacity = len(self._jd_ids)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        extra = capacity - len(self._jd_ids)
+        self._jd_ids = np.concatenate([self._jd_ids, np.zeros(extra, dtype=np.int64)])
+        self._fields = np.concatenate([self._fields, np.zeros(extra, dtype=np.uint8)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        self._signatures = np.vstack([self._signatures, np.zeros((extra, self.num_perm), dtype=np.uint16)])
+    
+    def _merge(self, keys: np.ndarray, rows: np.ndarray):
+        """
+        Insert rows into the sorted band arrays (caller holds the lock).
+        
+        Args:
+            keys: Band keys of the rows (rows x bands)
+            rows: Row numbers
+        """
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind='stable')
+            new_keys, new_rows = keys[order, band], rows[order]
+            positions = np.searchsorted(self._band_keys[band], new_keys)
+            self._band_keys[band] = np.insert(self._band_keys[band], positions, new_keys)
+            self._band_rows[band] = np.insert(self._band_rows[band], positions, new_rows)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Backfill JD signatures: python -m backend.jd_deduplication"""
+    from flask import Flask
+    
+    parser = argparse.ArgumentParser(description='Compute MinHash signatures of job descriptions that have none')
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows signed per transaction')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'development'), choices=sorted(config))
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO)
+    app = Flask(__name__)
+    app.config.from_object(config[args.config])
+    db.init_app(app)
+    
+    with app.app_context():
+        print(json.dumps(backfill_signatures(batch_size=args.batch_size)))
+
+
+if __name__ == '__main__':
+    main()
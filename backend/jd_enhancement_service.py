@@ -4,11 +4,16 @@ Transforms basic JDs into detailed, deliverables-focused descriptions suitable f
 """
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, Tuple
 from datetime import datetime
 from .models import db, JobDescription, GenerationLog
 from .claude_client import ClaudeClientService
-from .prompts import JD_ENHANCEMENT_PROMPT, JD_ENHANCEMENT_SYSTEM_PROMPT
+from .config import Config
+from .jd_condenser import JDCondenser
+from .input_normalizer import normalize_input
+from .jd_deduplication import BASIC, NearDuplicateIndex, default_hasher, sign_job_description
+from .prompts import JD_ENHANCEMENT_INSTRUCTIONS, JD_ENHANCEMENT_PROMPT, JD_ENHANCEMENT_SYSTEM_PROMPT
+from .token_budget import fit_input, load_token_history
 
 logger = logging.getLogger(__name__)
 
@@ -18,14 +23,22 @@ class JDEnhancementService:
     Service for enhancing job descriptions using Claude and the WORK methodology.
     """
     
-    def __init__(self, claude_client: Optional[ClaudeClientService] = None):
+    def __init__(
+        self,
+        claude_client: Optional[ClaudeClientService] = None,
+        duplicate_index: Optional[NearDuplicateIndex] = None
+    ):
         """
         Initialize JD Enhancement Service.
         
         Args:
             claude_client: Claude client service. If not provided, creates a new one.
+            duplicate_index: Near-duplicate JD index, shared with the interview service.
+                             If not provided, creates a new one.
         """
         self.claude_client = claude_client or ClaudeClientService()
+        self.condenser = JDCondenser(self.claude_client) if Config.JD_CONDENSE_ENABLED else None
+        self.duplicate_index = duplicate_index if duplicate_index is not None else NearDuplicateIndex()
     
     def enhance_jd(
         self,
@@ -38,7 +51,10 @@ class JDEnhancementService:
         work_output: Optional[str] = None,
         work_role: Optional[str] = None,
         work_knowledge: Optional[str] = None,
-        work_competencies: Optional[str] = None
+        work_competencies: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: bool = False,
+        clone_near_duplicate: bool = False
     ) -> Dict[str, Any]:
         """
         Enhance a basic job description using WORK methodology.
@@ -54,6 +70,11 @@ class JDEnhancementService:
             work_role: WORK - What are the key responsibilities/roles?
             work_knowledge: WORK - What knowledge areas are critical?
             work_competencies: WORK - What competencies are essential?
+            use_cache: Whether an identical earlier Claude response may be reused (default True)
+            hedge: Hedge a slow Claude call (for interactive requests)
+            clone_near_duplicate: Copy the enhancement of another JD whose basic description
+                                  is a near-duplicate (Jaccard >= Config.JD_DEDUP_THRESHOLD)
+                                  instead of calling Claude
         
         Returns:
             Dictionary with:
@@ -62,34 +83,33 @@ class JDEnhancementService:
                 'job_description_id': int,
                 'basic_jd': {...},
                 'enhanced_jd': {...},
-                'tokens_used': int,
+                'tokens_used': int,           # including condensation
+                'condensed_chunks': int,      # chunks of a long description condensed first (0 if none)
+                'input_tokens_saved': int,    # estimated, by normalizing the description
+                'cloned_from': {...} or None, # 'job_description_id', 'req_id', 'similarity' of the source
                 'error': str (if failed)
             }
         """
         
-        # Start generation log
-        log_entry = GenerationLog(
-            operation_type='jd_enhancement',
-            req_id=req_id,
-            user_id=user_id,
-            status='in_progress',
-            started_at=datetime.utcnow()
-        )
-        db.session.add(log_entry)
-        db.session.commit()
+        log_entry_id = self._start_log(req_id, user_id)
         
         try:
             logger.info(f"Starting JD enhancement for req_id: {req_id}")
             
-            # Check if JD already exists
-            existing_jd = JobDescription.query.filter_by(req_id=req_id).first()
-            if existing_jd:
-                logger.warning(f"JD for req_id {req_id} already exists. Updating...")
-                jd = existing_jd
-            else:
-                # Create new JD record
-                jd = JobDescription(
-                    req_id=req_id,
+            # Phase 1: check if JD already exists, then end the transaction so
+            # no pooled connection is held during the Claude call
+            load_token_history(self.claude_client, 'jd_enhancement')
+            clone_near_duplicate = clone_near_duplicate and Config.JD_DEDUP_ENABLED
+            if clone_near_duplicate:
+                self.duplicate_index.refresh()
+            existing_jd_id = self._find_existing_jd_id(req_id)
+            
+            # Phase 2: reuse a near-duplicate JD's enhancement, or call Claude with no open transaction
+            enhancement = None
+            if clone_near_duplicate:
+                enhancement = self._clone_enhancement(basic_description, existing_jd_id)
+            if enhancement is None:
+                enhancement = self._generate_enhancement(
                     basic_title=basic_title,
                     basic_description=basic_description,
                     basic_department=basic_department,
@@ -98,120 +118,536 @@ class JDEnhancementService:
                     work_role=work_role,
                     work_knowledge=work_knowledge,
                     work_competencies=work_competencies,
-                    created_by_user_id=user_id
+                    use_cache=use_cache,
+                    hedge=hedge
                 )
-                db.session.add(jd)
-                db.session.flush()  # Get the ID without committing
-            
-            # Prepare JD content for Claude
-            jd_content = f"""
-TITLE: {basic_title}
-DEPARTMENT: {basic_department or 'Not specified'}
-LEVEL: {basic_level or 'Not specified'}
-
-DESCRIPTION:
-{basic_description}
-            """.strip()
-            
-            # Build WORK context from user inputs
-            work_context_parts = []
-            if work_output:
-                work_context_parts.append(f"Work Output (what they'll deliver/build):\n{work_output}")
-            if work_role:
-                work_context_parts.append(f"Key Roles and Responsibilities:\n{work_role}")
-            if work_knowledge:
-                work_context_parts.append(f"Critical Knowledge Areas:\n{work_knowledge}")
-            if work_competencies:
-                work_context_parts.append(f"Essential Competencies:\n{work_competencies}")
             
-            work_context = "\n\n".join(work_context_parts) if work_context_parts else "No additional context provided"
-            
-            # Call Claude to enhance JD
-            user_prompt = JD_ENHANCEMENT_PROMPT.format(
-                work_context=work_context,
-                jd_content=jd_content
+            # Phase 3: write the JD and the log in one short transaction
+            result = self._persist_enhancement(
+                req_id=req_id,
+                basic_title=basic_title,
+                basic_description=basic_description,
+                user_id=user_id,
+                basic_department=basic_department,
+                basic_level=basic_level,
+                work_output=work_output,
+                work_role=work_role,
+                work_knowledge=work_knowledge,
+                work_competencies=work_competencies,
+                existing_jd_id=existing_jd_id,
+                enhanced_description=enhancement['enhanced_description'],
+                log_entry_id=log_entry_id,
+                tokens_used=enhancement['tokens_used'],
+                cache_read_tokens=enhancement['cache_read_tokens'],
+                cache_write_tokens=enhancement['cache_write_tokens'],
+                model=enhancement['model'],
+                output_tokens=enhancement['output_tokens']
             )
+            result['condensed_chunks'] = enhancement['condensed_chunks']
+            result['input_tokens_saved'] = enhancement['input_tokens_saved']
+            result['cloned_from'] = enhancement['cloned_from']
             
-            logger.info("Calling Claude API for JD enhancement...")
-            response = self.claude_client.call_claude(
-                system_prompt=JD_ENHANCEMENT_SYSTEM_PROMPT,
-                user_prompt=user_prompt,
-                temperature=0.3  # Lower temperature for consistency
-            )
+            logger.info(f"JD enhancement completed for req_id {req_id}. Tokens: {result['tokens_used']}")
             
-            if not response.get('success'):
-                raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+            return result
+        
+        except Exception as e:
+            logger.error(f"JD enhancement failed: {str(e)}")
+            self._record_failure(log_entry_id, e)
             
-            # Extract enhanced description
-            enhanced_description = response.get('text', '').strip()
+            return {
+                'success': False,
+                'req_id': req_id,
+                'error': str(e)
+            }
+    
+    def stream_enhance_jd(
+        self,
+        req_id: str,
+        basic_title: str,
+        basic_description: str,
+        user_id: str,
+        basic_department: Optional[str] = None,
+        basic_level: Optional[str] = None,
+        work_output: Optional[str] = None,
+        work_role: Optional[str] = None,
+        work_knowledge: Optional[str] = None,
+        work_competencies: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of enhance_jd.
+        
+        Takes the same arguments as enhance_jd and yields (event, data) tuples:
+            ('stage', {'stage': 'jd_enhancement', 'status': 'started'})
+            ('stage', {'stage': 'jd_condensation', 'status': 'started'})  # only for very long descriptions
+            ('jd_delta', {'text': str})    # enhanced JD text as it arrives
+            ('jd_enhanced', {...})         # same dictionary enhance_jd returns
+            ('error', {...})               # instead of jd_enhanced on failure
+        """
+        log_entry_id = self._start_log(req_id, user_id)
+        completed = False
+        
+        try:
+            logger.info(f"Starting streamed JD enhancement for req_id: {req_id}")
+            yield 'stage', {'stage': 'jd_enhancement', 'status': 'started'}
             
-            # Update JD with enhanced version
-            jd.enhanced_title = basic_title  # Keep original title
-            jd.enhanced_description = enhanced_description
-            jd.enhanced_at = datetime.utcnow()
+            load_token_history(self.claude_client, 'jd_enhancement')
+            existing_jd_id = self._find_existing_jd_id(req_id)
             
-            # Store WORK inputs if provided
-            if work_output:
-                jd.work_output = work_output
-            if work_role:
-                jd.work_role = work_role
-            if work_knowledge:
-                jd.work_knowledge = work_knowledge
-            if work_competencies:
-                jd.work_competencies = work_competencies
+            normalization = normalize_input(basic_description, label='Job description')
+            if self.condenser is not None and self.condenser.needs_condensing(normalization['text']):
+                yield 'stage', {'stage': 'jd_condensation', 'status': 'started'}
+            condensation = self._condense_description(normalization['text'], use_cache)
             
-            db.session.commit()
+            user_prompt = self._build_user_prompt(
+                basic_title=basic_title,
+                basic_description=condensation['text'],
+                basic_department=basic_department,
+                basic_level=basic_level,
+                work_output=work_output,
+                work_role=work_role,
+                work_knowledge=work_knowledge,
+                work_competencies=work_competencies
+            )
             
-            # Update log
-            log_entry.status = 'success'
-            log_entry.tokens_used = response['usage']['total_tokens']
-            log_entry.completed_at = datetime.utcnow()
-            db.session.commit()
+            response = None
+            for chunk in self.claude_client.stream_claude(
+                system_prompt=JD_ENHANCEMENT_SYSTEM_PROMPT,
+                static_prompt=JD_ENHANCEMENT_INSTRUCTIONS,
+                user_prompt=user_prompt,
+                temperature=0.3,
+                use_cache=use_cache,
+                hedge=hedge,
+                operation='jd_enhancement'
+            ):
+                if chunk['type'] == 'text':
+                    yield 'jd_delta', {'text': chunk['text']}
+                elif chunk['type'] == 'done':
+                    response = chunk['result']
             
-            logger.info(f"JD enhancement completed for req_id {req_id}. Tokens: {response['usage']['total_tokens']}")
+            if not response or not response.get('success'):
+                raise Exception("Claude API stream ended without a result")
             
-            return {
-                'success': True,
-                'job_description_id': jd.id,
-                'req_id': req_id,
-                'basic_jd': {
-                    'title': basic_title,
-                    'department': basic_department,
-                    'level': basic_level,
-                    'description': basic_description
-                },
-                'enhanced_jd': {
-                    'title': jd.enhanced_title,
-                    'description': enhanced_description
-                },
-                'work_inputs': {
-                    'work_output': work_output,
-                    'work_role': work_role,
-                    'work_knowledge': work_knowledge,
-                    'work_competencies': work_competencies
-                },
-                'tokens_used': response['usage']['total_tokens'],
-                'created_at': jd.created_at.isoformat(),
-                'enhanced_at': jd.enhanced_at.isoformat()
-            }
+            result = self._persist_enhancement(
+                req_id=req_id,
+                basic_title=basic_title,
+                basic_description=basic_description,
+                user_id=user_id,
+                basic_department=basic_department,
+                basic_level=basic_level,
+                work_output=work_output,
+                work_role=work_role,
+                work_knowledge=work_knowledge,
+                work_competencies=work_competencies,
+                existing_jd_id=existing_jd_id,
+                enhanced_description=response.get('text', '').strip(),
+                log_entry_id=log_entry_id,
+                tokens_used=response['usage']['total_tokens'] + condensation['tokens_used'],
+                cache_read_tokens=response['usage'].get('cache_read_input_tokens', 0),
+                cache_write_tokens=response['usage'].get('cache_creation_input_tokens', 0),
+                model=response.get('model'),
+                output_tokens=response['usage'].get('output_tokens') or None
+            )
+            result['condensed_chunks'] = condensation['chunks']
+            result['input_tokens_saved'] = normalization['tokens_saved']
+            
+            completed = True
+            yield 'jd_enhanced', result
+        
+        except GeneratorExit:
+            # The SSE client went away; nothing more can be sent, but the log must not stay in_progress
+            if not completed:
+                logger.warning("Streamed JD enhancement abandoned: client disconnected")
+                self._record_failure(log_entry_id, Exception("Client disconnected"))
+            raise
         
         except Exception as e:
-            logger.error(f"JD enhancement failed: {str(e)}")
+            logger.error(f"Streamed JD enhancement failed: {str(e)}")
+            self._record_failure(log_entry_id, e)
             
-            # Update log with error
-            log_entry.status = 'failed'
-            log_entry.error_message = str(e)
-            log_entry.completed_at = datetime.utcnow()
-            db.session.commit()
-            
-            db.session.rollback()
-            
-            return {
+            yield 'error', {
                 'success': False,
                 'req_id': req_id,
                 'error': str(e)
             }
     
+    def _generate_enhancement(
+        self,
+        basic_title: str,
+        basic_description: str,
+        basic_department: Optional[str] = None,
+        basic_level: Optional[str] = None,
+        work_output: Optional[str] = None,
+        work_role: Optional[str] = None,
+        work_knowledge: Optional[str] = None,
+        work_competencies: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Call Claude for an enhanced description. Must be called without an open transaction.
+        
+        The description is normalized, and a very long one condensed, before
+        it goes into the prompt.
+        
+        Returns:
+            Dictionary with 'enhanced_description', 'tokens_used', 'cache_read_tokens',
+            'cache_write_tokens', 'model', 'output_tokens', 'condensed_chunks',
+            'input_tokens_saved' and 'cloned_from' (None)
+        
+        Raises:
+            Exception: If the Claude call fails
+        """
+        normalization = normalize_input(basic_description, label='Job description')
+        condensation = self._condense_description(normalization['text'], use_cache)
+        user_prompt = self._build_user_prompt(
+            basic_title=basic_title,
+            basic_description=condensation['text'],
+            basic_department=basic_department,
+            basic_level=basic_level,
+            work_output=work_output,
+            work_role=work_role,
+            work_knowledge=work_knowledge,
+            work_competencies=work_competencies
+        )
+        
+        logger.info("Calling Claude API for JD enhancement...")
+        response = self.claude_client.call_claude(
+            system_prompt=JD_ENHANCEMENT_SYSTEM_PROMPT,
+            static_prompt=JD_ENHANCEMENT_INSTRUCTIONS,
+            user_prompt=user_prompt,
+            temperature=0.3,  # Lower temperature for consistency
+            use_cache=use_cache,
+            hedge=hedge,
+            operation='jd_enhancement'
+        )
+        
+        if not response.get('success'):
+            raise Exception(f"Claude API call failed: {response.get('error', 'Unknown error')}")
+        
+        return {
+            'enhanced_description': response.get('text', '').strip(),
+            'tokens_used': response['usage']['total_tokens'] + condensation['tokens_used'],
+            'cache_read_tokens': response['usage'].get('cache_read_input_tokens', 0),
+            'cache_write_tokens': response['usage'].get('cache_creation_input_tokens', 0),
+            'model': response.get('model'),
+            'output_tokens': response['usage'].get('output_tokens') or None,
+            'condensed_chunks': condensation['chunks'],
+            'input_tokens_saved': normalization['tokens_saved'],
+            'cloned_from': None
+        }
+    
+    def _clone_enhancement(self, basic_description: str, existing_jd_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        Find an enhanced JD whose basic description is a near-duplicate, and copy its enhancement.
+        
+        Reads the source JD in a short transaction, ended before returning.
+        
+        Args:
+            basic_description: Basic description being enhanced
+            existing_jd_id: ID of the JD being updated, which is never its own source
+        
+        Returns:
+            Enhancement dictionary like _generate_enhancement's (no tokens used),
+            or None if there is no near-duplicate
+        """
+        matches = self.duplicate_index.query(
+            default_hasher().signature(basic_description), field=BASIC, exclude=existing_jd_id
+        )
+        if not matches:
+            return None
+        
+        sources = {
+            jd.id: jd
+            for jd in JobDescription.query.filter(
+                JobDescription.id.in_([jd_id for jd_id, _ in matches]),
+                JobDescription.enhanced_description.isnot(None)
+            )
+        }
+        enhancement = None
+        for jd_id, similarity in matches:
+            if jd_id in sources:
+                source = sources[jd_id]
+                logger.info(f"Cloning the enhancement of req_id {source.req_id} (similarity {similarity:.2f})")
+                enhancement = {
+                    'enhanced_description': source.enhanced_description,
+                    'tokens_used': 0,
+                    'cache_read_tokens': 0,
+                    'cache_write_tokens': 0,
+                    'model': None,
+                    'output_tokens': None,
+                    'condensed_chunks': 0,
+                    'input_tokens_saved': 0,
+                    'cloned_from': {'job_description_id': jd_id, 'req_id': source.req_id, 'similarity': similarity}
+                }
+                break
+        db.session.commit()
+        
+        return enhancement
+    
+    def _start_log(self, req_id: str, user_id: str) -> int:
+        """
+        Create the in-progress GenerationLog entry.
+        
+        Returns:
+            ID of the log entry
+        """
+        log_entry = GenerationLog(
+            operation_type='jd_enhancement',
+            req_id=req_id,
+            user_id=user_id,
+            status='in_progress',
+            started_at=datetime.utcnow()
+        )
+        db.session.add(log_entry)
+        db.session.flush()
+        log_entry_id = log_entry.id
+        db.session.commit()
+        
+        return log_entry_id
+    
+    def _find_existing_jd_id(self, req_id: str) -> Optional[int]:
+        """
+        Look up an existing JD for req_id and end the read transaction.
+        
+        Returns:
+            JobDescription ID or None
+        """
+        existing_jd = JobDescription.query.filter_by(req_id=req_id).first()
+        existing_jd_id = existing_jd.id if existing_jd else None
+        db.session.commit()
+        
+        if existing_jd_id:
+            logger.warning(f"JD for req_id {req_id} already exists. Updating...")
+        
+        return existing_jd_id
+    
+    def _persist_enhancement(
+        self,
+        req_id: str,
+        basic_title: str,
+        basic_description: str,
+        user_id: str,
+        basic_department: Optional[str],
+        basic_level: Optional[str],
+        work_output: Optional[str],
+        work_role: Optional[str],
+        work_knowledge: Optional[str],
+        work_competencies: Optional[str],
+        existing_jd_id: Optional[int],
+        enhanced_description: str,
+        log_entry_id: int,
+        tokens_used: int,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0,
+        model: Optional[str] = None,
+        output_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Write the enhanced JD and the log update in one transaction.
+        
+        Returns:
+            Success result dictionary for enhance_jd
+        """
+        # Look the JD up again in case another request created it meanwhile
+        if existing_jd_id:
+            jd = db.session.get(JobDescription, existing_jd_id)
+        else:
+            jd = JobDescription.query.filter_by(req_id=req_id).first()
+        
+        jd = self._apply_enhancement(
+            jd=jd,
+            req_id=req_id,
+            basic_title=basic_title,
+            basic_description=basic_description,
+            user_id=user_id,
+            basic_department=basic_department,
+            basic_level=basic_level,
+            work_output=work_output,
+            work_role=work_role,
+            work_knowledge=work_knowledge,
+            work_competencies=work_competencies,
+            enhanced_description=enhanced_description
+        )
+        
+        # Update log
+        log_entry = db.session.get(GenerationLog, log_entry_id)
+        log_entry.status = 'success'
+        log_entry.tokens_used = tokens_used
+        log_entry.cache_read_tokens = cache_read_tokens
+        log_entry.cache_write_tokens = cache_write_tokens
+        log_entry.model = model
+        log_entry.output_tokens = output_tokens
+        log_entry.completed_at = datetime.utcnow()
+        
+        # Flush to get the ID and defaults, build the result, then commit
+        db.session.flush()
+        result = {
+            'success': True,
+            'job_description_id': jd.id,
+            'req_id': req_id,
+            'basic_jd': {
+                'title': basic_title,
+                'department': basic_department,
+                'level': basic_level,
+                'description': basic_description
+            },
+            'enhanced_jd': {
+                'title': jd.enhanced_title,
+                'description': enhanced_description
+            },
+            'work_inputs': {
+                'work_output': work_output,
+                'work_role': work_role,
+                'work_knowledge': work_knowledge,
+                'work_competencies': work_competencies
+            },
+            'tokens_used': tokens_used,
+            'cache_read_tokens': cache_read_tokens,
+            'cache_write_tokens': cache_write_tokens,
+            'model': model,
+            'created_at': jd.created_at.isoformat(),
+            'enhanced_at': jd.enhanced_at.isoformat()
+        }
+        signatures = (jd.id, jd.basic_minhash, jd.enhanced_minhash)
+        db.session.commit()
+        
+        self.duplicate_index.add_job_description(*signatures)
+        return result
+    
+    def _apply_enhancement(
+        self,
+        jd: Optional[JobDescription],
+        req_id: str,
+        basic_title: str,
+        basic_description: str,
+        user_id: str,
+        basic_department: Optional[str],
+        basic_level: Optional[str],
+        work_output: Optional[str],
+        work_role: Optional[str],
+        work_knowledge: Optional[str],
+        work_competencies: Optional[str],
+        enhanced_description: str
+    ) -> JobDescription:
+        """
+        Create the JD if needed and store the enhanced description (no commit).
+        
+        Args:
+            jd: Existing JobDescription for req_id, or None to create one
+        
+        Returns:
+            The JobDescription, added to the session
+        """
+        if not jd:
+            # Create new JD record
+            jd = JobDescription(
+                req_id=req_id,
+                basic_title=basic_title,
+                basic_description=basic_description,
+                basic_department=basic_department,
+                basic_level=basic_level,
+                work_output=work_output,
+                work_role=work_role,
+                work_knowledge=work_knowledge,
+                work_competencies=work_competencies,
+                created_by_user_id=user_id
+            )
+            db.session.add(jd)
+        
+        # Update JD with enhanced version
+        jd.enhanced_title = basic_title  # Keep original title
+        jd.enhanced_description = enhanced_description
+        jd.enhanced_at = datetime.utcnow()
+        
+        # Store WORK inputs if provided
+        if work_output:
+            jd.work_output = work_output
+        if work_role:
+            jd.work_role = work_role
+        if work_knowledge:
+            jd.work_knowledge = work_knowledge
+        if work_competencies:
+            jd.work_competencies = work_competencies
+        
+        sign_job_description(jd)
+        return jd
+    
+    def _record_failure(self, log_entry_id: int, error: Exception):
+        """Discard partial writes and mark the log entry failed."""
+        db.session.rollback()
+        
+        log_entry = db.session.get(GenerationLog, log_entry_id)
+        log_entry.status = 'failed'
+        log_entry.error_message = str(error)
+        log_entry.completed_at = datetime.utcnow()
+        db.session.commit()
+    
+    def _condense_description(self, basic_description: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Condense a very long basic description (see JDCondenser); short ones are returned as they are.
+        
+        Returns:
+            JDCondenser.condense result dictionary ('text', 'condensed', 'chunks',
+            'cached_chunks', 'tokens_used')
+        """
+        if self.condenser is None:
+            return {'text': basic_description, 'condensed': False, 'chunks': 0, 'cached_chunks': 0, 'tokens_used': 0}
+        return self.condenser.condense(basic_description, use_cache=use_cache)
+    
+    def _build_user_prompt(
+        self,
+        basic_title: str,
+        basic_description: str,
+        basic_department: Optional[str] = None,
+        basic_level: Optional[str] = None,
+        work_output: Optional[str] = None,
+        work_role: Optional[str] = None,
+        work_knowledge: Optional[str] = None,
+        work_competencies: Optional[str] = None
+    ) -> str:
+        """
+        Build the JD enhancement user prompt from the basic JD and WORK inputs.
+        
+        The static JD_ENHANCEMENT_INSTRUCTIONS are sent separately as the
+        cached static_prompt.
+        
+        Returns:
+            Formatted JD_ENHANCEMENT_PROMPT
+        
+        Raises:
+            InputTooLargeError: If the prompt is over Config.MAX_INPUT_TOKENS
+        """
+        # Prepare JD content for Claude
+        jd_content = f"""
+TITLE: {basic_title}
+DEPARTMENT: {basic_department or 'Not specified'}
+LEVEL: {basic_level or 'Not specified'}
+
+DESCRIPTION:
+{basic_description}
+        """.strip()
+        
+        # Build WORK context from user inputs
+        work_context_parts = []
+        if work_output:
+            work_context_parts.append(f"Work Output (what they'll deliver/build):\n{work_output}")
+        if work_role:
+            work_context_parts.append(f"Key Roles and Responsibilities:\n{work_role}")
+        if work_knowledge:
+            work_context_parts.append(f"Critical Knowledge Areas:\n{work_knowledge}")
+        if work_competencies:
+            work_context_parts.append(f"Essential Competencies:\n{work_competencies}")
+        
+        work_context = "\n\n".join(work_context_parts) if work_context_parts else "No additional context provided"
+        
+        return fit_input(
+            JD_ENHANCEMENT_PROMPT.format(work_context=work_context, jd_content=jd_content),
+            label='Job description'
+        )
+    
     def get_enhanced_jd(self, req_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve an already-enhanced JD.
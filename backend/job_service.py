@@ -0,0 +1,239 @@
+"""
+Background Job Service - Runs long generation workflows outside the request thread.
+Jobs are persisted in the generation_jobs table so any worker process can serve their status.
+"""
+
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Callable
+from flask import current_app
+from .models import db, GenerationJob
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the worker pool and its queue are both at capacity."""
+
+
+class JobService:
+    """
+    Bounded in-process worker pool for generation jobs.
+    
+    At most `max_workers` jobs run at once and at most `max_queue_size` more
+    wait for a worker; further submissions are rejected with JobQueueFullError
+    so a burst cannot pile up unbounded work in one process.
+    
+    Jobs only live in the process that accepted them. If that process exits,
+    its unfinished jobs are reported as failed once they are older than
+    Config.JOB_STALE_AFTER.
+    """
+    
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        executor=None
+    ):
+        """
+        Initialize Job Service.
+        
+        Args:
+            max_workers: Worker threads (defaults to Config.JOB_WORKERS)
+            max_queue_size: Jobs allowed to wait for a worker (defaults to Config.JOB_QUEUE_SIZE)
+            executor: Executor to run jobs on. If not provided, a thread pool is
+                      created on first submit (after gunicorn has forked).
+        """
+        self.max_workers = max_workers or Config.JOB_WORKERS
+        self.max_queue_size = max_queue_size if max_queue_size is not None else Config.JOB_QUEUE_SIZE
+        self.stale_after = timedelta(seconds=Config.JOB_STALE_AFTER)
+        self._executor = executor
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue_size)
+        self._handlers: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {}
+        self._stale_after: Dict[str, timedelta] = {}
+    
+    def register(
+        self,
+        job_type: str,
+        handler: Callable[[Dict[str, Any], str], Dict[str, Any]],
+        stale_after: Optional[int] = None
+    ):
+        """
+        Register the function that runs jobs of a given type.
+        
+        Args:
+            job_type: Job type name (e.g., 'workflow_full')
+            handler: Callable(payload, user_id) returning a result dictionary
+                     with a 'success' key
+            stale_after: Seconds before an unfinished job of this type is
+                         abandoned (defaults to Config.JOB_STALE_AFTER)
+        """
+        self._handlers[job_type] = handler
+        if stale_after is not None:
+            self._stale_after[job_type] = timedelta(seconds=stale_after)
+    
+    def submit(self, job_type: str, req_id: str, user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Persist a new job and hand it to the worker pool.
+        
+        Args:
+            job_type: Registered job type
+            req_id: Requisition ID the job works on
+            user_id: ID of user submitting the job
+            payload: JSON-serializable job input
+        
+        Returns:
+            Job dictionary (status 'queued')
+        
+        Raises:
+            ValueError: If job_type is not registered
+            JobQueueFullError: If the pool and its queue are full
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFullError("Too many generation jobs in progress. Please retry shortly.")
+        
+        try:
+            job = GenerationJob(
+                id=str(uuid.uuid4()),
+                job_type=job_type,
+                req_id=req_id,
+                user_id=user_id,
+                status='queued',
+                payload=payload
+            )
+            db.session.add(job)
+            db.session.flush()
+            job_dict = job.to_dict()
+            db.session.commit()
+            
+            app = current_app._get_current_object()
+            self._get_executor().submit(self._run_job, app, job_dict['job_id'])
+        except Exception:
+            self._slots.release()
+            raise
+        
+        logger.info(f"Queued {job_type} job {job_dict['job_id']} for req_id {req_id}")
+        return job_dict
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a job's status and result.
+        
+        Args:
+            job_id: Job ID
+        
+        Returns:
+            Job dictionary or None if not found
+        """
+        job = db.session.get(GenerationJob, job_id)
+        
+        if not job:
+            return None
+        
+        # A job that never finished within the stale window lost its worker: a
+        # running job is timed from when it started, a queued one from submission
+        stale_after = self._stale_after.get(job.job_type, self.stale_after)
+        since = job.started_at if job.status == 'running' else job.created_at
+        if job.status in ('queued', 'running') and since and since < datetime.utcnow() - stale_after:
+            abandoned = GenerationJob.query.filter_by(id=job_id, status=job.status).update(
+                {
+                    GenerationJob.status: 'failed',
+                    GenerationJob.error_message: 'Job was abandoned before completion',
+                    GenerationJob.completed_at: datetime.utcnow()
+                },
+                synchronize_session=False
+            )
+            db.session.commit()
+            if abandoned:
+                logger.warning(f"Job {job_id} abandoned after {stale_after.total_seconds():.0f}s {job.status}")
+            db.session.refresh(job)
+        
+        return job.to_dict()
+    
+    def _get_executor(self):
+        """Create the thread pool lazily so it is never inherited across a fork."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='generation-job'
+                )
+            return self._executor
+    
+    def _run_job(self, app, job_id: str):
+        """
+        Execute a job inside its own app context and record the outcome.
+        
+        Status changes are conditional on the status the worker expects, so
+        a job abandoned by get_job meanwhile is neither started nor
+        overwritten: a terminal status is final.
+        
+        Args:
+            app: Flask application the job was submitted from
+            job_id: Job ID
+        """
+        try:
+            with app.app_context():
+                try:
+                    started = GenerationJob.query.filter_by(id=job_id, status='queued').update(
+                        {GenerationJob.status: 'running', GenerationJob.started_at: datetime.utcnow()},
+                        synchronize_session=False
+                    )
+                    job = db.session.get(GenerationJob, job_id)
+                    job_type = job.job_type
+                    payload = dict(job.payload)
+                    user_id = job.user_id
+                    db.session.commit()
+                    if not started:
+                        logger.warning(f"Job {job_id} was no longer queued, not running it")
+                        return
+                    
+                    logger.info(f"Running {job_type} job {job_id}")
+                    result = self._handlers[job_type](payload, user_id)
+                    
+                    status = 'succeeded' if result.get('success') else 'failed'
+                    error_message = result.get('error') if status == 'failed' else None
+                    self._finish(job_id, status, result=result, error_message=error_message)
+                    
+                    logger.info(f"Job {job_id} finished with status {status}")
+                
+                except Exception as e:
+                    logger.error(f"Job {job_id} failed: {str(e)}")
+                    
+                    db.session.rollback()
+                    self._finish(job_id, 'failed', error_message=str(e))
+        finally:
+            self._slots.release()
+    
+    @staticmethod
+    def _finish(job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error_message: Optional[str] = None):
+        """
+        Record a running job's outcome, unless it already has a terminal status.
+        
+        Args:
+            job_id: Job ID
+            status: 'succeeded' or 'failed'
+            result: Handler result dictionary
+            error_message: Error message of a failed job
+        """
+        values = {
+            GenerationJob.status: status,
+            GenerationJob.error_message: error_message,
+            GenerationJob.completed_at: datetime.utcnow()
+        }
+        if result is not None:
+            values[GenerationJob.result] = result
+        finished = GenerationJob.query.filter_by(id=job_id, status='running').update(
+            values, synchronize_session=False
+        )
+        db.session.commit()
+        if not finished:
+            logger.warning(f"Job {job_id} already finished, {status} result discarded")
@@ -0,0 +1,174 @@
+"""
+Model Router - Choose the Claude model for each operation, falling back when a model is slow or failing.
+Health is judged from the calls this process has observed.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRouter:
+    """
+    Routing table of operation -> [primary model, fallback models...].
+    
+    Each (operation, model) pair keeps a sliding window of recent calls.
+    A model is unhealthy once its window has at least `min_samples` calls
+    and either the share of failed calls exceeds `max_error_rate` or the
+    mean latency of successful calls exceeds the operation's
+    'max_latency'. choose() returns the first healthy model of the route.
+    
+    An unhealthy model gets no traffic, so its window would never recover:
+    after `cooldown` seconds the window is cleared and the model is tried
+    again.
+    """
+    
+    def __init__(
+        self,
+        routes: Optional[Dict[str, Dict[str, Any]]] = None,
+        default_model: Optional[str] = None,
+        max_error_rate: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window_size: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        clock=time.monotonic
+    ):
+        """
+        Initialize Model Router.
+        
+        Args:
+            routes: {operation: {'models': [primary, *fallbacks], 'max_latency': seconds}}
+                    (defaults to Config.MODEL_ROUTES)
+            default_model: Model for operations without a route (defaults to Config.CLAUDE_MODEL)
+            max_error_rate: Failed share of calls that makes a model unhealthy
+                            (defaults to Config.MODEL_ROUTER_MAX_ERROR_RATE)
+            min_samples: Calls observed before a model can be judged
+                         (defaults to Config.MODEL_ROUTER_MIN_SAMPLES)
+            window_size: Calls remembered per operation and model
+                         (defaults to Config.MODEL_ROUTER_WINDOW_SIZE)
+            cooldown: Seconds before an unhealthy model is tried again
+                      (defaults to Config.MODEL_ROUTER_COOLDOWN)
+            clock: Time source (injectable for tests)
+        """
+        self.routes = routes if routes is not None else Config.MODEL_ROUTES
+        self.default_model = default_model or Config.CLAUDE_MODEL
+        self.max_error_rate = max_error_rate if max_error_rate is not None else Config.MODEL_ROUTER_MAX_ERROR_RATE
+        self.min_samples = min_samples if min_samples is not None else Config.MODEL_ROUTER_MIN_SAMPLES
+        self.window_size = window_size or Config.MODEL_ROUTER_WINDOW_SIZE
+        self.cooldown = cooldown if cooldown is not None else Config.MODEL_ROUTER_COOLDOWN
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (operation, model) -> deque of latencies in seconds, None for failed calls
+        self._windows: Dict[Tuple[str, str], deque] = {}
+        self._unhealthy_since: Dict[Tuple[str, str], float] = {}
+        self._routed: Dict[Tuple[str, str], int] = {}
+    
+    def models(self, operation: Optional[str]) -> List[str]:
+        """The route for an operation: primary model first, then fallbacks."""
+        route = self.routes.get(operation) if operation else None
+        return list(route['models']) if route and route.get('models') else [self.default_model]
+    
+    def choose(self, operation: Optional[str], is_available: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Pick the model for one call.
+        
+        Args:
+            operation: Routing table key (e.g. 'jd_enhancement'); None uses the default model
+            is_available: Optional extra check, e.g. that the model's circuit is not open
+        
+        Returns:
+            The first healthy and available model of the route, or the
+            primary model if none is
+        """
+        models = self.models(operation)
+        chosen = models[0]
+        with self._lock:
+            for model in models:
+                if self._is_healthy(operation, model) and (is_available is None or is_available(model)):
+                    chosen = model
+                    break
+            else:
+                logger.warning(f"No healthy model for {operation}; using primary {chosen}")
+            
+            if chosen != models[0]:
+                logger.info(f"Routing {operation} to fallback model {chosen}")
+            self._routed[(operation, chosen)] = self._routed.get((operation, chosen), 0) + 1
+        return chosen
+    
+    def record(self, operation: Optional[str], model: str, seconds: Optional[float]):
+        """
+        Add an observed call to a window.
+        
+        Args:
+            operation: Operation the call was routed for
+            model: Model that was called
+            seconds: Latency of a successful call, or None for a failed call
+        """
+        with self._lock:
+            window = self._windows.setdefault((operation, model), deque(maxlen=self.window_size))
+            window.append(seconds)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report each route's models with their health for this process.
+        
+        Returns:
+            Dictionary keyed by operation with a list of {'model', 'healthy',
+            'calls', 'error_rate', 'mean_latency', 'routed'} per model
+        """
+        with self._lock:
+            return {
+                operation: [
+                    {
+                        'model': model,
+                        'healthy': self._is_healthy(operation, model),
+                        **self._window_stats(operation, model),
+                        'routed': self._routed.get((operation, model), 0)
+                    }
+                    for model in self.models(operation)
+                ]
+                for operation in self.routes
+            }
+    
+    def _is_healthy(self, operation: Optional[str], model: str) -> bool:
+        """Judge a model from its window. Caller holds the lock."""
+        key = (operation, model)
+        since = self._unhealthy_since.get(key)
+        if since is not None:
+            if self._clock() - since < self.cooldown:
+                return False
+            # Cooldown over: forget the old calls and try the model again
+            del self._unhealthy_since[key]
+            self._windows.pop(key, None)
+            logger.info(f"Retrying model {model} for {operation} after cooldown")
+            return True
+        
+        window_stats = self._window_stats(operation, model)
+        if window_stats['calls'] < self.min_samples:
+            return True
+        
+        route = self.routes.get(operation) or {}
+        max_latency = route.get('max_latency')
+        too_slow = bool(max_latency) and window_stats['mean_latency'] is not None and window_stats['mean_latency'] > max_latency
+        if window_stats['error_rate'] > self.max_error_rate or too_slow:
+            logger.warning(f"Model {model} unhealthy for {operation}: error rate {window_stats['error_rate']}, "
+                           f"mean latency {window_stats['mean_latency']}s")
+            self._unhealthy_since[key] = self._clock()
+            return False
+        return True
+    
+    def _window_stats(self, operation: Optional[str], model: str) -> Dict[str, Any]:
+        """Calls, error rate and mean successful latency of a window. Caller holds the lock."""
+        window = self._windows.get((operation, model)) or ()
+        latencies = [seconds for seconds in window if seconds is not None]
+        calls = len(window)
+        return {
+            'calls': calls,
+            'error_rate': round((calls - len(latencies)) / calls, 4) if calls else 0.0,
+            'mean_latency': round(sum(latencies) / len(latencies), 3) if latencies else None
+        }
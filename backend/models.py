@@ -34,7 +34,11 @@ class JobDescription(db.Model):
     # Metadata
     created_by_user_id = db.Column(db.String(255), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    enhanced_at = db.Column(db.DateTime)
+    enhanced_at = db.Column(db.DateTime, index=True)
+    
+    # MinHash signatures (uint32 bytes) of the descriptions, for near-duplicate lookup (see jd_deduplication)
+    basic_minhash = db.Column(db.LargeBinary)
+    enhanced_minhash = db.Column(db.LargeBinary)
     
     # Relationships
     interviews = db.relationship('Interview', backref='job_description', lazy=True, cascade='all, delete-orphan')
@@ -126,13 +130,14 @@ class InterviewQuestion(db.Model):
 class QuestionCache(db.Model):
     """
     Caches generated questions to avoid regenerating similar questions.
-    Used for optimization when multiple JDs have similar requirements.
+    Used for optimization when multiple JDs have similar requirements;
+    lookups are by cosine similarity of the embedding (see QuestionIndex).
     """
     __tablename__ = 'question_cache'
     
     id = db.Column(db.Integer, primary_key=True)
     
-    # Cache key (hash of the question generation request)
+    # Cache key (hash of topic, skill level and question text)
     cache_key = db.Column(db.String(255), nullable=False, unique=True, index=True)
     
     # Original request details
@@ -144,21 +149,45 @@ class QuestionCache(db.Model):
     question_text = db.Column(db.Text, nullable=False)
     criteria = db.Column(db.JSON, nullable=False)
     
+    # float32 hashed n-gram vector of topic and question text (see question_similarity.embed_question)
+    embedding = db.Column(db.LargeBinary)
+    
+    # Estimated output tokens a hit saves (share of the generation that produced it)
+    token_cost = db.Column(db.Integer)
+    
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
-    usage_count = db.Column(db.Integer, default=1)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    usage_count = db.Column(db.Integer, default=1, index=True)
     
     def increment_usage(self):
-        """Increment usage counter and update last used timestamp"""
-        self.usage_count += 1
+        """
+        Increment usage counter and update last used timestamp; the caller commits.
+        Request paths record hits in QuestionUsageBuffer instead of writing each one.
+        """
+        self.usage_count = (self.usage_count or 0) + 1
         self.last_used_at = datetime.utcnow()
-        db.session.commit()
     
     def __repr__(self):
         return f'<QuestionCache {self.topic} - {self.skill_level}>'
 
 
+class CacheLease(db.Model):
+    """
+    Short-lived claim on a question cache entry that is being generated.
+    Lets concurrent requests on any host wait for one generation instead of each calling Claude.
+    """
+    __tablename__ = 'cache_leases'
+    
+    # Hash of what is being generated (e.g. skill level and subject area)
+    lease_key = db.Column(db.String(64), primary_key=True)
+    token = db.Column(db.String(32), nullable=False)  # Identifies the holder
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Lapses if the holder crashes
+    
+    def __repr__(self):
+        return f'<CacheLease {self.lease_key} until {self.expires_at}>'
+
+
 class GenerationLog(db.Model):
     """
     Audit log for tracking all JD and interview generation activities.
@@ -177,9 +206,68 @@ class GenerationLog(db.Model):
     error_message = db.Column(db.Text)
     tokens_used = db.Column(db.Integer)
     
+    # Targeted repair of invalid questions (interview generation only)
+    repair_count = db.Column(db.Integer, default=0)  # Questions re-requested
+    tokens_saved = db.Column(db.Integer, default=0)  # Estimated vs. regenerating the whole interview
+    
+    # Prompt caching (already counted in tokens_used)
+    cache_read_tokens = db.Column(db.Integer, default=0)  # Prompt tokens read from the cache
+    cache_write_tokens = db.Column(db.Integer, default=0)  # Prompt tokens written to the cache
+    
+    # Claude model that produced the output (chosen by the model router)
+    model = db.Column(db.String(100))
+    
+    # Output tokens of the main completion, all segments (NULL for parallel interviews,
+    # which have no single completion); the token budgeter learns max_tokens from these
+    output_tokens = db.Column(db.Integer)
+    
     # Timestamps
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     
     def __repr__(self):
         return f'<GenerationLog {self.operation_type} - {self.req_id} - {self.status}>'
+
+
+class GenerationJob(db.Model):
+    """
+    Background generation job (e.g. the full JD + interview workflow).
+    Persisted so that any worker process can report a job's status and result.
+    """
+    __tablename__ = 'generation_jobs'
+    
+    id = db.Column(db.String(36), primary_key=True)  # UUID4 string
+    
+    job_type = db.Column(db.String(50), nullable=False)  # e.g., 'workflow_full'
+    req_id = db.Column(db.String(255), nullable=False, index=True)
+    user_id = db.Column(db.String(255), nullable=False, index=True)
+    
+    # Status: 'queued', 'running', 'succeeded', 'failed'
+    status = db.Column(db.String(50), nullable=False, default='queued', index=True)
+    
+    # Request payload and final result (stored as JSON)
+    payload = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON)
+    error_message = db.Column(db.Text)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """Convert job to dictionary (status endpoint format)"""
+        return {
+            'job_id': self.id,
+            'job_type': self.job_type,
+            'req_id': self.req_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<GenerationJob {self.id} - {self.job_type} - {self.status}>'
@@ -1,9 +1,14 @@
 """
 Prompts for JD Enhancement and Interview Generation.
 These prompts are the core of the system and drive the quality of output.
+
+The JD enhancement and interview generation prompts are split into a static
+*_INSTRUCTIONS block, identical for every request and sent with prompt
+caching, and the variable blocks that carry the job description.
 """
 
-JD_ENHANCEMENT_PROMPT = """You are an expert in technical recruiting and job description analysis. Your task is to enhance a basic job description using the WORK methodology - focusing on Work Output, Roles, Knowledge, and Competencies.
+# Static part of the JD enhancement prompt (cached)
+JD_ENHANCEMENT_INSTRUCTIONS = """You are an expert in technical recruiting and job description analysis. Your task is to enhance a basic job description using the WORK methodology - focusing on Work Output, Roles, Knowledge, and Competencies.
 
 IMPORTANT: Your goal is to transform a basic job description into one that clearly defines:
 1. Specific deliverables and outcomes
@@ -13,11 +18,7 @@ IMPORTANT: Your goal is to transform a basic job description into one that clear
 
 The enhanced JD should be detailed enough that we can create technical interview questions that directly test whether a candidate can actually DO this work.
 
-CONTEXT FROM HIRING MANAGER:
-{work_context}
-
-HERE IS THE BASIC JOB DESCRIPTION:
-{jd_content}
+You will be given context from the hiring manager and the basic job description.
 
 ENHANCEMENT INSTRUCTIONS:
 1. Use the hiring manager's context to understand what this role truly requires
@@ -36,17 +37,38 @@ Provide an enhanced job description that:
 - Defines the scope of systems/technologies they'll work with based on the knowledge areas provided
 - Demonstrates understanding of the roles and competencies the manager specified
 
-Keep the enhanced description in clear, readable prose format (not a bulleted list). It should flow naturally while being more specific and detailed than the original.
+Keep the enhanced description in clear, readable prose format (not a bulleted list). It should flow naturally while being more specific and detailed than the original."""
+
+
+# Variable part of the JD enhancement prompt
+JD_ENHANCEMENT_PROMPT = """CONTEXT FROM HIRING MANAGER:
+{work_context}
+
+HERE IS THE BASIC JOB DESCRIPTION:
+{jd_content}
 
 Begin the enhanced job description now:"""
 
 
-INTERVIEW_GENERATION_PROMPT = """You are an expert technical interviewer for TechScreen. Your task is to create a comprehensive 5-question interview based on a job description.
+# Map step for job descriptions too long to send whole (see jd_condenser.py)
+JD_CONDENSATION_SYSTEM_PROMPT = """You condense long job postings for a recruiting team. You keep every concrete fact about the role and drop everything else."""
 
-Each question should directly test whether a candidate has the knowledge and experience to perform the key deliverables of the role.
 
-HERE IS THE JOB DESCRIPTION:
-{jd_content}
+JD_CONDENSATION_PROMPT = """Below is part {part} of {parts} of a long job posting. Condense it to the facts that describe the role:
+- Responsibilities, deliverables and the systems or products involved
+- Required and preferred skills, technologies, experience and qualifications
+- Team, seniority, location and working arrangements
+
+Drop company marketing, benefits boilerplate, legal notices, navigation text and anything repeated. Keep names of technologies and tools exactly as written. Write plain prose or short lines, with no preamble. If this part has nothing about the role, reply with nothing.
+
+PART {part} OF {parts}:
+{chunk}"""
+
+
+# Static part of the interview generation prompt (cached)
+INTERVIEW_GENERATION_INSTRUCTIONS = """You are an expert technical interviewer for TechScreen. Your task is to create a comprehensive 5-question interview based on a job description.
+
+Each question should directly test whether a candidate has the knowledge and experience to perform the key deliverables of the role.
 
 INTERVIEW STRUCTURE REQUIREMENTS:
 1. Create exactly 5 questions
@@ -81,9 +103,26 @@ KEY PRINCIPLES FOR THESE QUESTIONS:
 - Directly align with job requirements
 - Allow assessment at different competency levels
 - Focus on problems they would actually solve in the role
-- Don't create questions that require knowledge beyond the job requirements
+- Don't create questions that require knowledge beyond the job requirements"""
+
+
+# The job description, sent as its own cached block: the same JD is resent when an
+# interview is regenerated, retried or hedged
+INTERVIEW_GENERATION_CONTEXT = """HERE IS THE JOB DESCRIPTION:
+{jd_content}"""
+
+
+INTERVIEW_GENERATION_PROMPT = """Generate the 5-question interview now. After the last criterion of Question 5, write [End of Interview] on its own line and stop. Format your response as shown above, starting with [Question 1]:"""
+
+
+# Stop sequences for the formatted interview: the end marker requested above, or a
+# sixth question; either way the completion ends there instead of running on
+INTERVIEW_END_MARKER = "[End of Interview]"
+INTERVIEW_STOP_SEQUENCES = [INTERVIEW_END_MARKER, "[Question 6]"]
+
 
-Generate the 5-question interview now. Format your response as shown above, starting with [Question 1]:"""
+# Final prompt for structured output (INTERVIEW_OUTPUT_MODE='tool', see interview_schema.py)
+INTERVIEW_GENERATION_TOOL_PROMPT = """Generate the 5-question interview now. Return it by calling the record_interview tool instead of writing it out: for each question give the question text, its subject area as expected_answer, and its 8-10 criteria, each with the criterion name and its 1-2 sentence explanation."""
 
 
 JD_ENHANCEMENT_SYSTEM_PROMPT = """You are an expert at enhancing job descriptions to make them more specific and actionable for technical hiring. 
@@ -95,3 +134,59 @@ INTERVIEW_GENERATION_SYSTEM_PROMPT = """You are an expert technical interviewer
 Your questions are scenario-based, realistic, and designed to reveal whether candidates have real hands-on expertise in the required areas.
 You structure each question with detailed evaluation criteria that differentiate between competency levels.
 You follow the TechScreen Interview Creation Framework."""
+
+
+INTERVIEW_OUTLINE_PROMPT = """You are an expert technical interviewer for TechScreen. Your task is to plan a 5-question interview based on a job description.
+
+HERE IS THE JOB DESCRIPTION:
+{jd_content}
+
+Choose the 5 subject areas the interview should cover. Each subject area becomes one scenario-based question, so together they must cover the core deliverables and technical areas of the role without overlapping.
+
+FORMAT (exactly 5 lines, nothing else):
+1. [Subject Area Name] - [One sentence on what the question should test]
+2. [Subject Area Name] - [One sentence on what the question should test]
+3. [Subject Area Name] - [One sentence on what the question should test]
+4. [Subject Area Name] - [One sentence on what the question should test]
+5. [Subject Area Name] - [One sentence on what the question should test]
+
+Generate the 5 subject areas now:"""
+
+
+INTERVIEW_QUESTION_PROMPT = """You are an expert technical interviewer for TechScreen. Your task is to write ONE question of a 5-question interview based on a job description.
+
+HERE IS THE JOB DESCRIPTION:
+{jd_content}
+
+THIS QUESTION COVERS:
+Subject Area: {subject_area}
+Focus: {focus}
+
+THE OTHER QUESTIONS IN THIS INTERVIEW COVER (do not overlap with them):
+{other_subject_areas}
+
+QUESTION REQUIREMENTS:
+1. The question should be scenario-based and realistic
+2. It should NOT be overly complex or information-heavy (max 3 separate elements)
+3. It must have 8-10 detailed evaluation criteria
+4. Each criterion should have a clear name and a 1-2 sentence explanation
+{repair_instructions}
+FORMAT:
+
+[Question {question_number}]: [Scenario-based question text - keep it concise]
+
+Expected Answer: {subject_area}
+
+[Criterion Name]: [1-2 sentence explanation of what demonstrates mastery]
+[Criterion Name]: [1-2 sentence explanation of what demonstrates mastery]
+... (8-10 total criteria)
+
+Write the question now. Format your response as shown above, starting with [Question {question_number}]:"""
+
+
+INTERVIEW_QUESTION_REPAIR_INSTRUCTIONS = """
+A PREVIOUS ATTEMPT AT THIS QUESTION WAS REJECTED:
+{error}
+
+Make sure the question has question text and 8-10 criteria, each written on its own line as "Criterion Name: explanation".
+"""
@@ -0,0 +1,256 @@
+"""
+Question Cache Sweeper - Size- and age-bounded eviction for the question_cache table.
+Runs in the background of each worker, or once from the command line:
+    python -m backend.question_cache_sweeper --max-entries 10000
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from sqlalchemy import func
+
+from .config import Config, config
+from .models import db, QuestionCache
+
+logger = logging.getLogger(__name__)
+
+# Eviction order of each policy: first rows are evicted first
+EVICTION_ORDER = {
+    'lru': (QuestionCache.last_used_at, QuestionCache.id),
+    'lfu': (QuestionCache.usage_count, QuestionCache.last_used_at, QuestionCache.id),
+    'cost': (
+        QuestionCache.usage_count * func.coalesce(QuestionCache.token_cost, 0),
+        QuestionCache.last_used_at,
+        QuestionCache.id
+    )
+}
+
+
+class QuestionCacheSweeper:
+    """
+    Evicts question cache entries in small batches.
+    
+    A sweep first deletes entries idle (not used) for more than
+    `max_age_days`, then, while the table holds more than `max_entries`,
+    the entries that come first in the policy's order:
+    - 'lru': least recently used
+    - 'lfu': fewest uses, then least recently used
+    - 'cost': fewest tokens saved, i.e. uses times the tokens the question
+      cost to generate, then least recently used
+    
+    Each batch of at most `batch_size` ids is selected and deleted by
+    primary key in its own transaction, so no sweep holds long row or gap
+    locks on MySQL. Evicted entries are also dropped from the in-process
+    QuestionIndex; other workers drop them when a lookup misses. Several
+    workers may sweep at once: deletes by id are idempotent.
+    """
+    
+    def __init__(
+        self,
+        question_index=None,
+        usage_buffer=None,
+        policy: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_age_days: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ):
+        """
+        Initialize Question Cache Sweeper.
+        
+        Args:
+            question_index: QuestionIndex to keep in step with the table (optional)
+            usage_buffer: QuestionUsageBuffer flushed before each sweep, so the
+                          eviction order sees this worker's latest hits (optional)
+            policy: 'lru', 'lfu' or 'cost' (defaults to Config.QUESTION_CACHE_EVICTION_POLICY)
+            max_entries: Entries kept after a sweep; 0 disables (defaults to Config.QUESTION_CACHE_MAX_ENTRIES)
+            max_age_days: Idle days before an entry expires; 0 disables
+                          (defaults to Config.QUESTION_CACHE_MAX_AGE_DAYS)
+            batch_size: Rows deleted per transaction (defaults to Config.QUESTION_CACHE_SWEEP_BATCH_SIZE)
+        
+        Raises:
+            ValueError: If the policy is unknown
+        """
+        self.question_index = question_index
+        self.usage_buffer = usage_buffer
+        self.policy = (policy or Config.QUESTION_CACHE_EVICTION_POLICY).lower()
+        if self.policy not in EVICTION_ORDER:
+            raise ValueError(f"Unknown question cache eviction policy: {self.policy}")
+        self.max_entries = Config.QUESTION_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_age_days = Config.QUESTION_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        self.batch_size = batch_size or Config.QUESTION_CACHE_SWEEP_BATCH_SIZE
+        
+        self._lock = threading.Lock()
+        self._counters = {'sweeps': 0, 'expired': 0, 'evicted': 0}
+        self._last_sweep: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+    
+    def sweep(self) -> Dict[str, Any]:
+        """
+        Run one sweep. Needs an app context; commits after every batch.
+        
+        Returns:
+            Dictionary with 'expired' and 'evicted' (entries deleted by age and
+            by the size limit), 'batches', 'live_entries' and 'duration_ms'
+        """
+        started = datetime.utcnow()
+        report = {'expired': 0, 'evicted': 0, 'batches': 0}
+        if self.usage_buffer is not None:
+            self.usage_buffer.flush()
+        
+        if self.max_age_days:
+            cutoff = started - timedelta(days=self.max_age_days)
+            expired = QuestionCache.query.filter(QuestionCache.last_used_at < cutoff).order_by(QuestionCache.id)
+            report['expired'], report['batches'] = self._delete(expired)
+        
+        if self.max_entries:
+            excess = QuestionCache.query.count() - self.max_entries
+            db.session.commit()
+            if excess > 0:
+                victims = QuestionCache.query.order_by(*EVICTION_ORDER[self.policy])
+                evicted, batches = self._delete(victims, limit=excess)
+                report['evicted'] = evicted
+                report['batches'] += batches
+        
+        report['live_entries'] = QuestionCache.query.count()
+        db.session.commit()
+        report['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+        
+        with self._lock:
+            self._counters['sweeps'] += 1
+            self._counters['expired'] += report['expired']
+            self._counters['evicted'] += report['evicted']
+            self._last_sweep = dict(report, at=started.isoformat())
+        
+        if report['expired'] or report['evicted']:
+            logger.info(
+                f"Question cache sweep ({self.policy}): {report['expired']} expired, "
+                f"{report['evicted']} evicted in {report['batches']} batches, {report['live_entries']} live"
+            )
+        return report
+    
+    def _delete(self, query, limit: Optional[int] = None):
+        """
+        Delete the rows of a query, in order, one batch per transaction.
+        
+        Args:
+            query: QuestionCache query selecting (and ordering) the rows to delete
+            limit: Maximum rows to delete (all if None)
+        
+        Returns:
+            Tuple of (rows deleted, batches)
+        """
+        deleted = batches = 0
+        while limit is None or deleted < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - deleted)
+            ids = [entry_id for (entry_id,) in query.with_entities(QuestionCache.id).limit(size).all()]
+            if not ids:
+                db.session.commit()
+                break
+            QuestionCache.query.filter(QuestionCache.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            
+            if self.question_index is not None:
+                self.question_index.remove(ids)
+            deleted += len(ids)
+            batches += 1
+            if len(ids) < size:
+                break
+        return deleted, batches
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the limits, eviction counters of this process and the live table size.
+        
+        Needs an app context (the live size is counted).
+        
+        Returns:
+            Dictionary with 'policy', 'max_entries', 'max_age_days', 'live_entries',
+            'sweeps', 'expired', 'evicted' and 'last_sweep'
+        """
+        live_entries = QuestionCache.query.count()
+        db.session.commit()
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'max_entries': self.max_entries,
+                'max_age_days': self.max_age_days,
+                'live_entries': live_entries,
+                **self._counters,
+                'last_sweep': self._last_sweep
+            }
+    
+    def ensure_started(self, app):
+        """
+        Start the background sweeper thread of this process, once.
+        
+        The thread is started lazily (on the first request) so it is never
+        inherited across a fork. The interval is read from the app's config
+        (QUESTION_CACHE_SWEEP_INTERVAL; 0 disables the thread).
+        
+        Args:
+            app: Flask application whose context the sweeps run in
+        """
+        interval = app.config.get('QUESTION_CACHE_SWEEP_INTERVAL', Config.QUESTION_CACHE_SWEEP_INTERVAL)
+        if interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(app, interval), name='question-cache-sweeper', daemon=True
+            )
+            self._thread_pid = os.getpid()
+            self._thread.start()
+    
+    def stop(self):
+        """Stop the background thread after its current sweep."""
+        self._stop.set()
+    
+    def _run(self, app, interval: int):
+        """Sweep every interval seconds until stopped; a failed sweep is logged and retried next time."""
+        while not self._stop.wait(interval):
+            with app.app_context():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Question cache sweep failed: {str(e)}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Sweep the question cache once: python -m backend.question_cache_sweeper"""
+    from flask import Flask
+    
+    parser = argparse.ArgumentParser(description='Evict question cache entries in batches')
+    parser.add_argument('--policy', choices=sorted(EVICTION_ORDER), default=None)
+    parser.add_argument('--max-entries', type=int, default=None, help='Entries to keep; 0 disables')
+    parser.add_argument('--max-age-days', type=int, default=None, help='Idle days before expiry; 0 disables')
+    parser.add_argument('--batch-size', type=int, default=None, help='Rows deleted per transaction')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'development'), choices=sorted(config))
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO)
+    app = Flask(__name__)
+    app.config.from_object(config[args.config])
+    db.init_app(app)
+    
+    sweeper = QuestionCacheSweeper(
+        policy=args.policy,
+        max_entries=args.max_entries,
+        max_age_days=args.max_age_days,
+        batch_size=args.batch_size
+    )
+    with app.app_context():
+        print(json.dumps(sweeper.sweep()))
+
+
+if __name__ == '__main__':
+    main()
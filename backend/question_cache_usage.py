@@ -0,0 +1,199 @@
+"""
+Question Cache Usage - Per-worker buffer of question cache hits, flushed in batches.
+Keeps usage_count / last_used_at writes off the request path.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+from sqlalchemy import and_, case, func, or_
+
+from .config import Config
+from .models import db, QuestionCache
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionUsageBuffer:
+    """
+    Collects question cache hits in memory and writes them in batches.
+    
+    A hit only updates a dict entry (hits and last use per cache entry
+    id). A flush swaps the dict out and applies it with one
+    UPDATE ... SET usage_count = usage_count + CASE id ... END per
+    `batch_size` entries, rows in id order so concurrent flushes from
+    several workers lock them in the same order. last_used_at only moves
+    forward, so a late flush cannot roll back a newer timestamp. Hits on
+    entries evicted meanwhile update nothing.
+    
+    A failed flush puts its hits back for the next one. Hits recorded since
+    the last flush are lost if the worker dies without a clean shutdown;
+    on a normal exit the buffer is flushed.
+    """
+    
+    def __init__(self, batch_size: Optional[int] = None):
+        """
+        Initialize Question Usage Buffer.
+        
+        Args:
+            batch_size: Entries updated per statement (defaults to Config.QUESTION_CACHE_SWEEP_BATCH_SIZE)
+        """
+        self.batch_size = batch_size or Config.QUESTION_CACHE_SWEEP_BATCH_SIZE
+        
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[int, datetime]] = {}
+        self._counters = {'recorded': 0, 'flushes': 0, 'rows_flushed': 0, 'failures': 0}
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._app = None
+    
+    def record(self, entry_ids: Iterable[int], used_at: Optional[datetime] = None):
+        """
+        Count one hit on each cache entry. Never touches the database.
+        
+        Args:
+            entry_ids: Ids of the cache entries that were reused
+            used_at: Time of use (defaults to now)
+        """
+        used_at = used_at or datetime.utcnow()
+        with self._lock:
+            for entry_id in entry_ids:
+                hits, last_used_at = self._pending.get(entry_id, (0, used_at))
+                self._pending[entry_id] = (hits + 1, max(last_used_at, used_at))
+                self._counters['recorded'] += 1
+    
+    def flush(self) -> int:
+        """
+        Write the buffered hits. Needs an app context; commits after every batch.
+        
+        Returns:
+            Number of cache entries written
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        
+        items = sorted(pending.items())
+        written = 0
+        try:
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                self._update(batch)
+                db.session.commit()
+                written += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            self._restore(items[written:])
+            with self._lock:
+                self._counters['failures'] += 1
+            logger.warning(f"Question cache usage flush failed, {len(items) - written} entries kept: {str(e)}")
+        
+        with self._lock:
+            self._counters['flushes'] += 1
+            self._counters['rows_flushed'] += written
+        return written
+    
+    def _update(self, batch: List[Tuple[int, Tuple[int, datetime]]]):
+        """Apply one batch of (entry id, (hits, last used)) with a single UPDATE ... CASE."""
+        usage_count = case(
+            {entry_id: hits for entry_id, (hits, _) in batch},
+            value=QuestionCache.id,
+            else_=0
+        )
+        last_used_at = case(
+            *[
+                (
+                    and_(
+                        QuestionCache.id == entry_id,
+                        or_(QuestionCache.last_used_at.is_(None), QuestionCache.last_used_at < used_at)
+                    ),
+                    used_at
+                )
+                for entry_id, (_, used_at) in batch
+            ],
+            else_=QuestionCache.last_used_at
+        )
+        QuestionCache.query.filter(QuestionCache.id.in_([entry_id for entry_id, _ in batch])).update(
+            {
+                QuestionCache.usage_count: func.coalesce(QuestionCache.usage_count, 0) + usage_count,
+                QuestionCache.last_used_at: last_used_at
+            },
+            synchronize_session=False
+        )
+    
+    def _restore(self, items: List[Tuple[int, Tuple[int, datetime]]]):
+        """Put unwritten hits back, merged with any recorded since the flush began."""
+        with self._lock:
+            for entry_id, (hits, used_at) in items:
+                pending_hits, last_used_at = self._pending.get(entry_id, (0, used_at))
+                self._pending[entry_id] = (pending_hits + hits, max(last_used_at, used_at))
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the hits waiting to be written and the flush counters of this process.
+        
+        Returns:
+            Dictionary with 'pending_entries', 'pending_hits', 'recorded',
+            'flushes', 'rows_flushed' and 'failures'
+        """
+        with self._lock:
+            return {
+                'pending_entries': len(self._pending),
+                'pending_hits': sum(hits for hits, _ in self._pending.values()),
+                **self._counters
+            }
+    
+    def ensure_started(self, app):
+        """
+        Start the background flush thread of this process, once.
+        
+        The thread is started lazily (on the first request) so it is never
+        inherited across a fork. The interval is read from the app's config
+        (QUESTION_CACHE_USAGE_FLUSH_INTERVAL; 0 disables the thread, and
+        hits are then written when the sweeper runs or flush is called).
+        The buffer is also flushed when the process exits normally.
+        
+        Args:
+            app: Flask application whose context the flushes run in
+        """
+        interval = app.config.get('QUESTION_CACHE_USAGE_FLUSH_INTERVAL', Config.QUESTION_CACHE_USAGE_FLUSH_INTERVAL)
+        with self._lock:
+            if self._app is None:
+                atexit.register(self._flush_at_exit)
+            self._app = app
+            if interval <= 0:
+                return
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(app, interval), name='question-usage-flusher', daemon=True
+            )
+            self._thread_pid = os.getpid()
+            self._thread.start()
+    
+    def stop(self):
+        """Stop the background thread after its current flush."""
+        self._stop.set()
+    
+    def _run(self, app, interval: int):
+        """Flush every interval seconds until stopped."""
+        while not self._stop.wait(interval):
+            with app.app_context():
+                self.flush()
+    
+    def _flush_at_exit(self):
+        """Write what is left when the worker shuts down."""
+        if self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.warning(f"Question cache usage flush at exit failed: {str(e)}")
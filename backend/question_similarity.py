@@ -0,0 +1,240 @@
+"""
+Question Similarity - Hashed n-gram vectors of interview questions and a cosine index over the question cache.
+Lets a question generated for one role be reused for a near-identical subject area of another.
+"""
+
+import logging
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Optional, List, Tuple, Iterable
+
+import numpy as np
+
+from .models import QuestionCache
+
+logger = logging.getLogger(__name__)
+
+# Vector size; changing it makes stored vectors unusable (they are skipped, not misread)
+EMBEDDING_DIMENSIONS = 1024
+
+# Share of each field in a question's vector. The subject area dominates so that
+# the question text (unknown until a question is generated) cannot carry a match.
+FIELD_WEIGHTS = (('topic', 0.5), ('expected_answer', 0.3), ('text', 0.2))
+
+_TOKEN = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+
+def _stem(word: str) -> str:
+    """Fold plurals ('pipelines' -> 'pipeline') so they do not lower the similarity."""
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def _features(text: str) -> Counter:
+    """Word unigrams, word bigrams and character trigrams of a text."""
+    words = [_stem(word.rstrip('.')) for word in _TOKEN.findall((text or '').lower())]
+    words = [word for word in words if word]
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        features.update(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+def _hashed_vector(text: str, dimensions: int) -> np.ndarray:
+    """Signed feature hashing with sublinear term frequency, L2-normalized."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    features = _features(text)
+    if not features:
+        return vector
+    
+    indexes = np.empty(len(features), dtype=np.int64)
+    values = np.empty(len(features), dtype=np.float32)
+    for i, (feature, count) in enumerate(features.items()):
+        # crc32 rather than hash(): vectors are stored, so hashing must not vary per process
+        digest = zlib.crc32(feature.encode('utf-8'))
+        indexes[i] = digest % dimensions
+        values[i] = (1.0 + math.log(count)) * (1.0 if digest & 0x80000000 else -1.0)
+    np.add.at(vector, indexes, values)
+    
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed_question(
+    topic: str,
+    expected_answer: Optional[str] = None,
+    text: Optional[str] = None,
+    dimensions: int = EMBEDDING_DIMENSIONS
+) -> np.ndarray:
+    """
+    Vectorize a question (or a planned one) for cosine lookup.
+    
+    Each field is hashed into its own normalized n-gram vector; the vectors
+    are combined with FIELD_WEIGHTS and the result is normalized, so a dot
+    product of two embeddings is their cosine similarity.
+    
+    Args:
+        topic: Subject area (e.g. 'CI/CD Pipeline Design')
+        expected_answer: Expected answer / competency the question tests
+        text: Question text, or the focus of an outline item not yet expanded
+        dimensions: Vector size
+    
+    Returns:
+        float32 unit vector (all zeros if every field is empty)
+    """
+    fields = {'topic': topic, 'expected_answer': expected_answer, 'text': text}
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for field, weight in FIELD_WEIGHTS:
+        if fields[field]:
+            vector += weight * _hashed_vector(fields[field], dimensions)
+    
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def topic_key(topic: str) -> str:
+    """Normalized subject area (lowercase words, plurals folded), equal for trivially different spellings."""
+    return ' '.join(_stem(word.rstrip('.')) for word in _TOKEN.findall((topic or '').lower()))
+
+
+def skill_level_key(skill_level: Optional[str]) -> str:
+    """Normalized skill level; questions are only reused within the same level."""
+    return (skill_level or '').strip().lower()
+
+
+class QuestionIndex:
+    """
+    In-process cosine index over the embeddings stored in question_cache.
+    
+    Rows are loaded incrementally by id (see refresh), so a process reads
+    each cached question's vector once. Lookups are one matrix product of
+    the query vectors against the rows of the requested skill level.
+    Entries deleted from the table are dropped from the index when a lookup
+    finds them missing (see remove).
+    """
+    
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        """
+        Initialize Question Index.
+        
+        Args:
+            dimensions: Vector size of the embeddings to index
+        """
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._levels = np.empty(0, dtype=object)
+        self._matrix = np.empty((0, dimensions), dtype=np.float32)
+        self._last_id = 0
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def refresh(self):
+        """
+        Load the cache rows added since the last refresh.
+        
+        Queries through the caller's session, so call it during a short
+        read transaction (phase 1), not while Claude is being called.
+        """
+        rows = (
+            QuestionCache.query
+            .filter(QuestionCache.id > self._last_id, QuestionCache.embedding.isnot(None))
+            .order_by(QuestionCache.id)
+            .with_entities(QuestionCache.id, QuestionCache.skill_level, QuestionCache.embedding)
+            .all()
+        )
+        if rows:
+            self.add(rows)
+            logger.info(f"Loaded {len(rows)} cached question vectors")
+    
+    def add(self, rows: Iterable[Tuple[int, Optional[str], bytes]]):
+        """
+        Add cache entries to the index.
+        
+        Args:
+            rows: (id, skill_level, embedding bytes) tuples
+        """
+        ids, levels, vectors = [], [], []
+        for entry_id, skill_level, embedding in rows:
+            self._last_id = max(self._last_id, entry_id)
+            vector = np.frombuffer(embedding, dtype=np.float32)
+            if len(vector) != self.dimensions:
+                continue
+            ids.append(entry_id)
+            levels.append(skill_level_key(skill_level))
+            vectors.append(vector)
+        if not ids:
+            return
+        
+        with self._lock:
+            known = set(self._ids.tolist())
+            keep = [i for i, entry_id in enumerate(ids) if entry_id not in known]
+            self._ids = np.concatenate([self._ids, np.array([ids[i] for i in keep], dtype=np.int64)])
+            self._levels = np.concatenate([self._levels, np.array([levels[i] for i in keep], dtype=object)])
+            self._matrix = np.vstack([self._matrix] + [vectors[i][np.newaxis] for i in keep])
+    
+    def remove(self, entry_ids: Iterable[int]):
+        """Drop entries (e.g. deleted from the table) from the index."""
+        with self._lock:
+            keep = ~np.isin(self._ids, list(entry_ids))
+            self._ids, self._levels, self._matrix = self._ids[keep], self._levels[keep], self._matrix[keep]
+    
+    def has_level(self, skill_level: Optional[str]) -> bool:
+        """Whether any cached question of the skill level is indexed."""
+        with self._lock:
+            return bool(np.any(self._levels == skill_level_key(skill_level)))
+    
+    def search(
+        self,
+        vectors: List[np.ndarray],
+        skill_level: Optional[str],
+        threshold: float
+    ) -> List[Tuple[Optional[int], float]]:
+        """
+        Find the most similar cached question for each query vector.
+        
+        Each cached question is matched at most once; when two queries want
+        the same entry, the more similar one gets it.
+        
+        Args:
+            vectors: Query embeddings (see embed_question)
+            skill_level: Only entries of this skill level are considered
+            threshold: Minimum cosine similarity of a match
+        
+        Returns:
+            One (cache entry id or None, similarity) tuple per query vector, in order
+        """
+        matches: List[Tuple[Optional[int], float]] = [(None, 0.0)] * len(vectors)
+        if not vectors:
+            return matches
+        
+        with self._lock:
+            mask = self._levels == skill_level_key(skill_level)
+            ids, matrix = self._ids[mask], self._matrix[mask]
+        if not len(ids):
+            return matches
+        
+        similarities = np.stack(vectors) @ matrix.T
+        # Greedy assignment, most similar pairs first
+        taken = set()
+        assigned = set()
+        for flat in np.argsort(similarities, axis=None)[::-1]:
+            query, row = divmod(int(flat), len(ids))
+            score = float(similarities[query, row])
+            if score < threshold:
+                break
+            if query in assigned or row in taken:
+                continue
+            matches[query] = (int(ids[row]), score)
+            assigned.add(query)
+            taken.add(row)
+            if len(assigned) == len(vectors):
+                break
+        return matches
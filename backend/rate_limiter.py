@@ -0,0 +1,337 @@
+"""
+Rate Limiter - Token buckets for Claude requests, shared by all gunicorn workers on a host.
+Budgets and the wait queue live in a SQLite file so every process sees the same state.
+"""
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English prose, used before a request is sent
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text without calling the API.
+    
+    Args:
+        text: Prompt text
+    
+    Returns:
+        Estimated token count (at least 1)
+    """
+    return max(1, math.ceil(len(text or '') / CHARS_PER_TOKEN))
+
+
+class RateLimiter:
+    """
+    Requests-, input-token- and output-token-per-minute budgets across processes.
+    
+    Each budget is a token bucket holding up to one minute's allowance and
+    refilling continuously. Callers take a numbered ticket and are admitted
+    strictly in ticket order, so a large request is not starved by a stream
+    of small ones and no worker can jump the queue. Callers wait rather than
+    fail.
+    
+    The output cost of a request is not known until it finishes, so
+    max_tokens is reserved up front (as the API itself does) and the unused
+    part is returned by settle().
+    
+    The SQLite file is best effort: if it cannot be opened or stays locked,
+    the error is logged and the request is admitted without a reservation
+    (and settle/drain do nothing), so the limiter never fails a request.
+    """
+    
+    BUCKETS = ('requests', 'input_tokens', 'output_tokens')
+    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        requests_per_minute: Optional[int] = None,
+        input_tokens_per_minute: Optional[int] = None,
+        output_tokens_per_minute: Optional[int] = None,
+        poll_interval: float = 0.05,
+        clock=time.time,
+        sleep=time.sleep
+    ):
+        """
+        Initialize Rate Limiter.
+        
+        Args:
+            db_path: SQLite file shared by the workers (defaults to Config.RATE_LIMIT_DB_PATH)
+            requests_per_minute: Defaults to Config.RATE_LIMIT_REQUESTS_PER_MINUTE
+            input_tokens_per_minute: Defaults to Config.RATE_LIMIT_INPUT_TOKENS_PER_MINUTE
+            output_tokens_per_minute: Defaults to Config.RATE_LIMIT_OUTPUT_TOKENS_PER_MINUTE
+            poll_interval: Seconds between checks while waiting behind other callers
+            clock: Time source (injectable for tests)
+            sleep: Sleep function (injectable for tests)
+        
+        A limit of 0 disables that budget.
+        """
+        self.db_path = db_path or Config.RATE_LIMIT_DB_PATH
+        self.limits = {
+            'requests': requests_per_minute if requests_per_minute is not None
+                        else Config.RATE_LIMIT_REQUESTS_PER_MINUTE,
+            'input_tokens': input_tokens_per_minute if input_tokens_per_minute is not None
+                            else Config.RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+            'output_tokens': output_tokens_per_minute if output_tokens_per_minute is not None
+                             else Config.RATE_LIMIT_OUTPUT_TOKENS_PER_MINUTE
+        }
+        self.poll_interval = poll_interval
+        # A waiting caller refreshes its ticket every poll; tickets of dead workers expire
+        self.ticket_ttl = max(10.0, poll_interval * 20)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._counters = {
+            'admitted': 0,
+            'waited': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'drained': 0,
+            'db_errors': 0
+        }
+        
+        self._init_db()
+    
+    def acquire(self, input_tokens: int, output_tokens: int) -> Dict[str, int]:
+        """
+        Block until the request fits every budget, then deduct its cost.
+        
+        Args:
+            input_tokens: Estimated prompt tokens (see estimate_tokens)
+            output_tokens: Output tokens to reserve (the request's max_tokens)
+        
+        Returns:
+            Reservation dictionary to pass to settle()
+        """
+        # A request bigger than a whole bucket could never be admitted; it waits for a full bucket instead
+        reservation = {
+            name: min(amount, self.limits[name])
+            for name, amount in (('requests', 1), ('input_tokens', input_tokens), ('output_tokens', output_tokens))
+            if self.limits[name] > 0
+        }
+        
+        if not reservation or not self.db_path:
+            return {}
+        
+        started = self._clock()
+        
+        try:
+            with self._connect() as conn:
+                ticket = conn.execute(
+                    "INSERT INTO rate_limit_tickets (heartbeat) VALUES (?)", (started,)
+                ).lastrowid
+                slept = False
+                try:
+                    while True:
+                        wait = self._try_admit(conn, ticket, reservation)
+                        if wait is None:
+                            break
+                        self._sleep(min(max(wait, self.poll_interval), 1.0))
+                        slept = True
+                except BaseException:
+                    self._delete_ticket(conn, ticket)
+                    raise
+        except sqlite3.Error as e:
+            # Admitted unreserved; an abandoned ticket expires after ticket_ttl
+            self._db_error('acquire', e)
+            return {}
+        
+        waited = self._clock() - started
+        with self._lock:
+            self._counters['admitted'] += 1
+            if slept:
+                self._counters['waited'] += 1
+                self._counters['total_wait_seconds'] += waited
+                self._counters['max_wait_seconds'] = max(self._counters['max_wait_seconds'], waited)
+        
+        if waited >= 1:
+            logger.info(f"Rate limiter held Claude request for {waited:.1f}s")
+        
+        return reservation
+    
+    def settle(self, reservation: Dict[str, int], usage: Optional[Dict[str, int]] = None):
+        """
+        Correct the buckets once the real token usage is known.
+        
+        Unused reserved tokens are returned; usage above the estimate is
+        deducted. Without usage (the request failed), only the output
+        reservation is returned.
+        
+        Args:
+            reservation: Dictionary returned by acquire()
+            usage: Result 'usage' dictionary with input_tokens/output_tokens
+        """
+        adjustments = {}
+        if 'output_tokens' in reservation:
+            used = usage['output_tokens'] if usage else 0
+            adjustments['output_tokens'] = reservation['output_tokens'] - used
+        if 'input_tokens' in reservation and usage:
+            adjustments['input_tokens'] = reservation['input_tokens'] - usage['input_tokens']
+        
+        adjustments = {name: amount for name, amount in adjustments.items() if amount}
+        if not adjustments or not self.db_path:
+            return
+        
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for name, amount in adjustments.items():
+                    conn.execute(
+                        "UPDATE rate_limit_buckets SET tokens = MIN(?, tokens + ?) WHERE name = ?",
+                        (self.limits[name], amount, name)
+                    )
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._db_error('settle', e)
+    
+    def drain(self):
+        """
+        Empty every bucket after the API reported a rate limit.
+        
+        A 429 means the real budget is already spent, so all workers back
+        off together instead of each discovering it with its own request.
+        """
+        if not self.db_path:
+            return
+        
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE rate_limit_buckets SET tokens = MIN(tokens, 0), updated_at = ?", (self._clock(),))
+        except sqlite3.Error as e:
+            self._db_error('drain', e)
+            return
+        
+        with self._lock:
+            self._counters['drained'] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report wait counters for this process and the current shared queue length.
+        
+        Returns:
+            Dictionary of counters plus 'queue_length' and 'limits'
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 3)
+        stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 3)
+        stats['limits'] = dict(self.limits)
+        
+        if not self.db_path:
+            stats['queue_length'] = None
+            return stats
+        
+        try:
+            with self._connect() as conn:
+                stats['queue_length'] = conn.execute("SELECT COUNT(*) FROM rate_limit_tickets").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limiter stats unavailable: {str(e)}")
+            stats['queue_length'] = None
+        
+        return stats
+    
+    def _try_admit(self, conn: sqlite3.Connection, ticket: int, reservation: Dict[str, int]) -> Optional[float]:
+        """
+        Admit the ticket if it is first in line and every bucket has room.
+        
+        Returns:
+            None if admitted, otherwise seconds to wait before trying again
+        """
+        now = self._clock()
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE rate_limit_tickets SET heartbeat = ? WHERE id = ?", (now, ticket))
+            conn.execute("DELETE FROM rate_limit_tickets WHERE heartbeat < ?", (now - self.ticket_ttl,))
+            
+            head = conn.execute("SELECT MIN(id) FROM rate_limit_tickets").fetchone()[0]
+            if head != ticket:
+                conn.execute("COMMIT")
+                return self.poll_interval
+            
+            wait = 0.0
+            buckets = {}
+            for name, tokens, updated_at in conn.execute("SELECT name, tokens, updated_at FROM rate_limit_buckets"):
+                if name not in reservation:
+                    continue
+                capacity = self.limits[name]
+                refill_rate = capacity / 60.0
+                tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_rate)
+                buckets[name] = tokens
+                if tokens < reservation[name]:
+                    wait = max(wait, (reservation[name] - tokens) / refill_rate)
+            
+            if wait > 0:
+                conn.execute("COMMIT")
+                return wait
+            
+            for name, tokens in buckets.items():
+                conn.execute(
+                    "UPDATE rate_limit_buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                    (tokens - reservation[name], now, name)
+                )
+            conn.execute("DELETE FROM rate_limit_tickets WHERE id = ?", (ticket,))
+            conn.execute("COMMIT")
+            return None
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def _delete_ticket(self, conn: sqlite3.Connection, ticket: int):
+        """Withdraw a ticket that will not be admitted (best effort: it also expires on its own)."""
+        try:
+            conn.execute("DELETE FROM rate_limit_tickets WHERE id = ?", (ticket,))
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limiter could not withdraw ticket {ticket}: {str(e)}")
+    
+    def _db_error(self, operation: str, error: sqlite3.Error):
+        """Log and count a failed SQLite operation; the caller carries on unlimited."""
+        logger.warning(f"Rate limiter {operation} failed, continuing without it: {str(error)}")
+        with self._lock:
+            self._counters['db_errors'] += 1
+    
+    @contextmanager
+    def _connect(self):
+        """Open an autocommit connection; transactions are started explicitly with BEGIN IMMEDIATE."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def _init_db(self):
+        """Create the bucket and ticket tables and fill any new bucket."""
+        now = self._clock()
+        
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                    "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rate_limit_tickets ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, heartbeat REAL NOT NULL)"
+                )
+                for name in self.BUCKETS:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO rate_limit_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                        (name, self.limits[name], now)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limiter unavailable ({self.db_path}), requests are not limited: {str(e)}")
+            with self._lock:
+                self._counters['db_errors'] += 1
+            self.db_path = ''
@@ -0,0 +1,479 @@
+"""
+Response Cache - Content-addressed memoization of Claude API responses.
+Two tiers: an in-process LRU with TTL, and a shared SQLite file readable by all gunicorn workers on a host.
+The SQLite file also holds the leases that keep concurrent misses of one request from all calling Claude.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for Claude response dictionaries.
+    
+    Lookups check the in-process LRU first, then the SQLite tier (promoting
+    hits into memory). Both tiers expire entries after `ttl` seconds and
+    evict the least recently used entries beyond their size caps. Expired
+    entries are kept `stale_ttl` seconds longer for get_stale.
+    
+    Leases coordinate misses: the caller that gets acquire_lease generates
+    the response, others wait for it (see wait). Leases live in the SQLite
+    file, so they are shared by all workers on the host; without the shared
+    tier they only cover the threads of this process. A lease lapses after
+    `lease_ttl` seconds, so a crashed holder cannot block a key for long.
+    
+    The SQLite tier is best effort: if the file cannot be opened or is
+    locked, the error is logged and the lookup counts as a miss (and a
+    lease as acquired).
+    """
+    
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        db_path: Optional[str] = None,
+        disk_max_entries: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        lease_ttl: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        """
+        Initialize Response Cache.
+        
+        Args:
+            ttl: Entry lifetime in seconds (defaults to Config.RESPONSE_CACHE_TTL)
+            max_entries: In-process LRU size (defaults to Config.RESPONSE_CACHE_MAX_ENTRIES)
+            db_path: SQLite file for the shared tier (defaults to Config.RESPONSE_CACHE_DB_PATH).
+                     An empty string disables the shared tier.
+            disk_max_entries: Shared tier size (defaults to Config.RESPONSE_CACHE_DISK_MAX_ENTRIES)
+            stale_ttl: Seconds an expired entry is still returned by get_stale
+                       (defaults to Config.RESPONSE_CACHE_STALE_TTL)
+            lease_ttl: Lease lifetime in seconds (defaults to Config.CACHE_LEASE_TTL)
+            poll_interval: Seconds between checks while waiting on a lease
+                           (defaults to Config.CACHE_LEASE_POLL_INTERVAL)
+        """
+        self.ttl = ttl if ttl is not None else Config.RESPONSE_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else Config.RESPONSE_CACHE_MAX_ENTRIES
+        self.db_path = db_path if db_path is not None else Config.RESPONSE_CACHE_DB_PATH
+        self.disk_max_entries = (
+            disk_max_entries if disk_max_entries is not None else Config.RESPONSE_CACHE_DISK_MAX_ENTRIES
+        )
+        self.stale_ttl = stale_ttl if stale_ttl is not None else Config.RESPONSE_CACHE_STALE_TTL
+        self.lease_ttl = lease_ttl if lease_ttl is not None else Config.CACHE_LEASE_TTL
+        self.poll_interval = poll_interval if poll_interval is not None else Config.CACHE_LEASE_POLL_INTERVAL
+        
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._leases = {}  # key -> (token, expires_at), without the shared tier
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'disk_errors': 0,
+            'stale_hits': 0,
+            'leases': 0,
+            'lease_waits': 0,
+            'lease_wait_hits': 0,
+            'lease_timeouts': 0
+        }
+        
+        if self.db_path:
+            self._init_disk()
+    
+    @staticmethod
+    def make_key(
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        tool: Optional[Dict[str, Any]] = None,
+        stop_sequences: Optional[List[str]] = None,
+        prefill: Optional[str] = None
+    ) -> str:
+        """
+        Build the content address for a request.
+        
+        Args:
+            tool: Tool the request forces Claude to call, if any (its schema
+                  shapes the response, so it is part of the address)
+            stop_sequences: Stop sequences of the request, if any (they decide
+                            where the response ends)
+            prefill: Start of the assistant's reply, if any
+        
+        Returns:
+            SHA-256 hex digest of the request parameters
+        """
+        params = [model, system_prompt, user_prompt, temperature, max_tokens]
+        if tool:
+            params.append(tool)
+        if stop_sequences:
+            params.append(list(stop_sequences))
+        if prefill:
+            params.append({'prefill': prefill})
+        material = json.dumps(params, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            Cached response dictionary or None
+        """
+        value, tier = self._lookup(key)
+        with self._lock:
+            self._counters[tier] += 1
+        return value
+    
+    def get_stale(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an entry that expired less than stale_ttl seconds ago.
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            The expired response dictionary, or None
+        """
+        if not self.stale_ttl:
+            return None
+        now = time.time()
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] <= now < entry[0] + self.stale_ttl:
+                self._counters['stale_hits'] += 1
+                return entry[1]
+        
+        value = self._disk_get(key, now, stale=True)
+        if value is not None:
+            with self._lock:
+                self._counters['stale_hits'] += 1
+        return value
+    
+    def acquire_lease(self, key: str) -> Optional[str]:
+        """
+        Take the lease on a key, unless another caller holds an unexpired one.
+        
+        The key is looked up again once the lease is taken: a holder may have
+        stored its response and released the lease since the caller's miss.
+        Then the lease is given back, and wait returns the stored response.
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            Lease token to pass to release_lease, or None if the lease is held
+            or the response has been stored meanwhile
+        """
+        token = self._take_lease(key)
+        if token is None:
+            return None
+        if self._lookup(key)[0] is not None:
+            self.release_lease(key, token)
+            return None
+        with self._lock:
+            self._counters['leases'] += 1
+        return token
+    
+    def _take_lease(self, key: str) -> Optional[str]:
+        """Insert the lease on a key unless an unexpired one exists; returns its token or None."""
+        token = uuid.uuid4().hex
+        now = time.time()
+        
+        if not self.db_path:
+            with self._lock:
+                holder = self._leases.get(key)
+                if holder is not None and holder[1] > now:
+                    return None
+                self._leases[key] = (token, now + self.lease_ttl)
+            return token
+        
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM response_cache_leases WHERE key = ? AND expires_at <= ?", (key, now))
+                acquired = conn.execute(
+                    "INSERT OR IGNORE INTO response_cache_leases (key, token, expires_at) VALUES (?, ?, ?)",
+                    (key, token, now + self.lease_ttl)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache lease failed: {str(e)}")
+            with self._lock:
+                self._counters['disk_errors'] += 1
+            return token
+        
+        return token if acquired else None
+    
+    def release_lease(self, key: str, token: Optional[str]):
+        """
+        Release a lease taken with acquire_lease (a lapsed or taken-over lease is left alone).
+        
+        Args:
+            key: Cache key from make_key
+            token: Token returned by acquire_lease
+        """
+        if token is None:
+            return
+        
+        if not self.db_path:
+            with self._lock:
+                if self._leases.get(key, (None,))[0] == token:
+                    del self._leases[key]
+            return
+        
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM response_cache_leases WHERE key = ? AND token = ?", (key, token))
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache lease release failed: {str(e)}")
+    
+    def wait(self, key: str, timeout: float) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Wait for the holder of a key's lease to store its response.
+        
+        Polls every poll_interval seconds. If the holder gives up (its lease
+        is released or lapses without a stored response), this caller takes
+        the lease over and generates the response itself.
+        
+        Args:
+            key: Cache key from make_key
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Tuple of (response, None) once it is stored, (None, lease token) if
+            the lease was taken over, or (None, None) on timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._counters['lease_waits'] += 1
+        
+        while True:
+            value, tier = self._lookup(key)
+            if value is not None:
+                with self._lock:
+                    self._counters['lease_wait_hits'] += 1
+                return value, None
+            token = self.acquire_lease(key)
+            if token is not None:
+                return None, token
+            if self._lookup(key)[0] is not None:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self._counters['lease_timeouts'] += 1
+                logger.warning(f"Gave up waiting {timeout}s for a response cache lease")
+                return None, None
+            time.sleep(min(self.poll_interval, remaining))
+    
+    def set(self, key: str, value: Dict[str, Any]):
+        """
+        Store a response in both tiers.
+        
+        Args:
+            key: Cache key from make_key
+            value: JSON-serializable response dictionary
+        """
+        now = time.time()
+        
+        with self._lock:
+            self._memory_set(key, value, now + self.ttl)
+            self._counters['stores'] += 1
+        
+        self._disk_set(key, value, now)
+    
+    def delete(self, key: str):
+        """
+        Remove one entry from both tiers.
+        
+        Args:
+            key: Cache key from make_key
+        """
+        with self._lock:
+            self._memory.pop(key, None)
+        
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache delete failed: {str(e)}")
+    
+    def clear(self):
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM response_cache")
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache clear failed: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit/miss counters and tier sizes for this process.
+        
+        Returns:
+            Dictionary of counters plus 'memory_size' and 'hit_rate'
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_size'] = len(self._memory)
+        
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+    
+    def _lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up an unexpired entry in both tiers without counting it.
+        
+        Returns:
+            Tuple of (response or None, counter to charge: 'memory_hits', 'disk_hits' or 'misses')
+        """
+        now = time.time()
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return value, 'memory_hits'
+                # Kept for get_stale until its stale window is over
+                if expires_at + self.stale_ttl <= now:
+                    del self._memory[key]
+        
+        value = self._disk_get(key, now)
+        if value is None:
+            return None, 'misses'
+        
+        with self._lock:
+            self._memory_set(key, value, now + self.ttl)
+        return value, 'disk_hits'
+    
+    def _memory_set(self, key: str, value: Dict[str, Any], expires_at: float):
+        """Insert into the LRU and evict beyond max_entries. Caller holds the lock."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters['memory_evictions'] += 1
+    
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection to the shared tier for one transaction.
+        
+        A connection per operation keeps the tier safe across threads and
+        gunicorn workers; it commits on success and is always closed.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _init_disk(self):
+        """Create the shared tier table if needed."""
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_response_cache_last_access "
+                    "ON response_cache (last_access)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache_leases ("
+                    "key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk tier unavailable ({self.db_path}): {str(e)}")
+            self.db_path = ''
+    
+    def _disk_get(self, key: str, now: float, stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Read an unexpired (or, with stale, a recently expired) entry from the shared tier and refresh its access time."""
+        if not self.db_path:
+            return None
+        
+        try:
+            with self._connect() as conn:
+                if stale:
+                    row = conn.execute(
+                        "SELECT value FROM response_cache WHERE key = ? AND expires_at <= ? AND expires_at + ? > ?",
+                        (key, now, self.stale_ttl, now)
+                    ).fetchone()
+                else:
+                    row = conn.execute(
+                        "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?",
+                        (key, now)
+                    ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key))
+                return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Response cache disk read failed: {str(e)}")
+            with self._lock:
+                self._counters['disk_errors'] += 1
+            return None
+    
+    def _disk_set(self, key: str, value: Dict[str, Any], now: float):
+        """Write an entry to the shared tier, then drop entries past their stale window and overflow entries."""
+        if not self.db_path:
+            return
+        
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now + self.ttl, now)
+                )
+                evicted = conn.execute(
+                    "DELETE FROM response_cache WHERE expires_at + ? <= ?", (self.stale_ttl, now)
+                ).rowcount
+                overflow = conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] - self.disk_max_entries
+                if overflow > 0:
+                    evicted += conn.execute(
+                        "DELETE FROM response_cache WHERE key IN ("
+                        "SELECT key FROM response_cache ORDER BY last_access LIMIT ?)",
+                        (overflow,)
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk write failed: {str(e)}")
+            with self._lock:
+                self._counters['disk_errors'] += 1
+            return
+        
+        if evicted:
+            with self._lock:
+                self._counters['disk_evictions'] += evicted
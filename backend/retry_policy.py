@@ -0,0 +1,281 @@
+"""
+Retry Policy - Backoff, error classification and circuit breaking for Claude API calls.
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+from anthropic import APIConnectionError, APIStatusError
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: request timeout, lock conflict, rate limit, and
+# everything the server reports as its own failure (including 529 overloaded)
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Claude while the circuit breaker is open."""
+
+
+class RetryPolicy:
+    """
+    Decides whether and how long to wait before retrying a failed Claude call.
+    
+    Delays use decorrelated jitter (each delay is drawn between base_delay and
+    three times the previous delay, capped at max_delay), so concurrent
+    callers spread out instead of retrying in lockstep. A server Retry-After
+    hint is a lower bound on the delay; if it is longer than max_delay the
+    call is not retried at all.
+    """
+    
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        rng: Optional[random.Random] = None,
+        sleep=time.sleep
+    ):
+        """
+        Initialize Retry Policy.
+        
+        Args:
+            max_attempts: Total attempts including the first (defaults to Config.CLAUDE_RETRY_MAX_ATTEMPTS)
+            base_delay: Smallest delay in seconds (defaults to Config.CLAUDE_RETRY_BASE_DELAY)
+            max_delay: Largest delay in seconds (defaults to Config.CLAUDE_RETRY_MAX_DELAY)
+            rng: Random source for jitter (injectable for tests)
+            sleep: Sleep function (injectable for tests)
+        """
+        self.max_attempts = max_attempts or Config.CLAUDE_RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else Config.CLAUDE_RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else Config.CLAUDE_RETRY_MAX_DELAY
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+    
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Whether repeating the same request could succeed.
+        
+        Connection errors, timeouts, 408/409/429 and 5xx responses are
+        retryable. Other 4xx responses (bad request, authentication,
+        permissions, not found) will fail the same way again.
+        """
+        if isinstance(error, APIConnectionError):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+        return False
+    
+    def is_upstream_failure(self, error: Exception) -> bool:
+        """
+        Whether the error indicates the API itself is degraded.
+        
+        Rate limits are excluded: they reflect our own usage, not upstream health.
+        """
+        if isinstance(error, APIConnectionError):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code >= 500
+    
+    def next_delay(self, attempt: int, previous_delay: Optional[float], error: Exception) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, or None to give up.
+        
+        Args:
+            attempt: Number of the attempt that just failed (1-based)
+            previous_delay: Delay used before that attempt (None after the first)
+            error: The error the attempt failed with
+        
+        Returns:
+            Delay in seconds, or None if the error is not retryable, attempts
+            are exhausted, or the server asked for a longer wait than max_delay
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+        
+        upper = max(self.base_delay, (previous_delay or self.base_delay) * 3)
+        delay = min(self.max_delay, self.rng.uniform(self.base_delay, upper))
+        
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                logger.warning(f"Server asked to retry after {retry_after:.1f}s (over {self.max_delay}s); giving up")
+                return None
+            delay = max(delay, retry_after)
+        
+        return delay
+    
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """
+        Read the server's retry hint from retry-after-ms or retry-after headers.
+        
+        Returns:
+            Seconds to wait, or None if the response carries no usable hint
+        """
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        
+        headers = response.headers
+        try:
+            if headers.get('retry-after-ms'):
+                return max(0.0, float(headers['retry-after-ms']) / 1000)
+            value = headers.get('retry-after')
+            if not value:
+                return None
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                retry_at = parsedate_to_datetime(value)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker, tracked separately per model.
+    
+    After `failure_threshold` consecutive upstream failures the circuit opens
+    and calls fail immediately with CircuitOpenError for `reset_timeout`
+    seconds. Then a single trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        clock=time.monotonic
+    ):
+        """
+        Initialize Circuit Breaker.
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+                               (defaults to Config.CIRCUIT_BREAKER_FAILURE_THRESHOLD)
+            reset_timeout: Seconds the circuit stays open before a trial call
+                           (defaults to Config.CIRCUIT_BREAKER_RESET_TIMEOUT)
+            clock: Time source (injectable for tests)
+        """
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout if reset_timeout is not None else Config.CIRCUIT_BREAKER_RESET_TIMEOUT
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, Dict[str, Any]] = {}
+    
+    def before_request(self, key: str):
+        """
+        Check the circuit before calling the API.
+        
+        Args:
+            key: Circuit name (the model)
+        
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial call already in flight
+        """
+        with self._lock:
+            circuit = self._circuit(key)
+            
+            if circuit['state'] == 'closed':
+                return
+            
+            remaining = circuit['opened_at'] + self.reset_timeout - self._clock()
+            if circuit['state'] == 'open' and remaining <= 0:
+                circuit['state'] = 'half_open'
+                circuit['trial_in_flight'] = False
+            
+            if circuit['state'] == 'half_open' and not circuit['trial_in_flight']:
+                circuit['trial_in_flight'] = True
+                logger.info(f"Circuit for {key} half-open: sending a trial request")
+                return
+            
+            circuit['rejected'] += 1
+        
+        raise CircuitOpenError(
+            f"Claude API circuit open for {key}: upstream is failing, retry in {max(0, remaining):.0f}s"
+        )
+    
+    def record_success(self, key: str):
+        """Record a call that reached a healthy upstream; closes the circuit."""
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit['state'] != 'closed':
+                logger.info(f"Circuit for {key} closed")
+            circuit['state'] = 'closed'
+            circuit['consecutive_failures'] = 0
+            circuit['trial_in_flight'] = False
+    
+    def record_failure(self, key: str):
+        """Record an upstream failure; opens the circuit at the threshold or after a failed trial."""
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit['consecutive_failures'] += 1
+            circuit['trial_in_flight'] = False
+            
+            if circuit['state'] == 'half_open' or circuit['consecutive_failures'] >= self.failure_threshold:
+                if circuit['state'] != 'open':
+                    logger.error(f"Circuit for {key} opened after {circuit['consecutive_failures']} failures")
+                    circuit['times_opened'] += 1
+                circuit['state'] = 'open'
+                circuit['opened_at'] = self._clock()
+    
+    def is_open(self, key: str) -> bool:
+        """Whether calls for key would currently be rejected without a trial (no state change)."""
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or circuit['state'] != 'open':
+                return False
+            return circuit['opened_at'] + self.reset_timeout > self._clock()
+    
+    def release(self, key: str):
+        """Forget an in-flight trial call that ended without reaching the API."""
+        with self._lock:
+            self._circuit(key)['trial_in_flight'] = False
+    
+    def reset(self):
+        """Close every circuit and forget all counts."""
+        with self._lock:
+            self._circuits.clear()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Report each circuit's state.
+        
+        Returns:
+            Dictionary keyed by circuit name with state, consecutive_failures,
+            times_opened and rejected counts
+        """
+        with self._lock:
+            return {
+                key: {
+                    'state': circuit['state'],
+                    'consecutive_failures': circuit['consecutive_failures'],
+                    'times_opened': circuit['times_opened'],
+                    'rejected': circuit['rejected']
+                }
+                for key, circuit in self._circuits.items()
+            }
+    
+    def _circuit(self, key: str) -> Dict[str, Any]:
+        """Get or create a circuit's state. Caller holds the lock."""
+        if key not in self._circuits:
+            self._circuits[key] = {
+                'state': 'closed',
+                'consecutive_failures': 0,
+                'opened_at': 0.0,
+                'trial_in_flight': False,
+                'times_opened': 0,
+                'rejected': 0
+            }
+        return self._circuits[key]
+
+
+# Shared by every ClaudeClientService in the process
+circuit_breaker = CircuitBreaker()
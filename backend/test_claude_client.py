@@ -0,0 +1,1214 @@
+"""
+Unit tests for the Claude client layer: response parsing and API call handling.
+
+To run tests from project root:
+    pytest backend/test_claude_client.py -v
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from anthropic import APIConnectionError
+from .claude_client import ClaudeClientService, InterviewStreamParser
+from .response_cache import ResponseCache
+from .rate_limiter import RateLimiter, estimate_tokens
+from .retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError
+from .hedging import HedgingPolicy
+from .model_router import ModelRouter
+from .interview_schema import INTERVIEW_TOOL, parse_interview_tool_input
+from .token_budget import TokenBudgeter, InputTooLargeError, fit_input
+from .input_normalizer import InputNormalizer
+from .claude_simulator import ClaudeSimulator, ClaudeSimulatorServer, SimulatedClaudeClient
+from .prompts import (
+    INTERVIEW_GENERATION_INSTRUCTIONS,
+    INTERVIEW_GENERATION_PROMPT,
+    INTERVIEW_GENERATION_SYSTEM_PROMPT,
+    INTERVIEW_OUTLINE_PROMPT,
+    INTERVIEW_STOP_SEQUENCES,
+    JD_ENHANCEMENT_INSTRUCTIONS,
+    JD_ENHANCEMENT_SYSTEM_PROMPT
+)
+from .config import Config
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'test_fixtures', 'interview_responses')
+
+
+def load_corpus():
+    """Load the recorded Claude interview responses."""
+    corpus = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), newline='') as f:
+            corpus[name] = f.read()
+    return corpus
+
+
+def stream_parse(text, chunk_sizes):
+    """Feed text to an InterviewStreamParser using the given chunk sizes (cycled)."""
+    parser = InterviewStreamParser()
+    questions = []
+    position = 0
+    i = 0
+    while position < len(text):
+        size = chunk_sizes[i % len(chunk_sizes)]
+        questions.extend(parser.feed(text[position:position + size]))
+        position += size
+        i += 1
+    questions.extend(parser.close())
+    return questions
+
+
+class FakeMessages:
+    """Stands in for client.messages, counting create() calls."""
+    
+    def __init__(self, text='Enhanced JD', stop_reason='end_turn'):
+        self.text = text
+        self.stop_reason = stop_reason
+        self.calls = 0
+    
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=f"{self.text} #{self.calls}")],
+            usage=SimpleNamespace(input_tokens=100, output_tokens=50),
+            model=kwargs['model'],
+            stop_reason=self.stop_reason
+        )
+
+
+def make_cached_client(tmp_path, **fake_kwargs):
+    """ClaudeClientService with a fake transport and a response cache in tmp_path."""
+    service = ClaudeClientService(
+        api_key='test-key',
+        response_cache=ResponseCache(db_path=str(tmp_path / 'responses.db'))
+    )
+    service.client = SimpleNamespace(messages=FakeMessages(**fake_kwargs))
+    service.rate_limiter = None
+    return service
+
+
+class FakeClock:
+    """Clock whose sleep() advances time instantly."""
+    
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_limiter(tmp_path, clock=None, **limits):
+    """RateLimiter on a SQLite file in tmp_path; unspecified budgets are disabled."""
+    limits = {
+        'requests_per_minute': 0,
+        'input_tokens_per_minute': 0,
+        'output_tokens_per_minute': 0,
+        **limits
+    }
+    if clock:
+        return RateLimiter(db_path=str(tmp_path / 'limits.db'), clock=clock, sleep=clock.sleep, **limits)
+    return RateLimiter(db_path=str(tmp_path / 'limits.db'), poll_interval=0.005, **limits)
+
+
+class ScriptedTransport:
+    """httpx transport handler replaying scripted (status, headers) responses."""
+    
+    def __init__(self, responses, usage=None, content=None):
+        self.responses = list(responses)
+        self.usage = usage or {'input_tokens': 10, 'output_tokens': 5}
+        self.content = content or [{'type': 'text', 'text': 'Scripted response'}]
+        self.requests = []
+    
+    def __call__(self, request):
+        self.requests.append(request)
+        status, headers = self.responses.pop(0)
+        if status == 200:
+            body = {
+                'id': f"msg_{len(self.requests)}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': 'claude-test',
+                'content': self.content,
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': self.usage
+            }
+        else:
+            body = {'type': 'error', 'error': {'type': 'api_error', 'message': f"HTTP {status}"}}
+        return httpx.Response(status, json=body, headers=headers)
+
+
+def make_transport_client(responses, circuit_breaker=None, usage=None, content=None, **policy):
+    """ClaudeClientService whose SDK talks to a ScriptedTransport; sleeps are recorded, not slept."""
+    transport = ScriptedTransport(responses, usage=usage, content=content)
+    sleeps = []
+    service = ClaudeClientService(
+        api_key='test-key',
+        http_client=httpx.Client(transport=httpx.MockTransport(transport)),
+        retry_policy=RetryPolicy(rng=random.Random(0), sleep=sleeps.append, **policy),
+        circuit_breaker=circuit_breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    )
+    service.response_cache = None
+    service.rate_limiter = None
+    return service, transport, sleeps
+
+
+class FakeStream:
+    """Streaming response that produces its text after a delay, unless closed first."""
+    
+    def __init__(self, text, delay):
+        self.text = text
+        self.delay = delay
+        self.closed = threading.Event()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.closed.set()
+    
+    @property
+    def text_stream(self):
+        if self.closed.wait(self.delay):
+            raise ConnectionError('response closed')
+        yield self.text
+    
+    def close(self):
+        self.closed.set()
+    
+    def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=self.text)],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5),
+            model='claude-test',
+            stop_reason='end_turn'
+        )
+
+
+class HedgeMessages:
+    """Stands in for client.messages; the Nth stream() call answers after delays[N]."""
+    
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.streams = []
+    
+    def stream(self, **kwargs):
+        stream = FakeStream(f"response {len(self.streams) + 1}", self.delays[len(self.streams)])
+        self.streams.append(stream)
+        return stream
+
+
+def make_hedging_client(delays, budget_ratio=1.0):
+    """ClaudeClientService with a warmed-up hedging policy (hedges after ~50ms)."""
+    policy = HedgingPolicy(percentile=50, budget_ratio=budget_ratio, min_samples=5, window_size=20)
+    service = ClaudeClientService(api_key='test-key', hedging_policy=policy)
+    service.client = SimpleNamespace(messages=HedgeMessages(delays))
+    service.response_cache = None
+    service.rate_limiter = None
+    for metric in ('response', 'first_token'):
+        for _ in range(5):
+            policy.record_latency(metric, (service.model, service.max_tokens), 0.05)
+    return service
+
+
+@pytest.fixture
+def claude_client():
+    """Real client service (no API calls are made by the parsing tests)."""
+    return ClaudeClientService(api_key='test-key')
+
+
+class TestInterviewStreamParser:
+    """Tests for the incremental interview parser."""
+    
+    @pytest.mark.parametrize('name', sorted(os.listdir(FIXTURES_DIR)))
+    @pytest.mark.parametrize('chunk_sizes', [[1], [7], [64], [3, 50, 1, 200], [10 ** 6]])
+    def test_matches_batch_parser(self, claude_client, name, chunk_sizes):
+        """Any chunking of a recorded response parses exactly like the batch parser."""
+        text = load_corpus()[name]
+        
+        assert stream_parse(text, chunk_sizes) == claude_client.parse_interview_response(text)
+    
+    def test_matches_batch_parser_random_chunks(self, claude_client):
+        """Random chunk boundaries (including mid-header splits) give identical output."""
+        rng = random.Random(1234)
+        for text in load_corpus().values():
+            expected = claude_client.parse_interview_response(text)
+            for _ in range(20):
+                chunk_sizes = [rng.randint(1, 120) for _ in range(30)]
+                assert stream_parse(text, chunk_sizes) == expected
+    
+    def test_question_completed_by_next_header(self):
+        """A question is returned as soon as the next header line is complete."""
+        parser = InterviewStreamParser()
+        
+        assert parser.feed("[Question 1]: First?\nExpected Answer: Area\nName: Desc\n") == []
+        assert parser.feed("[Question 2]: Sec") == []
+        
+        completed = parser.feed("ond?\n")
+        assert [q['question_number'] for q in completed] == [1]
+        assert completed[0]['criteria'] == [{'criterion': 'Name', 'description': 'Desc'}]
+        assert parser.current_question['question_text'] == 'Second?'
+        
+        assert [q['question_number'] for q in parser.close()] == [2]
+        assert parser.close() == []
+
+
+class TestOutlineParser:
+    """Tests for parse_outline_response."""
+    
+    def test_parses_numbered_outline(self, claude_client):
+        """Numbered lines become subject areas with their focus sentences."""
+        text = (
+            "Here is the outline:\n\n"
+            "1. Distributed Caching - Tests cache invalidation under load.\n"
+            "2) **Event-Driven Architecture** - Tests consumer idempotency.\n"
+            "3. API Design\n"
+        )
+        
+        outline = claude_client.parse_outline_response(text)
+        
+        assert outline == [
+            {'subject_area': 'Distributed Caching', 'focus': 'Tests cache invalidation under load.'},
+            {'subject_area': 'Event-Driven Architecture', 'focus': 'Tests consumer idempotency.'},
+            {'subject_area': 'API Design', 'focus': ''}
+        ]
+
+
+class TestResponseCache:
+    """Tests for response memoization in call_claude."""
+    
+    def test_identical_request_served_from_cache(self, tmp_path):
+        """The second identical call is answered from memory with zero usage."""
+        service = make_cached_client(tmp_path)
+        
+        first = service.call_claude('system', 'prompt', temperature=0.3)
+        second = service.call_claude('system', 'prompt', temperature=0.3)
+        
+        assert service.client.messages.calls == 1
+        assert first['cached'] is False and first['usage']['total_tokens'] == 150
+        assert second['cached'] is True and second['usage']['total_tokens'] == 0
+        assert second['text'] == first['text']
+        assert service.response_cache.stats()['memory_hits'] == 1
+    
+    def test_key_includes_sampling_parameters(self, tmp_path):
+        """A different temperature or max_tokens is a different request."""
+        service = make_cached_client(tmp_path)
+        
+        service.call_claude('system', 'prompt', temperature=0.3)
+        service.call_claude('system', 'prompt', temperature=0.4)
+        service.call_claude('system', 'prompt', temperature=0.3, max_tokens=100)
+        
+        assert service.client.messages.calls == 3
+    
+    def test_use_cache_false_bypasses_lookup(self, tmp_path):
+        """use_cache=False always calls Claude and refreshes the cached entry."""
+        service = make_cached_client(tmp_path)
+        
+        service.call_claude('system', 'prompt')
+        fresh = service.call_claude('system', 'prompt', use_cache=False)
+        cached = service.call_claude('system', 'prompt')
+        
+        assert service.client.messages.calls == 2
+        assert cached['text'] == fresh['text']
+    
+    def test_shared_tier_serves_other_workers(self, tmp_path):
+        """A response cached by one process is found by another through SQLite."""
+        make_cached_client(tmp_path).call_claude('system', 'prompt')
+        
+        other_worker = make_cached_client(tmp_path)
+        result = other_worker.call_claude('system', 'prompt')
+        
+        assert other_worker.client.messages.calls == 0
+        assert result['cached'] is True
+        assert other_worker.response_cache.stats()['disk_hits'] == 1
+    
+    def test_truncated_and_discarded_responses_are_not_reused(self, tmp_path):
+        """max_tokens responses are never cached; discarded ones are removed."""
+        truncated = make_cached_client(tmp_path, stop_reason='max_tokens')
+        truncated.call_claude('system', 'prompt', max_continuations=0)
+        truncated.call_claude('system', 'prompt', max_continuations=0)
+        assert truncated.client.messages.calls == 2
+        
+        service = make_cached_client(tmp_path)
+        result = service.call_claude('system', 'other prompt')
+        service.discard_cached_response(result)
+        service.call_claude('system', 'other prompt')
+        assert service.client.messages.calls == 2
+    
+    def test_size_caps_and_ttl(self, tmp_path):
+        """Both tiers evict least recently used entries; expired entries miss."""
+        db_path = str(tmp_path / 'responses.db')
+        cache = ResponseCache(max_entries=2, db_path=db_path, disk_max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, {'text': key})
+        
+        stats = cache.stats()
+        assert stats['memory_size'] == 2
+        assert stats['memory_evictions'] == 1 and stats['disk_evictions'] == 1
+        
+        fresh = ResponseCache(db_path=db_path)
+        assert fresh.get('a') is None
+        assert fresh.get('c') == {'text': 'c'}
+        
+        expired = ResponseCache(ttl=0, db_path='')
+        expired.set('a', {'text': 'a'})
+        assert expired.get('a') is None
+    
+    def test_lease_given_back_is_not_counted(self, tmp_path):
+        """A lease taken after the response was stored is released and not counted."""
+        for db_path in ('', str(tmp_path / 'responses.db')):
+            cache = ResponseCache(db_path=db_path)
+            token = cache.acquire_lease('key')
+            cache.set('key', {'text': 'stored'})
+            cache.release_lease('key', token)
+            
+            assert cache.acquire_lease('key') is None
+            assert cache.stats()['leases'] == 1
+    
+    def test_concurrent_misses_make_one_call(self, tmp_path):
+        """Identical requests that miss together wait for the first one's response."""
+        service = make_cached_client(tmp_path)
+        service.response_cache.poll_interval = 0.01
+        create = service.client.messages.create
+        service.client.messages.create = lambda **kwargs: (time.sleep(0.2), create(**kwargs))[1]
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(service.call_claude('system', 'prompt')))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert service.client.messages.calls == 1
+        assert sorted(result['cached'] for result in results) == [False, True, True, True]
+        assert {result['text'] for result in results} == {'Enhanced JD #1'}
+        stats = service.response_cache.stats()
+        assert stats['leases'] == 1 and stats['lease_wait_hits'] == 3
+    
+    def test_stale_response_served_while_refreshed(self, tmp_path):
+        """An expired response is returned at once and refreshed by a single background call."""
+        service = make_cached_client(tmp_path)
+        service.response_cache = ResponseCache(ttl=0, stale_ttl=60, db_path=str(tmp_path / 'stale.db'))
+        key = service._cache_key(system_prompt='system', user_prompt='prompt', temperature=0.7, max_tokens=service.max_tokens)
+        service.response_cache.set(key, {'text': 'Old JD', 'usage': {}, 'model': 'm', 'stop_reason': 'end_turn'})
+        refreshed = threading.Event()
+        create = service.client.messages.create
+        service.client.messages.create = lambda **kwargs: (refreshed.wait(5), create(**kwargs))[1]
+        
+        first = service.call_claude('system', 'prompt', max_tokens=service.max_tokens)
+        second = service.call_claude('system', 'prompt', max_tokens=service.max_tokens)
+        assert first['text'] == second['text'] == 'Old JD'
+        assert first['stale'] is True and first['usage']['total_tokens'] == 0
+        
+        refreshed.set()
+        deadline = time.monotonic() + 5
+        while service.response_cache.acquire_lease(key) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert service.client.messages.calls == 1
+        assert service.response_cache.get_stale(key)['text'] == 'Enhanced JD #1'
+
+
+class TestRateLimiter:
+    """Tests for the cross-worker token bucket limiter."""
+    
+    def test_requests_wait_for_refill(self, tmp_path):
+        """A full minute of requests goes through at once; the next waits for refill."""
+        clock = FakeClock()
+        limiter = make_limiter(tmp_path, clock, requests_per_minute=60)
+        
+        for _ in range(60):
+            limiter.acquire(input_tokens=10, output_tokens=10)
+        assert clock.sleeps == []
+        
+        limiter.acquire(input_tokens=10, output_tokens=10)
+        assert sum(clock.sleeps) == pytest.approx(1.0)
+        assert limiter.stats()['waited'] == 1
+    
+    def test_unused_output_reservation_is_returned(self, tmp_path):
+        """max_tokens is reserved up front and the unused part refunded on settle."""
+        clock = FakeClock()
+        limiter = make_limiter(tmp_path, clock, output_tokens_per_minute=6000)
+        
+        reservation = limiter.acquire(input_tokens=100, output_tokens=4000)
+        limiter.settle(reservation, {'input_tokens': 100, 'output_tokens': 500})
+        limiter.acquire(input_tokens=100, output_tokens=4000)
+        
+        assert clock.sleeps == []
+    
+    def test_budget_is_shared_and_drained_across_workers(self, tmp_path):
+        """Limiters on the same file share buckets; a 429 drain makes every worker wait."""
+        clock = FakeClock()
+        worker_a = make_limiter(tmp_path, clock, requests_per_minute=60)
+        worker_b = make_limiter(tmp_path, clock, requests_per_minute=60)
+        
+        worker_a.drain()
+        worker_b.acquire(input_tokens=1, output_tokens=1)
+        
+        assert sum(clock.sleeps) == pytest.approx(1.0)
+    
+    def test_callers_are_admitted_in_arrival_order(self, tmp_path):
+        """A small request arriving later does not overtake a large waiting one."""
+        limiter = make_limiter(tmp_path, input_tokens_per_minute=60000)
+        limiter.drain()
+        admitted = []
+        
+        def request(name, tokens):
+            make_limiter(tmp_path, input_tokens_per_minute=60000).acquire(tokens, 1)
+            admitted.append(name)
+        
+        large = threading.Thread(target=request, args=('large', 200))
+        large.start()
+        time.sleep(0.05)
+        small = threading.Thread(target=request, args=('small', 1))
+        small.start()
+        large.join()
+        small.join()
+        
+        assert admitted == ['large', 'small']
+    
+    def test_call_claude_waits_for_budget(self, tmp_path):
+        """call_claude reserves the estimated prompt size and max_tokens before sending."""
+        clock = FakeClock()
+        service = make_cached_client(tmp_path)
+        service.response_cache = None
+        service.rate_limiter = make_limiter(tmp_path, clock, input_tokens_per_minute=600)
+        prompt = 'x' * 2000
+        
+        service.call_claude('system', prompt)
+        service.call_claude('system', prompt)
+        
+        # Each call is estimated at 502 input tokens; the fake reports 100 used,
+        # so settling the first call leaves 500 and the second waits for 2 more
+        assert estimate_tokens('system') + estimate_tokens(prompt) == 502
+        assert sum(clock.sleeps) == pytest.approx(0.2)
+        assert service.client.messages.calls == 2
+    
+    def test_unwritable_file_admits_without_limiting(self, tmp_path):
+        """A limiter whose SQLite file cannot be opened admits every request instead of failing."""
+        clock = FakeClock()
+        limiter = RateLimiter(
+            db_path=str(tmp_path / 'missing' / 'limits.db'), requests_per_minute=1,
+            input_tokens_per_minute=0, output_tokens_per_minute=0, clock=clock, sleep=clock.sleep
+        )
+        
+        for _ in range(3):
+            limiter.settle(limiter.acquire(input_tokens=10, output_tokens=10), {'input_tokens': 10, 'output_tokens': 5})
+        limiter.drain()
+        
+        stats = limiter.stats()
+        assert clock.sleeps == []
+        assert stats['admitted'] == 0 and stats['drained'] == 0
+        assert stats['db_errors'] == 1 and stats['queue_length'] is None
+    
+    def test_locked_file_does_not_fail_the_call(self, tmp_path, monkeypatch):
+        """A SQLite error while acquiring or settling is logged; the Claude response is still returned."""
+        service = make_cached_client(tmp_path)
+        service.response_cache = None
+        service.rate_limiter = make_limiter(tmp_path, output_tokens_per_minute=6000)
+        acquire = service.rate_limiter.acquire
+        
+        def connect():
+            raise sqlite3.OperationalError('database is locked')
+        
+        def acquire_then_lock(**kwargs):
+            # The file locks up while the first request is in flight
+            reservation = acquire(**kwargs)
+            monkeypatch.setattr(service.rate_limiter, '_connect', connect)
+            return reservation
+        
+        monkeypatch.setattr(service.rate_limiter, 'acquire', acquire_then_lock)
+        
+        result = service.call_claude('system', 'prompt')
+        service.call_claude('system', 'other prompt')
+        
+        assert result['text'] == 'Enhanced JD #1'
+        assert service.client.messages.calls == 2
+        assert service.rate_limiter.stats()['db_errors'] == 2
+
+
+class TestRetryPolicy:
+    """Tests for retries and the circuit breaker against a fake HTTP transport."""
+    
+    def test_retries_server_errors_with_jitter(self):
+        """5xx/529 responses are retried with delays between base and max delay."""
+        service, transport, sleeps = make_transport_client(
+            [(529, {}), (500, {}), (200, {})], base_delay=1, max_delay=20
+        )
+        
+        result = service.call_claude('system', 'prompt')
+        
+        assert result['text'] == 'Scripted response'
+        assert len(transport.requests) == 3
+        assert len(sleeps) == 2
+        assert all(1 <= delay <= 20 for delay in sleeps)
+    
+    def test_honors_retry_after(self):
+        """A retry-after header is a lower bound on the delay."""
+        service, transport, sleeps = make_transport_client(
+            [(429, {'retry-after': '7'}), (200, {})], base_delay=0.5, max_delay=20
+        )
+        
+        service.call_claude('system', 'prompt')
+        
+        assert sleeps[0] >= 7
+    
+    def test_gives_up_when_retry_after_exceeds_max_delay(self):
+        """A server asking for a longer wait than max_delay fails immediately."""
+        service, transport, sleeps = make_transport_client([(429, {'retry-after': '120'})], max_delay=20)
+        
+        with pytest.raises(Exception, match='rate limit exceeded'):
+            service.call_claude('system', 'prompt')
+        
+        assert len(transport.requests) == 1
+        assert sleeps == []
+    
+    def test_client_errors_are_not_retried(self):
+        """A 400 fails the same way every time, so it is raised at once."""
+        service, transport, sleeps = make_transport_client([(400, {})])
+        
+        with pytest.raises(Exception, match='Claude API error'):
+            service.call_claude('system', 'prompt')
+        
+        assert len(transport.requests) == 1
+        assert sleeps == []
+    
+    def test_circuit_opens_then_recovers(self):
+        """Repeated upstream failures open the circuit; after the timeout one trial call closes it."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+        service, transport, sleeps = make_transport_client(
+            [(503, {}), (503, {}), (503, {}), (200, {})], circuit_breaker=breaker, max_attempts=3
+        )
+        
+        with pytest.raises(Exception, match='Claude API error'):
+            service.call_claude('system', 'prompt')
+        assert breaker.stats()[service.model]['state'] == 'open'
+        
+        with pytest.raises(CircuitOpenError):
+            service.call_claude('system', 'prompt')
+        assert len(transport.requests) == 3
+        
+        clock.now += 31
+        assert service.call_claude('system', 'prompt')['success']
+        assert breaker.stats()[service.model]['state'] == 'closed'
+    
+    def test_decorrelated_jitter_stays_within_bounds(self):
+        """Delays grow from the previous delay but never exceed max_delay."""
+        policy = RetryPolicy(max_attempts=50, base_delay=1, max_delay=10, rng=random.Random(42))
+        error = APIConnectionError(request=httpx.Request('POST', 'https://api.anthropic.com/v1/messages'))
+        
+        delay = None
+        for attempt in range(1, 30):
+            previous = delay
+            delay = policy.next_delay(attempt, previous, error)
+            assert 1 <= delay <= min(10, (previous or 1) * 3)
+        
+        assert policy.next_delay(50, delay, error) is None
+        assert policy.next_delay(1, None, ValueError('not an API error')) is None
+
+
+class TestHedging:
+    """Tests for hedged Claude requests."""
+    
+    def test_hedge_wins_over_slow_primary(self):
+        """A backup sent after the latency percentile answers first; the primary is cancelled."""
+        service = make_hedging_client([5.0, 0.0])
+        
+        started = time.monotonic()
+        result = service.call_claude('system', 'prompt', hedge=True)
+        
+        assert time.monotonic() - started < 2
+        assert result['text'] == 'response 2'
+        assert service.client.messages.streams[0].closed.wait(1)
+        stats = service.hedging_policy.stats()
+        assert stats['hedged'] == 1 and stats['hedge_wins'] == 1 and stats['win_rate'] == 1.0
+    
+    def test_hedging_respects_budget(self):
+        """Without budget no backup is sent, and the primary's answer is used."""
+        service = make_hedging_client([0.2], budget_ratio=0)
+        
+        result = service.call_claude('system', 'prompt', hedge=True)
+        
+        assert result['text'] == 'response 1'
+        assert len(service.client.messages.streams) == 1
+        assert service.hedging_policy.stats()['skipped_over_budget'] == 1
+    
+    def test_streaming_hedges_on_first_token(self):
+        """In streaming mode the first attempt to produce text wins."""
+        service = make_hedging_client([5.0, 0.0])
+        
+        events = list(service.stream_claude('system', 'prompt', hedge=True))
+        
+        assert events[0] == {'type': 'text', 'text': 'response 2'}
+        assert events[-1]['result']['text'] == 'response 2'
+    
+    def test_no_hedging_until_enough_samples(self):
+        """The hedge delay is the window percentile once min_samples latencies are known."""
+        policy = HedgingPolicy(percentile=90, budget_ratio=0.05, min_samples=10, window_size=100)
+        for latency in range(1, 10):
+            policy.record_latency('response', 4000, latency)
+        assert policy.hedge_delay('response', 4000) is None
+        
+        policy.record_latency('response', 4000, 10)
+        assert policy.hedge_delay('response', 4000) == 10
+        assert policy.hedge_delay('response', 400) is None
+
+
+class TestPromptCaching:
+    """Tests for prompt cache breakpoints and cache usage accounting."""
+    
+    def test_static_and_context_blocks_carry_cache_control(self, monkeypatch):
+        """static_prompt and cached_context are sent as cached blocks before the variable prompt."""
+        monkeypatch.setattr(Config, 'PROMPT_CACHE_MIN_TOKENS', 0)
+        service, transport, _ = make_transport_client([(200, {})])
+        
+        service.call_claude('system', 'generate now', static_prompt='instructions', cached_context='the JD')
+        
+        body = json.loads(transport.requests[0].content)
+        assert body['system'] == [
+            {'type': 'text', 'text': 'system'},
+            {'type': 'text', 'text': 'instructions', 'cache_control': {'type': 'ephemeral'}}
+        ]
+        assert body['messages'][0]['content'] == [
+            {'type': 'text', 'text': 'the JD', 'cache_control': {'type': 'ephemeral'}},
+            {'type': 'text', 'text': 'generate now'}
+        ]
+    
+    def test_breakpoints_need_a_cacheable_prefix(self):
+        """A breakpoint is only set once the prefix up to it reaches the API's minimum cacheable length."""
+        service, transport, _ = make_transport_client([(200, {}), (200, {})])
+        
+        service.call_claude(
+            JD_ENHANCEMENT_SYSTEM_PROMPT, 'enhance this JD', static_prompt=JD_ENHANCEMENT_INSTRUCTIONS
+        )
+        service.call_claude(
+            INTERVIEW_GENERATION_SYSTEM_PROMPT,
+            'generate now',
+            static_prompt=INTERVIEW_GENERATION_INSTRUCTIONS,
+            cached_context='Builds data pipelines. ' * 200
+        )
+        
+        enhancement, interview = [json.loads(request.content) for request in transport.requests]
+        assert 'cache_control' not in json.dumps(enhancement)
+        assert 'cache_control' not in interview['system'][1]
+        assert interview['messages'][0]['content'][0]['cache_control'] == {'type': 'ephemeral'}
+    
+    def test_plain_prompts_and_disabled_caching_send_no_breakpoints(self, monkeypatch):
+        """Without cacheable parts the request is unchanged; PROMPT_CACHE_ENABLED=False drops cache_control."""
+        monkeypatch.setattr(Config, 'PROMPT_CACHE_ENABLED', False)
+        service, transport, _ = make_transport_client([(200, {}), (200, {})])
+        
+        service.call_claude('system', 'prompt')
+        service.call_claude('system', 'prompt', static_prompt='instructions')
+        
+        plain, split = [json.loads(request.content) for request in transport.requests]
+        assert plain['system'] == 'system'
+        assert plain['messages'][0]['content'] == 'prompt'
+        assert 'cache_control' not in json.dumps(split)
+    
+    def test_usage_includes_cache_reads_and_writes(self):
+        """Cache read and write tokens are reported and counted in total_tokens."""
+        service, _, _ = make_transport_client([(200, {})], usage={
+            'input_tokens': 20,
+            'output_tokens': 5,
+            'cache_creation_input_tokens': 300,
+            'cache_read_input_tokens': 1200
+        })
+        
+        result = service.call_claude('system', 'prompt', static_prompt='instructions')
+        
+        assert result['usage']['cache_read_input_tokens'] == 1200
+        assert result['usage']['cache_creation_input_tokens'] == 300
+        assert result['usage']['total_tokens'] == 1525
+
+
+class TestModelRouter:
+    """Tests for per-operation model routing and fallback."""
+    
+    def _router(self, clock=None, **kwargs):
+        routes = {'jd_enhancement': {'models': ['primary', 'fallback'], 'max_latency': 10}}
+        return ModelRouter(
+            routes=routes, max_error_rate=0.5, min_samples=4, cooldown=60, clock=clock or FakeClock(), **kwargs
+        )
+    
+    def test_falls_back_on_error_rate_and_latency(self):
+        """The primary is used until its error rate or mean latency is over the limit."""
+        errors = self._router()
+        slow = self._router()
+        for seconds in (1, None, None, None):
+            errors.record('jd_enhancement', 'primary', seconds)
+        for _ in range(4):
+            slow.record('jd_enhancement', 'primary', 15)
+        
+        assert self._router().choose('jd_enhancement') == 'primary'
+        assert errors.choose('jd_enhancement') == 'fallback'
+        assert slow.choose('jd_enhancement') == 'fallback'
+        assert errors.choose('unrouted') == errors.default_model
+    
+    def test_primary_is_retried_after_cooldown(self):
+        """An unhealthy model gets traffic again once the cooldown has passed."""
+        clock = FakeClock()
+        router = self._router(clock=clock)
+        for _ in range(4):
+            router.record('jd_enhancement', 'primary', None)
+        assert router.choose('jd_enhancement') == 'fallback'
+        
+        clock.sleep(61)
+        
+        assert router.choose('jd_enhancement') == 'primary'
+        assert router.stats()['jd_enhancement'][0]['calls'] == 0
+    
+    def test_retry_goes_to_fallback_model(self):
+        """A failing primary is abandoned mid-call; the result names the model that answered."""
+        service, transport, _ = make_transport_client([(529, {}), (200, {})])
+        service.model_router = ModelRouter(
+            routes={'jd_enhancement': {'models': ['primary', 'fallback'], 'max_latency': 0}},
+            max_error_rate=0.5,
+            min_samples=1
+        )
+        
+        service.call_claude('system', 'prompt', operation='jd_enhancement')
+        
+        assert [json.loads(request.content)['model'] for request in transport.requests] == ['primary', 'fallback']
+        assert service.model_router.stats()['jd_enhancement'][1]['routed'] == 1
+
+
+class TestStructuredOutput:
+    """Tests for tool-use (structured) interview output."""
+    
+    TOOL_INPUT = {
+        'questions': [
+            {
+                'question_text': 'Design a pipeline: batch or streaming?',
+                'expected_answer': 'Pipeline Design',
+                'criteria': [{'criterion': f'Criterion {i}', 'description': f'Point {i}: detail.'} for i in range(1, 9)]
+            }
+        ]
+    }
+    
+    def test_tool_call_returns_tool_input(self):
+        """Claude is made to call the tool; its input is returned as-is and as JSON text."""
+        service, transport, _ = make_transport_client([(200, {})], content=[
+            {'type': 'tool_use', 'id': 'toolu_1', 'name': 'record_interview', 'input': self.TOOL_INPUT}
+        ])
+        
+        result = service.call_claude('system', 'prompt', tool=INTERVIEW_TOOL)
+        
+        body = json.loads(transport.requests[0].content)
+        assert body['tools'][0]['name'] == 'record_interview'
+        assert body['tool_choice'] == {'type': 'tool', 'name': 'record_interview'}
+        assert result['tool_input'] == self.TOOL_INPUT
+        assert json.loads(result['text']) == self.TOOL_INPUT
+    
+    def test_hedged_tool_call_uses_non_streaming_attempt(self):
+        """Tool calls cannot be streamed by this SDK version, so hedged attempts use create()."""
+        service, transport, _ = make_transport_client([(200, {})], content=[
+            {'type': 'tool_use', 'id': 'toolu_1', 'name': 'record_interview', 'input': self.TOOL_INPUT}
+        ])
+        service.hedging_policy = HedgingPolicy(min_samples=5)
+        
+        result = service.call_claude('system', 'prompt', tool=INTERVIEW_TOOL, hedge=True)
+        
+        assert 'stream' not in json.loads(transport.requests[0].content)
+        assert result['tool_input'] == self.TOOL_INPUT
+    
+    def test_tool_input_is_validated_against_schema(self, claude_client):
+        """Valid input maps to question dictionaries; malformed input is rejected."""
+        questions = claude_client.parse_interview_tool_input(self.TOOL_INPUT)
+        
+        assert questions[0]['question_number'] == 1
+        assert questions[0]['question_text'] == 'Design a pipeline: batch or streaming?'
+        assert questions[0]['criteria'][0] == {'criterion': 'Criterion 1', 'description': 'Point 1: detail.'}
+        with pytest.raises(ValueError, match='questions.0.criteria'):
+            parse_interview_tool_input({
+                'questions': [{'question_text': 'Q', 'expected_answer': 'A', 'criteria': 'none'}]
+            })
+
+
+
+def sse_stream_response(texts, usage, stop_reason='end_turn'):
+    """httpx response carrying a Messages streaming body (Server-Sent Events) with one text delta per entry."""
+    events = [
+        ('message_start', {'type': 'message_start', 'message': {
+            'id': 'msg_stream', 'type': 'message', 'role': 'assistant', 'model': 'claude-test', 'content': [],
+            'stop_reason': None, 'stop_sequence': None, 'usage': usage
+        }}),
+        ('content_block_start', {
+            'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}
+        })
+    ]
+    events += [
+        ('content_block_delta', {
+            'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text}
+        })
+        for text in texts
+    ]
+    events += [
+        ('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+        ('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': stop_reason, 'stop_sequence': None},
+                           'usage': {'output_tokens': 500}}),
+        ('message_stop', {'type': 'message_stop'})
+    ]
+    body = ''.join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events)
+    return httpx.Response(200, content=body.encode(), headers={'content-type': 'text/event-stream'})
+
+
+class TestEarlyStop:
+    """Tests for stop sequences and stopping a stream early."""
+    
+    def _feed_lines(self, parser, lines):
+        questions = []
+        for line in lines:
+            questions.extend(parser.feed(line + "\n"))
+        return questions
+    
+    def test_parser_reports_completion_and_malformed_streams(self):
+        """The last question completes at max criteria or a trailing line; skips and overflow are errors."""
+        by_max = InterviewStreamParser(question_count=2, max_criteria=3)
+        self._feed_lines(by_max, ["[Question 1]: A?", "C1: d", "[Question 2]: B?", "C1: d", "C2: d"])
+        assert not by_max.complete
+        self._feed_lines(by_max, ["C3: d"])
+        assert by_max.complete
+        
+        by_trailing = InterviewStreamParser(question_count=1, max_criteria=10)
+        self._feed_lines(by_trailing, ["[Question 1]: A?", "Expected Answer: Area", "", "C1: d"])
+        assert not by_trailing.complete
+        self._feed_lines(by_trailing, ["", "I hope these questions help"])
+        assert by_trailing.complete
+        assert by_trailing.close()[0]['criteria'] == [{'criterion': 'C1', 'description': 'd'}]
+        
+        skipped = InterviewStreamParser(question_count=5, max_criteria=10)
+        kept = self._feed_lines(skipped, ["[Question 1]: A?", "C1: d", "[Question 3]: C?", "C1: d"])
+        assert skipped.error == "Expected [Question 2] but the stream continued with [Question 3]"
+        assert [q['question_number'] for q in kept + skipped.close()] == [1]
+        
+        overflow = InterviewStreamParser(question_count=5, max_criteria=2)
+        self._feed_lines(overflow, ["[Question 1]: A?", "C1: d", "C2: d", "C3: d"])
+        assert overflow.error == "Question 1 has more than 2 criteria"
+        assert overflow.close() == []
+    
+    def test_stop_when_closes_stream(self):
+        """Once stop_when is true no more text is read; the result covers the text delivered so far."""
+        requests = []
+        
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return sse_stream_response(['one ', 'two ', 'three ', 'four'], {'input_tokens': 40, 'output_tokens': 1})
+        
+        service = ClaudeClientService(
+            api_key='test-key', http_client=httpx.Client(transport=httpx.MockTransport(handler))
+        )
+        service.response_cache = None
+        service.rate_limiter = None
+        
+        events = list(service.stream_claude(
+            'system', 'prompt', stop_sequences=['[End]'], stop_when=lambda text: text == 'two '
+        ))
+        
+        assert [event['text'] for event in events[:-1]] == ['one ', 'two ']
+        result = events[-1]['result']
+        assert result['text'] == 'one two '
+        assert result['stop_reason'] == 'stop_requested'
+        assert result['usage']['input_tokens'] == 40
+        assert result['usage']['output_tokens'] == estimate_tokens('one two ')
+        assert requests[0]['stop_sequences'] == ['[End]']
+    
+    def test_stop_sequences_are_part_of_cache_key(self, tmp_path):
+        """A response produced with stop sequences is not reused for a request without them."""
+        service = ClaudeClientService(
+            api_key='test-key', response_cache=ResponseCache(db_path=str(tmp_path / 'responses.db'))
+        )
+        
+        plain = service._cache_key('system', 'prompt', 0.4, 100)
+        stopped = service._cache_key('system', 'prompt', 0.4, 100, stop_sequences=['[End]'])
+        
+        assert plain != stopped
+
+
+class SegmentMessages:
+    """Stands in for client.messages; each create() answers with the next (text, stop_reason) segment (None: no content)."""
+    
+    def __init__(self, segments):
+        self.segments = list(segments)
+        self.requests = []
+    
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        text, stop_reason = self.segments.pop(0)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=text)] if text is not None else [],
+            usage=SimpleNamespace(input_tokens=100, output_tokens=50),
+            model=kwargs['model'],
+            stop_reason=stop_reason
+        )
+
+
+class TestContinuation:
+    """Tests for continuing responses cut off at max_tokens."""
+    
+    def test_truncated_response_is_continued_from_prefill(self, tmp_path):
+        """The partial text is sent back as the assistant's reply; segments are stitched and usage summed."""
+        service = make_cached_client(tmp_path)
+        service.client = SimpleNamespace(messages=SegmentMessages([
+            ("[Question 1]: Design a cache?\n\nExpected Answer: Caching\n", 'max_tokens'),
+            ("\nInvalidation: Explains TTLs.", 'end_turn')
+        ]))
+        
+        result = service.call_claude('system', 'prompt')
+        
+        continuation_request = service.client.messages.requests[1]
+        assert continuation_request['messages'][-1] == {
+            'role': 'assistant', 'content': "[Question 1]: Design a cache?\n\nExpected Answer: Caching"
+        }
+        assert result['text'] == "[Question 1]: Design a cache?\n\nExpected Answer: Caching\nInvalidation: Explains TTLs."
+        assert result['stop_reason'] == 'end_turn'
+        assert result['continuations'] == 1
+        assert result['usage']['total_tokens'] == 300
+        assert service.call_claude('system', 'prompt')['cached'] is True
+    
+    def test_continuation_without_content(self, tmp_path):
+        """A continuation that ends at once with empty content keeps the text received so far."""
+        service = make_cached_client(tmp_path)
+        service.client = SimpleNamespace(messages=SegmentMessages([('Complete answer.', 'max_tokens'), (None, 'end_turn')]))
+        
+        result = service.call_claude('system', 'prompt')
+        
+        assert result['success'] is True
+        assert result['text'] == 'Complete answer.'
+        assert result['stop_reason'] == 'end_turn'
+    
+    def test_continuations_are_capped(self, tmp_path):
+        """After max_continuations the response is returned truncated, and not cached."""
+        service = make_cached_client(tmp_path)
+        service.client = SimpleNamespace(messages=SegmentMessages([('part ', 'max_tokens')] * 3))
+        
+        result = service.call_claude('system', 'prompt', max_continuations=2)
+        
+        assert result['text'] == 'part part part '
+        assert result['stop_reason'] == 'max_tokens'
+        assert len(service.client.messages.requests) == 3
+        assert service.response_cache.stats()['memory_size'] == 0
+    
+    def test_truncated_stream_is_continued(self):
+        """The continuation streams on as part of the same response."""
+        requests = []
+        segments = [(['one two\n'], 'max_tokens'), (['\nthree'], 'end_turn')]
+        
+        def handler(request):
+            requests.append(json.loads(request.content))
+            texts, stop_reason = segments.pop(0)
+            return sse_stream_response(texts, {'input_tokens': 40, 'output_tokens': 1}, stop_reason=stop_reason)
+        
+        service = ClaudeClientService(
+            api_key='test-key', http_client=httpx.Client(transport=httpx.MockTransport(handler))
+        )
+        service.response_cache = None
+        service.rate_limiter = None
+        
+        events = list(service.stream_claude('system', 'prompt'))
+        
+        assert [event['text'] for event in events[:-1]] == ['one two\n', 'three']
+        assert events[-1]['result']['text'] == 'one two\nthree'
+        assert events[-1]['result']['usage']['output_tokens'] == 1000
+        assert requests[1]['messages'][-1] == {'role': 'assistant', 'content': 'one two'}
+
+
+class TestTokenBudget:
+    """Tests for max_tokens learned from past output sizes and the input limit."""
+    
+    def test_budget_follows_percentile_of_recorded_outputs(self):
+        """The default is used until min_samples; then the percentile plus headroom, rounded and clamped."""
+        budgeter = TokenBudgeter(
+            percentile=90, headroom=1.25, min_samples=10, window_size=50,
+            default_max_tokens=4096, min_max_tokens=512
+        )
+        for output_tokens in range(100, 1000, 100):
+            budgeter.record('jd_enhancement', output_tokens)
+        assert budgeter.max_tokens('jd_enhancement') == 4096
+        
+        budgeter.record('jd_enhancement', 1000)
+        # p90 of 100..1000 is 900; 900 * 1.25 = 1125, rounded up to 1280
+        assert budgeter.max_tokens('jd_enhancement') == 1280
+        assert budgeter.max_tokens('interview_generation') == 4096
+        
+        for _ in range(50):
+            budgeter.record('jd_enhancement', 50)
+        assert budgeter.max_tokens('jd_enhancement') == 512
+        assert budgeter.stats()['jd_enhancement'] == {'samples': 50, 'max_tokens': 512}
+    
+    def test_call_uses_and_learns_budget(self, tmp_path):
+        """Calls without an explicit max_tokens get the learned budget and feed it their output size."""
+        service = make_cached_client(tmp_path)
+        service.client = SimpleNamespace(messages=SegmentMessages([('text', 'end_turn')] * 3))
+        service.token_budgeter = TokenBudgeter(min_samples=1, headroom=1.0, default_max_tokens=4096)
+        
+        service.call_claude('system', 'first', operation='jd_enhancement')
+        service.call_claude('system', 'second', operation='jd_enhancement')
+        service.call_claude('system', 'third', operation='jd_enhancement', max_tokens=2000)
+        
+        requested = [request['max_tokens'] for request in service.client.messages.requests]
+        assert requested == [4096, service.token_budgeter.min_max_tokens, 2000]
+    
+    def test_fit_input_compresses_or_rejects(self):
+        """Whitespace is squeezed when that brings the text under the limit; otherwise it is rejected."""
+        padded = 'Builds   data pipelines.   \n\n\n\n\n' * 40
+        limit = estimate_tokens(padded) - 1
+        
+        assert fit_input('short', max_tokens=limit) == 'short'
+        compressed = fit_input(padded, max_tokens=limit)
+        assert estimate_tokens(compressed) <= limit
+        assert 'Builds data pipelines.\n\nBuilds' in compressed
+        with pytest.raises(InputTooLargeError, match='Job description is too long'):
+            fit_input('word ' * 1000, max_tokens=100, label='Job description')
+
+
+class TestInputNormalizer:
+    """Tests for the deterministic job description clean-up."""
+    
+    ATS_EXPORT = (
+        "<h2>About the Role</h2><p>You will build <b>data</b> pipelines&nbsp;in   Python.</p>"
+        "<ul><li>Own the ETL platform</li></ul><p>We ship weekly.</p>"
+        "<ul><li>Medical, dental and vision insurance</li><li>401(k) match</li></ul>"
+        "<p>Acme is an Equal Opportunity Employer. All qualified applicants will receive consideration.</p>\n\n"
+        "## Requirements\n* **5+ years** of [Python](https://example.com/python)\n\n"
+        "<p>You will build <b>data</b> pipelines in Python.</p>"
+    )
+    
+    def test_markup_boilerplate_and_repeats_are_removed(self):
+        """HTML and markdown become text, boilerplate blocks go, and a repeated paragraph is kept once."""
+        result = InputNormalizer().normalize(self.ATS_EXPORT)
+        
+        assert result['text'] == (
+            "About the Role\n\n"
+            "You will build data pipelines in Python.\n\n"
+            "- Own the ETL platform\n\n"
+            "We ship weekly.\n\n"
+            "Requirements\n- 5+ years of Python"
+        )
+        assert result['chars_saved'] == len(self.ATS_EXPORT) - len(result['text'])
+        assert result['tokens_saved'] == estimate_tokens(self.ATS_EXPORT) - estimate_tokens(result['text'])
+    
+    def test_normalization_is_idempotent_and_configurable(self):
+        """Normalized text is left as it is, and the phrase index comes from the given phrases."""
+        normalizer = InputNormalizer(boilerplate_phrases=['free snacks'])
+        once = normalizer.normalize("Builds APIs.\n\nFree   snacks daily.\n\nEqual opportunity employer.")
+        
+        assert once['text'] == "Builds APIs.\n\nEqual opportunity employer."
+        assert normalizer.normalize(once['text']) == {'text': once['text'], 'chars_saved': 0, 'tokens_saved': 0}
+    
+    def test_duties_mentioning_boilerplate_phrases_are_kept(self):
+        """A Benefits Specialist's duties survive; only blocks that are mostly boilerplate are dropped."""
+        duties = (
+            "Responsibilities:\n"
+            "- Administer medical, dental and vision plans and the 401(k) program for 2,000 employees.\n"
+            "- Coordinate background check vendors and reasonable accommodation requests.\n"
+            "- Answer employee questions about enrollment and eligibility.\n"
+            "- Reconcile monthly carrier invoices with payroll deductions."
+        )
+        text = duties + "\n\nWe are an equal opportunity employer. Applicants will not be subject to E-Verify delays."
+        
+        assert InputNormalizer().normalize(text)['text'] == duties
+    
+    def test_plain_text_with_angle_brackets_and_underscores_is_kept(self):
+        """Comparisons, C++ templates and dunder names are not mistaken for markup."""
+        text = (
+            "Requirements: 5 < 10 years of experience with C++ templates like vector<int> "
+            "and __init__ methods in Python."
+        )
+        
+        assert InputNormalizer().normalize(text)['text'] == text
+        assert InputNormalizer().normalize(
+            "<p>Knows map&lt;K, V&gt;, snake__case__names and __bold text__.</p>"
+        )['text'] == "Knows map<K, V>, snake__case__names and bold text."
+
+
+def make_simulated_client(**simulator_kwargs):
+    """SimulatedClaudeClient that answers instantly and retries without sleeping."""
+    sleeps = []
+    service = SimulatedClaudeClient(
+        ClaudeSimulator(time_scale=0, **simulator_kwargs),
+        retry_policy=RetryPolicy(rng=random.Random(0), sleep=sleeps.append),
+        circuit_breaker=CircuitBreaker()
+    )
+    service.response_cache = None
+    service.rate_limiter = None
+    service.sleeps = sleeps
+    return service
+
+
+class TestSimulator:
+    """Tests for the Messages API simulator."""
+    
+    def test_simulated_interviews_pass_validation(self):
+        """Tool, text and outline answers go through the real parsers and validation."""
+        service = make_simulated_client()
+        
+        tool_result = service.call_claude('system', INTERVIEW_GENERATION_PROMPT, tool=INTERVIEW_TOOL)
+        assert service.validate_interview_structure(parse_interview_tool_input(tool_result['tool_input']))
+        
+        text_result = service.call_claude(
+            INTERVIEW_GENERATION_SYSTEM_PROMPT, INTERVIEW_GENERATION_PROMPT, stop_sequences=INTERVIEW_STOP_SEQUENCES
+        )
+        assert text_result['stop_reason'] == 'stop_sequence'
+        assert service.validate_interview_structure(service.parse_interview_response(text_result['text']))
+        
+        outline = service.call_claude('system', INTERVIEW_OUTLINE_PROMPT.format(jd_content='Builds data pipelines'))
+        assert len(service.parse_outline_response(outline['text'])) == Config.INTERVIEW_QUESTION_COUNT
+    
+    def test_stream_and_continuation_match_the_full_answer(self):
+        """Streams arrive in chunks, and a truncated answer continued from its prefill equals the whole one."""
+        service = make_simulated_client(chunk_tokens=4)
+        full = service.call_claude(INTERVIEW_GENERATION_SYSTEM_PROMPT, INTERVIEW_GENERATION_PROMPT)
+        
+        events = list(service.stream_claude(INTERVIEW_GENERATION_SYSTEM_PROMPT, INTERVIEW_GENERATION_PROMPT))
+        continued = service.call_claude(
+            INTERVIEW_GENERATION_SYSTEM_PROMPT, INTERVIEW_GENERATION_PROMPT, max_tokens=200, max_continuations=20
+        )
+        
+        assert len(events) > 100
+        assert events[-1]['result']['text'] == full['text']
+        assert continued['continuations'] > 0
+        assert continued['text'] == full['text']
+    
+    def test_injected_errors_are_retried(self):
+        """Scripted 429 and 529 responses go through the client's retry policy."""
+        service = make_simulated_client(retry_after=2.5)
+        service.simulator.fail_next(429, 529)
+        
+        result = service.call_claude('system', 'prompt')
+        
+        assert result['success'] is True
+        assert service.sleeps[0] >= 2.5
+        assert service.simulator.stats()['errors'] == 2
+    
+    def test_http_stand_in(self, monkeypatch):
+        """CLAUDE_BASE_URL points the real client at the local HTTP server."""
+        server = ClaudeSimulatorServer(ClaudeSimulator(time_scale=0))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            monkeypatch.setattr(Config, 'CLAUDE_BASE_URL', server.base_url)
+            service = ClaudeClientService(api_key='test-key', response_cache=None, rate_limiter=None)
+            service.response_cache = None
+            service.rate_limiter = None
+            
+            events = list(service.stream_claude(INTERVIEW_GENERATION_SYSTEM_PROMPT, INTERVIEW_GENERATION_PROMPT))
+            
+            assert service.validate_interview_structure(service.parse_interview_response(events[-1]['result']['text']))
+            assert server.simulator.stats()['streamed'] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -11,14 +11,33 @@ To run from backend folder:
 """
 
 import pytest
+import httpx
+import numpy as np
 import json
-from datetime import datetime
+import re
+import threading
+import time
+from datetime import datetime, timedelta
 from flask import Flask
-from .config import TestingConfig
-from .models import db, JobDescription, Interview, InterviewQuestion
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from .config import Config, TestingConfig
+from .models import db, JobDescription, Interview, InterviewQuestion, GenerationLog, GenerationJob, QuestionCache, CacheLease
 from .jd_enhancement_service import JDEnhancementService
 from .interview_generation_service import InterviewGenerationService
-from .claude_client import MockClaudeClient
+from .claude_client import ClaudeClientService, MockClaudeClient
+from .prompts import INTERVIEW_GENERATION_SYSTEM_PROMPT
+from .job_service import JobService, JobQueueFullError
+from .batch_service import BatchService
+from .response_cache import ResponseCache
+from .claude_simulator import ClaudeSimulator, SimulatedClaudeClient
+from .question_similarity import QuestionIndex, embed_question, topic_key
+from .jd_condenser import JDCondenser
+from .jd_deduplication import BASIC, ENHANCED, MinHasher, NearDuplicateIndex, backfill_signatures
+from .question_cache_sweeper import QuestionCacheSweeper
+from .question_cache_usage import QuestionUsageBuffer
+from .cache_leases import CacheLeases
+from .token_budget import TokenBudgeter
 
 
 @pytest.fixture
@@ -48,6 +67,128 @@ def mock_claude_client():
     return MockClaudeClient()
 
 
+def make_valid_questions():
+    """Build a parsed 5-question interview that passes validation."""
+    return [
+        {
+            'question_number': n,
+            'question_text': f'Question {n}?',
+            'expected_answer': f'Answer {n}',
+            'criteria': [
+                {'criterion': f'Criterion {i}', 'description': f'Description {i}'}
+                for i in range(1, 9)
+            ]
+        } for n in range(1, 6)
+    ]
+
+
+def build_interview_text(question_count=5, criteria_count=8):
+    """Build a Claude-formatted interview response."""
+    blocks = []
+    for n in range(1, question_count + 1):
+        lines = [
+            f"[Question {n}]: How would you approach scenario {n}?",
+            "",
+            f"Expected Answer: Subject Area {n}",
+            ""
+        ]
+        lines += [
+            f"Criterion {n}.{i}: Demonstrates understanding of point {i} for scenario {n}."
+            for i in range(1, criteria_count + 1)
+        ]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def build_interview_input(question_count=5, criteria_count=8):
+    """Build record_interview tool input, with colons inside the text."""
+    return {
+        'questions': [
+            {
+                'question_text': f"Scenario {n}: the nightly ETL job misses its SLA. What do you do?",
+                'expected_answer': f"Subject Area {n}",
+                'criteria': [
+                    {'criterion': f"Criterion {n}.{i}", 'description': f"Covers point {i}: e.g. retries, backfill."}
+                    for i in range(1, criteria_count + 1)
+                ]
+            }
+            for n in range(1, question_count + 1)
+        ]
+    }
+
+
+class RecordedClaudeClient(ClaudeClientService):
+    """
+    Claude client that replays a recorded response text.
+    Uses the real parsing and validation logic without any API access.
+    """
+    
+    def __init__(self, text, chunk_size=40):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.chunks_sent = 0
+        self.calls = []
+        self.stream_kwargs = []
+    
+    def _result(self):
+        return {
+            'success': True,
+            'text': self.text,
+            'usage': {'input_tokens': 1000, 'output_tokens': 2000, 'total_tokens': 3000},
+            'model': 'claude-opus-4-1',
+            'stop_reason': 'end_turn'
+        }
+    
+    def call_claude(self, system_prompt, user_prompt, **kwargs):
+        self.calls.append(user_prompt)
+        return self._result()
+    
+    def stream_claude(self, system_prompt, user_prompt, stop_when=None, **kwargs):
+        self.calls.append(user_prompt)
+        self.stream_kwargs.append(kwargs)
+        result = self._result()
+        for i in range(0, len(self.text), self.chunk_size):
+            self.chunks_sent += 1
+            chunk = self.text[i:i + self.chunk_size]
+            yield {'type': 'text', 'text': chunk}
+            if stop_when is not None and stop_when(chunk):
+                result.update(text=self.text[:i + self.chunk_size], stop_reason='stop_requested')
+                break
+        yield {'type': 'done', 'result': result}
+
+
+class SlowConnectionCheckingClient(MockClaudeClient):
+    """
+    Mock client that simulates a slow Claude call and records whether a
+    database connection was checked out from the pool while it ran.
+    """
+    
+    def __init__(self):
+        self.connections_held = []
+        self.transactions_open = []
+        self._checked_out = 0
+    
+    def watch(self, engine):
+        """Track pool checkouts on the given engine."""
+        def on_checkout(*args):
+            self._checked_out += 1
+        
+        def on_checkin(*args):
+            self._checked_out -= 1
+        
+        event.listen(engine, 'checkout', on_checkout)
+        event.listen(engine, 'checkin', on_checkin)
+    
+    def call_claude(self, system_prompt, user_prompt, **kwargs):
+        self.connections_held.append(self._checked_out)
+        self.transactions_open.append(db.session().in_transaction())
+        time.sleep(0.05)
+        return super().call_claude(system_prompt, user_prompt, **kwargs)
+    
+    def parse_interview_response(self, response_text):
+        return make_valid_questions()
+
+
 class TestJDEnhancementService:
     """Tests for JD Enhancement Service."""
     
@@ -70,6 +211,118 @@ class TestJDEnhancementService:
             assert 'job_description_id' in result
             assert 'enhanced_jd' in result
     
+    def test_long_description_is_condensed(self, app):
+        """A description over the threshold is condensed per chunk, and re-pasting it reuses the summaries."""
+        class CondensingClient(MockClaudeClient):
+            def __init__(self):
+                self.response_cache = ResponseCache(db_path='')
+                self.prompts = []
+            
+            def call_claude(self, system_prompt, user_prompt, **kwargs):
+                self.prompts.append((kwargs.get('operation'), user_prompt))
+                result = super().call_claude(system_prompt, user_prompt, **kwargs)
+                if kwargs.get('operation') == 'jd_condensation':
+                    result['text'] = f"Summary of {user_prompt.split('PART ')[1].split(':')[0]}"
+                return result
+        
+        sections = [f"Section {n}: builds data pipelines. " + 'Company history and benefits. ' * 30 for n in range(30)]
+        description = '\n\n'.join(sections)
+        
+        with app.app_context():
+            client = CondensingClient()
+            service = JDEnhancementService(client)
+            result = service.enhance_jd(
+                req_id='REQ-050', basic_title='Engineer', basic_description=description, user_id='user123'
+            )
+            
+            condensation_calls = [prompt for operation, prompt in client.prompts if operation == 'jd_condensation']
+            enhancement_prompt = client.prompts[-1][1]
+            assert result['success'] == True
+            assert result['condensed_chunks'] == len(condensation_calls) > 1
+            assert 'Summary of 1 OF' in enhancement_prompt
+            assert 'Company history' not in enhancement_prompt
+            assert result['tokens_used'] == 200 * (len(condensation_calls) + 1)
+            assert JobDescription.query.filter_by(req_id='REQ-050').first().basic_description == description
+            
+            client.prompts.clear()
+            service.enhance_jd(req_id='REQ-050', basic_title='Engineer', basic_description=description, user_id='user123')
+            assert [operation for operation, _ in client.prompts] == ['jd_enhancement']
+    
+    def test_concurrent_condensations_share_chunk_summaries(self):
+        """Two requests condensing the same description call Claude once per chunk between them."""
+        class SlowClient(MockClaudeClient):
+            def __init__(self):
+                self.response_cache = ResponseCache(db_path='', poll_interval=0.01)
+                self.cache_leases = True
+                self.lease_wait_timeout = 5
+                self.prompts = []
+            
+            def call_claude(self, system_prompt, user_prompt, **kwargs):
+                self.prompts.append(user_prompt)
+                time.sleep(0.1)
+                return super().call_claude(system_prompt, user_prompt, **kwargs)
+        
+        client = SlowClient()
+        condenser = JDCondenser(client, threshold_tokens=100, chunk_tokens=200, max_workers=4, max_rounds=1)
+        description = '\n\n'.join(f"Section {n}: " + 'builds data pipelines. ' * 30 for n in range(4))
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(condenser.condense(description))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        chunks = len(condenser.split(description))
+        assert len(client.prompts) == len(set(client.prompts)) == chunks
+        # Each chunk is generated by one request and read from the cache by the other
+        assert sum(result['cached_chunks'] for result in results) == chunks
+    
+    def test_token_history_retried_after_failed_load(self, app):
+        """A failed generation_logs query leaves the operation unloaded, so the next call seeds it."""
+        with app.app_context():
+            budgeter = TokenBudgeter(min_samples=3, headroom=1.0, default_max_tokens=4096, min_max_tokens=256)
+            GenerationLog.__table__.drop(db.engine)
+            with pytest.raises(OperationalError):
+                budgeter.ensure_history('jd_enhancement')
+            db.session.rollback()
+            
+            GenerationLog.__table__.create(db.engine)
+            for output_tokens in (600, 700, 800):
+                db.session.add(GenerationLog(
+                    operation_type='jd_enhancement', req_id='REQ-052', user_id='user123',
+                    status='success', output_tokens=output_tokens
+                ))
+            db.session.commit()
+            budgeter.ensure_history('jd_enhancement')
+            
+            assert budgeter.stats()['jd_enhancement'] == {'samples': 3, 'max_tokens': 1024}
+    
+    def test_description_is_normalized_before_prompt(self, app):
+        """Boilerplate and markup never reach Claude, and the saving is reported."""
+        class PromptRecordingClient(MockClaudeClient):
+            def call_claude(self, system_prompt, user_prompt, **kwargs):
+                self.user_prompt = user_prompt
+                return super().call_claude(system_prompt, user_prompt, **kwargs)
+        
+        with app.app_context():
+            client = PromptRecordingClient()
+            result = JDEnhancementService(client).enhance_jd(
+                req_id='REQ-051',
+                basic_title='Engineer',
+                basic_description=(
+                    "<p>Builds <b>data</b> pipelines.</p>"
+                    "<p>We are an equal opportunity employer and do not discriminate.</p>"
+                ),
+                user_id='user123'
+            )
+            
+            assert result['success'] == True
+            assert 'Builds data pipelines.' in client.user_prompt
+            assert 'equal opportunity' not in client.user_prompt
+            assert '<p>' not in client.user_prompt
+            assert result['input_tokens_saved'] > 0
+    
     def test_enhance_jd_creates_db_record(self, app, mock_claude_client):
         """Test that JD enhancement creates database record."""
         with app.app_context():
@@ -332,6 +585,96 @@ class TestInterviewGenerationService:
             service = InterviewGenerationService(mock_claude_client)
             result = service.get_interview(9999)
             assert result is None
+    
+    def test_prompt_cache_usage_is_logged(self, app):
+        """The JD is sent as a cached block and cache reads/writes are recorded."""
+        class PromptCachingClient(RecordedClaudeClient):
+            def _result(self):
+                result = super()._result()
+                result['usage'] = dict(
+                    result['usage'], cache_read_input_tokens=1500, cache_creation_input_tokens=400
+                )
+                return result
+            
+            def call_claude(self, system_prompt, user_prompt, **kwargs):
+                self.kwargs = kwargs
+                return super().call_claude(system_prompt, user_prompt, **kwargs)
+        
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-009',
+                basic_title='Engineer',
+                basic_description='Builds data pipelines',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.commit()
+            
+            client = PromptCachingClient(build_interview_text())
+            service = InterviewGenerationService(client)
+            result = service.generate_interview(
+                req_id='REQ-009', job_description_id=jd.id, user_id='user123', generation_mode='single'
+            )
+            
+            assert result['success'] == True
+            assert 'Builds data pipelines' in client.kwargs['cached_context']
+            assert 'Builds data pipelines' not in client.calls[0]
+            assert result['cache_read_tokens'] == 1500
+            log = GenerationLog.query.filter_by(req_id='REQ-009').first()
+            assert log.cache_read_tokens == 1500
+            assert log.cache_write_tokens == 400
+            assert log.model == 'claude-opus-4-1'
+            assert log.output_tokens == 2000
+    
+    def test_oversized_job_description_is_rejected(self, app, monkeypatch):
+        """A JD over MAX_INPUT_TOKENS fails the generation without calling Claude."""
+        monkeypatch.setattr(Config, 'MAX_INPUT_TOKENS', 100)
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-010',
+                basic_title='Engineer',
+                basic_description='Builds data pipelines and reporting. ' * 100,
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.commit()
+            
+            client = RecordedClaudeClient(build_interview_text())
+            result = InterviewGenerationService(client).generate_interview(
+                req_id='REQ-010', job_description_id=jd.id, user_id='user123', generation_mode='single'
+            )
+            
+            assert result['success'] == False
+            assert 'Job description is too long' in result['error']
+            assert client.calls == []
+            assert GenerationLog.query.filter_by(req_id='REQ-010').first().status == 'failed'
+    
+    def test_structured_output_keeps_colons_in_text(self, app):
+        """Tool-use output goes straight into question rows; colons in the text are not criteria."""
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-010',
+                basic_title='Data Engineer',
+                basic_description='Builds data pipelines',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.commit()
+            
+            server = FakeBatchServer(respond_to_prompt)
+            service = InterviewGenerationService(server.client())
+            result = service.generate_interview(
+                req_id='REQ-010', job_description_id=jd.id, user_id='user123', generation_mode='single'
+            )
+            
+            assert result['success'] == True
+            assert result['repaired_questions'] == 0
+            assert server.message_calls == 1
+            interview = db.session.get(Interview, result['interview_id'])
+            questions = sorted(interview.questions, key=lambda q: q.question_number)
+            assert questions[0].question_text.startswith('Scenario 1: the nightly ETL job')
+            assert len(questions[0].criteria) == 8
+            assert questions[0].criteria[0]['description'] == 'Covers point 1: e.g. retries, backfill.'
 
 
 class TestInterviewQuestionModel:
@@ -379,3 +722,1290 @@ class TestInterviewQuestionModel:
             assert result['question_number'] == 1
             assert result['question_text'] == 'Test question?'
             assert len(result['criteria']) == 1
+
+
+class TestConnectionRelease:
+    """Tests that no database connection is held while waiting on Claude."""
+    
+    def test_enhance_jd_releases_connection(self, app):
+        """No connection is checked out during the Claude call in enhance_jd."""
+        with app.app_context():
+            client = SlowConnectionCheckingClient()
+            client.watch(db.engine)
+            service = JDEnhancementService(client)
+            
+            # Enhance twice so both the create and update paths are covered
+            for _ in range(2):
+                result = service.enhance_jd(
+                    req_id='REQ-101',
+                    basic_title='Engineer',
+                    basic_description='Job description',
+                    user_id='user123'
+                )
+                assert result['success'] == True
+            
+            assert client.connections_held == [0, 0]
+            assert client.transactions_open == [False, False]
+    
+    def test_generate_interview_releases_connection(self, app):
+        """No connection is checked out during the Claude call in generate_interview."""
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-102',
+                basic_title='Engineer',
+                basic_description='Job description',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.flush()
+            jd_id = jd.id
+            db.session.commit()
+            
+            client = SlowConnectionCheckingClient()
+            client.watch(db.engine)
+            service = InterviewGenerationService(client)
+            result = service.generate_interview(
+                req_id='REQ-102',
+                job_description_id=jd_id,
+                user_id='user123'
+            )
+            
+            assert result['success'] == True
+            assert client.connections_held == [0]
+            assert client.transactions_open == [False]
+            assert len(result['interview']['questions']) == 5
+            
+            log = GenerationLog.query.filter_by(
+                req_id='REQ-102', operation_type='interview_generation'
+            ).first()
+            assert log.status == 'success'
+    
+    def test_failed_generation_writes_nothing(self, app):
+        """A validation failure leaves no interview behind and marks the log failed."""
+        with app.app_context():
+            class InvalidClient(MockClaudeClient):
+                def validate_interview_structure(self, questions):
+                    raise ValueError("Expected 5 questions, got 0")
+            
+            jd = JobDescription(
+                req_id='REQ-103',
+                basic_title='Engineer',
+                basic_description='Job description',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.commit()
+            
+            service = InterviewGenerationService(InvalidClient())
+            result = service.generate_interview(
+                req_id='REQ-103',
+                job_description_id=jd.id,
+                user_id='user123'
+            )
+            
+            assert result['success'] == False
+            assert Interview.query.filter_by(req_id='REQ-103').count() == 0
+            log = GenerationLog.query.filter_by(req_id='REQ-103').first()
+            assert log.status == 'failed'
+
+
+class InlineExecutor:
+    """Executor that runs submitted work immediately (or holds it, if paused)."""
+    
+    def __init__(self, paused=False):
+        self.paused = paused
+        self.pending = []
+    
+    def submit(self, fn, *args):
+        if self.paused:
+            self.pending.append((fn, args))
+        else:
+            fn(*args)
+
+
+class TestJobService:
+    """Tests for the background job service."""
+    
+    def test_job_runs_and_reports_result(self, app):
+        """A submitted job is persisted, run, and its result is readable."""
+        with app.app_context():
+            service = JobService(max_workers=1, max_queue_size=0, executor=InlineExecutor())
+            service.register('echo', lambda payload, user_id: {'success': True, 'echo': payload['value']})
+            
+            job = service.submit('echo', 'REQ-201', 'user123', {'value': 42})
+            
+            result = service.get_job(job['job_id'])
+            assert result['status'] == 'succeeded'
+            assert result['result']['echo'] == 42
+            assert result['started_at'] is not None
+    
+    def test_failed_job_records_error(self, app):
+        """A handler that raises marks the job failed with its error."""
+        with app.app_context():
+            def handler(payload, user_id):
+                raise RuntimeError('Claude unavailable')
+            
+            service = JobService(max_workers=1, max_queue_size=0, executor=InlineExecutor())
+            service.register('boom', handler)
+            
+            job = service.submit('boom', 'REQ-202', 'user123', {})
+            
+            result = service.get_job(job['job_id'])
+            assert result['status'] == 'failed'
+            assert result['error'] == 'Claude unavailable'
+    
+    def test_queue_is_bounded(self, app):
+        """Submissions beyond workers + queue size are rejected."""
+        with app.app_context():
+            executor = InlineExecutor(paused=True)
+            service = JobService(max_workers=1, max_queue_size=1, executor=executor)
+            service.register('echo', lambda payload, user_id: {'success': True})
+            
+            first = service.submit('echo', 'REQ-203', 'user123', {})
+            service.submit('echo', 'REQ-203', 'user123', {})
+            with pytest.raises(JobQueueFullError):
+                service.submit('echo', 'REQ-203', 'user123', {})
+            
+            assert service.get_job(first['job_id'])['status'] == 'queued'
+            
+            # Finishing a job frees a slot
+            fn, args = executor.pending.pop(0)
+            fn(*args)
+            service.submit('echo', 'REQ-203', 'user123', {})
+            assert GenerationJob.query.filter_by(req_id='REQ-203').count() == 3
+    
+    def test_stale_job_is_reported_failed(self, app):
+        """A job left running past the stale window is reported as failed."""
+        with app.app_context():
+            job = GenerationJob(
+                id='stale-job',
+                job_type='workflow_full',
+                req_id='REQ-204',
+                user_id='user123',
+                status='running',
+                payload={},
+                created_at=datetime(2020, 1, 1),
+                started_at=datetime(2020, 1, 1)
+            )
+            db.session.add(job)
+            db.session.commit()
+            
+            service = JobService(executor=InlineExecutor())
+            result = service.get_job('stale-job')
+            
+            assert result['status'] == 'failed'
+            assert service.get_job('missing') is None
+    
+    def test_staleness_runs_from_start_and_terminal_status_is_final(self, app):
+        """Time spent queued does not abandon a running job, and an abandoned job is never overwritten."""
+        with app.app_context():
+            executor = InlineExecutor(paused=True)
+            service = JobService(max_workers=1, max_queue_size=1, executor=executor)
+            seen = []
+            
+            def handler(payload, user_id):
+                job = GenerationJob.query.filter_by(req_id=payload['req_id']).first()
+                seen.append(service.get_job(job.id)['status'])
+                if payload['abandon']:
+                    job.started_at = datetime.utcnow() - timedelta(minutes=5)
+                    db.session.commit()
+                    seen.append(service.get_job(job.id)['status'])
+                return {'success': True}
+            
+            service.register('slow', handler, stale_after=60)
+            queued = service.submit('slow', 'REQ-205', 'user123', {'req_id': 'REQ-205', 'abandon': False})
+            abandoned = service.submit('slow', 'REQ-206', 'user123', {'req_id': 'REQ-206', 'abandon': True})
+            GenerationJob.query.update({GenerationJob.created_at: datetime.utcnow() - timedelta(minutes=5)})
+            db.session.commit()
+            for fn, args in executor.pending:
+                fn(*args)
+            
+            assert seen == ['running', 'running', 'failed']
+            assert service.get_job(queued['job_id'])['status'] == 'succeeded'
+            assert service.get_job(abandoned['job_id'])['status'] == 'failed'
+            assert service.get_job(abandoned['job_id'])['error'] == 'Job was abandoned before completion'
+
+
+class TestStreaming:
+    """Tests for the streaming (SSE) generation path."""
+    
+    def _create_jd(self, req_id):
+        jd = JobDescription(
+            req_id=req_id,
+            basic_title='Engineer',
+            basic_description='Job description',
+            enhanced_description='Enhanced job description',
+            created_by_user_id='user123'
+        )
+        db.session.add(jd)
+        db.session.flush()
+        jd_id = jd.id
+        db.session.commit()
+        return jd_id
+    
+    def test_stream_interview_emits_questions_before_stream_ends(self, app):
+        """Questions are yielded as soon as their block is complete."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-301')
+            client = RecordedClaudeClient(build_interview_text())
+            service = InterviewGenerationService(client)
+            
+            events = []
+            chunks_at_first_question = None
+            for event, data in service.stream_interview('REQ-301', jd_id, 'user123'):
+                if event == 'question' and chunks_at_first_question is None:
+                    chunks_at_first_question = client.chunks_sent
+                events.append((event, data))
+            
+            names = [event for event, _ in events]
+            assert names[0] == 'stage'
+            assert names.count('question') == 5
+            assert names[-1] == 'interview_complete'
+            assert [d['question_number'] for e, d in events if e == 'question'] == [1, 2, 3, 4, 5]
+            assert chunks_at_first_question < client.chunks_sent / 2
+            
+            interview = Interview.query.filter_by(req_id='REQ-301').first()
+            assert len(interview.questions) == 5
+    
+    def test_workflow_against_simulator(self, app):
+        """JD enhancement, a tool-mode interview and a streamed interview run end to end on the simulator."""
+        with app.app_context():
+            client = SimulatedClaudeClient(ClaudeSimulator(time_scale=0))
+            client.response_cache = None
+            client.rate_limiter = None
+            
+            enhanced = JDEnhancementService(client).enhance_jd(
+                req_id='REQ-305', basic_title='Data Engineer', basic_description='Builds data pipelines', user_id='user123'
+            )
+            service = InterviewGenerationService(client)
+            generated = service.generate_interview(
+                'REQ-305', enhanced['job_description_id'], 'user123', generation_mode='single'
+            )
+            streamed = [event for event, _ in service.stream_interview('REQ-305', enhanced['job_description_id'], 'user123')]
+            
+            assert enhanced['success'] == True
+            assert generated['success'] == True
+            assert len(generated['interview']['questions']) == 5
+            assert streamed.count('question') == 5
+            assert streamed[-1] == 'interview_complete'
+            assert client.simulator.stats()['requests'] == 3
+    
+    def test_stream_interview_reports_invalid_structure(self, app):
+        """An interview with no valid question yields an error event and saves nothing."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-302')
+            client = RecordedClaudeClient(build_interview_text(criteria_count=3))
+            service = InterviewGenerationService(client)
+            
+            events = list(service.stream_interview('REQ-302', jd_id, 'user123'))
+            
+            assert events[-1][0] == 'error'
+            assert 'has 3 criteria' in events[-1][1]['error']
+            assert len(client.calls) == 1
+            assert Interview.query.filter_by(req_id='REQ-302').count() == 0
+    
+    def test_stream_interview_repairs_missing_question(self, app):
+        """A missing question is re-requested and re-sent before saving."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-305')
+            client = RecordedClaudeClient(build_interview_text(question_count=4))
+            service = InterviewGenerationService(client)
+            
+            events = list(service.stream_interview('REQ-305', jd_id, 'user123'))
+            
+            assert ('stage', {'stage': 'repairing', 'status': 'started'}) in events
+            assert [d['question_number'] for e, d in events if e == 'question'] == [1, 2, 3, 4, 5]
+            assert events[-1][0] == 'interview_complete'
+            assert events[-1][1]['repaired_questions'] == 1
+    
+    def test_stream_interview_stops_after_last_question(self, app):
+        """The stream is closed once question 5 is complete, so trailing output is never read."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-306')
+            interview_text = build_interview_text()
+            text = interview_text + "\n\nI hope these questions help you assess candidates.\n" + "More notes.\n" * 200
+            client = RecordedClaudeClient(text)
+            service = InterviewGenerationService(client)
+            
+            events = list(service.stream_interview('REQ-306', jd_id, 'user123'))
+            
+            assert events[-1][0] == 'interview_complete'
+            assert client.stream_kwargs[0]['stop_sequences'] == ['[End of Interview]', '[Question 6]']
+            assert client.chunks_sent <= len(interview_text) // client.chunk_size + 3
+            assert len(Interview.query.filter_by(req_id='REQ-306').first().questions[4].criteria) == 8
+    
+    def test_stream_interview_aborts_malformed_stream(self, app):
+        """A skipped question number stops the stream; earlier questions are kept and the rest repaired."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-307')
+            text = build_interview_text().replace('[Question 3]', '[Question 4]', 1)
+            client = RecordedClaudeClient(text)
+            service = InterviewGenerationService(client)
+            
+            events = list(service.stream_interview('REQ-307', jd_id, 'user123'))
+            
+            assert client.chunks_sent < len(text) / client.chunk_size * 3 / 5
+            assert [d['question_number'] for e, d in events if e == 'question'] == [1, 2, 3, 4, 5]
+            assert events[-1][0] == 'interview_complete'
+            assert events[-1][1]['repaired_questions'] == 3
+    
+    def test_disconnected_stream_marks_log_failed(self, app):
+        """Closing a stream early (client disconnect) fails its log entry; closing after completion does not."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-308')
+            service = InterviewGenerationService(RecordedClaudeClient(build_interview_text()))
+            
+            stream = service.stream_interview('REQ-308', jd_id, 'user123')
+            assert next(stream)[0] == 'stage'
+            assert next(stream)[0] == 'question'
+            stream.close()
+            
+            finished = service.stream_interview('REQ-308', jd_id, 'user123')
+            for event, _ in finished:
+                if event == 'interview_complete':
+                    break
+            finished.close()
+            
+            logs = GenerationLog.query.filter_by(req_id='REQ-308').order_by(GenerationLog.id).all()
+            assert [log.status for log in logs] == ['failed', 'success']
+            assert logs[0].error_message == 'Client disconnected'
+            assert Interview.query.filter_by(req_id='REQ-308').count() == 1
+    
+    def test_stream_enhance_jd(self, app, mock_claude_client):
+        """JD text is streamed as deltas and then saved."""
+        with app.app_context():
+            service = JDEnhancementService(mock_claude_client)
+            
+            events = list(service.stream_enhance_jd(
+                req_id='REQ-303',
+                basic_title='Engineer',
+                basic_description='Job description',
+                user_id='user123'
+            ))
+            
+            deltas = ''.join(data['text'] for event, data in events if event == 'jd_delta')
+            assert events[-1][0] == 'jd_enhanced'
+            assert deltas.strip() == events[-1][1]['enhanced_jd']['description']
+            assert JobDescription.query.filter_by(req_id='REQ-303').first().enhanced_description == deltas.strip()
+    
+    def test_workflow_stream_route(self, monkeypatch):
+        """The streaming workflow endpoint emits Server-Sent Events end to end."""
+        from .app import create_app
+        from . import interview_routes
+        
+        client = RecordedClaudeClient(build_interview_text())
+        monkeypatch.setattr(interview_routes.jd_enhancement_service, 'claude_client', client)
+        monkeypatch.setattr(interview_routes.interview_generation_service, 'claude_client', client)
+        
+        app = create_app('testing')
+        with app.app_context():
+            response = app.test_client().post(
+                '/api/interview/workflow/full/stream',
+                json={'req_id': 'REQ-304', 'basic_title': 'Engineer', 'basic_description': 'Job description'},
+                headers={'X-User-ID': 'admin1', 'X-User-Role': 'admin'}
+            )
+            body = response.get_data(as_text=True)
+            
+            assert response.status_code == 200
+            assert response.mimetype == 'text/event-stream'
+            assert body.count('event: question\n') == 5
+            assert 'event: jd_enhanced\n' in body
+            assert body.rstrip().split('\n\n')[-1].startswith('event: done\n')
+            db.session.remove()
+            db.drop_all()
+    
+    def test_stream_routes_reject_non_object_bodies(self):
+        """A JSON body that is not an object gets a JSON 400 from the streaming endpoints."""
+        from .app import create_app
+        
+        app = create_app('testing')
+        with app.app_context():
+            headers = {'X-User-ID': 'admin1', 'X-User-Role': 'admin'}
+            for path in ('/api/interview/generate/stream', '/api/interview/workflow/full/stream'):
+                for body in ('null', '[]', '"REQ-307"'):
+                    response = app.test_client().post(
+                        path, data=body, content_type='application/json', headers=headers
+                    )
+                    assert response.status_code == 400
+                    assert response.get_json() == {'error': 'Request body must be a JSON object'}
+            db.session.remove()
+            db.drop_all()
+    
+    def test_unknown_generation_mode_rejected(self, monkeypatch):
+        """A misspelled generation_mode is a 400, not a silent fallback to single mode."""
+        from .app import create_app
+        from . import interview_routes
+        
+        client = RecordedClaudeClient(build_interview_text())
+        monkeypatch.setattr(interview_routes.jd_enhancement_service, 'claude_client', client)
+        monkeypatch.setattr(interview_routes.interview_generation_service, 'claude_client', client)
+        
+        app = create_app('testing')
+        with app.app_context():
+            headers = {'X-User-ID': 'admin1', 'X-User-Role': 'admin'}
+            generate = app.test_client().post(
+                '/api/interview/generate',
+                json={'req_id': 'REQ-306', 'job_description_id': 1, 'generation_mode': 'paralel'},
+                headers=headers
+            )
+            workflow = app.test_client().post(
+                '/api/interview/workflow/full',
+                json={'req_id': 'REQ-306', 'basic_title': 'Engineer', 'basic_description': 'Job description',
+                      'generation_mode': 'paralel'},
+                headers=headers
+            )
+            
+            assert generate.status_code == workflow.status_code == 400
+            assert "'paralel'" in generate.get_json()['error']
+            assert client.calls == []
+            assert JobDescription.query.filter_by(req_id='REQ-306').count() == 0
+            db.session.remove()
+            db.drop_all()
+
+
+class FanOutClaudeClient(RecordedClaudeClient):
+    """
+    Client that answers outline and per-question prompts, simulating a fixed
+    latency per call and recording how many calls ran at once.
+    """
+    
+    def __init__(self, latency=0.1, subject_areas=None):
+        super().__init__(text='')
+        self.latency = latency
+        self.subject_areas = subject_areas or [f"Subject Area {n}" for n in range(1, 6)]
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+    
+    def call_claude(self, system_prompt, user_prompt, **kwargs):
+        with self.lock:
+            self.calls.append(kwargs.get('max_tokens'))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        
+        if 'Choose the 5 subject areas' in user_prompt:
+            self.text = "\n".join(
+                f"{n}. {area} - Tests {area.lower()}." for n, area in enumerate(self.subject_areas, 1)
+            )
+        else:
+            n = int(re.search(r'starting with \[Question (\d+)\]', user_prompt).group(1))
+            self.text = build_interview_text(question_count=1).replace('[Question 1]', f'[Question {n}]')
+        return self._result()
+
+
+class TestParallelGeneration:
+    """Tests for the outline + per-question fan-out generation mode."""
+    
+    def test_parallel_generation_merges_questions(self, app):
+        """Per-question calls run concurrently and merge into a valid interview."""
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-401',
+                basic_title='Engineer',
+                basic_description='Job description',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.flush()
+            jd_id = jd.id
+            db.session.commit()
+            
+            client = FanOutClaudeClient(latency=0.1)
+            service = InterviewGenerationService(client)
+            
+            started = time.monotonic()
+            result = service.generate_interview(
+                req_id='REQ-401',
+                job_description_id=jd_id,
+                user_id='user123',
+                generation_mode='parallel'
+            )
+            elapsed = time.monotonic() - started
+            
+            assert result['success'] == True
+            questions = result['interview']['questions']
+            assert [q['question_number'] for q in questions] == [1, 2, 3, 4, 5]
+            assert len(client.calls) == 6
+            assert result['tokens_used'] == 6 * 3000
+            assert client.max_in_flight == 5
+            # Outline + the slowest question, not the sum of six calls
+            assert elapsed < 0.45
+    
+    def test_parallel_generation_rejects_short_outline(self, app):
+        """An outline without 5 items fails the generation."""
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-402',
+                basic_title='Engineer',
+                basic_description='Job description',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.commit()
+            
+            client = RecordedClaudeClient("1. Only One Area - Tests one thing.")
+            service = InterviewGenerationService(client)
+            result = service.generate_interview(
+                req_id='REQ-402',
+                job_description_id=jd.id,
+                user_id='user123',
+                generation_mode='parallel'
+            )
+            
+            assert result['success'] == False
+            assert 'outline items' in result['error']
+
+
+class TestQuestionCache:
+    """Tests for semantic reuse of cached questions."""
+    
+    def test_index_matches_similar_questions_only(self):
+        """Lookups honor the threshold and skill level, and use each entry once."""
+        index = QuestionIndex()
+        index.add([
+            (1, 'Senior', embed_question('Data Pipeline Reliability', 'Data Pipeline Reliability', 'How do you backfill?').tobytes()),
+            (2, 'Senior', embed_question('Kubernetes Networking', 'Kubernetes Networking', 'How do pods talk?').tobytes()),
+            (3, 'Junior', embed_question('API Design', 'API Design', 'Design a REST API.').tobytes())
+        ])
+        
+        queries = [
+            embed_question('Data Pipelines Reliability', 'Data Pipelines Reliability', 'Tests recovery of failed jobs.'),
+            embed_question('Data Pipeline Reliability', 'Data Pipeline Reliability', 'Tests backfills.'),
+            embed_question('Data Pipeline Design', 'Data Pipeline Design', 'Tests batch pipeline design.'),
+            embed_question('API Design', 'API Design', 'Tests REST API design.')
+        ]
+        matches = index.search(queries, 'senior', Config.CACHE_SIMILARITY_THRESHOLD)
+        
+        # Both reliability items want entry 1; the closer one gets it
+        assert matches[1][0] == 1 and matches[1][1] >= Config.CACHE_SIMILARITY_THRESHOLD
+        assert matches[0] == (None, 0.0)
+        assert matches[2] == (None, 0.0)  # a different subject area
+        assert matches[3] == (None, 0.0)  # only cached for another level
+        assert index.search(queries[3:], 'Junior', Config.CACHE_SIMILARITY_THRESHOLD)[0][0] == 3
+    
+    def test_similar_outline_items_reuse_cached_questions(self, app):
+        """Only the outline items without a similar cached question are sent to Claude."""
+        with app.app_context():
+            jds = []
+            for req_id in ('REQ-451', 'REQ-452'):
+                jd = JobDescription(
+                    req_id=req_id,
+                    basic_title='Data Engineer',
+                    basic_description='Job description',
+                    basic_level='Senior',
+                    created_by_user_id='user123'
+                )
+                db.session.add(jd)
+                jds.append(jd)
+            db.session.commit()
+            
+            client = FanOutClaudeClient(latency=0, subject_areas=[
+                'Data Pipeline Reliability', 'Kubernetes Networking', 'API Design',
+                'Incident Response', 'SQL Query Performance'
+            ])
+            service = InterviewGenerationService(client)
+            first = service.generate_interview(
+                req_id='REQ-451', job_description_id=jds[0].id, user_id='user123', generation_mode='parallel'
+            )
+            assert first['success'] == True
+            assert first['cached_questions'] == 0
+            assert QuestionCache.query.count() == 5
+            # Outline plus five expansions, shared by the five new entries
+            assert {entry.token_cost for entry in QuestionCache.query.all()} == {6 * 3000 // 5}
+            
+            # A near-identical role: two subject areas carry over (one reworded)
+            client.subject_areas = [
+                'Frontend Accessibility', 'Data Pipelines Reliability', 'Mobile Release Process',
+                'Kubernetes Networking', 'Security Threat Modeling'
+            ]
+            client.calls.clear()
+            # Single mode still plans with an outline while the cache has questions for the level
+            second = service.generate_interview(
+                req_id='REQ-452', job_description_id=jds[1].id, user_id='user123', generation_mode='single'
+            )
+            
+            assert second['success'] == True
+            assert second['cached_questions'] == 2
+            assert len(client.calls) == 1 + 3
+            assert second['tokens_used'] == 4 * 3000
+            questions = second['interview']['questions']
+            assert [q['question_number'] for q in questions] == [1, 2, 3, 4, 5]
+            
+            # Reuse is buffered in memory until the next flush
+            assert {entry.usage_count for entry in QuestionCache.query.all()} == {1}
+            assert service.usage_buffer.flush() == 2
+            
+            reused = {entry.topic: entry.usage_count for entry in QuestionCache.query.all()}
+            assert reused['Data Pipeline Reliability'] == 2
+            assert reused['Kubernetes Networking'] == 2
+            assert len(reused) == 8
+
+
+class TestQuestionCacheSweeper:
+    """Tests for question cache eviction."""
+    
+    @staticmethod
+    def _add_entries(entries):
+        """Add cache entries from (topic, usage_count, token_cost, idle days) tuples."""
+        now = datetime.utcnow()
+        for topic, usage_count, token_cost, idle_days in entries:
+            db.session.add(QuestionCache(
+                cache_key=topic,
+                request_hash=topic,
+                topic=topic,
+                skill_level='Senior',
+                question_text=f"Question on {topic}?",
+                criteria=make_valid_questions()[0]['criteria'],
+                embedding=embed_question(topic, topic).tobytes(),
+                usage_count=usage_count,
+                token_cost=token_cost,
+                last_used_at=now - timedelta(days=idle_days)
+            ))
+        db.session.commit()
+    
+    @pytest.mark.parametrize('policy, kept', [
+        ('lru', {'recent', 'unpriced', 'popular'}),
+        ('lfu', {'popular', 'expensive', 'stale'}),
+        ('cost', {'popular', 'expensive', 'recent'})
+    ])
+    def test_evicts_in_policy_order_in_batches(self, app, policy, kept):
+        """Entries over the limit are deleted in the policy's order, a batch per transaction."""
+        with app.app_context():
+            self._add_entries([
+                ('recent', 1, 3000, 0),
+                ('popular', 9, 500, 2),
+                ('expensive', 2, 8000, 5),
+                ('stale', 3, 100, 9),
+                ('cheap', 1, 100, 4),
+                ('unpriced', 1, None, 1)
+            ])
+            index = QuestionIndex()
+            index.refresh()
+            sweeper = QuestionCacheSweeper(index, policy=policy, max_entries=3, max_age_days=0, batch_size=2)
+            
+            report = sweeper.sweep()
+            
+            assert report['evicted'] == 3
+            assert report['batches'] == 2
+            assert report['live_entries'] == 3
+            assert {entry.topic for entry in QuestionCache.query.all()} == kept
+            assert len(index) == 3
+            assert sweeper.stats()['evicted'] == 3
+    
+    def test_expires_idle_entries_before_the_size_limit(self, app):
+        """Entries idle longer than the maximum age go first; an unknown policy is rejected."""
+        with app.app_context():
+            self._add_entries([(f"topic {i}", 1, 1000, i * 10) for i in range(12)])
+            sweeper = QuestionCacheSweeper(policy='lru', max_entries=5, max_age_days=45, batch_size=3)
+            
+            report = sweeper.sweep()
+            
+            # Idle 50-110 days: 7 expired in 3 batches; 5 remain, within the limit
+            assert report['expired'] == 7
+            assert report['evicted'] == 0
+            assert report['batches'] == 3
+            stats = sweeper.stats()
+            assert stats['live_entries'] == 5
+            assert stats['sweeps'] == 1 and stats['last_sweep']['expired'] == 7
+        
+        with pytest.raises(ValueError):
+            QuestionCacheSweeper(policy='fifo')
+
+
+class TestQuestionUsageBuffer:
+    """Tests for buffered question cache usage counters."""
+    
+    def test_flush_writes_hits_in_one_update_per_batch(self, app):
+        """Hits are summed in memory and written with one UPDATE per batch; timestamps only move forward."""
+        with app.app_context():
+            now = datetime.utcnow()
+            TestQuestionCacheSweeper._add_entries([(f"topic {i}", 1, 1000, 1) for i in range(5)])
+            ids = [entry.id for entry in QuestionCache.query.order_by(QuestionCache.id)]
+            # Another worker already recorded a later use of the first entry
+            QuestionCache.query.filter_by(id=ids[0]).update({QuestionCache.last_used_at: now + timedelta(hours=1)})
+            db.session.commit()
+            
+            buffer = QuestionUsageBuffer(batch_size=2)
+            buffer.record(ids[:3], used_at=now)
+            buffer.record(ids[:1], used_at=now)
+            buffer.record([ids[4], 999999], used_at=now)  # 999999 was evicted
+            assert buffer.stats()['pending_hits'] == 6
+            
+            updates = []
+            def count_updates(conn, cursor, statement, *args):
+                if statement.startswith('UPDATE question_cache'):
+                    updates.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count_updates)
+            try:
+                assert buffer.flush() == 5
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_updates)
+            
+            assert len(updates) == 3
+            entries = {entry.id: entry for entry in QuestionCache.query.all()}
+            assert [entries[entry_id].usage_count for entry_id in ids] == [3, 2, 2, 1, 2]
+            assert entries[ids[0]].last_used_at == now + timedelta(hours=1)
+            assert entries[ids[1]].last_used_at == now
+            assert entries[ids[3]].last_used_at < now
+            stats = buffer.stats()
+            assert stats['pending_entries'] == 0 and stats['rows_flushed'] == 5
+    
+    def test_failed_flush_keeps_hits(self, app, monkeypatch):
+        """Hits of a failed flush are merged back and written by the next one."""
+        with app.app_context():
+            TestQuestionCacheSweeper._add_entries([('topic', 1, 1000, 1)])
+            entry_id = QuestionCache.query.one().id
+            buffer = QuestionUsageBuffer()
+            buffer.record([entry_id])
+            
+            def fail(batch):
+                buffer.record([entry_id])  # a hit arriving during the flush
+                raise RuntimeError('deadlock')
+            monkeypatch.setattr(buffer, '_update', fail)
+            assert buffer.flush() == 0
+            assert buffer.stats()['pending_hits'] == 2
+            assert buffer.stats()['failures'] == 1
+            
+            monkeypatch.undo()
+            assert buffer.flush() == 1
+            assert QuestionCache.query.one().usage_count == 3
+
+
+class TestQuestionCacheLeases:
+    """Tests for stampede protection of the question cache."""
+    
+    def test_waits_for_outline_items_leased_by_another_request(self, app, monkeypatch):
+        """Items another request is generating are reused when cached, or taken over when it gives up."""
+        with app.app_context():
+            jd = JobDescription(
+                req_id='REQ-461',
+                basic_title='Data Engineer',
+                basic_description='Job description',
+                basic_level='Senior',
+                created_by_user_id='user123'
+            )
+            db.session.add(jd)
+            db.session.commit()
+            TestQuestionCacheSweeper._add_entries([('Data Pipeline Reliability', 1, 1000, 1)])
+            
+            # Another request is generating two of the outline items
+            other_request = CacheLeases()
+            other_leases = other_request.acquire(
+                CacheLeases.make_key('senior', topic_key(area)) for area in ('Mobile Release Process', 'Chaos Engineering')
+            )
+            assert len(other_leases) == 2
+            
+            client = FanOutClaudeClient(latency=0, subject_areas=[
+                'Frontend Accessibility', 'Data Pipelines Reliability', 'mobile release process',
+                'Security Threat Modeling', 'Chaos Engineering'
+            ])
+            service = InterviewGenerationService(client)
+            service.question_leases.poll_interval = 0.01
+            held = service.question_leases.held
+            
+            def other_request_finishes(keys):
+                # It caches its Mobile Release Process question and gives up on Chaos Engineering
+                TestQuestionCacheSweeper._add_entries([('Mobile Release Process', 1, 1000, 0)])
+                other_request.release(other_leases)
+                monkeypatch.setattr(service.question_leases, 'held', held)
+                return held(keys)
+            monkeypatch.setattr(service.question_leases, 'held', other_request_finishes)
+            
+            result = service.generate_interview(
+                req_id='REQ-461', job_description_id=jd.id, user_id='user123', generation_mode='parallel'
+            )
+            
+            assert result['success'] == True
+            assert result['cached_questions'] == 2
+            assert len(client.calls) == 1 + 3  # outline, then three items including Chaos Engineering
+            assert CacheLease.query.count() == 0
+            stats = service.question_leases.stats()
+            assert stats['contended'] == 2
+            assert stats['acquired'] == 2 + 1
+            assert stats['released'] == 3 and stats['timeouts'] == 0
+
+
+JD_TEMPLATE = (
+    "{location} - Senior Data Engineer (req {req}). You will design, build and operate the batch and "
+    "streaming pipelines that feed our analytics platform, own data quality checks and backfills, "
+    "partner with analysts on data models, and mentor two junior engineers. We use Python, Spark, "
+    "Airflow and Snowflake on AWS, deploy with Terraform and review every change. You have five years "
+    "of data engineering experience, have run pipelines in production and can explain trade-offs."
+)
+
+
+class TestNearDuplicateJDs:
+    """Tests for MinHash/LSH near-duplicate detection and cloning."""
+    
+    def test_index_finds_near_duplicates_quickly(self):
+        """Trivially different JDs match, others do not, and a lookup at 100k JDs is sub-millisecond."""
+        hasher = MinHasher()
+        index = NearDuplicateIndex()
+        rng = np.random.default_rng(0)
+        noise = rng.integers(0, 2 ** 32, (100000, index.num_perm), dtype=np.uint64).astype(np.uint32)
+        index.add((100 + i, BASIC, signature) for i, signature in enumerate(noise))
+        index.add([
+            (1, BASIC, hasher.signature(JD_TEMPLATE.format(location='London', req='R-1'))),
+            (2, BASIC, hasher.signature("Frontend Engineer. Build accessible React interfaces with TypeScript."))
+        ])
+        
+        query = hasher.signature(JD_TEMPLATE.format(location='Remote', req='R-2'))
+        assert [jd_id for jd_id, _ in index.query(query)] == [1]
+        assert index.query(query, field=ENHANCED) == []
+        assert index.query(query, exclude=1) == []
+        
+        timings = []
+        for _ in range(50):
+            started = time.perf_counter()
+            index.query(query)
+            timings.append(time.perf_counter() - started)
+        # Sub-millisecond in practice; the bound leaves room for slow CI machines
+        assert sorted(timings)[len(timings) // 2] < 0.002
+    
+    def test_near_duplicate_enhancement_and_interview_are_cloned(self, app):
+        """A near-duplicate req_id reuses the enhancement and the interview without calling Claude."""
+        with app.app_context():
+            index = NearDuplicateIndex()
+            client = RecordedClaudeClient(build_interview_text())
+            jd_service = JDEnhancementService(client, index)
+            interview_service = InterviewGenerationService(client, index)
+            
+            original = jd_service.enhance_jd(
+                req_id='REQ-461',
+                basic_title='Senior Data Engineer',
+                basic_description=JD_TEMPLATE.format(location='London', req='REQ-461'),
+                user_id='user123'
+            )
+            first = interview_service.generate_interview(
+                req_id='REQ-461', job_description_id=original['job_description_id'], user_id='user123'
+            )
+            assert first['success'] == True and first['cloned_from'] is None
+            calls = len(client.calls)
+            
+            duplicate = jd_service.enhance_jd(
+                req_id='REQ-462',
+                basic_title='Senior Data Engineer',
+                basic_description=JD_TEMPLATE.format(location='Remote', req='REQ-462'),
+                user_id='user123',
+                clone_near_duplicate=True
+            )
+            assert duplicate['success'] == True
+            assert duplicate['cloned_from']['job_description_id'] == original['job_description_id']
+            assert duplicate['cloned_from']['similarity'] >= Config.JD_DEDUP_THRESHOLD
+            assert duplicate['tokens_used'] == 0
+            assert duplicate['enhanced_jd']['description'] == original['enhanced_jd']['description']
+            
+            cloned = interview_service.generate_interview(
+                req_id='REQ-462',
+                job_description_id=duplicate['job_description_id'],
+                user_id='user123',
+                clone_near_duplicate=True
+            )
+            assert cloned['success'] == True
+            assert cloned['cloned_from']['interview_id'] == first['interview_id']
+            assert cloned['tokens_used'] == 0
+            assert [q['question_text'] for q in cloned['interview']['questions']] == \
+                [q['question_text'] for q in first['interview']['questions']]
+            assert len(client.calls) == calls
+            
+            # An unrelated JD is enhanced as usual
+            other = jd_service.enhance_jd(
+                req_id='REQ-463',
+                basic_title='Frontend Engineer',
+                basic_description='Build accessible React interfaces with TypeScript and a design system.',
+                user_id='user123',
+                clone_near_duplicate=True
+            )
+            assert other['cloned_from'] is None
+            assert len(client.calls) == calls + 1
+    
+    def test_backfill_signs_existing_jds(self, app):
+        """JDs written before signatures existed are signed in batches and then found by the index."""
+        with app.app_context():
+            for n, location in enumerate(['London', 'Berlin', 'Paris']):
+                db.session.add(JobDescription(
+                    req_id=f"REQ-47{n}",
+                    basic_title='Senior Data Engineer',
+                    basic_description=JD_TEMPLATE.format(location=location, req=f"REQ-47{n}"),
+                    enhanced_description='Enhanced' if n < 2 else None,
+                    created_by_user_id='user123',
+                    enhanced_at=datetime.utcnow() if n < 2 else None
+                ))
+            db.session.commit()
+            
+            assert backfill_signatures(batch_size=2) == {'signed': 3, 'batches': 2}
+            assert backfill_signatures(batch_size=2) == {'signed': 0, 'batches': 0}
+            assert JobDescription.query.filter(JobDescription.basic_minhash.is_(None)).count() == 0
+            
+            index = NearDuplicateIndex()
+            index.refresh()
+            query = MinHasher().signature(JD_TEMPLATE.format(location='Paris', req='REQ-472'))
+            paris_id = JobDescription.query.filter_by(req_id='REQ-472').first().id
+            assert len(index) == 5  # Three basic and two enhanced descriptions
+            assert index.query(query)[0] == (paris_id, 1.0)
+
+
+class RepairingClaudeClient(RecordedClaudeClient):
+    """
+    Client whose full-interview response has a broken question 3, and whose
+    single-question (repair) responses are valid unless told otherwise.
+    """
+    
+    def __init__(self, repair_valid=True):
+        broken = build_interview_text()
+        broken = broken.replace("Criterion 3.8: Demonstrates understanding of point 8 for scenario 3.\n", "")
+        super().__init__(broken)
+        self.repair_valid = repair_valid
+        self.repair_prompts = []
+    
+    def call_claude(self, system_prompt, user_prompt, **kwargs):
+        if 'write ONE question' not in user_prompt:
+            return super().call_claude(system_prompt, user_prompt, **kwargs)
+        
+        self.calls.append(user_prompt)
+        self.repair_prompts.append(user_prompt)
+        criteria_count = 9 if self.repair_valid else 7
+        return {
+            'success': True,
+            'text': build_interview_text(question_count=1, criteria_count=criteria_count),
+            'usage': {'input_tokens': 500, 'output_tokens': 400, 'total_tokens': 900},
+            'model': 'claude-opus-4-1',
+            'stop_reason': 'end_turn'
+        }
+
+
+class TestQuestionRepair:
+    """Tests for targeted repair of invalid questions."""
+    
+    def _create_jd(self, req_id):
+        jd = JobDescription(
+            req_id=req_id,
+            basic_title='Engineer',
+            basic_description='Job description',
+            created_by_user_id='user123'
+        )
+        db.session.add(jd)
+        db.session.flush()
+        jd_id = jd.id
+        db.session.commit()
+        return jd_id
+    
+    def test_find_question_errors(self):
+        """Every missing or invalid slot is reported, not just the first."""
+        client = RecordedClaudeClient('')
+        questions = make_valid_questions()
+        questions[1]['criteria'] = questions[1]['criteria'][:7]
+        questions[3]['criteria'][0]['description'] = ''
+        del questions[4]
+        
+        errors = client.find_question_errors(questions)
+        
+        assert sorted(errors) == [2, 4, 5]
+        assert errors[2] == 'Question 2 has 7 criteria. Expected 8-10 criteria.'
+        assert errors[4] == 'Question 4, Criterion 1 is missing description'
+        assert errors[5] == 'Question 5 is missing'
+    
+    def test_repairs_only_broken_question(self, app):
+        """Only the invalid question is re-requested; the rest are kept."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-501')
+            client = RepairingClaudeClient()
+            service = InterviewGenerationService(client)
+            
+            result = service.generate_interview(
+                req_id='REQ-501',
+                job_description_id=jd_id,
+                user_id='user123'
+            )
+            
+            assert result['success'] == True
+            assert result['repaired_questions'] == 1
+            assert result['tokens_used'] == 3000 + 900
+            assert len(client.repair_prompts) == 1
+            assert '[Question 3]' in client.repair_prompts[0]
+            assert 'Question 3 has 7 criteria' in client.repair_prompts[0]
+            
+            questions = result['interview']['questions']
+            assert len(questions[2]['criteria']) == 9
+            assert questions[0]['question_text'] == 'How would you approach scenario 1?'
+            
+            log = GenerationLog.query.filter_by(req_id='REQ-501').first()
+            assert log.repair_count == 1
+            assert log.tokens_saved == 3000 - 900
+    
+    def test_repair_rounds_are_bounded(self, app):
+        """A question that stays invalid fails the interview after the last round."""
+        with app.app_context():
+            jd_id = self._create_jd('REQ-502')
+            client = RepairingClaudeClient(repair_valid=False)
+            service = InterviewGenerationService(client)
+            service.repair_max_rounds = 2
+            
+            result = service.generate_interview(
+                req_id='REQ-502',
+                job_description_id=jd_id,
+                user_id='user123'
+            )
+            
+            assert result['success'] == False
+            assert 'Question 3 has 7 criteria' in result['error']
+            assert len(client.repair_prompts) == 2
+            assert Interview.query.filter_by(req_id='REQ-502').count() == 0
+
+
+class FakeBatchServer:
+    """
+    Local stand-in for the Claude Messages and Message Batches endpoints,
+    served to the SDK through an httpx mock transport.
+    
+    respond(params) returns the response text for one request (or a dict,
+    returned as a tool_use block), or raises to make that request error. A batch reports 'in_progress' for the first
+    `polls_until_ended` status checks; with `status_error` set, status checks fail with that HTTP status instead.
+    """
+    
+    def __init__(self, respond, polls_until_ended=1, status_error=None):
+        self.respond = respond
+        self.polls_until_ended = polls_until_ended
+        self.status_error = status_error
+        self.batches = {}
+        self.canceled = []
+        self.message_calls = 0
+    
+    def client(self):
+        """ClaudeClientService talking to this server, without caching or rate limiting."""
+        service = ClaudeClientService(
+            api_key='test-key',
+            http_client=httpx.Client(transport=httpx.MockTransport(self.handle))
+        )
+        service.response_cache = None
+        service.rate_limiter = None
+        service.hedging_policy = None
+        return service
+    
+    def handle(self, request):
+        path = request.url.path
+        
+        if request.method == 'POST' and path == '/v1/messages':
+            self.message_calls += 1
+            return httpx.Response(200, json=self._message(json.loads(request.content)))
+        
+        if request.method == 'POST' and path == '/v1/messages/batches':
+            batch_id = f"msgbatch_{len(self.batches) + 1}"
+            self.batches[batch_id] = {'requests': json.loads(request.content)['requests'], 'polls': 0}
+            return httpx.Response(200, json=self._batch(batch_id))
+        
+        match = re.match(r'^/v1/messages/batches/(\w+)/cancel$', path)
+        if request.method == 'POST' and match and match.group(1) in self.batches:
+            self.canceled.append(match.group(1))
+            return httpx.Response(200, json=self._batch(match.group(1)))
+        
+        match = re.match(r'^/v1/messages/batches/(\w+)(/results)?$', path)
+        if request.method == 'GET' and match and match.group(1) in self.batches:
+            batch_id = match.group(1)
+            if not match.group(2):
+                self.batches[batch_id]['polls'] += 1
+                if self.status_error:
+                    return httpx.Response(self.status_error, json={
+                        'type': 'error', 'error': {'type': 'invalid_request_error', 'message': 'status unavailable'}
+                    })
+                return httpx.Response(200, json=self._batch(batch_id))
+            
+            lines = []
+            for entry in self.batches[batch_id]['requests']:
+                try:
+                    outcome = {'type': 'succeeded', 'message': self._message(entry['params'])}
+                except Exception as e:
+                    outcome = {'type': 'errored', 'error': {
+                        'type': 'error', 'error': {'type': 'invalid_request_error', 'message': str(e)}
+                    }}
+                lines.append(json.dumps({'custom_id': entry['custom_id'], 'result': outcome}))
+            return httpx.Response(200, content='\n'.join(lines).encode(),
+                                  headers={'content-type': 'application/binary'})
+        
+        return httpx.Response(404, json={'type': 'error', 'error': {'type': 'not_found_error', 'message': path}})
+    
+    def _batch(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = batch['polls'] >= self.polls_until_ended
+        return {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {'processing': 0 if ended else len(batch['requests'])},
+            'results_url': f"https://api.anthropic.com/v1/messages/batches/{batch_id}/results" if ended else None
+        }
+    
+    def _message(self, params):
+        answer = self.respond(params)
+        if isinstance(answer, dict):
+            content = [{'type': 'tool_use', 'id': 'toolu_fake', 'name': params['tools'][0]['name'], 'input': answer}]
+        else:
+            content = [{'type': 'text', 'text': answer}]
+        return {
+            'id': 'msg_fake',
+            'type': 'message',
+            'role': 'assistant',
+            'model': params['model'],
+            'content': content,
+            'stop_reason': 'tool_use' if isinstance(answer, dict) else 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': 100, 'output_tokens': 200}
+        }
+
+
+def block_text(content):
+    """Prompt text of a system prompt or message content, as a string or content blocks."""
+    if isinstance(content, str):
+        return content
+    return "\n\n".join(block['text'] for block in content)
+
+
+def respond_to_prompt(params):
+    """Answer JD enhancement prompts with an enhanced JD and interview prompts with an interview."""
+    prompt = block_text(params['messages'][0]['content'])
+    if 'write ONE question' in prompt:
+        return build_interview_text(question_count=1, criteria_count=9)
+    if params.get('tools'):
+        return build_interview_input()
+    if block_text(params['system']).startswith(INTERVIEW_GENERATION_SYSTEM_PROMPT):
+        return build_interview_text()
+    if 'FAIL-ME' in prompt:
+        raise ValueError('prompt is too long')
+    return 'Enhanced: ' + prompt[-40:]
+
+
+def make_bulk_jds(*req_ids):
+    """Bulk workflow JD inputs."""
+    return [
+        {
+            'req_id': req_id,
+            'basic_title': f'Engineer {req_id}',
+            'basic_description': f'Builds things for {req_id}',
+            'work_output': 'Deployed services'
+        }
+        for req_id in req_ids
+    ]
+
+
+class TestBatchService:
+    """Tests for the Message Batches bulk pipeline."""
+    
+    def _service(self, server):
+        client = server.client()
+        return BatchService(
+            JDEnhancementService(client),
+            InterviewGenerationService(client),
+            poll_interval=0
+        )
+    
+    def test_bulk_workflow_writes_all_jds_and_interviews(self, app):
+        """One batch per stage; every JD and interview is written."""
+        with app.app_context():
+            server = FakeBatchServer(respond_to_prompt, polls_until_ended=3)
+            service = self._service(server)
+            
+            result = service.run_bulk_workflow(make_bulk_jds('REQ-601', 'REQ-602', 'REQ-603'), 'user123')
+            
+            assert result['success'] == True
+            assert result['succeeded'] == 3 and result['failed'] == 0
+            assert len(server.batches) == 2
+            assert [len(batch['requests']) for batch in server.batches.values()] == [3, 3]
+            assert all(batch['polls'] == 3 for batch in server.batches.values())
+            assert server.message_calls == 0
+            assert result['total_tokens_used'] == 6 * 300
+            
+            jd = JobDescription.query.filter_by(req_id='REQ-602').first()
+            assert jd.enhanced_description.startswith('Enhanced:')
+            assert jd.work_output == 'Deployed services'
+            interview = Interview.query.filter_by(req_id='REQ-602').first()
+            assert interview.interview_name == 'Engineer REQ-602 - Interview'
+            assert len(interview.questions) == 5
+            assert GenerationLog.query.filter_by(status='success').count() == 6
+    
+    def test_errored_request_fails_only_its_jd(self, app):
+        """An errored batch entry is reported for its JD; the others are written."""
+        with app.app_context():
+            server = FakeBatchServer(respond_to_prompt)
+            service = self._service(server)
+            jds = make_bulk_jds('REQ-611', 'REQ-612')
+            jds[1]['basic_description'] = 'FAIL-ME'
+            
+            result = service.run_bulk_workflow(jds, 'user123')
+            
+            assert result['succeeded'] == 1 and result['failed'] == 1
+            assert result['jd_enhancements'][1]['success'] == False
+            assert 'prompt is too long' in result['jd_enhancements'][1]['error']
+            assert len(result['interviews']) == 1
+            assert JobDescription.query.filter_by(req_id='REQ-612').first() is None
+            
+            log = GenerationLog.query.filter_by(req_id='REQ-612').first()
+            assert log.status == 'failed'
+            assert 'prompt is too long' in log.error_message
+    
+    def test_existing_jd_is_updated(self, app):
+        """A req_id that already exists is updated in place, not duplicated."""
+        with app.app_context():
+            db.session.add(JobDescription(
+                req_id='REQ-621',
+                basic_title='Old title',
+                basic_description='Old description',
+                created_by_user_id='user123'
+            ))
+            db.session.commit()
+            
+            service = self._service(FakeBatchServer(respond_to_prompt))
+            results = service.enhance_jds(make_bulk_jds('REQ-621'), 'user123')
+            
+            assert results[0]['success'] == True
+            assert JobDescription.query.filter_by(req_id='REQ-621').count() == 1
+            assert JobDescription.query.filter_by(req_id='REQ-621').first().enhanced_description.startswith('Enhanced:')
+    
+    def test_batch_timeout_cancels_and_fails_every_jd(self, app):
+        """A batch that does not end in time is canceled and every log entry fails."""
+        with app.app_context():
+            server = FakeBatchServer(respond_to_prompt, polls_until_ended=1000)
+            service = self._service(server)
+            service.timeout = 0
+            
+            with pytest.raises(TimeoutError):
+                service.enhance_jds(make_bulk_jds('REQ-641', 'REQ-642'), 'user123')
+            
+            assert server.canceled == ['msgbatch_1']
+            assert GenerationLog.query.filter_by(status='failed').count() == 2
+            assert JobDescription.query.count() == 0
+    
+    def test_failed_poll_cancels_batch(self, app):
+        """A batch whose status cannot be read is canceled before the error propagates."""
+        with app.app_context():
+            server = FakeBatchServer(respond_to_prompt, polls_until_ended=1000, status_error=400)
+            service = self._service(server)
+            
+            with pytest.raises(Exception, match='status unavailable'):
+                service.enhance_jds(make_bulk_jds('REQ-643'), 'user123')
+            
+            assert server.canceled == ['msgbatch_1']
+            assert GenerationLog.query.filter_by(req_id='REQ-643', status='failed').count() == 1
+    
+    def test_invalid_question_is_repaired_individually(self, app):
+        """A batched interview with a broken question is repaired with one direct call."""
+        with app.app_context():
+            def respond(params):
+                if params.get('tools'):
+                    interview = build_interview_input()
+                    interview['questions'][2]['criteria'].pop()
+                    return interview
+                return respond_to_prompt(params)
+            
+            server = FakeBatchServer(respond)
+            service = self._service(server)
+            
+            result = service.run_bulk_workflow(make_bulk_jds('REQ-631'), 'user123')
+            
+            assert result['succeeded'] == 1
+            assert result['interviews'][0]['repaired_questions'] == 1
+            assert server.message_calls == 1
+            interview = db.session.get(Interview, result['interviews'][0]['interview_id'])
+            assert len(sorted(interview.questions, key=lambda q: q.question_number)[2].criteria) == 9
@@ -0,0 +1,207 @@
+"""
+Token Budget - Per-operation max_tokens learned from past output sizes, and prompt input limits.
+Output sizes are recorded in generation_logs.output_tokens and in this process's own calls.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import deque
+from typing import Optional, Dict, Any
+from .config import Config
+from .models import GenerationLog
+from .rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class InputTooLargeError(ValueError):
+    """Raised instead of calling Claude when a prompt input is over its token limit."""
+
+
+def fit_input(text: str, max_tokens: Optional[int] = None, label: str = 'Input') -> str:
+    """
+    Check a prompt input against a token limit, compressing it if needed.
+    
+    Tokens are estimated locally (see estimate_tokens). Text over the limit
+    has its whitespace squeezed (trailing spaces, runs of spaces and blank
+    lines), which is often enough for JDs pasted from rich-text editors; text
+    still over the limit is rejected.
+    
+    Args:
+        text: Prompt input, e.g. a job description
+        max_tokens: Token limit (defaults to Config.MAX_INPUT_TOKENS; 0 disables)
+        label: Name of the input for the error message
+    
+    Returns:
+        The text, compressed if it was over the limit
+    
+    Raises:
+        InputTooLargeError: If the text is over the limit even after compression
+    """
+    max_tokens = Config.MAX_INPUT_TOKENS if max_tokens is None else max_tokens
+    if not max_tokens or not text or estimate_tokens(text) <= max_tokens:
+        return text
+    
+    compressed = re.sub(r'[ \t]+', ' ', text)
+    compressed = re.sub(r' *\n *', '\n', compressed)
+    compressed = re.sub(r'\n{3,}', '\n\n', compressed).strip()
+    
+    tokens = estimate_tokens(compressed)
+    if tokens > max_tokens:
+        raise InputTooLargeError(f"{label} is too long (~{tokens} tokens; the limit is {max_tokens})")
+    
+    logger.info(f"{label} compressed from ~{estimate_tokens(text)} to ~{tokens} tokens")
+    return compressed
+
+
+def load_token_history(claude_client, operation: str):
+    """Seed the client's token budgeter (if it has one) from generation_logs; see TokenBudgeter.ensure_history."""
+    budgeter = getattr(claude_client, 'token_budgeter', None)
+    if budgeter is not None:
+        budgeter.ensure_history(operation)
+
+
+class TokenBudgeter:
+    """
+    Chooses max_tokens per operation from the output sizes it has seen.
+    
+    Each operation keeps a window of recent output token counts. Once it has
+    `min_samples` of them, max_tokens is the `percentile` of the window times
+    `headroom`, rounded up to a multiple of ROUND_TO (so the hedging and rate
+    limiter keys built from max_tokens stay few) and clamped to
+    [min_max_tokens, default_max_tokens]. Before that, the default is used.
+    
+    A budget that turns out too small is not fatal: the truncated response
+    is continued (see ClaudeClientService.call_claude), and its full length
+    is recorded, so the budget grows.
+    """
+    
+    ROUND_TO = 256
+    
+    def __init__(
+        self,
+        percentile: Optional[float] = None,
+        headroom: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window_size: Optional[int] = None,
+        default_max_tokens: Optional[int] = None,
+        min_max_tokens: Optional[int] = None
+    ):
+        """
+        Initialize Token Budgeter.
+        
+        Args:
+            percentile: Percentile of past output sizes to cover (defaults to Config.TOKEN_BUDGET_PERCENTILE)
+            headroom: Multiplier applied on top of the percentile (defaults to Config.TOKEN_BUDGET_HEADROOM)
+            min_samples: Output sizes needed before the budget is used
+                         (defaults to Config.TOKEN_BUDGET_MIN_SAMPLES)
+            window_size: Output sizes remembered per operation (defaults to Config.TOKEN_BUDGET_WINDOW_SIZE)
+            default_max_tokens: Budget without enough samples, and the upper bound
+                                (defaults to Config.CLAUDE_MAX_TOKENS)
+            min_max_tokens: Lower bound of the budget (defaults to Config.TOKEN_BUDGET_MIN_MAX_TOKENS)
+        """
+        self.percentile = percentile if percentile is not None else Config.TOKEN_BUDGET_PERCENTILE
+        self.headroom = headroom if headroom is not None else Config.TOKEN_BUDGET_HEADROOM
+        self.min_samples = min_samples if min_samples is not None else Config.TOKEN_BUDGET_MIN_SAMPLES
+        self.window_size = window_size or Config.TOKEN_BUDGET_WINDOW_SIZE
+        self.default_max_tokens = default_max_tokens or Config.CLAUDE_MAX_TOKENS
+        self.min_max_tokens = min_max_tokens if min_max_tokens is not None else Config.TOKEN_BUDGET_MIN_MAX_TOKENS
+        self._lock = threading.Lock()
+        self._windows: Dict[str, deque] = {}
+        self._history_loaded = set()
+        self._history_loading = set()
+    
+    def max_tokens(self, operation: Optional[str]) -> int:
+        """
+        Budget for one call of an operation.
+        
+        Args:
+            operation: Operation key (e.g. 'jd_enhancement'); None gets the default
+        
+        Returns:
+            max_tokens to request
+        """
+        with self._lock:
+            window = self._windows.get(operation) if operation else None
+            if not window or len(window) < self.min_samples:
+                return self.default_max_tokens
+            samples = sorted(window)
+        
+        # Nearest-rank percentile
+        index = min(len(samples) - 1, max(0, math.ceil(self.percentile / 100 * len(samples)) - 1))
+        budget = math.ceil(samples[index] * self.headroom / self.ROUND_TO) * self.ROUND_TO
+        return max(self.min_max_tokens, min(self.default_max_tokens, budget))
+    
+    def record(self, operation: Optional[str], output_tokens: int):
+        """
+        Add a completed call's output size to its operation's window.
+        
+        Args:
+            operation: Operation the call was made for
+            output_tokens: Output tokens of the complete response (all segments)
+        """
+        if not operation or output_tokens <= 0:
+            return
+        with self._lock:
+            self._windows.setdefault(operation, deque(maxlen=self.window_size)).append(output_tokens)
+    
+    def ensure_history(self, operation: str):
+        """
+        Seed an operation's window from generation_logs, once per process.
+        
+        Queries through the caller's session, so call it during a
+        short read transaction (phase 1), not while Claude is being called.
+        A concurrent call for the same operation returns without waiting;
+        if the query fails, the error is raised and the next call retries.
+        
+        Args:
+            operation: GenerationLog.operation_type to load
+        """
+        with self._lock:
+            if operation in self._history_loaded or operation in self._history_loading:
+                return
+            self._history_loading.add(operation)
+        
+        try:
+            rows = (
+                GenerationLog.query
+                .filter(
+                    GenerationLog.operation_type == operation,
+                    GenerationLog.status == 'success',
+                    GenerationLog.output_tokens.isnot(None)
+                )
+                .order_by(GenerationLog.id.desc())
+                .limit(self.window_size)
+                .with_entities(GenerationLog.output_tokens)
+                .all()
+            )
+        except BaseException:
+            with self._lock:
+                self._history_loading.discard(operation)
+            raise
+        
+        with self._lock:
+            self._history_loading.discard(operation)
+            self._history_loaded.add(operation)
+            window = self._windows.setdefault(operation, deque(maxlen=self.window_size))
+            # Oldest first, ahead of anything this process recorded meanwhile
+            for (output_tokens,) in rows:
+                if len(window) < self.window_size:
+                    window.appendleft(output_tokens)
+        logger.info(f"Loaded {len(rows)} past output sizes for {operation}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report each operation's samples and current budget.
+        
+        Returns:
+            Dictionary keyed by operation with 'samples' and 'max_tokens'
+        """
+        with self._lock:
+            operations = {operation: len(window) for operation, window in self._windows.items()}
+        return {
+            operation: {'samples': samples, 'max_tokens': self.max_tokens(operation)}
+            for operation, samples in operations.items()
+        }
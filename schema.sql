@@ -45,6 +45,10 @@ CREATE TABLE job_descriptions (
     enhanced_title VARCHAR(255) DEFAULT NULL COMMENT 'Enhanced job title',
     enhanced_description TEXT DEFAULT NULL COMMENT 'Enhanced job description',
     
+    -- MinHash signatures, for near-duplicate JD detection
+    basic_minhash BLOB DEFAULT NULL COMMENT 'MinHash signature of the basic description',
+    enhanced_minhash BLOB DEFAULT NULL COMMENT 'MinHash signature of the enhanced description',
+    
     -- Metadata
     created_by_user_id VARCHAR(255) NOT NULL COMMENT 'User who created this JD',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT 'Creation timestamp',
@@ -52,7 +56,8 @@ CREATE TABLE job_descriptions (
     
     -- Indexes
     INDEX ix_job_descriptions_req_id (req_id),
-    INDEX ix_job_descriptions_created_by_user_id (created_by_user_id)
+    INDEX ix_job_descriptions_created_by_user_id (created_by_user_id),
+    INDEX ix_job_descriptions_enhanced_at (enhanced_at)
 ) ENGINE=InnoDB 
   DEFAULT CHARSET=utf8mb4 
   COLLATE=utf8mb4_unicode_ci
@@ -158,6 +163,8 @@ CREATE TABLE question_cache (
     -- Cached response
     question_text TEXT NOT NULL COMMENT 'Cached question text',
     criteria JSON NOT NULL COMMENT 'Cached evaluation criteria',
+    embedding BLOB DEFAULT NULL COMMENT 'Similarity vector of the question, for semantic reuse',
+    token_cost INT DEFAULT NULL COMMENT 'Tokens the question cost to generate (its share of the call)',
     
     -- Metadata
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT 'Cache creation timestamp',
@@ -166,7 +173,9 @@ CREATE TABLE question_cache (
     
     -- Indexes
     INDEX ix_question_cache_cache_key (cache_key),
-    INDEX ix_question_cache_request_hash (request_hash)
+    INDEX ix_question_cache_request_hash (request_hash),
+    INDEX ix_question_cache_last_used_at (last_used_at),
+    INDEX ix_question_cache_usage_count (usage_count)
 ) ENGINE=InnoDB 
   DEFAULT CHARSET=utf8mb4 
   COLLATE=utf8mb4_unicode_ci
@@ -190,6 +199,12 @@ CREATE TABLE generation_logs (
     status VARCHAR(50) NOT NULL COMMENT 'Status: success, failed, in_progress',
     error_message TEXT DEFAULT NULL COMMENT 'Error message if operation failed',
     tokens_used INT DEFAULT NULL COMMENT 'Claude API tokens consumed',
+    repair_count INT DEFAULT 0 COMMENT 'Questions re-requested because they failed validation',
+    tokens_saved INT DEFAULT 0 COMMENT 'Estimated tokens saved vs. regenerating the whole interview',
+    cache_read_tokens INT DEFAULT 0 COMMENT 'Prompt tokens read from the prompt cache',
+    cache_write_tokens INT DEFAULT 0 COMMENT 'Prompt tokens written to the prompt cache',
+    model VARCHAR(100) DEFAULT NULL COMMENT 'Claude model that served the operation',
+    output_tokens INT DEFAULT NULL COMMENT 'Output tokens of the operation (learns max_tokens)',
     
     -- Timestamps
     started_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT 'Operation start time',
@@ -206,6 +221,59 @@ CREATE TABLE generation_logs (
   COLLATE=utf8mb4_unicode_ci
   COMMENT='Audit log for all generation operations';
 
+-- ============================================================================
+-- Table: generation_jobs
+-- Background jobs of the async workflow API (POST /workflow/full with async)
+-- ============================================================================
+DROP TABLE IF EXISTS generation_jobs;
+
+CREATE TABLE generation_jobs (
+    id VARCHAR(36) NOT NULL PRIMARY KEY COMMENT 'Job ID (UUID4)',
+    
+    -- Job details
+    job_type VARCHAR(50) NOT NULL COMMENT 'Type: workflow_full',
+    req_id VARCHAR(255) NOT NULL COMMENT 'Requisition ID',
+    user_id VARCHAR(255) NOT NULL COMMENT 'User ID who submitted the job',
+    
+    -- Status and data
+    status VARCHAR(50) NOT NULL DEFAULT 'queued' COMMENT 'Status: queued, running, succeeded, failed',
+    payload JSON NOT NULL COMMENT 'Request body the job runs with',
+    result JSON DEFAULT NULL COMMENT 'Workflow result once succeeded',
+    error_message TEXT DEFAULT NULL COMMENT 'Error message if the job failed',
+    
+    -- Timestamps
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT 'Submission time',
+    started_at DATETIME DEFAULT NULL COMMENT 'Time a worker picked the job up',
+    completed_at DATETIME DEFAULT NULL COMMENT 'Completion time',
+    
+    -- Indexes
+    INDEX ix_generation_jobs_req_id (req_id),
+    INDEX ix_generation_jobs_user_id (user_id),
+    INDEX ix_generation_jobs_status (status)
+) ENGINE=InnoDB 
+  DEFAULT CHARSET=utf8mb4 
+  COLLATE=utf8mb4_unicode_ci
+  COMMENT='Background generation jobs';
+
+-- ============================================================================
+-- Table: cache_leases
+-- Short-lived leases that let one request fill a question cache entry
+-- while concurrent requests for it wait
+-- ============================================================================
+DROP TABLE IF EXISTS cache_leases;
+
+CREATE TABLE cache_leases (
+    lease_key VARCHAR(64) NOT NULL PRIMARY KEY COMMENT 'Hash of the skill level and subject area',
+    token VARCHAR(32) NOT NULL COMMENT 'Identifies the holder',
+    expires_at DATETIME NOT NULL COMMENT 'Lease lapses after this time if the holder crashes',
+    
+    -- Indexes
+    INDEX ix_cache_leases_expires_at (expires_at)
+) ENGINE=InnoDB 
+  DEFAULT CHARSET=utf8mb4 
+  COLLATE=utf8mb4_unicode_ci
+  COMMENT='Leases protecting the question cache from stampedes';
+
 -- ============================================================================
 -- Verification Queries
 -- ============================================================================
@@ -225,7 +293,9 @@ WHERE TABLE_SCHEMA = DATABASE()
       'interviews', 
       'interview_questions', 
       'question_cache', 
-      'generation_logs'
+      'generation_logs', 
+      'generation_jobs', 
+      'cache_leases'
   )
 ORDER BY TABLE_NAME;
 
@@ -256,7 +326,9 @@ WHERE TABLE_SCHEMA = DATABASE()
       'interviews', 
       'interview_questions', 
       'question_cache', 
-      'generation_logs'
+      'generation_logs', 
+      'generation_jobs', 
+      'cache_leases'
   )
 ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;
 